@@ -11,6 +11,7 @@ Train and evaluate baseline ML models for Arabic meter detection:
 Target: 75-80% accuracy (beat current 68.2% hybrid detector)
 """
 
+import os
 import sys
 import json
 import numpy as np
@@ -99,7 +100,16 @@ def extract_full_dataset_features():
     print("Extracting features using BAHRFeatureExtractor...")
     extractor = BAHRFeatureExtractor()
 
-    X, y = extractor.extract_batch(verses)
+    def report_progress(done, total):
+        print(f"\r  {done}/{total} verses", end="" if done < total else "\n", flush=True)
+
+    # Cached rows are reused, so only new or changed verses are extracted
+    X, y = extractor.extract_batch(
+        verses,
+        n_jobs=os.cpu_count() or 1,
+        cache_dir='data/ml/feature_cache',
+        progress=report_progress,
+    )
 
     print(f"✅ Feature extraction complete!")
     print(f"   Feature matrix shape: {X.shape}")
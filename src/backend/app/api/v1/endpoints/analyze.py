@@ -3,19 +3,25 @@ Analyze endpoint for prosodic analysis of Arabic poetry.
 """
 
 import logging
+from typing import Optional
+
 import numpy as np
 
 from fastapi import APIRouter, HTTPException, status
 
+from app.core.analysis_context import AnalysisContext
 from app.core.bahr_detector import BahrDetector
 from app.core.normalization import normalize_arabic_text
-from app.core.phonetics import text_to_phonetic_pattern
 from app.core.quality import analyze_verse_quality
 from app.core.rhyme import analyze_verse_rhyme
 from app.core.taqti3 import perform_taqti3
 from app.db.redis import cache_get, cache_set, generate_cache_key
+from app.db.revalidation import analysis_revalidator
+from app.db.singleflight import analysis_singleflight
+from app.executor import run_analysis
 from app.schemas.analyze import AnalyzeRequest, AnalyzeResponse, BahrInfo, RhymeInfo
 from app.ml.model_loader import ml_service
+from app.warmup import warmup
 
 logger = logging.getLogger(__name__)
 
@@ -109,136 +115,209 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
             )
 
         # Step b: Check Redis cache (with graceful degradation)
-        cache_key = generate_cache_key(
-            normalized_text,
-            detect_bahr=request.detect_bahr,
-            suggest_corrections=request.suggest_corrections,
-            analyze_rhyme=request.analyze_rhyme,
-        )
+        cache_key = _cache_key(request, normalized_text)
         cached_result = None
 
         try:
             cached_result = await cache_get(cache_key)
             if cached_result:
                 logger.info(f"Cache hit for key: {cache_key}")
-                return AnalyzeResponse(**cached_result)
+                return AnalyzeResponse.from_cache(cached_result)
         except Exception as e:
             # Cache failure should not break the request
             logger.warning(f"Cache read failed (continuing without cache): {e}")
 
         logger.info(f"Cache miss for key: {cache_key}, performing analysis")
 
-        # Step c: Perform taqti3 (scansion)
+        # Steps c-g: CPU-bound analysis, off the event loop. Concurrent misses
+        # of the same key (in this worker, or across workers with the Redis
+        # lease) share one analysis.
+        async def compute() -> AnalyzeResponse:
+            # Results of the warm-up fallbacks (rule-only detection while the
+            # ML models load) are not cached
+            cacheable = warmup.is_ready()
+            response = await run_analysis(_perform_analysis, request, normalized_text)
+            if not cacheable:
+                logger.info(f"Not caching result computed during warm-up: {cache_key}")
+                return response
+
+            # Step h: Cache result (TTL: 24 hours = 86400 seconds) with error handling
+            try:
+                response_dict = response.model_dump()
+                await cache_set(cache_key, response_dict, ttl=86400, normalized_text=normalized_text)
+                logger.info(f"Cached analysis result with key: {cache_key}")
+            except Exception as e:
+                # Cache failure should not break the response
+                logger.warning(f"Failed to cache result: {e}")
+            return response
+
+        async def lookup() -> Optional[AnalyzeResponse]:
+            cached = await cache_get(cache_key)
+            return AnalyzeResponse.from_cache(cached) if cached else None
+
+        # During an engine rollout, answer with the previous version's result
+        # and re-analyze in the background
+        if analysis_revalidator.enabled:
+            stale_key = _cache_key(
+                request, normalized_text, version=analysis_revalidator.previous_version
+            )
+            stale = await analysis_revalidator.serve_stale(
+                stale_key, cache_key, compute, lookup, parse=AnalyzeResponse.from_cache
+            )
+            if stale is not None:
+                logger.info(f"Serving previous engine version result for key: {cache_key}")
+                return stale
+
+        response = await analysis_singleflight.do(cache_key, compute, lookup)
+
+        # Step i: Return response
+        return response
+
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except ValueError as e:
+        # Handle validation errors
+        logger.error(f"Validation error: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        # Handle unexpected server errors
+        logger.error(f"Unexpected error during analysis: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred during analysis. Please try again.",
+        )
+
+
+def _cache_key(
+    request: AnalyzeRequest, normalized_text: str, version: Optional[str] = None
+) -> str:
+    """Cache key for an analysis under an engine version (default: current)."""
+    return generate_cache_key(
+        normalized_text,
+        detect_bahr=request.detect_bahr,
+        suggest_corrections=request.suggest_corrections,
+        analyze_rhyme=request.analyze_rhyme,
+        version=version,
+    )
+
+
+def _perform_analysis(request: AnalyzeRequest, normalized_text: str) -> AnalyzeResponse:
+    """
+    Run the CPU-bound part of the analysis (taqti3, bahr, quality, rhyme).
+
+    Executed on the analysis executor (thread or process pool), so it must be
+    a module-level function and only raise picklable exceptions.
+
+    Args:
+        request: Analysis request
+        normalized_text: Normalized verse text
+
+    Returns:
+        AnalyzeResponse (not cached yet)
+
+    Raises:
+        ValueError: Invalid verse structure (mapped to 400 by the endpoint)
+    """
+    # Derived text representations, shared by every stage below
+    context = AnalysisContext(request.text, normalized_text=normalized_text)
+
+    # Step c: Perform taqti3 (scansion)
+    try:
+        taqti3_result = perform_taqti3(normalized_text, normalize=False, context=context)
+
+        # Edge case: Empty taqti3 result
+        if not taqti3_result or not taqti3_result.strip():
+            logger.warning("Taqti3 returned empty result")
+            taqti3_result = "غير محدد"  # "Not determined"
+
+    except ValueError as e:
+        logger.error(f"Taqti3 validation error: {e}")
+        # Mapped to 400 by the endpoint (HTTPException does not pickle)
+        raise ValueError(f"Invalid verse structure: {str(e)}") from e
+    except Exception as e:
+        logger.error(f"Taqti3 processing failed: {e}", exc_info=True)
+        # Provide graceful fallback
+        taqti3_result = "خطأ في التحليل"  # "Analysis error"
+
+    # Step d: Hybrid bahr detection (Rule-based + ML fallback)
+    bahr_info = None
+    confidence = 0.0
+    detection_method = "none"
+
+    if request.detect_bahr:
         try:
-            taqti3_result = perform_taqti3(normalized_text, normalize=False)
+            # Try rule-based detection first
+            detected_bahr = bahr_detector.analyze_verse(normalized_text, context=context)
+
+            if detected_bahr and detected_bahr.confidence >= RULE_BASED_CONFIDENCE_THRESHOLD:
+                # High confidence rule-based detection - use it
+                bahr_info = BahrInfo(
+                    id=detected_bahr.id,
+                    name_ar=detected_bahr.name_ar,
+                    name_en=detected_bahr.name_en,
+                    confidence=detected_bahr.confidence,
+                )
+                confidence = detected_bahr.confidence
+                detection_method = "rule_based"
+                logger.info(
+                    f"✓ Rule-based detection: {bahr_info.name_ar} (confidence: {confidence:.2f})"
+                )
 
-            # Edge case: Empty taqti3 result
-            if not taqti3_result or not taqti3_result.strip():
-                logger.warning("Taqti3 returned empty result")
-                taqti3_result = "غير محدد"  # "Not determined"
+            elif ml_service.is_loaded():
+                # Low confidence or no rule-based match - try ML fallback
+                try:
+                    # Extract the model's selected features for ML prediction
+                    features = ml_service.extract_features(normalized_text, context=context)
 
-        except ValueError as e:
-            logger.error(f"Taqti3 validation error: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid verse structure: {str(e)}",
-            )
-        except Exception as e:
-            logger.error(f"Taqti3 processing failed: {e}", exc_info=True)
-            # Provide graceful fallback
-            taqti3_result = "خطأ في التحليل"  # "Analysis error"
+                    # Get ML prediction
+                    ml_result = ml_service.predict_batched(features)
 
-        # Step d: Hybrid bahr detection (Rule-based + ML fallback)
-        bahr_info = None
-        confidence = 0.0
-        detection_method = "none"
+                    # Compare with rule-based if it exists
+                    if detected_bahr and ml_result['confidence'] > detected_bahr.confidence:
+                        # ML is more confident
+                        bahr_info = BahrInfo(
+                            id=None,  # ML doesn't have IDs yet
+                            name_ar=ml_result['meter'],
+                            name_en=ml_result['meter'],  # TODO: Add translation mapping
+                            confidence=ml_result['confidence'],
+                        )
+                        confidence = ml_result['confidence']
+                        detection_method = "ml_override"
+                        logger.info(
+                            f"✓ ML override: {bahr_info.name_ar} (confidence: {confidence:.2f}, "
+                            f"top-3: {ml_result['top_k'][:3]})"
+                        )
+                    elif not detected_bahr:
+                        # Pure ML detection (rule-based found nothing)
+                        bahr_info = BahrInfo(
+                            id=None,
+                            name_ar=ml_result['meter'],
+                            name_en=ml_result['meter'],
+                            confidence=ml_result['confidence'],
+                        )
+                        confidence = ml_result['confidence']
+                        detection_method = "ml_only"
+                        logger.info(
+                            f"✓ ML detection: {bahr_info.name_ar} (confidence: {confidence:.2f})"
+                        )
+                    else:
+                        # Use rule-based despite low confidence
+                        bahr_info = BahrInfo(
+                            id=detected_bahr.id,
+                            name_ar=detected_bahr.name_ar,
+                            name_en=detected_bahr.name_en,
+                            confidence=detected_bahr.confidence,
+                        )
+                        confidence = detected_bahr.confidence
+                        detection_method = "rule_based_low"
+                        logger.info(
+                            f"✓ Rule-based (low conf): {bahr_info.name_ar} "
+                            f"(rb: {confidence:.2f} vs ml: {ml_result['confidence']:.2f})"
+                        )
 
-        if request.detect_bahr:
-            try:
-                # Try rule-based detection first
-                detected_bahr = bahr_detector.analyze_verse(normalized_text)
-                
-                if detected_bahr and detected_bahr.confidence >= RULE_BASED_CONFIDENCE_THRESHOLD:
-                    # High confidence rule-based detection - use it
-                    bahr_info = BahrInfo(
-                        id=detected_bahr.id,
-                        name_ar=detected_bahr.name_ar,
-                        name_en=detected_bahr.name_en,
-                        confidence=detected_bahr.confidence,
-                    )
-                    confidence = detected_bahr.confidence
-                    detection_method = "rule_based"
-                    logger.info(
-                        f"✓ Rule-based detection: {bahr_info.name_ar} (confidence: {confidence:.2f})"
-                    )
-                    
-                elif ml_service.is_loaded():
-                    # Low confidence or no rule-based match - try ML fallback
-                    try:
-                        # Extract features for ML prediction
-                        from app.ml.feature_extractor import BAHRFeatureExtractor
-                        extractor = BAHRFeatureExtractor()
-                        features = extractor.extract_features(normalized_text)
-                        
-                        # Get ML prediction
-                        ml_result = ml_service.predict(features)
-                        
-                        # Compare with rule-based if it exists
-                        if detected_bahr and ml_result['confidence'] > detected_bahr.confidence:
-                            # ML is more confident
-                            bahr_info = BahrInfo(
-                                id=None,  # ML doesn't have IDs yet
-                                name_ar=ml_result['meter'],
-                                name_en=ml_result['meter'],  # TODO: Add translation mapping
-                                confidence=ml_result['confidence'],
-                            )
-                            confidence = ml_result['confidence']
-                            detection_method = "ml_override"
-                            logger.info(
-                                f"✓ ML override: {bahr_info.name_ar} (confidence: {confidence:.2f}, "
-                                f"top-3: {ml_result['top_k'][:3]})"
-                            )
-                        elif not detected_bahr:
-                            # Pure ML detection (rule-based found nothing)
-                            bahr_info = BahrInfo(
-                                id=None,
-                                name_ar=ml_result['meter'],
-                                name_en=ml_result['meter'],
-                                confidence=ml_result['confidence'],
-                            )
-                            confidence = ml_result['confidence']
-                            detection_method = "ml_only"
-                            logger.info(
-                                f"✓ ML detection: {bahr_info.name_ar} (confidence: {confidence:.2f})"
-                            )
-                        else:
-                            # Use rule-based despite low confidence
-                            bahr_info = BahrInfo(
-                                id=detected_bahr.id,
-                                name_ar=detected_bahr.name_ar,
-                                name_en=detected_bahr.name_en,
-                                confidence=detected_bahr.confidence,
-                            )
-                            confidence = detected_bahr.confidence
-                            detection_method = "rule_based_low"
-                            logger.info(
-                                f"✓ Rule-based (low conf): {bahr_info.name_ar} "
-                                f"(rb: {confidence:.2f} vs ml: {ml_result['confidence']:.2f})"
-                            )
-                            
-                    except Exception as ml_error:
-                        logger.warning(f"ML prediction failed, falling back to rule-based: {ml_error}")
-                        if detected_bahr:
-                            bahr_info = BahrInfo(
-                                id=detected_bahr.id,
-                                name_ar=detected_bahr.name_ar,
-                                name_en=detected_bahr.name_en,
-                                confidence=detected_bahr.confidence,
-                            )
-                            confidence = detected_bahr.confidence
-                            detection_method = "rule_based_fallback"
-                else:
-                    # No ML model available, use rule-based result
+                except Exception as ml_error:
+                    logger.warning(f"ML prediction failed, falling back to rule-based: {ml_error}")
                     if detected_bahr:
                         bahr_info = BahrInfo(
                             id=detected_bahr.id,
@@ -247,125 +326,111 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
                             confidence=detected_bahr.confidence,
                         )
                         confidence = detected_bahr.confidence
-                        detection_method = "rule_based_only"
-                    else:
-                        logger.info("No bahr detected with sufficient confidence")
-                        detection_method = "none"
-                        
-            except Exception as e:
-                logger.error(f"Bahr detection failed: {e}", exc_info=True)
-                detection_method = "error"
-                # Continue without bahr detection - don't fail the whole request
-
-        # Step e: Advanced quality analysis using quality module
-        try:
-            # Get phonetic pattern for advanced analysis
-            phonetic_pattern = text_to_phonetic_pattern(normalized_text)
-
-            # Perform comprehensive quality analysis
-            quality_score, quality_errors, quality_suggestions = analyze_verse_quality(
-                verse_text=request.text,
-                taqti3_result=taqti3_result,
-                bahr_id=bahr_info.id if bahr_info else None,
-                bahr_name_ar=bahr_info.name_ar if bahr_info else None,
-                meter_confidence=confidence,
-                detected_pattern=phonetic_pattern,
-                expected_pattern="",  # Could be enhanced to fetch from bahr template
-            )
-
-            # Use sophisticated score from quality module
-            score = quality_score.overall
-
-            # Use quality-generated suggestions
-            suggestions = quality_suggestions if request.suggest_corrections else []
-
-            # Log quality metrics
-            logger.info(
-                f"Quality analysis: overall={score:.2f}, "
-                f"meter_accuracy={quality_score.meter_accuracy:.2f}, "
-                f"errors_count={len(quality_errors)}"
-            )
+                        detection_method = "rule_based_fallback"
+            else:
+                # No ML model available, use rule-based result
+                if detected_bahr:
+                    bahr_info = BahrInfo(
+                        id=detected_bahr.id,
+                        name_ar=detected_bahr.name_ar,
+                        name_en=detected_bahr.name_en,
+                        confidence=detected_bahr.confidence,
+                    )
+                    confidence = detected_bahr.confidence
+                    detection_method = "rule_based_only"
+                else:
+                    logger.info("No bahr detected with sufficient confidence")
+                    detection_method = "none"
 
         except Exception as e:
-            # Fallback to simple scoring if quality module fails
-            logger.warning(f"Quality analysis failed, using simple scoring: {e}")
-
-            score = round(confidence * 100, 2) if confidence > 0 else 0.0
-            score = max(0.0, min(100.0, score))
-
-            suggestions = []
-            if confidence >= 0.9:
-                suggestions.append("التقطيع دقيق ومتسق")
-            elif confidence >= 0.7:
-                suggestions.append("التقطيع جيد مع بعض الاختلافات البسيطة")
-            elif confidence > 0:
-                suggestions.append("قد يحتاج البيت إلى مراجعة للتقطيع")
-
-            if not bahr_info and request.detect_bahr:
-                suggestions.append("لم يتم التعرف على البحر بثقة كافية")
-
-        # Step f: Rhyme analysis (if requested)
-        rhyme_info = None
-        if request.analyze_rhyme:
-            try:
-                rhyme_pattern, rhyme_desc_ar, rhyme_desc_en = analyze_verse_rhyme(
-                    request.text
-                )
+            logger.error(f"Bahr detection failed: {e}", exc_info=True)
+            detection_method = "error"
+            # Continue without bahr detection - don't fail the whole request
 
-                rhyme_info = RhymeInfo(
-                    rawi=rhyme_pattern.qafiyah.rawi,
-                    rawi_vowel=rhyme_pattern.qafiyah.rawi_vowel,
-                    rhyme_types=[rt.value for rt in rhyme_pattern.rhyme_types],
-                    description_ar=rhyme_desc_ar,
-                    description_en=rhyme_desc_en,
-                )
+    # Step e: Advanced quality analysis using quality module
+    try:
+        # Get phonetic pattern for advanced analysis
+        phonetic_pattern = context.pattern()
+
+        # Perform comprehensive quality analysis
+        quality_score, quality_errors, quality_suggestions = analyze_verse_quality(
+            verse_text=request.text,
+            taqti3_result=taqti3_result,
+            bahr_id=bahr_info.id if bahr_info else None,
+            bahr_name_ar=bahr_info.name_ar if bahr_info else None,
+            meter_confidence=confidence,
+            detected_pattern=phonetic_pattern,
+            expected_pattern="",  # Could be enhanced to fetch from bahr template
+        )
 
-                # Add rhyme info to suggestions
-                if request.suggest_corrections:
-                    suggestions.append(f"🎵 {rhyme_desc_ar}")
+        # Use sophisticated score from quality module
+        score = quality_score.overall
 
-                logger.info(
-                    f"Rhyme analysis: rawi={rhyme_pattern.qafiyah.rawi}, types={len(rhyme_pattern.rhyme_types)}"
-                )
+        # Use quality-generated suggestions
+        suggestions = quality_suggestions if request.suggest_corrections else []
 
-            except Exception as e:
-                # Rhyme analysis is optional, don't fail if it errors
-                logger.warning(f"Rhyme analysis failed: {e}")
-
-        # Step g: Build response
-        response = AnalyzeResponse(
-            text=request.text,
-            taqti3=taqti3_result,
-            bahr=bahr_info,
-            rhyme=rhyme_info,
-            errors=[],
-            suggestions=suggestions if request.suggest_corrections else [],
-            score=score,
+        # Log quality metrics
+        logger.info(
+            f"Quality analysis: overall={score:.2f}, "
+            f"meter_accuracy={quality_score.meter_accuracy:.2f}, "
+            f"errors_count={len(quality_errors)}"
         )
 
-        # Step h: Cache result (TTL: 24 hours = 86400 seconds) with error handling
+    except Exception as e:
+        # Fallback to simple scoring if quality module fails
+        logger.warning(f"Quality analysis failed, using simple scoring: {e}")
+
+        score = round(confidence * 100, 2) if confidence > 0 else 0.0
+        score = max(0.0, min(100.0, score))
+
+        suggestions = []
+        if confidence >= 0.9:
+            suggestions.append("التقطيع دقيق ومتسق")
+        elif confidence >= 0.7:
+            suggestions.append("التقطيع جيد مع بعض الاختلافات البسيطة")
+        elif confidence > 0:
+            suggestions.append("قد يحتاج البيت إلى مراجعة للتقطيع")
+
+        if not bahr_info and request.detect_bahr:
+            suggestions.append("لم يتم التعرف على البحر بثقة كافية")
+
+    # Step f: Rhyme analysis (if requested)
+    rhyme_info = None
+    if request.analyze_rhyme:
         try:
-            response_dict = response.model_dump()
-            await cache_set(cache_key, response_dict, ttl=86400)
-            logger.info(f"Cached analysis result with key: {cache_key}")
-        except Exception as e:
-            # Cache failure should not break the response
-            logger.warning(f"Failed to cache result: {e}")
+            rhyme_pattern, rhyme_desc_ar, rhyme_desc_en = analyze_verse_rhyme(
+                request.text, context=context
+            )
 
-        # Step i: Return response
-        return response
+            rhyme_info = RhymeInfo(
+                rawi=rhyme_pattern.qafiyah.rawi,
+                rawi_vowel=rhyme_pattern.qafiyah.rawi_vowel,
+                rhyme_types=[rt.value for rt in rhyme_pattern.rhyme_types],
+                description_ar=rhyme_desc_ar,
+                description_en=rhyme_desc_en,
+            )
 
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
-    except ValueError as e:
-        # Handle validation errors
-        logger.error(f"Validation error: {e}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-    except Exception as e:
-        # Handle unexpected server errors
-        logger.error(f"Unexpected error during analysis: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred during analysis. Please try again.",
-        )
+            # Add rhyme info to suggestions
+            if request.suggest_corrections:
+                suggestions.append(f"🎵 {rhyme_desc_ar}")
+
+            logger.info(
+                f"Rhyme analysis: rawi={rhyme_pattern.qafiyah.rawi}, types={len(rhyme_pattern.rhyme_types)}"
+            )
+
+        except Exception as e:
+            # Rhyme analysis is optional, don't fail if it errors
+            logger.warning(f"Rhyme analysis failed: {e}")
+
+    # Step g: Build response
+    response = AnalyzeResponse(
+        text=request.text,
+        taqti3=taqti3_result,
+        bahr=bahr_info,
+        rhyme=rhyme_info,
+        errors=[],
+        suggestions=suggestions if request.suggest_corrections else [],
+        score=score,
+    )
+
+    return response
@@ -9,38 +9,62 @@ This endpoint uses BahrDetectorV2 which provides:
 - Bilingual explanations (Arabic + English)
 """
 
+import asyncio
+import json
 import logging
-import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
+from app.config import settings
+from app.core.analysis_context import AnalysisContext
 from app.core.normalization import normalize_arabic_text
-from app.core.phonetics import text_to_phonetic_pattern
 from app.core.prosody.detector_v2 import BahrDetectorV2
 from app.core.prosody.fallback_detector import detect_with_all_strategies
-from app.core.prosody.phoneme_based_detector import (
-    detect_meter_from_text,
-    detect_with_phoneme_fitness,
-)
+from app.core.prosody.phoneme_based_detector import detect_meter_candidates
 from app.core.quality import analyze_verse_quality
-from app.core.rhyme import analyze_verse_rhyme
+from app.core.rhyme import analyze_poem_rhyme, analyze_verse_rhyme
 from app.core.taqti3 import perform_taqti3
-from app.db.redis import cache_get, cache_set, generate_cache_key
+from app.db.redis import (
+    cache_get,
+    cache_get_many,
+    cache_set,
+    cache_set_many,
+    generate_cache_key,
+)
+from app.db.revalidation import analysis_revalidator
+from app.db.singleflight import analysis_singleflight
+from app.executor import get_analysis_executor, run_analysis
 from app.schemas.analyze import (
+    BATCH_MAX_ITEMS,
+    POEM_MAX_VERSES,
     AlternativeMeter,
+    AnalyzeBatchItem,
+    AnalyzeBatchRequest,
+    AnalyzePoemRequest,
     AnalyzeRequest,
     AnalyzeResponse,
     BahrInfo,
     DetectionUncertainty,
+    PoemMeterSummary,
+    PoemRhymeError,
+    PoemRhymeInfo,
+    PoemSummary,
     RhymeInfo,
 )
+from app.warmup import warmup
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Initialize BahrDetectorV2 (singleton)
-bahr_detector_v2 = BahrDetectorV2()
+bahr_detector_v2 = BahrDetectorV2(lazy_vowel_inference=True)
 logger.info(
     f"BahrDetectorV2 initialized: {bahr_detector_v2.get_statistics()['total_meters']} meters, {bahr_detector_v2.get_statistics()['total_patterns']} patterns"
 )
@@ -125,12 +149,7 @@ async def analyze_v2(request: AnalyzeRequest) -> AnalyzeResponse:
         logger.info(f"[V2] Analyzing verse: {request.text[:50]}...")
 
         try:
-            normalized_text = normalize_arabic_text(
-                request.text,
-                remove_tashkeel=False,  # Keep diacritics for accurate analysis
-                normalize_hamzas=True,
-                normalize_alefs=True,
-            )
+            normalized_text = _normalize_verse(request.text)
         except Exception as e:
             logger.error(f"Text normalization failed: {e}")
             raise HTTPException(
@@ -145,422 +164,896 @@ async def analyze_v2(request: AnalyzeRequest) -> AnalyzeResponse:
             )
 
         # Step 2: Check Redis cache
-        cache_key = generate_cache_key(
-            normalized_text + "_v2",
-            detect_bahr=request.detect_bahr,
-            suggest_corrections=request.suggest_corrections,
-            analyze_rhyme=request.analyze_rhyme,
-        )  # Different cache for v2
+        cache_key = _cache_key_v2(request, normalized_text)
         cached_result = None
 
         try:
             cached_result = await cache_get(cache_key)
             if cached_result:
                 logger.info(f"[V2] Cache hit for key: {cache_key}")
-                return AnalyzeResponse(**cached_result)
+                return AnalyzeResponse.from_cache(cached_result)
         except Exception as e:
             logger.warning(f"Cache read failed (continuing without cache): {e}")
 
         logger.info(f"[V2] Cache miss for key: {cache_key}, performing analysis")
 
-        # Step 3: Detect bahr using BahrDetectorV2 (with 100% accuracy features!)
-        # NOTE: We do bahr detection FIRST so we can use it for accurate taqti3
-        bahr_info = None
-        confidence = 0.0
-        alternative_meters_list = []
-        detection_uncertainty_info = None
+        # Steps 3-7: CPU-bound analysis, off the event loop. Concurrent misses
+        # of the same key (in this worker, or across workers with the Redis
+        # lease) share one analysis.
+        async def compute() -> AnalyzeResponse:
+            # Results of the warm-up fallbacks (heuristic vowels while CAMeL
+            # Tools loads) are not cached
+            cacheable = warmup.is_ready()
+            response = await run_analysis(
+                _perform_analysis_v2, request, normalized_text
+            )
+            if not cacheable:
+                logger.info(
+                    f"[V2] Not caching result computed during warm-up: {cache_key}"
+                )
+                return response
 
-        if request.detect_bahr:
+            # Step 8: Cache result (TTL: 24 hours)
             try:
-                # CRITICAL FIX: Use phoneme-based detection by default
-                # This matches the approach used for the golden set preprocessing
-                # and handles the mismatch between actual syllable patterns and
-                # theoretical tafila patterns in the cache.
-
-                detection_result = None
-
-                if request.precomputed_pattern:
-                    # Use precomputed pattern (for golden set evaluation)
-                    phonetic_pattern = request.precomputed_pattern
-                    logger.info(f"[V2] Using pre-computed pattern: {phonetic_pattern}")
-
-                    # Try with expected meter first if provided
-                    if request.expected_meter:
-                        detection_results = bahr_detector_v2.detect(
-                            phonetic_pattern,
-                            top_k=1,
-                            expected_meter_ar=request.expected_meter,
-                        )
-                        detection_result = (
-                            detection_results[0] if detection_results else None
-                        )
-                    else:
-                        # Use fallback detection
-                        detection_result = detect_with_all_strategies(
-                            bahr_detector_v2, phonetic_pattern
-                        )
-                else:
-                    # Extract hemistichs for real user input
-                    # Try explicit separators first: *** or 3+ spaces
-                    hemistichs = re.split(r"\s*[*×•]{2,}\s*|\s{3,}", normalized_text)
-
-                    if len(hemistichs) >= 2:
-                        # Found explicit separator
-                        first_hemistich = hemistichs[0].strip()
-                    else:
-                        # No explicit separator - split at midpoint by words
-                        # Arabic verses typically have equal-length hemistichs
-                        words = normalized_text.strip().split()
-                        if (
-                            len(words) > 8
-                        ):  # If verse has many words, likely has 2 hemistichs
-                            mid = len(words) // 2
-                            first_hemistich = " ".join(words[:mid])
-                            logger.info(
-                                f"[V2] No separator found, splitting at midpoint: {mid} words"
-                            )
-                        else:
-                            # Short text, use as-is
-                            first_hemistich = normalized_text
+                response_dict = response.model_dump()
+                await cache_set(
+                    cache_key, response_dict, ttl=86400, normalized_text=normalized_text
+                )
+                logger.info(f"[V2] Cached analysis result with key: {cache_key}")
+            except Exception as e:
+                logger.warning(f"Failed to cache result: {e}")
+            return response
+
+        async def lookup() -> Optional[AnalyzeResponse]:
+            cached = await cache_get(cache_key)
+            return AnalyzeResponse.from_cache(cached) if cached else None
+
+        # During an engine rollout, answer with the previous version's result
+        # and re-analyze in the background
+        if analysis_revalidator.enabled:
+            stale_key = _cache_key_v2(
+                request, normalized_text, version=analysis_revalidator.previous_version
+            )
+            stale = await analysis_revalidator.serve_stale(
+                stale_key, cache_key, compute, lookup, parse=AnalyzeResponse.from_cache
+            )
+            if stale is not None:
+                logger.info(
+                    f"[V2] Serving previous engine version result for key: {cache_key}"
+                )
+                return stale
 
-                    # Use HYBRID detection (combines fitness + similarity)
-                    # This is the recommended approach that solves the pattern mismatch issue
-                    from app.core.normalization import has_diacritics
+        response = await analysis_singleflight.do(cache_key, compute, lookup)
 
-                    has_tashkeel = has_diacritics(first_hemistich)
+        # Step 9: Return response
+        return response
 
-                    logger.info(
-                        f"[V2] Using hybrid detection (fitness + similarity, has_tashkeel={has_tashkeel})"
-                    )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Validation error: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error during analysis: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred during analysis. Please try again.",
+        )
 
-                    # Try hybrid detection first
-                    detection_result = detect_meter_from_text(
-                        first_hemistich,
-                        has_tashkeel,
-                        bahr_detector_v2,
-                        min_score=0.50,  # 50% minimum score
-                        use_hybrid=True,  # Enable hybrid scoring
-                    )
 
-                    if detection_result:
-                        logger.info(
-                            f"[V2] Hybrid detection successful: {detection_result.meter_name_ar} "
-                            f"(confidence: {detection_result.confidence:.2%})"
-                        )
-                    else:
-                        # Fallback to traditional pattern-based detection if hybrid fails
-                        logger.info(
-                            "[V2] Hybrid detection failed, trying pattern-based fallback"
-                        )
-                        phonetic_pattern = text_to_phonetic_pattern(normalized_text)
-                        logger.info(
-                            f"[V2] Extracted phonetic pattern: {phonetic_pattern}"
-                        )
+@router.post(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    summary="Analyze many Arabic verses (V2, streamed)",
+    description=f"""
+    Analyze up to {BATCH_MAX_ITEMS} verses in one request.
 
-                        detection_result = detect_with_all_strategies(
-                            bahr_detector_v2, phonetic_pattern
-                        )
+    Identical verses (after normalization) are analyzed once, cache hits are
+    resolved with a single Redis MGET, and new results are written back with
+    one pipelined round trip.
 
-                if detection_result:
-                    # MULTI-CANDIDATE DETECTION: Get top 3 candidates when using hybrid detection
-                    # (Skip for golden set evaluation with precomputed patterns)
-                    alternative_meters_list = []
-                    detection_uncertainty_info = None
-
-                    if not request.precomputed_pattern:
-                        # Only for real user input (hybrid detection path)
-                        try:
-                            from app.core.normalization import has_diacritics
-
-                            has_tashkeel = has_diacritics(normalized_text)
-
-                            # Get top 3 candidates for comparison
-                            all_candidates = detect_with_phoneme_fitness(
-                                normalized_text,
-                                has_tashkeel,
-                                bahr_detector_v2,
-                                top_k=3,
-                                use_hybrid_scoring=True,
-                            )
+    The response is streamed as NDJSON: one `AnalyzeBatchItem` per line, in
+    request order. A verse that fails produces a line with `error` set; the
+    rest of the batch is unaffected.
+    """,
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "NDJSON stream of AnalyzeBatchItem",
+            "content": {"application/x-ndjson": {}},
+        },
+        422: {"description": "Invalid batch"},
+    },
+)
+async def analyze_v2_batch(batch: AnalyzeBatchRequest) -> StreamingResponse:
+    """
+    Analyze a batch of verses, streaming results in request order.
 
-                            # Determine if detection is uncertain
-                            is_uncertain = False
-                            reason = None
-                            top_diff = None
+    Args:
+        batch: Verses to analyze, each with its own options
 
-                            if detection_result.confidence < 0.90:
-                                is_uncertain = True
-                                reason = "low_confidence"
-                                logger.info(
-                                    f"[V2] Uncertain: low confidence ({detection_result.confidence:.2%})"
-                                )
-                            elif len(all_candidates) >= 2:
-                                top_diff = (
-                                    all_candidates[0][2] - all_candidates[1][2]
-                                )  # score diff
-                                # Show as uncertain if:
-                                # 1. Very close race (diff < 2%) - always show alternatives
-                                # 2. Moderately close race (diff < 5%) AND confidence not very high (< 97%)
-                                if top_diff < 0.02 or (
-                                    top_diff < 0.05
-                                    and detection_result.confidence < 0.97
-                                ):
-                                    is_uncertain = True
-                                    reason = "close_candidates"
-                                    logger.info(
-                                        f"[V2] Uncertain: close candidates "
-                                        f"({all_candidates[0][1]}: {all_candidates[0][2]:.2%} vs "
-                                        f"{all_candidates[1][1]}: {all_candidates[1][2]:.2%}, diff: {top_diff:.2%})"
-                                    )
+    Returns:
+        StreamingResponse of NDJSON lines (AnalyzeBatchItem)
+    """
+    logger.info(f"[V2] Batch analysis of {len(batch.items)} verses")
+    plan = await _plan_batch(batch.items)
 
-                            # Build alternative meters list if uncertain
-                            if is_uncertain and len(all_candidates) > 1:
-                                from app.core.prosody.meters import METERS_REGISTRY
-
-                                for meter_id, name_ar, score, pattern in all_candidates[
-                                    1:
-                                ]:
-                                    meter = METERS_REGISTRY.get(meter_id)
-                                    if meter:
-                                        # Get transformations for this alternative (simplified - just show "base")
-                                        # Full transformation tracking would require re-running detector
-                                        alternative_meters_list.append(
-                                            AlternativeMeter(
-                                                id=meter_id,
-                                                name_ar=name_ar,
-                                                name_en=meter.name_en,
-                                                confidence=score,
-                                                matched_pattern=pattern,
-                                                transformations=[
-                                                    "base"
-                                                ],  # Simplified for alternatives
-                                                confidence_diff=all_candidates[0][2]
-                                                - score,
-                                            )
-                                        )
+    async def lines() -> AsyncIterator[str]:
+        async for item in _analyze_batch(plan, settings.analysis_batch_chunk_size):
+            yield item.model_dump_json() + "\n"
 
-                                logger.info(
-                                    f"[V2] Added {len(alternative_meters_list)} alternative meter(s): "
-                                    f"{[m.name_ar for m in alternative_meters_list]}"
-                                )
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-                            # Build detection uncertainty info
-                            if is_uncertain or len(all_candidates) >= 2:
-                                detection_uncertainty_info = DetectionUncertainty(
-                                    is_uncertain=is_uncertain,
-                                    reason=reason,
-                                    top_diff=(
-                                        top_diff if len(all_candidates) >= 2 else None
-                                    ),
-                                    recommendation=(
-                                        "add_diacritics"
-                                        if not has_tashkeel and is_uncertain
-                                        else None
-                                    ),
-                                )
 
-                                logger.info(
-                                    f"[V2] Detection uncertainty: is_uncertain={is_uncertain}, "
-                                    f"reason={reason}, recommendation={detection_uncertainty_info.recommendation}"
-                                )
+@router.post(
+    "/poem",
+    status_code=status.HTTP_200_OK,
+    summary="Analyze a full poem (V2, streamed per verse)",
+    description=f"""
+    Split a poem into verses (one bayt per line) and stream results as soon
+    as each verse is scored, in poem order.
+
+    Each `verse` event is an `AnalyzeBatchItem`. The stream ends with one
+    `summary` event (`PoemSummary`): majority meter and poem-level rhyme
+    consistency (إقواء، سناد، إكفاء، إيطاء، ردف).
+
+    Format: NDJSON (`{{"type": "verse" | "summary", ...}}` per line) by
+    default, Server-Sent Events when the request sends
+    `Accept: text/event-stream`. At most {POEM_MAX_VERSES} verses.
+    """,
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Stream of verse events followed by a summary event",
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+        },
+        400: {"description": "No verses found or too many verses"},
+    },
+)
+async def analyze_v2_poem(
+    poem: AnalyzePoemRequest,
+    accept: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """
+    Analyze a poem verse by verse, streaming incremental results.
 
-                        except Exception as e:
-                            logger.warning(
-                                f"[V2] Multi-candidate detection failed: {e}",
-                                exc_info=True,
-                            )
-                            # Continue with single detection result
+    Args:
+        poem: Poem text (one verse per line) and analysis options
+        accept: Accept header, selects SSE when it contains text/event-stream
 
-                    # Extract explanation parts (bilingual)
-                    explanation_full = detection_result.explanation
-                    if " | " in explanation_full:
-                        explanation_ar, explanation_en = explanation_full.split(
-                            " | ", 1
-                        )
-                    else:
-                        explanation_ar = explanation_full
-                        explanation_en = explanation_full
-
-                    # Safely extract match_quality value (handle None or missing attribute)
-                    match_quality_value = None
-                    if (
-                        hasattr(detection_result, "match_quality")
-                        and detection_result.match_quality
-                    ):
-                        match_quality_value = (
-                            detection_result.match_quality.value
-                            if hasattr(detection_result.match_quality, "value")
-                            else str(detection_result.match_quality)
-                        )
+    Returns:
+        StreamingResponse of verse events followed by a summary event
+    """
+    verses = split_poem_verses(poem.text)
+    if not verses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No verses found in poem text",
+        )
+    if len(verses) > POEM_MAX_VERSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Poem has {len(verses)} verses, maximum is {POEM_MAX_VERSES}",
+        )
 
-                    bahr_info = BahrInfo(
-                        id=detection_result.meter_id,
-                        name_ar=detection_result.meter_name_ar,
-                        name_en=detection_result.meter_name_en,
-                        confidence=detection_result.confidence,
-                        # NEW: Explainability fields
-                        match_quality=match_quality_value,
-                        matched_pattern=detection_result.matched_pattern,
-                        transformations=detection_result.transformations,
-                        explanation_ar=explanation_ar.strip(),
-                        explanation_en=explanation_en.strip(),
-                    )
-                    confidence = detection_result.confidence
+    logger.info(f"[V2] Poem analysis of {len(verses)} verses")
 
-                    logger.info(
-                        f"[V2] Detected: {bahr_info.name_ar} "
-                        f"(confidence: {confidence:.2%}, quality: {bahr_info.match_quality}) "
-                        f"with transformations: {bahr_info.transformations}"
-                    )
-                else:
-                    logger.info("[V2] No bahr detected with sufficient confidence")
+    # Lines that are not valid verses become error events, not a failed request
+    requests: List[Optional[AnalyzeRequest]] = []
+    errors: Dict[int, str] = {}
+    for index, verse in enumerate(verses):
+        try:
+            requests.append(
+                AnalyzeRequest(
+                    text=verse,
+                    detect_bahr=poem.detect_bahr,
+                    suggest_corrections=poem.suggest_corrections,
+                    analyze_rhyme=poem.analyze_rhyme,
+                )
+            )
+        except ValidationError as e:
+            requests.append(None)
+            errors[index] = "; ".join(err["msg"] for err in e.errors())
+
+    plan = await _plan_batch(requests, errors)
+    use_sse = "text/event-stream" in (accept or "")
+
+    def encode(event: str, data: dict) -> str:
+        if use_sse:
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        return json.dumps({"type": event, **data}, ensure_ascii=False) + "\n"
+
+    async def events() -> AsyncIterator[str]:
+        results: List[AnalyzeBatchItem] = []
+        # One verse per executor task so the first lines arrive immediately
+        async for item in _analyze_batch(plan, chunk_size=1):
+            results.append(item)
+            yield encode("verse", item.model_dump(mode="json"))
+
+        # Headers are already sent; report failures in-band
+        try:
+            summary = await run_analysis(_summarize_poem, verses, results)
+        except HTTPException as e:
+            yield encode("error", {"status_code": e.status_code, "detail": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"[V2] Poem summary failed: {e}", exc_info=True)
+            yield encode(
+                "error",
+                {
+                    "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "detail": "An unexpected error occurred while summarizing the poem.",
+                },
+            )
+            return
+        yield encode("summary", summary.model_dump(mode="json"))
 
-            except Exception as e:
-                logger.error(f"[V2] Bahr detection failed: {e}", exc_info=True)
-        else:
-            logger.info("[V2] Bahr detection skipped (detect_bahr=False)")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+    )
+
+
+@dataclass
+class _BatchPlan:
+    """Work shared across the verses of a batch (see _plan_batch)."""
 
-        # Step 4: Perform taqti3 (scansion) AFTER bahr detection
-        # This allows us to use the detected meter for accurate tafail
+    keys: List[Optional[str]]  # Cache key per item (None if the item failed)
+    errors: Dict[int, str]  # Item index → error message
+    first_request: Dict[str, Tuple[AnalyzeRequest, str]]  # Key → (request, normalized)
+    results: Dict[str, AnalyzeResponse]
+    cached_keys: Set[str]
+    misses: List[str]
+
+
+async def _plan_batch(
+    requests: List[Optional[AnalyzeRequest]],
+    errors: Optional[Dict[int, str]] = None,
+) -> _BatchPlan:
+    """
+    Normalize, key and deduplicate requests, resolving cache hits with one MGET.
+
+    Args:
+        requests: Requests to analyze (None for items that already failed)
+        errors: Errors for failed items, by index
+
+    Returns:
+        _BatchPlan with cached results and the unique keys still to analyze
+    """
+    errors = dict(errors or {})
+    keys: List[Optional[str]] = []
+    first_request: Dict[str, Tuple[AnalyzeRequest, str]] = {}
+
+    for index, request in enumerate(requests):
+        if request is None:
+            keys.append(None)
+            continue
         try:
-            if bahr_info and bahr_info.id:
-                # Use detected bahr for accurate taqti3
-                taqti3_result = perform_taqti3(
-                    normalized_text, normalize=False, bahr_id=bahr_info.id
+            normalized_text = _normalize_verse(request.text)
+        except Exception as e:
+            errors[index] = f"Failed to normalize text: {str(e)}"
+            keys.append(None)
+            continue
+        if not normalized_text or not normalized_text.strip():
+            errors[index] = "Text is empty after normalization"
+            keys.append(None)
+            continue
+
+        cache_key = _cache_key_v2(request, normalized_text)
+        keys.append(cache_key)
+        first_request.setdefault(cache_key, (request, normalized_text))
+
+    unique_keys = list(first_request)
+    cached_values = await cache_get_many(unique_keys)
+
+    results: Dict[str, AnalyzeResponse] = {}
+    cached_keys: Set[str] = set()
+    for cache_key, value in zip(unique_keys, cached_values):
+        if value:
+            try:
+                results[cache_key] = AnalyzeResponse.from_cache(value)
+                cached_keys.add(cache_key)
+            except Exception as e:
+                logger.warning(
+                    f"[V2] Ignoring invalid cached result for {cache_key}: {e}"
                 )
-                logger.info(
-                    f"[V2] Taqti3 with detected bahr {bahr_info.name_ar}: {taqti3_result}"
+
+    misses = [key for key in unique_keys if key not in results]
+    if misses and analysis_revalidator.enabled:
+        # Engine rollout: serve previous-version results, re-analyze in the background
+        stale = await analysis_revalidator.serve_stale_many(
+            {
+                key: _cache_key_v2(
+                    *first_request[key], version=analysis_revalidator.previous_version
                 )
-            else:
-                # Fallback to pattern matching if no bahr detected
-                taqti3_result = perform_taqti3(normalized_text, normalize=False)
-                logger.info(
-                    f"[V2] Taqti3 without bahr (pattern matching): {taqti3_result}"
+                for key in misses
+            },
+            lambda key: partial(_analyze_and_cache_v2, *first_request[key], key),
+            parse=AnalyzeResponse.from_cache,
+        )
+        results.update(stale)
+        cached_keys.update(stale)
+        misses = [key for key in misses if key not in stale]
+    logger.info(
+        f"[V2] Batch: {len(unique_keys)} unique verses, "
+        f"{len(cached_keys)} cache hits, {len(misses)} to analyze"
+    )
+    return _BatchPlan(keys, errors, first_request, results, cached_keys, misses)
+
+
+async def _analyze_batch(
+    plan: _BatchPlan, chunk_size: int
+) -> AsyncIterator[AnalyzeBatchItem]:
+    """
+    Analyze cache misses in chunks and yield items in request order.
+
+    Chunks run concurrently on the analysis executor (at most one per
+    worker). Each item is yielded as soon as it and every item before it are
+    resolved. New results are written to Redis in one pipeline at the end,
+    also when the client disconnects early.
+    """
+    executor = get_analysis_executor()
+    semaphore = asyncio.Semaphore(executor.max_workers)
+    chunk_size = max(1, chunk_size)
+    keys, errors, results = plan.keys, plan.errors, plan.results
+
+    async def analyze_chunk(chunk_keys: List[str]) -> Tuple[Dict[str, object], bool]:
+        async with semaphore:
+            # Results computed during warm-up are not cached (see analyze_v2)
+            cacheable = warmup.is_ready()
+            try:
+                outcomes = await run_analysis(
+                    _perform_analysis_v2_batch,
+                    [plan.first_request[k] for k in chunk_keys],
+                )
+            except HTTPException as e:
+                outcomes = [str(e.detail)] * len(chunk_keys)
+            except Exception as e:
+                logger.error(f"[V2] Batch chunk failed: {e}", exc_info=True)
+                outcomes = ["An unexpected error occurred during analysis."] * len(
+                    chunk_keys
+                )
+        return dict(zip(chunk_keys, outcomes)), cacheable
+
+    tasks = [
+        asyncio.ensure_future(analyze_chunk(plan.misses[start : start + chunk_size]))
+        for start in range(0, len(plan.misses), chunk_size)
+    ]
+    key_errors: Dict[str, str] = {}
+    to_cache: Dict[str, dict] = {}
+    next_index = 0
+
+    def ready_items() -> List[AnalyzeBatchItem]:
+        nonlocal next_index
+        items = []
+        while next_index < len(keys):
+            cache_key = keys[next_index]
+            if next_index in errors:
+                item = AnalyzeBatchItem(index=next_index, error=errors[next_index])
+            elif cache_key in results:
+                item = AnalyzeBatchItem(
+                    index=next_index,
+                    result=results[cache_key],
+                    cached=cache_key in plan.cached_keys,
                 )
+            elif cache_key in key_errors:
+                item = AnalyzeBatchItem(index=next_index, error=key_errors[cache_key])
+            else:
+                break
+            items.append(item)
+            next_index += 1
+        return items
 
-            if not taqti3_result or not taqti3_result.strip():
-                logger.warning("Taqti3 returned empty result")
-                taqti3_result = "غير محدد"
+    try:
+        for item in ready_items():
+            yield item
+
+        for finished in asyncio.as_completed(tasks):
+            outcomes, cacheable = await finished
+            for cache_key, outcome in outcomes.items():
+                if isinstance(outcome, AnalyzeResponse):
+                    results[cache_key] = outcome
+                    if cacheable:
+                        to_cache[cache_key] = outcome.model_dump()
+                else:
+                    key_errors[cache_key] = str(outcome)
+            for item in ready_items():
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        if to_cache:
+            await cache_set_many(
+                to_cache,
+                ttl=86400,
+                normalized_texts={key: plan.first_request[key][1] for key in to_cache},
+            )
+            logger.info(f"[V2] Batch cached {len(to_cache)} new results")
+
+
+def split_poem_verses(text: str) -> List[str]:
+    """
+    Split poem text into verses (one bayt per non-empty line).
+
+    Example:
+        >>> split_poem_verses("قفا نبك من ذكرى حبيب ومنزل\n\nبسقط اللوى بين الدخول فحومل")
+        ['قفا نبك من ذكرى حبيب ومنزل', 'بسقط اللوى بين الدخول فحومل']
+    """
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _summarize_poem(verses: List[str], items: List[AnalyzeBatchItem]) -> PoemSummary:
+    """
+    Aggregate per-verse results into the poem summary.
+
+    The majority meter is the most frequent detected bahr (ties go to the
+    meter seen first); its ratio is over the verses analyzed successfully.
+    Rhyme consistency is checked across those same verses with
+    RhymeAnalyzer.analyze_rhyme_consistency().
+    """
+    analyzed = sorted(
+        (item for item in items if item.result is not None), key=lambda i: i.index
+    )
+    detected = [item.result.bahr for item in analyzed if item.result.bahr]
+    analyzed_count = len(analyzed)
+
+    majority_meter = None
+    if detected:
+        counts = Counter(bahr.id for bahr in detected)
+        meter_id, verse_count = counts.most_common(1)[0]
+        bahr = next(b for b in detected if b.id == meter_id)
+        confidences = [b.confidence for b in detected if b.id == meter_id]
+        majority_meter = PoemMeterSummary(
+            id=bahr.id,
+            name_ar=bahr.name_ar,
+            name_en=bahr.name_en,
+            verse_count=verse_count,
+            ratio=verse_count / analyzed_count,
+            mean_confidence=sum(confidences) / len(confidences),
+        )
 
+    rhyme = None
+    if analyzed_count >= 2:
+        try:
+            result, summary_ar, summary_en = analyze_poem_rhyme(
+                [verses[item.index] for item in analyzed]
+            )
+            rhyme = PoemRhymeInfo(
+                is_consistent=result.is_consistent,
+                common_rawi=result.common_rawi,
+                common_rawi_vowel=result.common_rawi_vowel,
+                consistency_score=result.consistency_score,
+                errors=[
+                    PoemRhymeError(type=err.value, message_ar=err_ar, message_en=err_en)
+                    for err, err_ar, err_en in result.errors
+                ],
+                summary_ar=summary_ar,
+                summary_en=summary_en,
+            )
         except ValueError as e:
-            logger.error(f"Taqti3 validation error: {e}")
-            # Don't raise error, just set to fallback
-            taqti3_result = "غير محدد"
+            logger.warning(f"[V2] Poem rhyme consistency failed: {e}")
+
+    return PoemSummary(
+        verse_count=len(items),
+        analyzed_count=analyzed_count,
+        majority_meter=majority_meter,
+        rhyme=rhyme,
+    )
+
+
+def _normalize_verse(text: str) -> str:
+    """Normalize verse text the way the V2 analysis expects it."""
+    return normalize_arabic_text(
+        text,
+        remove_tashkeel=False,  # Keep diacritics for accurate analysis
+        normalize_hamzas=True,
+        normalize_alefs=True,
+    )
+
+
+def _cache_key_v2(
+    request: AnalyzeRequest, normalized_text: str, version: Optional[str] = None
+) -> str:
+    """Cache key for a V2 analysis (separate namespace from V1) under an engine version."""
+    return generate_cache_key(
+        normalized_text,
+        detect_bahr=request.detect_bahr,
+        suggest_corrections=request.suggest_corrections,
+        analyze_rhyme=request.analyze_rhyme,
+        namespace="v2",
+        version=version,
+    )
+
+
+async def _analyze_and_cache_v2(
+    request: AnalyzeRequest, normalized_text: str, cache_key: str
+) -> AnalyzeResponse:
+    """Analyze a verse off the event loop and cache the result (background re-analysis)."""
+    cacheable = warmup.is_ready()
+    response = await run_analysis(_perform_analysis_v2, request, normalized_text)
+    if cacheable:
+        await cache_set(
+            cache_key, response.model_dump(), ttl=86400, normalized_text=normalized_text
+        )
+    return response
+
+
+def _perform_analysis_v2_batch(
+    items: List[Tuple[AnalyzeRequest, str]],
+) -> List[Union[AnalyzeResponse, str]]:
+    """
+    Run _perform_analysis_v2 over several verses in one executor task.
+
+    Args:
+        items: (request, normalized_text) pairs
+
+    Returns:
+        One AnalyzeResponse per item, or an error message if that item failed
+    """
+    outcomes: List[Union[AnalyzeResponse, str]] = []
+    for request, normalized_text in items:
+        try:
+            outcomes.append(_perform_analysis_v2(request, normalized_text))
+        except ValueError as e:
+            outcomes.append(str(e))
         except Exception as e:
-            logger.error(f"Taqti3 processing failed: {e}", exc_info=True)
-            taqti3_result = "غير محدد"
+            logger.error(f"[V2] Batch item analysis failed: {e}", exc_info=True)
+            outcomes.append("An unexpected error occurred during analysis.")
+    return outcomes
+
+
+def _perform_analysis_v2(
+    request: AnalyzeRequest, normalized_text: str
+) -> AnalyzeResponse:
+    """
+    Run the CPU-bound part of the V2 analysis (bahr, taqti3, quality, rhyme).
 
-        # Step 5: Enhanced quality analysis
+    Executed on the analysis executor (thread or process pool), so it must be
+    a module-level function and only raise picklable exceptions.
+
+    Args:
+        request: Analysis request
+        normalized_text: Normalized verse text
+
+    Returns:
+        AnalyzeResponse (not cached yet)
+    """
+    # Derived text representations, shared by every stage below
+    context = AnalysisContext(request.text, normalized_text=normalized_text)
+
+    # Step 3: Detect bahr using BahrDetectorV2 (with 100% accuracy features!)
+    # NOTE: We do bahr detection FIRST so we can use it for accurate taqti3
+    bahr_info = None
+    confidence = 0.0
+    alternative_meters_list = []
+    detection_uncertainty_info = None
+
+    if request.detect_bahr:
         try:
-            phonetic_pattern = text_to_phonetic_pattern(normalized_text)
-
-            quality_score, quality_errors, quality_suggestions = analyze_verse_quality(
-                verse_text=request.text,
-                taqti3_result=taqti3_result,
-                bahr_id=bahr_info.id if bahr_info else None,
-                bahr_name_ar=bahr_info.name_ar if bahr_info else None,
-                meter_confidence=confidence,
-                detected_pattern=phonetic_pattern,
-                expected_pattern="",
-            )
+            # CRITICAL FIX: Use phoneme-based detection by default
+            # This matches the approach used for the golden set preprocessing
+            # and handles the mismatch between actual syllable patterns and
+            # theoretical tafila patterns in the cache.
+
+            detection_result = None
+            hybrid_detection = None
+
+            if request.precomputed_pattern:
+                # Use precomputed pattern (for golden set evaluation)
+                phonetic_pattern = request.precomputed_pattern
+                logger.info(f"[V2] Using pre-computed pattern: {phonetic_pattern}")
+
+                # Try with expected meter first if provided
+                if request.expected_meter:
+                    detection_results = bahr_detector_v2.detect(
+                        phonetic_pattern,
+                        top_k=1,
+                        expected_meter_ar=request.expected_meter,
+                    )
+                    detection_result = (
+                        detection_results[0] if detection_results else None
+                    )
+                else:
+                    # Use fallback detection
+                    detection_result = detect_with_all_strategies(
+                        bahr_detector_v2, phonetic_pattern
+                    )
+            else:
+                # Extract the first hemistich for real user input (explicit
+                # *** separator, or a word-midpoint split for long verses)
+                first_hemistich = context.first_hemistich
+                if len(context.hemistichs) >= 2:
+                    logger.info(
+                        f"[V2] Split verse into {len(context.hemistichs)} hemistichs"
+                    )
 
-            score = quality_score.overall
-            suggestions = quality_suggestions if request.suggest_corrections else []
+                # Use HYBRID detection (combines fitness + similarity)
+                # This is the recommended approach that solves the pattern mismatch issue
+                has_tashkeel = context.diacritized(first_hemistich)
 
-            # Add explainability-based suggestions
-            if bahr_info and bahr_info.transformations:
-                non_base = [t for t in bahr_info.transformations if t != "base"]
-                if not non_base:
-                    suggestions.append(
-                        f"✓ التقطيع دقيق ومتسق مع بحر {bahr_info.name_ar} (الصيغة الأساسية)"
+                logger.info(
+                    f"[V2] Using hybrid detection (fitness + similarity, has_tashkeel={has_tashkeel})"
+                )
+
+                # Try hybrid detection first: one scoring pass gives the
+                # detection and the top 3 candidates for the alternatives
+                hybrid_detection = detect_meter_candidates(
+                    first_hemistich,
+                    has_tashkeel,
+                    bahr_detector_v2,
+                    top_k=3,
+                    min_score=0.50,  # 50% minimum score
+                    use_hybrid=True,  # Enable hybrid scoring
+                    context=context,
+                )
+                detection_result = hybrid_detection.result
+
+                if detection_result:
+                    logger.info(
+                        f"[V2] Hybrid detection successful: {detection_result.meter_name_ar} "
+                        f"(confidence: {detection_result.confidence:.2%})"
                     )
-                elif len(non_base) <= 2:
-                    suggestions.append(
-                        f"✓ التقطيع جيد مع زحافات معتادة: {', '.join(non_base)}"
+                else:
+                    # Fallback to traditional pattern-based detection if hybrid fails
+                    logger.info(
+                        "[V2] Hybrid detection failed, trying pattern-based fallback"
                     )
+                    phonetic_pattern = context.pattern()
+                    logger.info(f"[V2] Extracted phonetic pattern: {phonetic_pattern}")
+
+                    detection_result = detect_with_all_strategies(
+                        bahr_detector_v2, phonetic_pattern
+                    )
+
+            if detection_result:
+                # MULTI-CANDIDATE DETECTION: Get top 3 candidates when using hybrid detection
+                # (Skip for golden set evaluation with precomputed patterns)
+                alternative_meters_list = []
+                detection_uncertainty_info = None
+
+                if hybrid_detection is not None:
+                    # Only for real user input (hybrid detection path)
+                    try:
+                        all_candidates = hybrid_detection.candidates
+                        top_diff = hybrid_detection.top_margin
+
+                        # Determine if detection is uncertain
+                        is_uncertain = False
+                        reason = None
+
+                        if detection_result.confidence < 0.90:
+                            is_uncertain = True
+                            reason = "low_confidence"
+                            logger.info(
+                                f"[V2] Uncertain: low confidence ({detection_result.confidence:.2%})"
+                            )
+                        elif top_diff is not None:
+                            # Show as uncertain if:
+                            # 1. Very close race (diff < 2%) - always show alternatives
+                            # 2. Moderately close race (diff < 5%) AND confidence not very high (< 97%)
+                            if top_diff < 0.02 or (
+                                top_diff < 0.05 and detection_result.confidence < 0.97
+                            ):
+                                is_uncertain = True
+                                reason = "close_candidates"
+                                logger.info(
+                                    f"[V2] Uncertain: close candidates "
+                                    f"({all_candidates[0].meter_name_ar}: {all_candidates[0].score:.2%} vs "
+                                    f"{all_candidates[1].meter_name_ar}: {all_candidates[1].score:.2%}, diff: {top_diff:.2%})"
+                                )
+
+                        # Build alternative meters list if uncertain
+                        if is_uncertain:
+                            for candidate in hybrid_detection.alternatives:
+                                alternative_meters_list.append(
+                                    AlternativeMeter(
+                                        id=candidate.meter_id,
+                                        name_ar=candidate.meter_name_ar,
+                                        name_en=candidate.meter_name_en,
+                                        confidence=candidate.score,
+                                        matched_pattern=candidate.matched_pattern,
+                                        transformations=candidate.transformations,
+                                        confidence_diff=candidate.margin,
+                                    )
+                                )
+
+                            logger.info(
+                                f"[V2] Added {len(alternative_meters_list)} alternative meter(s): "
+                                f"{[m.name_ar for m in alternative_meters_list]}"
+                            )
+
+                        # Build detection uncertainty info
+                        if is_uncertain or top_diff is not None:
+                            detection_uncertainty_info = DetectionUncertainty(
+                                is_uncertain=is_uncertain,
+                                reason=reason,
+                                top_diff=top_diff,
+                                recommendation=(
+                                    "add_diacritics"
+                                    if not has_tashkeel and is_uncertain
+                                    else None
+                                ),
+                            )
+
+                            logger.info(
+                                f"[V2] Detection uncertainty: is_uncertain={is_uncertain}, "
+                                f"reason={reason}, recommendation={detection_uncertainty_info.recommendation}"
+                            )
+
+                    except Exception as e:
+                        logger.warning(
+                            f"[V2] Multi-candidate detection failed: {e}",
+                            exc_info=True,
+                        )
+                        # Continue with single detection result
+
+                # Extract explanation parts (bilingual)
+                explanation_full = detection_result.explanation
+                if " | " in explanation_full:
+                    explanation_ar, explanation_en = explanation_full.split(" | ", 1)
                 else:
-                    suggestions.append(f"⚠️ عدة زحافات مطبقة: {', '.join(non_base)}")
+                    explanation_ar = explanation_full
+                    explanation_en = explanation_full
+
+                # Safely extract match_quality value (handle None or missing attribute)
+                match_quality_value = None
+                if (
+                    hasattr(detection_result, "match_quality")
+                    and detection_result.match_quality
+                ):
+                    match_quality_value = (
+                        detection_result.match_quality.value
+                        if hasattr(detection_result.match_quality, "value")
+                        else str(detection_result.match_quality)
+                    )
 
+                bahr_info = BahrInfo(
+                    id=detection_result.meter_id,
+                    name_ar=detection_result.meter_name_ar,
+                    name_en=detection_result.meter_name_en,
+                    confidence=detection_result.confidence,
+                    # NEW: Explainability fields
+                    match_quality=match_quality_value,
+                    matched_pattern=detection_result.matched_pattern,
+                    transformations=detection_result.transformations,
+                    explanation_ar=explanation_ar.strip(),
+                    explanation_en=explanation_en.strip(),
+                )
+                confidence = detection_result.confidence
+
+                logger.info(
+                    f"[V2] Detected: {bahr_info.name_ar} "
+                    f"(confidence: {confidence:.2%}, quality: {bahr_info.match_quality}) "
+                    f"with transformations: {bahr_info.transformations}"
+                )
+            else:
+                logger.info("[V2] No bahr detected with sufficient confidence")
+
+        except Exception as e:
+            logger.error(f"[V2] Bahr detection failed: {e}", exc_info=True)
+    else:
+        logger.info("[V2] Bahr detection skipped (detect_bahr=False)")
+
+    # Step 4: Perform taqti3 (scansion) AFTER bahr detection
+    # This allows us to use the detected meter for accurate tafail
+    try:
+        if bahr_info and bahr_info.id:
+            # Use detected bahr for accurate taqti3
+            taqti3_result = perform_taqti3(
+                normalized_text, normalize=False, bahr_id=bahr_info.id, context=context
+            )
             logger.info(
-                f"[V2] Quality: overall={score:.2f}, "
-                f"meter_accuracy={quality_score.meter_accuracy:.2f}"
+                f"[V2] Taqti3 with detected bahr {bahr_info.name_ar}: {taqti3_result}"
+            )
+        else:
+            # Fallback to pattern matching if no bahr detected
+            taqti3_result = perform_taqti3(
+                normalized_text, normalize=False, context=context
             )
+            logger.info(f"[V2] Taqti3 without bahr (pattern matching): {taqti3_result}")
 
-        except Exception as e:
-            logger.warning(f"Quality analysis failed, using simple scoring: {e}")
+        if not taqti3_result or not taqti3_result.strip():
+            logger.warning("Taqti3 returned empty result")
+            taqti3_result = "غير محدد"
 
-            score = round(confidence * 100, 2) if confidence > 0 else 0.0
-            score = max(0.0, min(100.0, score))
+    except ValueError as e:
+        logger.error(f"Taqti3 validation error: {e}")
+        # Don't raise error, just set to fallback
+        taqti3_result = "غير محدد"
+    except Exception as e:
+        logger.error(f"Taqti3 processing failed: {e}", exc_info=True)
+        taqti3_result = "غير محدد"
 
-            suggestions = []
-            if confidence >= 0.9:
-                suggestions.append("✓ التقطيع دقيق ومتسق")
-            elif confidence >= 0.7:
-                suggestions.append("التقطيع جيد مع بعض الاختلافات البسيطة")
-            elif confidence > 0:
-                suggestions.append("قد يحتاج البيت إلى مراجعة للتقطيع")
+    # Step 5: Enhanced quality analysis
+    try:
+        phonetic_pattern = context.pattern()
+
+        quality_score, quality_errors, quality_suggestions = analyze_verse_quality(
+            verse_text=request.text,
+            taqti3_result=taqti3_result,
+            bahr_id=bahr_info.id if bahr_info else None,
+            bahr_name_ar=bahr_info.name_ar if bahr_info else None,
+            meter_confidence=confidence,
+            detected_pattern=phonetic_pattern,
+            expected_pattern="",
+        )
 
-            if not bahr_info and request.detect_bahr:
-                suggestions.append("لم يتم التعرف على البحر بثقة كافية")
+        score = quality_score.overall
+        suggestions = quality_suggestions if request.suggest_corrections else []
 
-        # Step 6: Rhyme analysis (if requested)
-        rhyme_info = None
-        if request.analyze_rhyme:
-            try:
-                rhyme_pattern, rhyme_desc_ar, rhyme_desc_en = analyze_verse_rhyme(
-                    request.text
+        # Add explainability-based suggestions
+        if bahr_info and bahr_info.transformations:
+            non_base = [t for t in bahr_info.transformations if t != "base"]
+            if not non_base:
+                suggestions.append(
+                    f"✓ التقطيع دقيق ومتسق مع بحر {bahr_info.name_ar} (الصيغة الأساسية)"
                 )
-
-                rhyme_info = RhymeInfo(
-                    rawi=rhyme_pattern.qafiyah.rawi,
-                    rawi_vowel=rhyme_pattern.qafiyah.rawi_vowel,
-                    rhyme_types=[rt.value for rt in rhyme_pattern.rhyme_types],
-                    description_ar=rhyme_desc_ar,
-                    description_en=rhyme_desc_en,
+            elif len(non_base) <= 2:
+                suggestions.append(
+                    f"✓ التقطيع جيد مع زحافات معتادة: {', '.join(non_base)}"
                 )
+            else:
+                suggestions.append(f"⚠️ عدة زحافات مطبقة: {', '.join(non_base)}")
+
+        logger.info(
+            f"[V2] Quality: overall={score:.2f}, "
+            f"meter_accuracy={quality_score.meter_accuracy:.2f}"
+        )
 
-                if request.suggest_corrections:
-                    suggestions.append(f"🎵 {rhyme_desc_ar}")
+    except Exception as e:
+        logger.warning(f"Quality analysis failed, using simple scoring: {e}")
 
-                logger.info(f"[V2] Rhyme: rawi={rhyme_pattern.qafiyah.rawi}")
+        score = round(confidence * 100, 2) if confidence > 0 else 0.0
+        score = max(0.0, min(100.0, score))
 
-            except Exception as e:
-                logger.warning(f"Rhyme analysis failed: {e}")
-
-        # Step 7: Build response
-        response = AnalyzeResponse(
-            text=request.text,
-            taqti3=taqti3_result,
-            bahr=bahr_info,
-            rhyme=rhyme_info,
-            alternative_meters=(
-                alternative_meters_list if alternative_meters_list else None
-            ),
-            detection_uncertainty=detection_uncertainty_info,
-            errors=[],
-            suggestions=suggestions if request.suggest_corrections else [],
-            score=score,
-        )
+        suggestions = []
+        if confidence >= 0.9:
+            suggestions.append("✓ التقطيع دقيق ومتسق")
+        elif confidence >= 0.7:
+            suggestions.append("التقطيع جيد مع بعض الاختلافات البسيطة")
+        elif confidence > 0:
+            suggestions.append("قد يحتاج البيت إلى مراجعة للتقطيع")
+
+        if not bahr_info and request.detect_bahr:
+            suggestions.append("لم يتم التعرف على البحر بثقة كافية")
 
-        # Step 8: Cache result (TTL: 24 hours)
+    # Step 6: Rhyme analysis (if requested)
+    rhyme_info = None
+    if request.analyze_rhyme:
         try:
-            response_dict = response.model_dump()
-            await cache_set(cache_key, response_dict, ttl=86400)
-            logger.info(f"[V2] Cached analysis result with key: {cache_key}")
-        except Exception as e:
-            logger.warning(f"Failed to cache result: {e}")
+            rhyme_pattern, rhyme_desc_ar, rhyme_desc_en = analyze_verse_rhyme(
+                request.text, context=context
+            )
 
-        # Step 9: Return response
-        return response
+            rhyme_info = RhymeInfo(
+                rawi=rhyme_pattern.qafiyah.rawi,
+                rawi_vowel=rhyme_pattern.qafiyah.rawi_vowel,
+                rhyme_types=[rt.value for rt in rhyme_pattern.rhyme_types],
+                description_ar=rhyme_desc_ar,
+                description_en=rhyme_desc_en,
+            )
 
-    except HTTPException:
-        raise
-    except ValueError as e:
-        logger.error(f"Validation error: {e}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-    except Exception as e:
-        logger.error(f"Unexpected error during analysis: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred during analysis. Please try again.",
-        )
+            if request.suggest_corrections:
+                suggestions.append(f"🎵 {rhyme_desc_ar}")
+
+            logger.info(f"[V2] Rhyme: rawi={rhyme_pattern.qafiyah.rawi}")
+
+        except Exception as e:
+            logger.warning(f"Rhyme analysis failed: {e}")
+
+    # Step 7: Build response
+    response = AnalyzeResponse(
+        text=request.text,
+        taqti3=taqti3_result,
+        bahr=bahr_info,
+        rhyme=rhyme_info,
+        alternative_meters=(
+            alternative_meters_list if alternative_meters_list else None
+        ),
+        detection_uncertainty=detection_uncertainty_info,
+        errors=[],
+        suggestions=suggestions if request.suggest_corrections else [],
+        score=score,
+    )
+
+    return response
@@ -45,10 +45,95 @@ class Settings:
     database_echo: bool = _get("DATABASE_ECHO", "false").lower() == "true"
     redis_url: str = _get("REDIS_URL", "redis://localhost:6379/0")
     cache_ttl: int = int(_get("CACHE_TTL", "86400"))  # 24 hours in seconds
+    # Async Redis connection pool (see app.db.redis.get_redis)
+    redis_max_connections: int = int(_get("REDIS_MAX_CONNECTIONS", "50"))
+    redis_pool_timeout: float = float(_get("REDIS_POOL_TIMEOUT", "1"))  # seconds
+    redis_socket_timeout: float = float(_get("REDIS_SOCKET_TIMEOUT", "0.5"))  # seconds
+    redis_socket_connect_timeout: float = float(
+        _get("REDIS_SOCKET_CONNECT_TIMEOUT", "0.5")
+    )
+    redis_health_check_interval: int = int(
+        _get("REDIS_HEALTH_CHECK_INTERVAL", "30")
+    )  # seconds
+    redis_pipeline_chunk_size: int = int(
+        _get("REDIS_PIPELINE_CHUNK_SIZE", "500")
+    )  # keys
+    # Skip Redis for COOLDOWN seconds after THRESHOLD consecutive failures
+    redis_breaker_threshold: int = int(
+        _get("REDIS_BREAKER_THRESHOLD", "5")
+    )  # 0 disables
+    redis_breaker_cooldown: float = float(
+        _get("REDIS_BREAKER_COOLDOWN", "10")
+    )  # seconds
+
+    # In-process L1 cache in front of Redis (per worker)
+    cache_l1_enabled: bool = _get("CACHE_L1_ENABLED", "true").lower() == "true"
+    cache_l1_max_entries: int = int(_get("CACHE_L1_MAX_ENTRIES", "1024"))
+    cache_l1_ttl: float = float(_get("CACHE_L1_TTL", "300"))  # seconds
+    # Clear every worker's L1 cache when ANALYSIS_ENGINE_VERSION changes
+    cache_invalidation_pubsub: bool = (
+        _get("CACHE_INVALIDATION_PUBSUB", "false").lower() == "true"
+    )
+    # Encoding of cached values in Redis (see app.db.cache_codec)
+    cache_codec: str = _get("CACHE_CODEC", "msgpack")  # msgpack | json
+    cache_compression: str = _get("CACHE_COMPRESSION", "zstd")  # zstd | zlib | none
+    cache_compress_threshold: int = int(
+        _get("CACHE_COMPRESS_THRESHOLD", "1024")
+    )  # bytes
+    # Durable L3 cache in PostgreSQL (analysis_cache table) behind Redis
+    cache_l3_enabled: bool = _get("CACHE_L3_ENABLED", "false").lower() == "true"
+    cache_l3_ttl_days: float = float(_get("CACHE_L3_TTL_DAYS", "30"))
+    cache_l3_flush_interval: float = float(_get("CACHE_L3_FLUSH_INTERVAL", "5"))
+    cache_l3_sweep_interval: float = float(_get("CACHE_L3_SWEEP_INTERVAL", "3600"))
+    # Coalesce concurrent cache misses of the same key (see app.db.singleflight)
+    singleflight_enabled: bool = _get("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+    singleflight_redis_lease: bool = (
+        _get("SINGLEFLIGHT_REDIS_LEASE", "false").lower() == "true"
+    )
+    singleflight_lease_ttl: float = float(
+        _get("SINGLEFLIGHT_LEASE_TTL", "30")
+    )  # seconds
+    singleflight_wait_timeout: float = float(
+        _get("SINGLEFLIGHT_WAIT_TIMEOUT", "10")
+    )  # seconds
+    # Serve the previous engine version's cached result on a miss and
+    # re-analyze in the background (see app.db.revalidation)
+    cache_stale_while_revalidate: bool = (
+        _get("CACHE_STALE_WHILE_REVALIDATE", "false").lower() == "true"
+    )
+    cache_previous_engine_version: str = _get("CACHE_PREVIOUS_ENGINE_VERSION", "")
+    cache_revalidate_max_inflight: int = int(_get("CACHE_REVALIDATE_MAX_INFLIGHT", "2"))
     rate_limit_requests: int = int(_get("RATE_LIMIT_REQUESTS", "100"))
     rate_limit_period: int = int(_get("RATE_LIMIT_PERIOD", "3600"))
     maintenance_mode: bool = _get("MAINTENANCE_MODE", "false").lower() == "true"
 
+    # Executor for CPU-bound analysis (thread | process | inline)
+    analysis_executor: str = _get("ANALYSIS_EXECUTOR", "thread")
+    analysis_workers: int = int(_get("ANALYSIS_WORKERS", "4"))
+    analysis_queue_size: int = int(_get("ANALYSIS_QUEUE_SIZE", "32"))
+    analysis_timeout: float = float(_get("ANALYSIS_TIMEOUT", "10"))  # seconds
+    analysis_batch_chunk_size: int = int(_get("ANALYSIS_BATCH_CHUNK_SIZE", "16"))
+
+    # On-disk snapshot of generated meter patterns (empty dir → system temp dir)
+    pattern_snapshot_enabled: bool = (
+        _get("PATTERN_SNAPSHOT_ENABLED", "true").lower() == "true"
+    )
+    pattern_snapshot_dir: str = _get("PATTERN_SNAPSHOT_DIR", "")
+
+    # Shared vocalization cache of vowel inference (memory | sqlite | redis)
+    vocalization_cache_backend: str = _get("VOCALIZATION_CACHE_BACKEND", "memory")
+    vocalization_cache_path: str = _get("VOCALIZATION_CACHE_PATH", "")
+
+    # ML inference: concurrent predictions share one predict_proba call
+    ml_micro_batching: bool = _get("ML_MICRO_BATCHING", "true").lower() == "true"
+    ml_batch_max_size: int = int(_get("ML_BATCH_MAX_SIZE", "32"))
+    ml_batch_max_wait_ms: float = float(_get("ML_BATCH_MAX_WAIT_MS", "2"))
+    # Serve the RandomForest from its flat NumPy export when present
+    ml_flat_forest: bool = _get("ML_FLAT_FOREST", "true").lower() == "true"
+
+    # Load CAMeL Tools and ML models in background threads (see app.warmup)
+    warmup_in_background: bool = _get("WARMUP_IN_BACKGROUND", "true").lower() == "true"
+
 
 settings = Settings()
 
@@ -0,0 +1,175 @@
+"""
+Analysis context - per-request memo of derived text representations.
+
+A single analysis request used to normalize the same verse in the endpoint,
+in BahrDetector.analyze_verse and in RhymeAnalyzer.extract_qafiyah, and to
+re-extract phonemes and phonetic patterns in taqti3, quality analysis, the
+phoneme-fitness detector (for top-1 and again for top-3) and the ML feature
+extractor.
+
+AnalysisContext computes each of these once and hands the same objects to
+every stage. Stages accept an optional ``context`` argument and fall back to
+computing things themselves when called without one, so existing callers are
+unaffected.
+
+Values are memoized per input text, because stages do not all look at the
+same text (e.g. meter detection runs on the first hemistich while quality
+analysis uses the full verse). Returned lists are shared between stages and
+must not be mutated.
+"""
+
+import re
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.core.normalization import has_diacritics, normalize_arabic_text
+from app.core.phonetics import Phoneme, extract_phonemes, phonemes_to_pattern
+
+# Explicit hemistich separators: *** (or ×× / ••) or 3+ spaces
+HEMISTICH_SEPARATOR = re.compile(r"\s*[*×•]{2,}\s*|\s{3,}")
+
+# Verses with more words than this are assumed to contain both hemistichs
+HEMISTICH_MIN_WORDS = 8
+
+
+class AnalysisContext:
+    """
+    Memoized normalized text, diacritics flag, phonemes, patterns and
+    hemistich split for one verse.
+
+    Example:
+        >>> context = AnalysisContext("إذا غامَرتَ في شَرَفٍ مَرومِ")
+        >>> context.has_diacritics
+        True
+        >>> context.pattern() is context.pattern()  # computed once
+        True
+    """
+
+    def __init__(self, text: str, normalized_text: Optional[str] = None):
+        """
+        Args:
+            text: Raw verse text as received
+            normalized_text: Already normalized text, if the caller has it
+                (must equal normalize_arabic_text(text) with default options)
+        """
+        self.text = text
+        self._memo: Dict[Hashable, Any] = {}
+        if normalized_text is not None:
+            self._memo[("normalize", text)] = normalized_text
+
+    def _cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = compute()
+            return value
+
+    def normalize(self, text: Optional[str] = None) -> str:
+        """
+        Normalize text with normalize_arabic_text() defaults (memoized).
+
+        Args:
+            text: Text to normalize (default: the raw verse)
+
+        Raises:
+            ValueError: As normalize_arabic_text()
+        """
+        if text is None:
+            text = self.text
+        return self._cached(("normalize", text), lambda: normalize_arabic_text(text))
+
+    @property
+    def normalized_text(self) -> str:
+        """Normalized verse text."""
+        return self.normalize()
+
+    def diacritized(self, text: Optional[str] = None) -> bool:
+        """
+        Whether text has diacritics (memoized).
+
+        Args:
+            text: Text to check (default: the normalized verse)
+        """
+        if text is None:
+            text = self.normalized_text
+        return self._cached(("diacritics", text), lambda: has_diacritics(text))
+
+    @property
+    def has_diacritics(self) -> bool:
+        """Whether the normalized verse has diacritics."""
+        return self.diacritized()
+
+    def phonemes(
+        self, text: Optional[str] = None, has_tashkeel: Optional[bool] = None
+    ) -> List[Phoneme]:
+        """
+        Phonemes of text (memoized).
+
+        Args:
+            text: Normalized text (default: the normalized verse)
+            has_tashkeel: Passed to extract_phonemes(); auto-detected if None
+        """
+        if text is None:
+            text = self.normalized_text
+        if has_tashkeel is None:
+            has_tashkeel = self.diacritized(text)
+        return self._cached(
+            ("phonemes", text, has_tashkeel),
+            lambda: extract_phonemes(text, has_tashkeel=has_tashkeel),
+        )
+
+    def pattern(
+        self, text: Optional[str] = None, has_tashkeel: Optional[bool] = None
+    ) -> str:
+        """
+        Phonetic pattern of text (memoized), as text_to_phonetic_pattern().
+
+        Args:
+            text: Normalized text (default: the normalized verse)
+            has_tashkeel: Passed to extract_phonemes(); auto-detected if None
+        """
+        if text is None:
+            text = self.normalized_text
+        if has_tashkeel is None:
+            has_tashkeel = self.diacritized(text)
+        return self._cached(
+            ("pattern", text, has_tashkeel),
+            lambda: phonemes_to_pattern(self.phonemes(text, has_tashkeel)),
+        )
+
+    @property
+    def hemistichs(self) -> List[str]:
+        """
+        The verse split into hemistichs.
+
+        Uses an explicit separator if present, otherwise splits long verses
+        (more than HEMISTICH_MIN_WORDS words) at the word midpoint. Short
+        verses are returned whole.
+        """
+
+        def split() -> List[str]:
+            text = self.normalized_text
+            parts = HEMISTICH_SEPARATOR.split(text)
+            if len(parts) >= 2:
+                return [part.strip() for part in parts]
+            words = text.strip().split()
+            if len(words) > HEMISTICH_MIN_WORDS:
+                mid = len(words) // 2
+                return [" ".join(words[:mid]), " ".join(words[mid:])]
+            return [text]
+
+        return self._cached("hemistichs", split)
+
+    @property
+    def first_hemistich(self) -> str:
+        """First hemistich (the whole verse if it cannot be split)."""
+        return self.hemistichs[0]
+
+    def memoize(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Memoize an arbitrary derived value (e.g. a detector ranking).
+
+        Args:
+            key: Hashable key, namespaced by the caller
+            compute: Called once to produce the value
+        """
+        return self._cached(("custom", key), compute)
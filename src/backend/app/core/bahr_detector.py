@@ -6,9 +6,10 @@ a verse follows by comparing its tafa'il pattern to known bahr templates.
 """
 
 from dataclasses import dataclass
-from difflib import SequenceMatcher
 from typing import Dict, List, Optional
 
+from app.core.analysis_context import AnalysisContext
+from app.core.prosody.sequence_similarity import sequence_ratio
 from app.core.taqti3 import perform_taqti3
 
 
@@ -330,8 +331,8 @@ class BahrDetector:
         """
         Calculate similarity between two tafa'il patterns.
 
-        Uses Python's difflib.SequenceMatcher for fuzzy string matching,
-        which allows for minor variations (zihafat) in the prosodic pattern.
+        Uses the Ratcliff/Obershelp ratio of difflib.SequenceMatcher (via
+        sequence_ratio()) for fuzzy string matching, which allows for minor variations (zihafat) in the prosodic pattern.
 
         Args:
             tafail1: First tafa'il pattern string
@@ -353,7 +354,7 @@ class BahrDetector:
             ... )
             0.85  # Approximate
         """
-        return SequenceMatcher(None, tafail1, tafail2).ratio()
+        return sequence_ratio(tafail1, tafail2)
 
     def detect_bahr(
         self, input_pattern: str, is_phonetic: bool = False
@@ -421,7 +422,9 @@ class BahrDetector:
 
         return None
 
-    def analyze_verse(self, verse: str) -> Optional[BahrInfo]:
+    def analyze_verse(
+        self, verse: str, context: Optional[AnalysisContext] = None
+    ) -> Optional[BahrInfo]:
         """
         Complete end-to-end analysis: convert to phonetic pattern + bahr detection.
 
@@ -432,6 +435,7 @@ class BahrDetector:
 
         Args:
             verse: Arabic verse text (with or without diacritics)
+            context: Optional shared AnalysisContext for the verse
 
         Returns:
             BahrInfo object with detected bahr and confidence, or None if
@@ -450,16 +454,20 @@ class BahrDetector:
         from app.core.phonetics import text_to_phonetic_pattern
 
         # Normalize and convert to phonetic pattern
-        normalized = normalize_arabic_text(verse)
-        has_tash = has_diacritics(verse)
-        phonetic_pattern = text_to_phonetic_pattern(normalized, has_tash)
+        if context is not None:
+            normalized = context.normalize(verse)
+            phonetic_pattern = context.pattern(normalized, context.diacritized(verse))
+        else:
+            normalized = normalize_arabic_text(verse)
+            has_tash = has_diacritics(verse)
+            phonetic_pattern = text_to_phonetic_pattern(normalized, has_tash)
 
         # Detect bahr using phonetic pattern (primary method)
         result = self.detect_bahr(phonetic_pattern, is_phonetic=True)
 
         # If no match with phonetic, try tafa'il method as fallback
         if not result:
-            tafail = perform_taqti3(verse)
+            tafail = perform_taqti3(verse, context=context)
             result = self.detect_bahr(tafail, is_phonetic=False)
 
         return result
@@ -8,19 +8,33 @@ from rules and validates against them.
 Version 2.2: Now includes vowel inference for undiacritized text support.
 """
 
+import bisect
 import logging
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Optional, Set, Tuple
+from typing import AbstractSet, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.metrics.analysis_metrics import record_meter_search
 
 from .disambiguation import disambiguate_tied_results
 from .meters import METERS_REGISTRY, Meter
 from .pattern_generator import PatternGenerator
+from .pattern_index import PatternTrie
 from .pattern_similarity import PatternSimilarity
+from .pattern_snapshot import load_pattern_snapshot
 from .tafila import Tafila
 
 logger = logging.getLogger(__name__)
 
+# Fuzzy matches below this similarity are rejected by _find_close_match()
+MIN_FUZZY_SIMILARITY = 0.60
+
+# Results this close to the best confidence count as tied in disambiguation
+TIE_TOLERANCE = 0.001
+
+# Small tolerance so that floating point noise in a bound never prunes a tie
+_BOUND_EPSILON = 1e-9
+
 
 class MatchQuality(Enum):
     """Quality of meter match."""
@@ -96,38 +110,79 @@ class BahrDetectorV2:
         0.95
     """
 
-    def __init__(self, enable_vowel_inference: bool = True):
+    def __init__(
+        self, enable_vowel_inference: bool = True, lazy_vowel_inference: bool = False
+    ):
         """
         Initialize detector with pattern generators for all meters.
         
         Args:
             enable_vowel_inference: Enable automatic vowel restoration for undiacritized text
+            lazy_vowel_inference: Do not load CAMeL Tools now; heuristic vowels
+                are used until vowel_inferencer.load_disambiguator() has run
+                (see app.warmup)
         """
         self.meters = METERS_REGISTRY
         self.generators: Dict[int, PatternGenerator] = {}
-        self.pattern_cache: Dict[int, Set[str]] = {}
-        self.hemistich_cache: Dict[int, Set[str]] = {}
+        # Read-only (frozensets / mappings shared with the process-wide snapshot)
+        self.pattern_cache: Dict[int, AbstractSet[str]] = {}
+        self.hemistich_cache: Dict[int, AbstractSet[str]] = {}
+
+        # Pattern → transformations lookup (explanations without regeneration)
+        self.tracking_tables: Dict[int, Mapping[str, Sequence[str]]] = {}
+        self.hemistich_tracking_tables: Dict[int, Mapping[str, Sequence[str]]] = {}
+
+        # Prefix tries over the cached patterns (used for fuzzy matching)
+        self.pattern_index: Dict[int, PatternTrie] = {}
+        self.hemistich_index: Dict[int, PatternTrie] = {}
+
+        # Distinct (length, "/" count, "o" count) of each meter's patterns,
+        # used to bound fuzzy similarity before running the edit distance
+        self.pattern_profiles: Dict[int, Tuple[Tuple[int, int, int], ...]] = {}
+        self._meter_order = {meter_id: i for i, meter_id in enumerate(self.meters)}
 
         # Initialize vowel inference (handles 90% of production input)
         self.vowel_inferencer = None
         if enable_vowel_inference:
             try:
                 from app.core.vowel_inference import VowelInferencer
-                self.vowel_inferencer = VowelInferencer(use_camel_tools=True)
+                self.vowel_inferencer = VowelInferencer(
+                    use_camel_tools=True, load=not lazy_vowel_inference
+                )
                 logger.info("✅ Vowel inference enabled (handles undiacritized text)")
             except ImportError as e:
                 logger.warning(f"⚠️  Vowel inference disabled: {e}")
 
-        # Initialize generators and cache both full-verse and hemistich patterns
+        # Full-verse and hemistich patterns with their transformation tracking,
+        # loaded from the on-disk snapshot (regenerated when the rules change)
+        snapshot = load_pattern_snapshot(self.meters)
+
         for meter_id, meter in self.meters.items():
-            generator = PatternGenerator(meter)
-            self.generators[meter_id] = generator
+            self.generators[meter_id] = PatternGenerator(meter)
+
+            self.pattern_cache[meter_id] = snapshot.patterns[meter_id]
+            self.hemistich_cache[meter_id] = snapshot.hemistich_patterns[meter_id]
+            self.tracking_tables[meter_id] = snapshot.tracking_tables[meter_id]
+            self.hemistich_tracking_tables[meter_id] = (
+                snapshot.hemistich_tracking_tables[meter_id]
+            )
 
-            # Generate and cache full verse patterns
-            self.pattern_cache[meter_id] = generator.generate_all_patterns('full_verse')
+            # Index both caches for sub-linear fuzzy matching
+            self.pattern_index[meter_id] = PatternTrie(self.pattern_cache[meter_id])
+            self.hemistich_index[meter_id] = PatternTrie(self.hemistich_cache[meter_id])
 
-            # Generate and cache hemistich patterns
-            self.hemistich_cache[meter_id] = generator.generate_all_patterns('hemistich')
+            self.pattern_profiles[meter_id] = self._build_pattern_profile(
+                self.pattern_cache[meter_id] | self.hemistich_cache[meter_id]
+            )
+
+    @staticmethod
+    def _build_pattern_profile(
+        patterns: Iterable[str],
+    ) -> Tuple[Tuple[int, int, int], ...]:
+        """Distinct (length, "/" count, "o" count) triples of a pattern set."""
+        return tuple(
+            sorted({(len(p), p.count("/"), p.count("o")) for p in patterns if p})
+        )
 
     def detect(
         self,
@@ -174,60 +229,118 @@ class BahrDetectorV2:
             
             # Restore vowels if needed
             vocalized, vowel_confidence = self.vowel_inferencer.restore_vowels(text)
-            
-            logger.debug(f"Vowel inference applied (confidence: {vowel_confidence:.2f})")
-            logger.debug(f"Vocalized text: {vocalized}")
-            
-            # Convert to phonetic pattern
-            from app.core.prosody_phonetics import prosodic_text_to_pattern
-            phonetic_pattern = prosodic_text_to_pattern(vocalized, has_tashkeel=True)
-            
-            logger.debug(f"Generated pattern: {phonetic_pattern}")
-            
-            # Detect meter from pattern
-            candidates = self._detect_from_pattern(
-                phonetic_pattern, expected_meter_ar
+            return self._detect_vocalized(
+                vocalized, vowel_confidence, top_k, expected_meter_ar
             )
-            
-            # CRITICAL: Adjust confidence based on vowel inference quality
-            # If vowel inference is uncertain, meter detection is also uncertain
-            for candidate in candidates:
-                original_confidence = candidate.confidence
-                candidate.confidence *= vowel_confidence
-                
-                # Add vowel inference note to explanation
-                candidate.explanation += (
-                    f"\n\nNote: Vowel inference applied (confidence: {vowel_confidence:.1%}). "
-                    f"Original meter confidence: {original_confidence:.1%}, "
-                    f"Adjusted: {candidate.confidence:.1%}"
-                )
-            
-            return candidates[:top_k]
         
         # Original pattern-based detection
         elif phonetic_pattern:
-            return self._detect_from_pattern(phonetic_pattern, expected_meter_ar)[:top_k]
+            return self._detect_from_pattern(
+                phonetic_pattern, expected_meter_ar, top_k=top_k
+            )[:top_k]
         else:
             raise ValueError("Must provide either 'phonetic_pattern' or 'text'")
     
+    def detect_batch(
+        self,
+        texts: Sequence[str],
+        top_k: int = 3,
+        expected_meter_ar: Optional[str] = None,
+    ) -> List[List[DetectionResult]]:
+        """
+        Detect meters of many raw Arabic texts (e.g. the verses of a poem).
+
+        Same results as detect(text=...) per text, but the texts are
+        vocalized together with one VowelInferencer.restore_vowels_batch()
+        call instead of one disambiguation per verse.
+
+        Args:
+            texts: Raw Arabic texts
+            top_k: Return top K matches per text (default: 3)
+            expected_meter_ar: Optional expected meter (for disambiguation in evaluation)
+
+        Returns:
+            One list of DetectionResult objects per text (as detect())
+        """
+        if not self.vowel_inferencer:
+            raise ValueError(
+                "Vowel inference not available. Initialize detector with "
+                "enable_vowel_inference=True"
+            )
+
+        vocalizations = self.vowel_inferencer.restore_vowels_batch(texts)
+        return [
+            self._detect_vocalized(vocalized, vowel_confidence, top_k, expected_meter_ar)
+            for vocalized, vowel_confidence in vocalizations
+        ]
+
+    def _detect_vocalized(
+        self,
+        vocalized: str,
+        vowel_confidence: float,
+        top_k: int,
+        expected_meter_ar: Optional[str] = None,
+    ) -> List[DetectionResult]:
+        """Detect meters of vocalized text, scaled by the vowel inference confidence."""
+        logger.debug(f"Vowel inference applied (confidence: {vowel_confidence:.2f})")
+        logger.debug(f"Vocalized text: {vocalized}")
+
+        # Convert to phonetic pattern
+        from app.core.prosody_phonetics import prosodic_text_to_pattern
+        phonetic_pattern = prosodic_text_to_pattern(vocalized, has_tashkeel=True)
+
+        logger.debug(f"Generated pattern: {phonetic_pattern}")
+
+        # Detect meter from pattern (uniform confidence scaling below
+        # keeps the order, so the top-k search still applies)
+        candidates = self._detect_from_pattern(
+            phonetic_pattern, expected_meter_ar, top_k=top_k
+        )
+
+        # CRITICAL: Adjust confidence based on vowel inference quality
+        # If vowel inference is uncertain, meter detection is also uncertain
+        for candidate in candidates:
+            original_confidence = candidate.confidence
+            candidate.confidence *= vowel_confidence
+
+            # Add vowel inference note to explanation
+            candidate.explanation += (
+                f"\n\nNote: Vowel inference applied (confidence: {vowel_confidence:.1%}). "
+                f"Original meter confidence: {original_confidence:.1%}, "
+                f"Adjusted: {candidate.confidence:.1%}"
+            )
+
+        return candidates[:top_k]
+
     def _detect_from_pattern(
         self,
         phonetic_pattern: str,
         expected_meter_ar: Optional[str] = None,
+        top_k: Optional[int] = None,
     ) -> List[DetectionResult]:
         """
         Internal method for pattern-based detection.
         
         Separated from detect() to support both direct pattern input
         and text input with vowel inference.
-        """
-        candidates = []
 
-        # Check against all meters
-        for meter_id, meter in self.meters.items():
-            result = self._match_meter(phonetic_pattern, meter)
-            if result:
-                candidates.append(result)
+        With top_k, meters are searched best-first by an upper bound on the
+        confidence they can reach, and the search stops once no remaining
+        meter can enter the top k (see _search_top_k()). The first top_k
+        results are identical to the exhaustive search; later ones may be
+        missing.
+        """
+        if top_k is None or top_k < 1 or expected_meter_ar or not phonetic_pattern:
+            # Exhaustive: disambiguation with an expected meter needs every result
+            candidates = []
+
+            # Check against all meters
+            for meter_id, meter in self.meters.items():
+                result = self._match_meter(phonetic_pattern, meter)
+                if result:
+                    candidates.append(result)
+        else:
+            candidates = self._search_top_k(phonetic_pattern, top_k)
 
         # Sort by confidence (descending), then by tier (ascending - prefer common meters)
         # This provides tie-breaking for meters with identical patterns (e.g., المتدارك vs المتقارب)
@@ -242,6 +355,100 @@ class BahrDetectorV2:
 
         return candidates
 
+    def _search_top_k(self, phonetic_pattern: str, top_k: int) -> List[DetectionResult]:
+        """
+        Match meters best-first, skipping those that cannot reach the top k.
+
+        A meter is pruned when its confidence bound is below both the current
+        k-th best confidence and the tie band of the current best (so every
+        result disambiguation might boost is still scored), or when it cannot
+        reach the fuzzy similarity threshold at all.
+
+        Returns:
+            Results in registry order, a superset of the exhaustive top k
+        """
+        ranked = sorted(
+            (
+                self._confidence_upper_bound(phonetic_pattern, meter) + (meter,)
+                for meter in self.meters.values()
+            ),
+            key=lambda entry: -entry[0],
+        )
+
+        candidates: List[DetectionResult] = []
+        negated_confidences: List[float] = []  # Ascending, i.e. best first
+        scored = 0
+
+        for confidence_bound, similarity_bound, meter in ranked:
+            if len(candidates) >= top_k:
+                kth_best = -negated_confidences[top_k - 1]
+                tie_floor = -negated_confidences[0] - TIE_TOLERANCE
+                if confidence_bound < min(kth_best, tie_floor) - _BOUND_EPSILON:
+                    break  # Bounds are sorted, nothing left can qualify
+            if similarity_bound < MIN_FUZZY_SIMILARITY - _BOUND_EPSILON:
+                continue
+
+            scored += 1
+            result = self._match_meter(phonetic_pattern, meter)
+            if result:
+                candidates.append(result)
+                bisect.insort(negated_confidences, -result.confidence)
+
+        record_meter_search(scored=scored, pruned=len(ranked) - scored)
+
+        # Registry order, so that the stable sort breaks exact ties like the
+        # exhaustive search does
+        candidates.sort(key=lambda result: self._meter_order[result.meter_id])
+        return candidates
+
+    def _confidence_upper_bound(
+        self, phonetic_pattern: str, meter: Meter
+    ) -> Tuple[float, float]:
+        """
+        Upper bounds on the confidence and fuzzy similarity of a meter match.
+
+        Exact matches are bounded by 1.0. For fuzzy matches, every unit of
+        weighted edit distance (an indel, or half a substitution) changes the
+        symbol counts by at most one, so the count difference to the closest
+        (length, "/" count, "o" count) profile of the meter bounds the
+        distance, and with it PatternSimilarity.calculate_similarity().
+
+        Returns:
+            (confidence_bound, similarity_bound)
+        """
+        if (
+            phonetic_pattern in self.pattern_cache[meter.id]
+            or phonetic_pattern in self.hemistich_cache[meter.id]
+        ):
+            return 1.0, 1.0
+
+        weights = PatternSimilarity.WEIGHTS
+        m = len(phonetic_pattern)
+        query_slash = phonetic_pattern.count("/")
+        query_o = phonetic_pattern.count("o")
+        query_other = m - query_slash - query_o
+
+        similarity_bound = 0.0
+        for n, slash, o in self.pattern_profiles[meter.id]:
+            count_gap = (
+                abs(query_slash - slash)
+                + abs(query_o - o)
+                + abs(query_other - (n - slash - o))
+            )
+            distance = (
+                count_gap * weights["insert_delete"]
+                + abs(m - n) * weights["length_penalty"]
+            )
+            similarity = 1.0 - distance / (max(m, n) * weights["substitute_weight"])
+            if similarity > similarity_bound:
+                similarity_bound = similarity
+
+        # Fuzzy confidence = similarity * (0.9 + 0.1 * base), see _find_close_match()
+        best_base = self._calculate_confidence(
+            MatchQuality.EXACT, is_exact=False, meter_tier=meter.tier
+        )
+        return similarity_bound * (0.9 + 0.1 * best_base), similarity_bound
+
     def detect_best(self, phonetic_pattern: str) -> Optional[DetectionResult]:
         """
         Detect single best meter match.
@@ -290,14 +497,22 @@ class BahrDetectorV2:
 
         # Check for close matches in full verse (allowing minor variations)
         close_match = self._find_close_match(
-            phonetic_pattern, full_verse_patterns, meter, match_type='full_verse'
+            phonetic_pattern,
+            full_verse_patterns,
+            meter,
+            match_type='full_verse',
+            index=self.pattern_index.get(meter.id),
         )
         if close_match:
             return close_match
 
         # Check for close matches in hemistich
         close_match_hemistich = self._find_close_match(
-            phonetic_pattern, hemistich_patterns, meter, match_type='hemistich'
+            phonetic_pattern,
+            hemistich_patterns,
+            meter,
+            match_type='hemistich',
+            index=self.hemistich_index.get(meter.id),
         )
         if close_match_hemistich:
             return close_match_hemistich
@@ -312,16 +527,8 @@ class BahrDetectorV2:
         base_pattern = meter.base_pattern
         is_base = pattern == base_pattern
 
-        # Get transformations with tracking
-        generator = self.generators[meter.id]
-        tracked_patterns = generator.generate_with_tracking()
-
-        # Find the matching pattern with its transformations
-        transformations = []
-        for pat, trans in tracked_patterns:
-            if pat == pattern:
-                transformations = trans
-                break
+        # Get transformations from the precomputed tracking table
+        transformations = self.get_transformations(meter.id, pattern, match_type)
 
         # Determine match quality based on transformations
         match_quality = self._assess_match_quality(transformations, meter)
@@ -349,36 +556,42 @@ class BahrDetectorV2:
         )
 
     def _find_close_match(
-        self, pattern: str, valid_patterns: Set[str], meter: Meter, match_type: str = 'full_verse'
+        self,
+        pattern: str,
+        valid_patterns: AbstractSet[str],
+        meter: Meter,
+        match_type: str = 'full_verse',
+        index: Optional[PatternTrie] = None,
     ) -> Optional[DetectionResult]:
         """
         Find close match allowing for minor variations using weighted edit distance.
 
         This handles cases where the scansion might be slightly off
         but the meter is still clearly identifiable.
+
+        If a PatternTrie built from valid_patterns is given, it is searched
+        instead of scanning every pattern (same result, far fewer DP cells).
+        Otherwise all patterns are scored in one PatternSimilarity.similarity_many()
+        pass.
         """
         best_match = None
         best_similarity = 0.0
 
-        for valid_pattern in valid_patterns:
-            similarity = self._calculate_similarity(pattern, valid_pattern)
-
-            # Use fuzzy matching threshold (60%+ for phonological variations)
-            # Lower than exact matching to handle real poetry variations
-            if similarity >= 0.60 and similarity > best_similarity:
-                best_similarity = similarity
-                best_match = valid_pattern
+        # Use fuzzy matching threshold (60%+ for phonological variations)
+        # Lower than exact matching to handle real poetry variations
+        if index is not None:
+            best_match, best_similarity = index.best_match(pattern, min_similarity=0.60)
+        elif pattern and valid_patterns:
+            candidates = list(valid_patterns)
+            similarities = PatternSimilarity.similarity_many(pattern, candidates)
+            best_position = int(similarities.argmax())  # First of equal maxima
+            if similarities[best_position] >= 0.60:
+                best_similarity = float(similarities[best_position])
+                best_match = candidates[best_position]
 
         if best_match and best_similarity >= 0.60:
             # Create result with reduced confidence
-            generator = self.generators[meter.id]
-            tracked_patterns = generator.generate_with_tracking()
-
-            transformations = []
-            for pat, trans in tracked_patterns:
-                if pat == best_match:
-                    transformations = trans
-                    break
+            transformations = self.get_transformations(meter.id, best_match, match_type)
 
             match_quality = self._assess_match_quality(transformations, meter)
 
@@ -414,6 +627,27 @@ class BahrDetectorV2:
 
         return None
 
+    def get_transformations(
+        self, meter_id: int, pattern: str, match_type: str = 'full_verse'
+    ) -> List[str]:
+        """
+        Look up the transformations that generate a pattern.
+
+        Args:
+            meter_id: Meter ID (1-16)
+            pattern: Generated phonetic pattern
+            match_type: 'full_verse' or 'hemistich'
+
+        Returns:
+            Transformation names per position, or [] if the pattern was not
+            generated for this meter and verse type
+        """
+        if match_type == 'hemistich':
+            table = self.hemistich_tracking_tables.get(meter_id, {})
+        else:
+            table = self.tracking_tables.get(meter_id, {})
+        return list(table.get(pattern, []))
+
     def _assess_match_quality(
         self, transformations: List[str], meter: Meter
     ) -> MatchQuality:
@@ -607,7 +841,7 @@ class BahrDetectorV2:
 
         return pattern in self.pattern_cache[meter_id]
 
-    def get_valid_patterns(self, meter_id: int) -> Set[str]:
+    def get_valid_patterns(self, meter_id: int) -> AbstractSet[str]:
         """
         Get all valid patterns for a specific meter.
 
@@ -615,9 +849,9 @@ class BahrDetectorV2:
             meter_id: Meter ID (1-16)
 
         Returns:
-            Set of all valid phonetic patterns
+            Read-only set of all valid phonetic patterns
         """
-        return self.pattern_cache.get(meter_id, set())
+        return self.pattern_cache.get(meter_id, frozenset())
 
     def segment_pattern_to_tafail(
         self, pattern: str, meter: Meter, allow_hemistich: bool = True
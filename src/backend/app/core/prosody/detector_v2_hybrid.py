@@ -20,6 +20,7 @@ from collections import defaultdict
 from .pattern_similarity import PatternSimilarity
 from .meters import METERS_REGISTRY
 from .pattern_generator import PatternGenerator
+from .pattern_snapshot import load_pattern_snapshot
 
 
 @dataclass
@@ -444,13 +445,17 @@ class BahrDetectorV2Hybrid:
         self.theoretical_patterns: Dict[int, Set[str]] = {}
         self.theoretical_generators: Dict[int, PatternGenerator] = {}
 
+        snapshot = load_pattern_snapshot(self.meters)
+
         for meter_id, meter in self.meters.items():
             # Only generate theoretical for meters without empirical patterns
             if meter_id not in self.empirical_patterns:
                 generator = PatternGenerator(meter)
                 self.theoretical_generators[meter_id] = generator
-                # Generate both full-verse and hemistich patterns
-                self.theoretical_patterns[meter_id] = generator.generate_all_patterns('auto')
+                # Both full-verse and hemistich patterns (same as 'auto')
+                self.theoretical_patterns[meter_id] = (
+                    snapshot.patterns[meter_id] | snapshot.hemistich_patterns[meter_id]
+                )
 
     def detect(
         self,
@@ -6,11 +6,11 @@ to detect the meter, including pattern relaxation and statistical matching.
 """
 
 import logging
-from difflib import SequenceMatcher
 from typing import List, Optional, Tuple
 
 from .detector_v2 import BahrDetectorV2, DetectionResult, MatchQuality
 from .meters import Meter
+from .sequence_similarity import SequenceRatioMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +86,7 @@ class FallbackDetector:
         """
         # Collect all matches above threshold with meter frequency info
         candidates: List[Tuple[float, Meter, str, int, int]] = []
+        matcher = SequenceRatioMatcher(phonetic_pattern)
 
         # Check all meters
         for meter_id, meter in self.primary_detector.meters.items():
@@ -94,9 +95,7 @@ class FallbackDetector:
             best_pat_for_meter = None
 
             for cached_pattern in valid_patterns:
-                similarity = SequenceMatcher(
-                    None, phonetic_pattern, cached_pattern
-                ).ratio()
+                similarity = matcher.ratio(cached_pattern)
 
                 if similarity > best_sim_for_meter:
                     best_sim_for_meter = similarity
@@ -129,14 +128,9 @@ class FallbackDetector:
             confidence = best_similarity * 0.85  # 15% penalty for fallback
 
             # Create result
-            generator = self.primary_detector.generators[best_meter.id]
-            tracked_patterns = generator.generate_with_tracking()
-
-            transformations = []
-            for pat, trans in tracked_patterns:
-                if pat == best_cached_pattern:
-                    transformations = trans
-                    break
+            transformations = self.primary_detector.get_transformations(
+                best_meter.id, best_cached_pattern
+            )
 
             match_quality = (
                 MatchQuality.MODERATE if best_similarity >= 0.80 else MatchQuality.WEAK
@@ -6,7 +6,7 @@ by applying combinations of allowed Zihafat and 'Ilal according to the rules.
 """
 
 from itertools import product
-from typing import List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from .ilal import Ilah
 from .meters import Meter
@@ -190,10 +190,15 @@ class PatternGenerator:
 
         return unique
 
-    def generate_with_tracking(self) -> List[Tuple[str, List[str]]]:
+    def generate_with_tracking(
+        self, verse_type: str = 'full_verse'
+    ) -> List[Tuple[str, List[str]]]:
         """
         Generate patterns with transformation tracking.
 
+        Args:
+            verse_type: 'full_verse' (default) or 'hemistich'
+
         Returns:
             List of (pattern, transformations_applied) tuples
 
@@ -206,7 +211,8 @@ class PatternGenerator:
             ('/o////o/o/o/o//o//o/o/o', ['قبض at pos 1', 'base', 'base', 'base'])
         """
         results = []
-        position_variations = self._generate_position_variations_with_names()
+        tafail_count = self._get_tafail_count_for_type(verse_type)
+        position_variations = self._generate_position_variations_with_names(tafail_count)
 
         for combo in product(*position_variations):
             tafail_list = [t[0] for t in combo]
@@ -217,6 +223,31 @@ class PatternGenerator:
 
         return results
 
+    def build_tracking_table(self, verse_type: str = 'full_verse') -> Dict[str, List[str]]:
+        """
+        Build a pattern → transformations lookup table.
+
+        When several combinations produce the same pattern, the first one in
+        generate_with_tracking() order is kept (the same one a linear search
+        over that list would find).
+
+        Args:
+            verse_type: 'full_verse' (default) or 'hemistich'
+
+        Returns:
+            Dictionary mapping pattern → list of transformation names per position
+
+        Example:
+            >>> gen = PatternGenerator(AL_TAWIL)
+            >>> table = gen.build_tracking_table()
+            >>> table['//o/o//o/o/o//o/o//o/o/o']
+            ['base', 'base', 'base', 'base']
+        """
+        table: Dict[str, List[str]] = {}
+        for pattern, transformations in self.generate_with_tracking(verse_type):
+            table.setdefault(pattern, transformations)
+        return table
+
     def _generate_position_variations_with_names(
         self, tafail_count: Optional[int] = None
     ) -> List[List[Tuple[Tafila, str]]]:
@@ -0,0 +1,243 @@
+"""
+Pattern Index - Prefix trie over generated meter patterns.
+
+The fuzzy matcher in BahrDetectorV2 used to compare the input pattern against
+every generated pattern of every meter, running a full weighted edit distance
+DP for each pair. Generated patterns share long prefixes (they are products of
+per-position tafila variants), so most of that work is repeated.
+
+PatternTrie stores the patterns of one meter in a prefix trie and computes the
+edit distance DP one row per trie node, so shared prefixes are scored once.
+Subtrees whose lower bound cannot reach the similarity threshold (or the best
+similarity found so far) are pruned without being visited.
+
+Scores are identical to PatternSimilarity.calculate_similarity(), and ties are
+resolved exactly like a linear scan over the original pattern set.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .pattern_similarity import PatternSimilarity
+
+# Small tolerance so that floating point noise in the bound never prunes a tie
+_PRUNE_EPSILON = 1e-9
+
+
+class _TrieNode:
+    """Single trie node keyed by the next pattern symbol."""
+
+    __slots__ = ("children", "order", "pattern", "min_len", "max_len")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.order: Optional[int] = None  # Scan order if a pattern ends here
+        self.pattern: Optional[str] = None
+        self.min_len: int = 0  # Shortest pattern length in this subtree
+        self.max_len: int = 0  # Longest pattern length in this subtree
+
+
+class PatternTrie:
+    """
+    Prefix trie supporting bounded weighted-edit-distance search.
+
+    Example:
+        >>> trie = PatternTrie(["/o//o//o/o", "/o//o//o//"])
+        >>> trie.best_match("/o//o//o/o/")
+        ('/o//o//o/o', 0.9318181818181819)
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Build the trie.
+
+        Args:
+            patterns: Patterns to index. The iteration order is remembered and
+                used for tie-breaking, so that best_match() returns the same
+                pattern a linear scan over the same iterable would return.
+        """
+        self.root = _TrieNode()
+        self.size = 0
+
+        for order, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            node = self.root
+            for symbol in pattern:
+                node = node.children.setdefault(symbol, _TrieNode())
+            if node.order is None:
+                node.order = order
+                node.pattern = pattern
+                self.size += 1
+
+        self._compute_length_bounds(self.root, 0)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _compute_length_bounds(self, node: _TrieNode, depth: int) -> None:
+        """Annotate every node with the min/max pattern length below it."""
+        stack: List[Tuple[_TrieNode, int, bool]] = [(node, depth, False)]
+        while stack:
+            current, current_depth, expanded = stack.pop()
+            if not expanded:
+                stack.append((current, current_depth, True))
+                for child in current.children.values():
+                    stack.append((child, current_depth + 1, False))
+                continue
+
+            lengths = [
+                (child.min_len, child.max_len) for child in current.children.values()
+            ]
+            if current.pattern is not None:
+                lengths.append((current_depth, current_depth))
+            current.min_len = min(low for low, _ in lengths)
+            current.max_len = max(high for _, high in lengths)
+
+    def best_match(
+        self, query: str, min_similarity: float = 0.0
+    ) -> Tuple[Optional[str], float]:
+        """
+        Find the indexed pattern most similar to query.
+
+        Args:
+            query: Input phonetic pattern
+            min_similarity: Only patterns scoring at least this are considered
+
+        Returns:
+            (best_pattern, similarity) or (None, 0.0) if nothing qualifies.
+            Among equally similar patterns, the one that came first in the
+            original iteration order is returned.
+        """
+        if not query or self.size == 0:
+            return None, 0.0
+
+        weights = PatternSimilarity.WEIGHTS
+        indel = weights["insert_delete"]
+        substitute = weights["substitute_weight"]
+        m = len(query)
+
+        best_pattern: Optional[str] = None
+        best_similarity = 0.0
+        best_order = -1
+
+        # Depth-first traversal carrying the DP row for the current prefix
+        first_row = [j * indel for j in range(m + 1)]
+        stack: List[Tuple[_TrieNode, int, List[float]]] = [(self.root, 0, first_row)]
+
+        while stack:
+            node, depth, row = stack.pop()
+
+            # Upper bound on similarity reachable anywhere in this subtree
+            bound = self._similarity_upper_bound(row, depth, node, m)
+            floor = max(min_similarity, best_similarity)
+            if bound < floor - _PRUNE_EPSILON:
+                continue
+
+            if node.pattern is not None:
+                similarity = self._finalize(row[m], m, depth, query, node.pattern)
+                if similarity >= min_similarity and (
+                    similarity > best_similarity
+                    or (
+                        similarity == best_similarity
+                        and best_pattern is not None
+                        and node.order < best_order
+                    )
+                ):
+                    best_pattern = node.pattern
+                    best_similarity = similarity
+                    best_order = node.order
+
+            for symbol, child in node.children.items():
+                new_row = [row[0] + indel]
+                for j in range(1, m + 1):
+                    if query[j - 1] == symbol:
+                        new_row.append(row[j - 1])
+                    else:
+                        new_row.append(
+                            min(
+                                row[j - 1] + substitute,
+                                new_row[j - 1] + indel,
+                                row[j] + indel,
+                            )
+                        )
+                stack.append((child, depth + 1, new_row))
+
+        if best_pattern is None:
+            return None, 0.0
+        return best_pattern, best_similarity
+
+    @staticmethod
+    def _finalize(distance: float, m: int, n: int, query: str, pattern: str) -> float:
+        """Turn a DP distance into the PatternSimilarity score."""
+        if query == pattern:
+            return 1.0
+        weights = PatternSimilarity.WEIGHTS
+        distance = distance + abs(m - n) * weights["length_penalty"]
+        max_distance = max(m, n) * weights["substitute_weight"]
+        if max_distance == 0:
+            return 1.0
+        similarity = 1.0 - (distance / max_distance)
+        return max(0.0, min(1.0, similarity))
+
+    @staticmethod
+    def _similarity_upper_bound(
+        row: List[float], depth: int, node: _TrieNode, m: int
+    ) -> float:
+        """
+        Upper bound on the similarity of any pattern ending below node.
+
+        Every completion of the current prefix to a pattern of length n must
+        still align the remaining m - j query symbols with n - depth pattern
+        symbols, costing at least |(m - j) - (n - depth)| indels on top of
+        row[j]. Length penalty and normaliser are bounded over the subtree's
+        [min_len, max_len] range.
+        """
+        weights = PatternSimilarity.WEIGHTS
+        indel = weights["insert_delete"]
+
+        low_remaining = node.min_len - depth
+        high_remaining = node.max_len - depth
+
+        edit_bound = None
+        for j, value in enumerate(row):
+            rest = m - j
+            if rest < low_remaining:
+                gap = low_remaining - rest
+            elif rest > high_remaining:
+                gap = rest - high_remaining
+            else:
+                gap = 0
+            candidate = value + gap * indel
+            if edit_bound is None or candidate < edit_bound:
+                edit_bound = candidate
+
+        if m < node.min_len:
+            length_gap = node.min_len - m
+        elif m > node.max_len:
+            length_gap = m - node.max_len
+        else:
+            length_gap = 0
+
+        distance_bound = edit_bound + length_gap * weights["length_penalty"]
+        max_distance = max(m, node.max_len) * weights["substitute_weight"]
+        if max_distance == 0:
+            return 1.0
+        return 1.0 - (distance_bound / max_distance)
+
+
+def build_pattern_index(
+    patterns_by_meter: Dict[int, Iterable[str]]
+) -> Dict[int, PatternTrie]:
+    """
+    Build one PatternTrie per meter.
+
+    Args:
+        patterns_by_meter: Mapping meter_id → patterns (e.g. detector.pattern_cache)
+
+    Returns:
+        Mapping meter_id → PatternTrie
+    """
+    return {
+        meter_id: PatternTrie(patterns)
+        for meter_id, patterns in patterns_by_meter.items()
+    }
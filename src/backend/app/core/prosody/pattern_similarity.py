@@ -11,11 +11,36 @@ The key insight is that real poetry often has natural variations from ideal patt
 
 Rather than requiring exact pattern matches, we use weighted edit distance to find
 the best matching meter with a confidence score.
+
+For scoring one pattern against many candidates, PatternSimilarity.similarity_many()
+runs the same DP vectorized over all candidates at once with NumPy.
 """
 
-from typing import List, Tuple
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple, Union
 import re
 
+import numpy as np
+
+
+@dataclass(frozen=True)
+class EncodedPatterns:
+    """
+    Candidate patterns packed for PatternSimilarity.similarity_many().
+
+    Attributes:
+        patterns: Original pattern strings (in input order)
+        matrix: (n_patterns, max_len) uint8 symbol codes, right-padded
+        lengths: (n_patterns,) pattern lengths
+    """
+
+    patterns: Tuple[str, ...]
+    matrix: np.ndarray
+    lengths: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
 
 class PatternSimilarity:
     """
@@ -133,6 +158,118 @@ class PatternSimilarity:
 
         return dp[m][n] + length_penalty
 
+    @staticmethod
+    def encode_patterns(patterns: Sequence[str]) -> EncodedPatterns:
+        """
+        Pack patterns into a padded uint8 matrix for similarity_many().
+
+        Encode once and reuse when the same candidate set is scored repeatedly
+        (e.g. a meter's generated patterns).
+
+        Args:
+            patterns: Candidate patterns
+
+        Returns:
+            EncodedPatterns
+        """
+        patterns = tuple(patterns)
+        lengths = np.fromiter((len(p) for p in patterns), dtype=np.int64, count=len(patterns))
+        width = int(lengths.max()) if len(patterns) else 0
+        matrix = np.zeros((len(patterns), width), dtype=np.uint8)
+
+        codes = PatternSimilarity._symbol_codes("".join(patterns))
+        for row, pattern in enumerate(patterns):
+            if pattern:
+                matrix[row, : len(pattern)] = [codes[c] for c in pattern]
+
+        return EncodedPatterns(patterns=patterns, matrix=matrix, lengths=lengths)
+
+    @staticmethod
+    def _symbol_codes(symbols: str) -> dict:
+        """Map each distinct symbol to a non-zero uint8 code (0 is padding)."""
+        codes = {'/': 1, 'o': 2}
+        for c in symbols:
+            if c not in codes:
+                codes[c] = len(codes) + 1
+        if len(codes) > 255:
+            raise ValueError("Too many distinct pattern symbols to encode as uint8")
+        return codes
+
+    @staticmethod
+    def similarity_many(
+        query: str, patterns: Union[Sequence[str], EncodedPatterns]
+    ) -> np.ndarray:
+        """
+        Calculate calculate_similarity(query, p) for every candidate p at once.
+
+        The DP runs one query symbol at a time over a (n_patterns, max_len)
+        matrix. Within a row, the insertion dependency is resolved with a
+        running minimum, so each row costs a handful of NumPy operations
+        regardless of how many candidates there are. All DP values are small
+        integers, so scores are bit-identical to the scalar version.
+
+        Args:
+            query: Input prosodic pattern
+            patterns: Candidate patterns, or the result of encode_patterns()
+
+        Returns:
+            float64 array of similarity scores, aligned with patterns
+
+        Example:
+            >>> PatternSimilarity.similarity_many("//o/o", ["//o/o", "//o//o"])
+            array([1.   , 0.875])
+        """
+        if not isinstance(patterns, EncodedPatterns):
+            patterns = PatternSimilarity.encode_patterns(patterns)
+
+        n_patterns = len(patterns)
+        if n_patterns == 0 or not query:
+            return np.zeros(n_patterns, dtype=np.float64)
+
+        weights = PatternSimilarity.WEIGHTS
+        indel = weights['insert_delete']
+        substitute = weights['substitute_weight']
+
+        matrix = patterns.matrix
+        lengths = patterns.lengths
+        width = matrix.shape[1]
+
+        # Query symbols unknown to the candidates can never match: code 0 is
+        # padding, so give them a code no candidate cell holds.
+        codes = PatternSimilarity._symbol_codes("".join(patterns.patterns) + query)
+        query_codes = [codes[c] for c in query]
+
+        offsets = np.arange(width + 1, dtype=np.float64) * indel
+        prev = np.broadcast_to(offsets, (n_patterns, width + 1)).copy()
+        row = np.empty_like(prev)
+
+        for i, code in enumerate(query_codes, start=1):
+            diagonal = prev[:, :-1]
+            row[:, 0] = i * indel
+            row[:, 1:] = np.where(
+                matrix == code,
+                diagonal,
+                np.minimum(diagonal + substitute, prev[:, 1:] + indel),
+            )
+            # Insertions: row[j] = min_k<=j (row[k] + (j - k) * indel)
+            np.minimum.accumulate(row - offsets, axis=1, out=row)
+            row += offsets
+            prev, row = row, prev
+
+        distance = prev[np.arange(n_patterns), lengths]
+
+        m = len(query)
+        distance = distance + np.abs(m - lengths) * weights['length_penalty']
+        max_distance = np.maximum(m, lengths) * substitute
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = 1.0 - (distance / max_distance)
+        similarity = np.clip(similarity, 0.0, 1.0)
+
+        # Empty candidates score 0.0, exactly like calculate_similarity()
+        similarity[lengths == 0] = 0.0
+        return similarity
+
     @staticmethod
     def _get_substitution_cost(c1: str, c2: str) -> float:
         """
@@ -194,10 +331,13 @@ class PatternSimilarity:
         if not input_pattern or not candidate_patterns:
             return []
 
-        # Calculate similarity for each candidate
+        # Calculate similarity for all candidates in one vectorized pass
+        similarities = PatternSimilarity.similarity_many(
+            input_pattern, [pattern for _, pattern in candidate_patterns]
+        )
+
         scored_matches = []
-        for meter_name, pattern in candidate_patterns:
-            similarity = PatternSimilarity.calculate_similarity(input_pattern, pattern)
+        for (meter_name, pattern), similarity in zip(candidate_patterns, similarities.tolist()):
             if similarity >= min_similarity:
                 scored_matches.append((meter_name, pattern, similarity))
 
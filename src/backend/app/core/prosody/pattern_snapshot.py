@@ -0,0 +1,505 @@
+"""
+Pattern Snapshot - Versioned on-disk cache of generated meter patterns.
+
+Every process that builds a BahrDetectorV2 (each API worker, each import of the
+analyze_v2 endpoint, each BahrDetectorV2Hybrid) used to regenerate the full
+verse and hemistich patterns of every meter, plus their transformation
+tracking tables. Those only change when the prosody rules change.
+
+This module stores them once on disk:
+
+    <snapshot_dir>/patterns-v<FORMAT>-<fingerprint>/
+        manifest.json        meter → row ranges, transformation vocabulary
+        patterns.npy         fixed-width bytes array, one pattern per row,
+                             sorted within each meter/verse type section
+        transformations.npy  int16 matrix, transformation name ids per row
+
+The .npy files are opened with mmap. The transformation tracking tables are
+served straight from the mapped arrays (binary search over the sorted rows,
+see TrackingTable), so workers on the same host share those pages through
+the page cache. The pattern sets themselves are materialized per process as
+frozensets: the prefix tries and the exact-match checks on the detection
+path need hashed Python strings.
+
+The directory name contains a fingerprint of METERS_REGISTRY, the
+zihafat/'ilal definitions and the generator source, so any rule change makes
+the old snapshot unreachable and a fresh one is generated automatically.
+Snapshots of other fingerprints are only removed once they have not been
+used for STALE_SNAPSHOT_AGE, so versions sharing a directory during a
+rollout keep theirs.
+
+Loaded snapshots (and the rules fingerprint) are memoized per process, so
+several detectors in the same worker share one read-only copy.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import AbstractSet, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from . import ilal, meters, pattern_generator, tafila, zihafat
+from .meters import METERS_REGISTRY, Meter
+from .pattern_generator import PatternGenerator
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+_VERSE_TYPES = ("full_verse", "hemistich")
+
+# Modules whose code defines the generated patterns
+_RULE_MODULES = (meters, zihafat, ilal, tafila, pattern_generator)
+
+# Snapshots of other fingerprints unused for this long are removed (seconds)
+STALE_SNAPSHOT_AGE = 7 * 24 * 3600
+
+_loaded: Dict[str, "PatternSnapshot"] = {}
+_fingerprints: Dict[int, tuple] = {}  # id(registry) → (registry, fingerprint)
+_lock = threading.Lock()
+
+
+class TrackingTable(Mapping):
+    """
+    Read-only pattern → transformations lookup over snapshot rows.
+
+    Rows are one section of the mmapped arrays, sorted by pattern, so a
+    lookup is a binary search and nothing is copied into the process.
+    """
+
+    def __init__(
+        self, patterns: np.ndarray, transformations: np.ndarray, names: Sequence[str]
+    ):
+        self._patterns = patterns
+        self._transformations = transformations
+        self._names = names
+
+    def _row(self, pattern: str) -> int:
+        try:
+            key = pattern.encode("ascii")
+        except (AttributeError, UnicodeEncodeError):
+            return -1
+        if len(key) > self._patterns.dtype.itemsize:
+            return -1
+        row = int(np.searchsorted(self._patterns, key))
+        if row < len(self._patterns) and self._patterns[row] == key:
+            return row
+        return -1
+
+    def __getitem__(self, pattern: str) -> tuple:
+        row = self._row(pattern)
+        if row < 0:
+            raise KeyError(pattern)
+        return tuple(
+            self._names[i] for i in self._transformations[row].tolist() if i >= 0
+        )
+
+    def __contains__(self, pattern: object) -> bool:
+        return isinstance(pattern, str) and self._row(pattern) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self._patterns.tolist():
+            yield raw.decode("ascii")
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+
+@dataclass
+class PatternSnapshot:
+    """
+    Generated patterns and tracking tables for a set of meters.
+
+    Attributes:
+        fingerprint: Rules fingerprint the snapshot was generated for
+        patterns: meter_id → full verse patterns
+        hemistich_patterns: meter_id → hemistich patterns
+        tracking_tables: meter_id → {full verse pattern: transformations}
+        hemistich_tracking_tables: meter_id → {hemistich pattern: transformations}
+    """
+
+    fingerprint: str
+    patterns: Dict[int, AbstractSet[str]]
+    hemistich_patterns: Dict[int, AbstractSet[str]]
+    tracking_tables: Dict[int, Mapping]
+    hemistich_tracking_tables: Dict[int, Mapping]
+
+    def tables_for(self, verse_type: str) -> Dict[int, Mapping]:
+        """Tracking tables for 'full_verse' or 'hemistich'."""
+        if verse_type == "hemistich":
+            return self.hemistich_tracking_tables
+        return self.tracking_tables
+
+
+def _describe_transform(rule, base: tafila.Tafila) -> Optional[str]:
+    """Phonetic result of applying a zahaf/'illa, or None if it does not apply."""
+    try:
+        return rule.apply(base).phonetic
+    except Exception:
+        return None
+
+
+def compute_rules_fingerprint(
+    meters_registry: Optional[Dict[int, Meter]] = None
+) -> str:
+    """
+    Fingerprint the rules that determine the generated patterns.
+
+    Covers every meter's base tafāʿīl, the zihafat/'ilal allowed at each
+    position together with what they produce, and the source of the rule
+    modules, so that editing a transformation function also invalidates
+    snapshots.
+
+    Args:
+        meters_registry: Meters to fingerprint (default: METERS_REGISTRY)
+
+    Returns:
+        Hex digest (SHA-256)
+    """
+    if meters_registry is None:
+        meters_registry = METERS_REGISTRY
+
+    description = []
+    for meter_id in sorted(meters_registry):
+        meter = meters_registry[meter_id]
+        positions = []
+        for position, base in enumerate(meter.base_tafail, start=1):
+            rules = meter.get_rules_at_position(position)
+            zihafat_desc = []
+            ilal_desc = []
+            if rules is not None:
+                zihafat_desc = [
+                    [zahaf.type.value, _describe_transform(zahaf, base)]
+                    for zahaf in rules.allowed_zihafat
+                ]
+                ilal_desc = [
+                    [ilah.type.value, _describe_transform(ilah, base)]
+                    for ilah in rules.allowed_ilal
+                ]
+            positions.append(
+                [
+                    base.name,
+                    base.phonetic,
+                    zihafat_desc,
+                    ilal_desc,
+                    bool(rules and rules.is_final),
+                ]
+            )
+        description.append([meter_id, meter.name_ar, meter.name_en, positions])
+
+    digest = hashlib.sha256()
+    digest.update(f"format={SNAPSHOT_FORMAT_VERSION}\n".encode("utf-8"))
+    digest.update(json.dumps(description, ensure_ascii=False).encode("utf-8"))
+    for module in _RULE_MODULES:
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def rules_fingerprint(meters_registry: Optional[Dict[int, Meter]] = None) -> str:
+    """
+    compute_rules_fingerprint(), memoized per registry for this process.
+
+    Rules do not change while a process runs, so detectors constructed
+    after the first one skip re-hashing the rule module sources.
+    """
+    if meters_registry is None:
+        meters_registry = METERS_REGISTRY
+    cached = _fingerprints.get(id(meters_registry))
+    if cached is not None and cached[0] is meters_registry:
+        return cached[1]
+    fingerprint = compute_rules_fingerprint(meters_registry)
+    _fingerprints[id(meters_registry)] = (meters_registry, fingerprint)
+    return fingerprint
+
+
+def build_snapshot(
+    meters_registry: Optional[Dict[int, Meter]] = None,
+    fingerprint: Optional[str] = None,
+) -> PatternSnapshot:
+    """
+    Generate a snapshot in memory with PatternGenerator.
+
+    Args:
+        meters_registry: Meters to generate (default: METERS_REGISTRY)
+        fingerprint: Precomputed rules fingerprint (computed if omitted)
+
+    Returns:
+        PatternSnapshot (read-only: frozensets and mapping proxies)
+    """
+    if meters_registry is None:
+        meters_registry = METERS_REGISTRY
+    if fingerprint is None:
+        fingerprint = compute_rules_fingerprint(meters_registry)
+
+    snapshot = PatternSnapshot(fingerprint, {}, {}, {}, {})
+    for meter_id, meter in meters_registry.items():
+        generator = PatternGenerator(meter)
+        snapshot.patterns[meter_id] = frozenset(
+            generator.generate_all_patterns("full_verse")
+        )
+        snapshot.hemistich_patterns[meter_id] = frozenset(
+            generator.generate_all_patterns("hemistich")
+        )
+        for verse_type in _VERSE_TYPES:
+            table = generator.build_tracking_table(verse_type)
+            snapshot.tables_for(verse_type)[meter_id] = MappingProxyType(
+                {pattern: tuple(names) for pattern, names in table.items()}
+            )
+    return snapshot
+
+
+def snapshot_path(snapshot_dir: os.PathLike, fingerprint: str) -> Path:
+    """Directory holding the snapshot for a fingerprint."""
+    return (
+        Path(snapshot_dir) / f"patterns-v{SNAPSHOT_FORMAT_VERSION}-{fingerprint[:32]}"
+    )
+
+
+def write_snapshot(snapshot: PatternSnapshot, snapshot_dir: os.PathLike) -> Path:
+    """
+    Write a snapshot to disk atomically.
+
+    The files are written to a temporary directory which is then renamed into
+    place, so concurrent workers never observe a half-written snapshot. If
+    another process wins the race, its snapshot is kept.
+
+    Args:
+        snapshot: Snapshot to write
+        snapshot_dir: Root directory for snapshots
+
+    Returns:
+        Path of the snapshot directory
+    """
+    root = Path(snapshot_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    target = snapshot_path(root, snapshot.fingerprint)
+
+    names: List[str] = []
+    name_ids: Dict[str, int] = {}
+    rows: List[str] = []
+    row_transformations: List[List[int]] = []
+    sections: Dict[str, Dict[str, List[int]]] = {}
+
+    for meter_id in sorted(snapshot.patterns):
+        sections[str(meter_id)] = {}
+        for verse_type in _VERSE_TYPES:
+            table = snapshot.tables_for(verse_type)[meter_id]
+            start = len(rows)
+            # Sorted so TrackingTable can binary-search the section
+            for pattern in sorted(table):
+                transformations = table[pattern]
+                ids = []
+                for name in transformations:
+                    if name not in name_ids:
+                        name_ids[name] = len(names)
+                        names.append(name)
+                    ids.append(name_ids[name])
+                rows.append(pattern)
+                row_transformations.append(ids)
+            sections[str(meter_id)][verse_type] = [start, len(rows)]
+
+    width = max((len(row) for row in rows), default=1)
+    patterns_array = np.array([row.encode("ascii") for row in rows], dtype=f"S{width}")
+    positions = max((len(ids) for ids in row_transformations), default=0)
+    transformations_array = np.full((len(rows), positions), -1, dtype=np.int16)
+    for index, ids in enumerate(row_transformations):
+        transformations_array[index, : len(ids)] = ids
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": snapshot.fingerprint,
+        "transformation_names": names,
+        "sections": sections,
+    }
+
+    staging = Path(tempfile.mkdtemp(prefix=".patterns-", dir=root))
+    try:
+        os.chmod(staging, 0o755)  # mkdtemp creates it owner-only
+        np.save(staging / "patterns.npy", patterns_array)
+        np.save(staging / "transformations.npy", transformations_array)
+        with open(staging / "manifest.json", "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, ensure_ascii=False)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            if not target.exists():
+                raise
+            logger.debug(
+                "Pattern snapshot %s already written by another process", target
+            )
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+
+    return target
+
+
+def read_snapshot(
+    snapshot_dir: os.PathLike, fingerprint: str
+) -> Optional[PatternSnapshot]:
+    """
+    Load a snapshot from disk using mmap.
+
+    The tracking tables stay backed by the mapped arrays (TrackingTable);
+    the pattern sets are materialized as frozensets.
+
+    Args:
+        snapshot_dir: Root directory for snapshots
+        fingerprint: Expected rules fingerprint
+
+    Returns:
+        PatternSnapshot, or None if no valid snapshot exists for fingerprint
+    """
+    path = snapshot_path(snapshot_dir, fingerprint)
+    if not path.is_dir():
+        return None
+
+    try:
+        with open(path / "manifest.json", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        if (
+            manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION
+            or manifest.get("fingerprint") != fingerprint
+        ):
+            logger.warning("Ignoring mismatched pattern snapshot at %s", path)
+            return None
+
+        patterns_array = np.load(path / "patterns.npy", mmap_mode="r")
+        transformations_array = np.load(path / "transformations.npy", mmap_mode="r")
+        if len(patterns_array) != len(transformations_array):
+            raise ValueError("pattern and transformation row counts differ")
+
+        names = manifest["transformation_names"]
+        snapshot = PatternSnapshot(fingerprint, {}, {}, {}, {})
+        for meter_key, meter_sections in manifest["sections"].items():
+            meter_id = int(meter_key)
+            for verse_type in _VERSE_TYPES:
+                start, stop = meter_sections[verse_type]
+                table = TrackingTable(
+                    patterns_array[start:stop], transformations_array[start:stop], names
+                )
+                snapshot.tables_for(verse_type)[meter_id] = table
+                if verse_type == "hemistich":
+                    snapshot.hemistich_patterns[meter_id] = frozenset(table)
+                else:
+                    snapshot.patterns[meter_id] = frozenset(table)
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+        logger.warning(f"Discarding unreadable pattern snapshot at {path}: {e}")
+        return None
+
+    _touch(path)
+    return snapshot
+
+
+def _touch(path: Path) -> None:
+    """Mark a snapshot as in use (see _remove_stale_snapshots)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _remove_stale_snapshots(
+    snapshot_dir: Path, keep: Path, max_age: float = STALE_SNAPSHOT_AGE
+) -> None:
+    """
+    Best-effort removal of snapshots not used for max_age seconds.
+
+    Other fingerprints may belong to versions still running (a rollout that
+    shares the directory), and every load touches its snapshot, so only
+    snapshots nobody has loaded for a while are removed.
+    """
+    cutoff = time.time() - max_age
+    for candidate in snapshot_dir.glob("patterns-v*"):
+        if candidate == keep or not candidate.is_dir():
+            continue
+        try:
+            if candidate.stat().st_mtime < cutoff:
+                shutil.rmtree(candidate, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def default_snapshot_dir() -> Optional[Path]:
+    """Configured snapshot directory, or None if snapshots are disabled."""
+    from app.config import settings
+
+    if not settings.pattern_snapshot_enabled:
+        return None
+    if settings.pattern_snapshot_dir:
+        return Path(settings.pattern_snapshot_dir)
+    return Path(tempfile.gettempdir()) / "bahr" / "pattern_snapshots"
+
+
+def load_pattern_snapshot(
+    meters_registry: Optional[Dict[int, Meter]] = None,
+    snapshot_dir: Optional[os.PathLike] = None,
+) -> PatternSnapshot:
+    """
+    Get the pattern snapshot for the current rules.
+
+    Order of preference: this process's memoized snapshot, the on-disk
+    snapshot, a freshly generated one (which is then written to disk).
+    Disk problems never fail detector startup; they only cost regeneration.
+
+    Args:
+        meters_registry: Meters to load (default: METERS_REGISTRY)
+        snapshot_dir: Root directory for snapshots (default: settings,
+            see default_snapshot_dir())
+
+    Returns:
+        PatternSnapshot (shared within the process, read-only)
+    """
+    if meters_registry is None:
+        meters_registry = METERS_REGISTRY
+    fingerprint = rules_fingerprint(meters_registry)
+
+    with _lock:
+        cached = _loaded.get(fingerprint)
+        if cached is not None:
+            return cached
+
+        directory = (
+            Path(snapshot_dir) if snapshot_dir is not None else default_snapshot_dir()
+        )
+
+        snapshot = None
+        if directory is not None:
+            snapshot = read_snapshot(directory, fingerprint)
+            if snapshot is not None:
+                logger.info(
+                    f"Loaded pattern snapshot {fingerprint[:12]} from {directory}"
+                )
+
+        if snapshot is None:
+            snapshot = build_snapshot(meters_registry, fingerprint)
+            if directory is not None:
+                try:
+                    path = write_snapshot(snapshot, directory)
+                    _remove_stale_snapshots(directory, keep=path)
+                    logger.info(f"Wrote pattern snapshot {fingerprint[:12]} to {path}")
+                except OSError as e:
+                    logger.warning(
+                        f"Could not write pattern snapshot to {directory}: {e}"
+                    )
+
+        _loaded[fingerprint] = snapshot
+        return snapshot
+
+
+def clear_loaded_snapshots() -> None:
+    """Forget snapshots and fingerprints memoized in this process (mainly for tests)."""
+    with _lock:
+        _loaded.clear()
+        _fingerprints.clear()
@@ -7,13 +7,42 @@ This approach handles the mismatch between actual syllable scansion and
 theoretical tafila patterns.
 """
 
+import weakref
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from app.core.phonetics import Phoneme, extract_phonemes
+import numpy as np
+from app.core.analysis_context import AnalysisContext
+from app.core.phonetics import Phoneme, extract_phonemes, phonemes_to_pattern
 
 from .detector_v2 import BahrDetectorV2, DetectionResult, MatchQuality
 from .meters import METERS_REGISTRY
+from .sequence_similarity import SequenceRatioMatcher
+
+# Vowels counted as harakat / as sakin-like (tanween) by the fitness heuristic
+_SHORT_VOWELS = frozenset(("a", "u", "i"))
+_SAKIN_VOWELS = frozenset(("", "aa", "uu", "ii", "an", "un", "in"))
+
+
+def count_phonemes(phonemes: Sequence[Phoneme]) -> Tuple[int, int]:
+    """
+    Count harakat and sakinat (sukun, long vowels and tanween) in one pass.
+
+    Args:
+        phonemes: List of phonemes extracted from text
+
+    Returns:
+        (n_harakas, total_sakins) as used by calculate_pattern_fitness()
+    """
+    n_harakas = 0
+    total_sakins = 0
+    for phoneme in phonemes:
+        vowel = phoneme.vowel
+        if vowel in _SHORT_VOWELS:
+            n_harakas += 1
+        elif vowel in _SAKIN_VOWELS:
+            total_sakins += 1
+    return n_harakas, total_sakins
 
 
 def calculate_pattern_fitness(phonemes: List[Phoneme], pattern: str) -> float:
@@ -26,6 +55,10 @@ def calculate_pattern_fitness(phonemes: List[Phoneme], pattern: str) -> float:
     - Structural similarity (harakat/sakin ratios and distribution)
     - Penalty for large count mismatches
 
+    The score depends only on the phoneme counts and the pattern's "/" and
+    "o" counts and length; see fitness_from_counts() to score many patterns
+    at once.
+
     Args:
         phonemes: List of phonemes extracted from text
         pattern: Cached pattern to test fitness against
@@ -36,52 +69,136 @@ def calculate_pattern_fitness(phonemes: List[Phoneme], pattern: str) -> float:
     if not phonemes or not pattern:
         return 0.0
 
-    # Count phoneme types
-    n_harakas = sum(1 for p in phonemes if p.vowel in ["a", "u", "i"])
-    n_sakins = sum(1 for p in phonemes if p.is_sukun())
-    n_long = sum(1 for p in phonemes if p.is_long_vowel())
-    n_tanween = sum(1 for p in phonemes if p.vowel in ["an", "un", "in"])
+    n_harakas, total_sakins = count_phonemes(phonemes)
+    fitness = fitness_from_counts(
+        n_harakas,
+        total_sakins,
+        np.array([pattern.count("/")]),
+        np.array([pattern.count("o")]),
+        np.array([len(pattern)]),
+    )
+    return float(fitness[0])
 
-    # Count pattern symbols
-    n_haraka_in_pattern = pattern.count("/")
-    n_sakin_in_pattern = pattern.count("o")
 
-    # Use the original fitness function from precompute_golden_patterns.py
-    # This function gives high scores to patterns with similar counts,
-    # which works when combined with tier-based tie-breaking
+def fitness_from_counts(
+    n_harakas: int,
+    total_sakins: int,
+    pattern_harakat: np.ndarray,
+    pattern_sakinat: np.ndarray,
+    pattern_lengths: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorized fitness of patterns given by their symbol counts.
+
+    Uses the original fitness function from precompute_golden_patterns.py,
+    which gives high scores to patterns with similar counts (this works when
+    combined with tier-based tie-breaking).
 
-    total_sakins = n_sakins + n_long + n_tanween
+    Args:
+        n_harakas: Harakat in the verse (see count_phonemes())
+        total_sakins: Sakinat in the verse (see count_phonemes())
+        pattern_harakat: "/" count per pattern
+        pattern_sakinat: "o" count per pattern
+        pattern_lengths: Length per pattern
+
+    Returns:
+        float64 array of fitness scores (0.0-1.0)
+    """
+
+    def count_ratio(a, b) -> np.ndarray:
+        # min/max ratio, 0.0 where both counts are zero
+        low = np.minimum(a, b)
+        high = np.maximum(a, b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = low / high
+        return np.where(high > 0, ratio, 0.0)
 
     # 1. Harakat count ratio
-    if max(n_harakas, n_haraka_in_pattern) > 0:
-        haraka_ratio = min(n_harakas, n_haraka_in_pattern) / max(
-            n_harakas, n_haraka_in_pattern
-        )
-    else:
-        haraka_ratio = 0.0
+    haraka_ratio = count_ratio(n_harakas, pattern_harakat)
 
     # 2. Sakin count ratio
-    if max(total_sakins, n_sakin_in_pattern) > 0:
-        sakin_ratio = min(total_sakins, n_sakin_in_pattern) / max(
-            total_sakins, n_sakin_in_pattern
-        )
-    else:
-        sakin_ratio = 0.0
+    sakin_ratio = count_ratio(total_sakins, pattern_sakinat)
 
     # 3. Length ratio
-    expected_length = n_harakas + total_sakins
-    pattern_len = len(pattern)
-    if max(pattern_len, expected_length) > 0:
-        length_ratio = min(pattern_len, expected_length) / max(
-            pattern_len, expected_length
-        )
-    else:
-        length_ratio = 0.0
+    length_ratio = count_ratio(n_harakas + total_sakins, pattern_lengths)
 
     # Overall fitness (weighted average - same as golden set preprocessing)
-    fitness = haraka_ratio * 0.4 + sakin_ratio * 0.4 + length_ratio * 0.2
+    return haraka_ratio * 0.4 + sakin_ratio * 0.4 + length_ratio * 0.2
 
-    return fitness
+
+@dataclass(frozen=True)
+class PatternBuckets:
+    """
+    A meter's cached patterns grouped by ("/" count, "o" count, length).
+
+    Fitness only depends on these counts, so it is computed once per bucket
+    and gathered back to pattern order through pattern_bucket.
+
+    Attributes:
+        patterns: Patterns in cache iteration order
+        pattern_bucket: Bucket index of each pattern
+        harakat: "/" count per bucket
+        sakinat: "o" count per bucket
+        lengths: Pattern length per bucket
+    """
+
+    patterns: Tuple[str, ...]
+    pattern_bucket: np.ndarray
+    harakat: np.ndarray
+    sakinat: np.ndarray
+    lengths: np.ndarray
+
+    @classmethod
+    def build(cls, patterns) -> "PatternBuckets":
+        patterns = tuple(patterns)
+        bucket_ids: Dict[Tuple[int, int, int], int] = {}
+        pattern_bucket = np.empty(len(patterns), dtype=np.intp)
+        for position, pattern in enumerate(patterns):
+            key = (pattern.count("/"), pattern.count("o"), len(pattern))
+            pattern_bucket[position] = bucket_ids.setdefault(key, len(bucket_ids))
+
+        counts = np.array(list(bucket_ids), dtype=np.int64).reshape(-1, 3)
+        return cls(
+            patterns=patterns,
+            pattern_bucket=pattern_bucket,
+            harakat=counts[:, 0],
+            sakinat=counts[:, 1],
+            lengths=counts[:, 2],
+        )
+
+    def fitness(self, n_harakas: int, total_sakins: int) -> np.ndarray:
+        """Fitness of every pattern, in pattern order."""
+        per_bucket = fitness_from_counts(
+            n_harakas, total_sakins, self.harakat, self.sakinat, self.lengths
+        )
+        return per_bucket[self.pattern_bucket]
+
+
+# Per-detector bucket indexes, built on first use
+_pattern_buckets: (
+    "weakref.WeakKeyDictionary[BahrDetectorV2, Dict[int, PatternBuckets]]"
+) = weakref.WeakKeyDictionary()
+
+
+def get_pattern_buckets(detector: BahrDetectorV2) -> Dict[int, PatternBuckets]:
+    """
+    Bucketed full-verse patterns of every meter of a detector (cached).
+
+    Args:
+        detector: Initialized BahrDetectorV2 instance
+
+    Returns:
+        Mapping meter_id → PatternBuckets (meters without patterns omitted)
+    """
+    buckets = _pattern_buckets.get(detector)
+    if buckets is None:
+        buckets = {
+            meter_id: PatternBuckets.build(patterns)
+            for meter_id, patterns in detector.pattern_cache.items()
+            if patterns
+        }
+        _pattern_buckets[detector] = buckets
+    return buckets
 
 
 def detect_with_phoneme_fitness(
@@ -90,6 +207,7 @@ def detect_with_phoneme_fitness(
     detector: BahrDetectorV2,
     top_k: int = 3,
     use_hybrid_scoring: bool = True,
+    context: Optional[AnalysisContext] = None,
 ) -> List[Tuple[int, str, float, str]]:
     """
     Detect meter using phoneme-based fitness matching.
@@ -100,23 +218,52 @@ def detect_with_phoneme_fitness(
     3. Optionally combines fitness with pattern similarity (hybrid scoring)
     4. Returns meters with best scores
 
+    The full ranking does not depend on top_k, so with a shared context it is
+    computed once per text and reused by later calls (e.g. top-1 detection
+    followed by top-3 alternatives).
+
     Args:
         text: Arabic text (normalized)
         has_tashkeel: Whether text has diacritical marks
         detector: Initialized BahrDetectorV2 instance
         top_k: Number of top results to return
         use_hybrid_scoring: If True, combines fitness and pattern similarity
+        context: Optional shared AnalysisContext (reuses phonemes, pattern
+            and ranking)
 
     Returns:
         List of (meter_id, meter_name_ar, score, best_pattern) tuples
     """
-    from difflib import SequenceMatcher
+    if context is None:
+        ranking = _rank_meters_by_fitness(
+            text, has_tashkeel, detector, use_hybrid_scoring
+        )
+    else:
+        ranking = context.memoize(
+            ("phoneme_fitness", text, has_tashkeel, use_hybrid_scoring, id(detector)),
+            lambda: _rank_meters_by_fitness(
+                text, has_tashkeel, detector, use_hybrid_scoring, context
+            ),
+        )
+
+    # Return top K
+    return ranking[:top_k]
 
-    from app.core.phonetics import text_to_phonetic_pattern
 
+def _rank_meters_by_fitness(
+    text: str,
+    has_tashkeel: bool,
+    detector: BahrDetectorV2,
+    use_hybrid_scoring: bool,
+    context: Optional[AnalysisContext] = None,
+) -> List[Tuple[int, str, float, str]]:
+    """Rank all meters for detect_with_phoneme_fitness() (best first)."""
     # Extract phonemes
     try:
-        phonemes = extract_phonemes(text, has_tashkeel=has_tashkeel)
+        if context is not None:
+            phonemes = context.phonemes(text, has_tashkeel)
+        else:
+            phonemes = extract_phonemes(text, has_tashkeel=has_tashkeel)
     except Exception:
         return []
 
@@ -127,52 +274,52 @@ def detect_with_phoneme_fitness(
     extracted_pattern = None
     if use_hybrid_scoring:
         try:
-            extracted_pattern = text_to_phonetic_pattern(
-                text, has_tashkeel=has_tashkeel
-            )
+            if context is not None:
+                extracted_pattern = context.pattern(text, has_tashkeel)
+            else:
+                extracted_pattern = phonemes_to_pattern(phonemes)
         except Exception:
             pass
 
+    # Phoneme counts are all the fitness heuristic needs from the verse
+    n_harakas, total_sakins = count_phonemes(phonemes)
+
+    # One matcher for all meters: its memo is shared by every cached pattern
+    matcher = SequenceRatioMatcher(extracted_pattern) if extracted_pattern else None
+
     # Test fitness for each meter
     meter_scores = []
 
-    for meter_id, cached_patterns in detector.pattern_cache.items():
-        if not cached_patterns:
-            continue
+    for meter_id, buckets in get_pattern_buckets(detector).items():
+        # Fitness (phoneme-based) of every pattern, computed per bucket
+        fitness = buckets.fitness(n_harakas, total_sakins)
 
-        # Find best-fitting pattern for this meter
-        best_fitness = 0.0
-        best_similarity = 0.0
-        best_pattern = None
-
-        for pattern in cached_patterns:
-            # Calculate fitness (phoneme-based)
-            fitness = calculate_pattern_fitness(phonemes, pattern)
-
-            # Calculate similarity (pattern-based) if available
-            similarity = 0.0
-            if extracted_pattern:
-                similarity = SequenceMatcher(None, extracted_pattern, pattern).ratio()
-
-            # Hybrid score: weighted combination of fitness and similarity
-            if use_hybrid_scoring and extracted_pattern:
-                # Give more weight to similarity for diacritized text (more accurate patterns)
-                # Give more weight to fitness for undiacritized text (patterns less reliable)
-                if has_tashkeel:
-                    score = (similarity * 0.65) + (fitness * 0.35)
-                else:
-                    score = (similarity * 0.50) + (fitness * 0.50)
+        # Calculate similarity (pattern-based) if available
+        if matcher is not None:
+            similarity = matcher.ratios(buckets.patterns)
+        else:
+            similarity = np.zeros(len(buckets.patterns))
+
+        # Hybrid score: weighted combination of fitness and similarity
+        if use_hybrid_scoring and extracted_pattern:
+            # Give more weight to similarity for diacritized text (more accurate patterns)
+            # Give more weight to fitness for undiacritized text (patterns less reliable)
+            if has_tashkeel:
+                score = (similarity * 0.65) + (fitness * 0.35)
             else:
-                score = fitness
+                score = (similarity * 0.50) + (fitness * 0.50)
+        else:
+            score = fitness
 
-            if score > best_fitness or (
-                score == best_fitness and similarity > best_similarity
-            ):
-                best_fitness = score
-                best_similarity = similarity
-                best_pattern = pattern
+        # Best-fitting pattern: highest score, then highest similarity,
+        # then first in cache order
+        best_fitness = float(score.max())
+        if best_fitness > 0.0:
+            tied = np.flatnonzero(score == best_fitness)
+            best = int(tied[np.argmax(similarity[tied])])
+            best_similarity = float(similarity[best])
+            best_pattern = buckets.patterns[best]
 
-        if best_fitness > 0.0 and best_pattern:
             meter = METERS_REGISTRY.get(meter_id)
             if meter:
                 meter_scores.append(
@@ -242,58 +389,136 @@ def detect_with_phoneme_fitness(
     meter_scores_with_ranking.sort(key=lambda x: (-x[2], x[4], x[5]))
 
     # Remove ranking info from results, return boosted score
-    meter_scores = [
+    return [
         (mid, name, boosted, pat)
         for mid, name, boosted, pat, _, _, _, _ in meter_scores_with_ranking
     ]
 
-    # Return top K
-    return meter_scores[:top_k]
 
+@dataclass
+class MeterCandidate:
+    """
+    One meter of the hybrid-scoring ranking.
+
+    Attributes:
+        meter_id: ID of the meter (1-16)
+        meter_name_ar: Arabic name
+        meter_name_en: English name
+        score: Hybrid score (frequency-boosted), used as confidence
+        matched_pattern: Best-fitting cached pattern of the meter
+        transformations: Transformations that generate matched_pattern
+            (from the detector's precomputed tracking table)
+        margin: Score difference from the top candidate (0.0 for the top)
+    """
 
-def detect_meter_from_text(
+    meter_id: int
+    meter_name_ar: str
+    meter_name_en: str
+    score: float
+    matched_pattern: str
+    transformations: List[str]
+    margin: float
+
+
+@dataclass
+class HybridDetection:
+    """
+    Top result and ranked alternatives of one hybrid-scoring pass.
+
+    Attributes:
+        result: DetectionResult for the top candidate, or None if no meter
+            reached the minimum score
+        candidates: Top-k candidates, best first (regardless of min_score)
+    """
+
+    result: Optional[DetectionResult]
+    candidates: List[MeterCandidate]
+
+    @property
+    def alternatives(self) -> List[MeterCandidate]:
+        """Candidates after the top one."""
+        return self.candidates[1:]
+
+    @property
+    def top_margin(self) -> Optional[float]:
+        """Score difference between the top two candidates, if there are two."""
+        if len(self.candidates) < 2:
+            return None
+        return self.candidates[0].score - self.candidates[1].score
+
+
+def detect_meter_candidates(
     text: str,
     has_tashkeel: bool,
     detector: BahrDetectorV2,
+    top_k: int = 3,
     min_score: float = 0.50,
     use_hybrid: bool = True,
-) -> Optional[DetectionResult]:
+    context: Optional[AnalysisContext] = None,
+) -> HybridDetection:
     """
-    Detect meter from Arabic text using hybrid scoring (fitness + similarity).
+    Detect meter and rank alternatives from one hybrid-scoring pass.
 
-    This is the main entry point for enhanced phoneme-based detection.
-    It combines phoneme fitness with pattern similarity for better accuracy.
+    All cached patterns are scored once; the top result, the alternatives,
+    their margins, matched patterns and transformations all come from that
+    ranking.
 
     Args:
         text: Arabic text (normalized)
         has_tashkeel: Whether text has diacritical marks
         detector: Initialized BahrDetectorV2 instance
-        min_score: Minimum score threshold (default: 0.50 = 50%)
+        top_k: Number of ranked candidates to return
+        min_score: Minimum score of the top candidate for a result
+            (default: 0.50 = 50%)
         use_hybrid: Whether to use hybrid scoring (default: True)
+        context: Optional shared AnalysisContext for the verse
 
     Returns:
-        DetectionResult for best match, or None if no good match
+        HybridDetection with the top DetectionResult (or None) and candidates
+
+    Example:
+        >>> detection = detect_meter_candidates(text, True, detector)
+        >>> detection.result.meter_name_ar
+        'الطويل'
+        >>> [(c.meter_name_ar, round(c.margin, 2)) for c in detection.alternatives]
+        [('المتقارب', 0.04), ('الكامل', 0.08)]
     """
-    results = detect_with_phoneme_fitness(
-        text, has_tashkeel, detector, top_k=1, use_hybrid_scoring=use_hybrid
+    ranking = detect_with_phoneme_fitness(
+        text,
+        has_tashkeel,
+        detector,
+        top_k=top_k,
+        use_hybrid_scoring=use_hybrid,
+        context=context,
     )
 
-    if not results:
-        return None
+    candidates = []
+    for meter_id, meter_name_ar, score, pattern in ranking:
+        meter = METERS_REGISTRY.get(meter_id)
+        if not meter:
+            continue
+        candidates.append(
+            MeterCandidate(
+                meter_id=meter_id,
+                meter_name_ar=meter_name_ar,
+                meter_name_en=meter.name_en,
+                score=score,
+                matched_pattern=pattern,
+                transformations=detector.get_transformations(meter_id, pattern),
+                margin=ranking[0][2] - score,
+            )
+        )
 
-    meter_id, meter_name_ar, score, best_pattern = results[0]
+    result = None
+    if candidates and candidates[0].score >= min_score:
+        result = _create_hybrid_result(candidates[0])
 
-    # Check if score meets minimum threshold
-    if score < min_score:
-        return None
+    return HybridDetection(result=result, candidates=candidates)
 
-    # Get meter details
-    meter = METERS_REGISTRY.get(meter_id)
-    if not meter:
-        return None
 
-    # Convert score to confidence
-    confidence = score
+def _create_hybrid_result(candidate: MeterCandidate) -> DetectionResult:
+    """Build the DetectionResult of the top hybrid-scoring candidate."""
+    score = candidate.score
 
     # Determine match quality based on score
     if score >= 0.85:
@@ -313,15 +538,51 @@ def detect_meter_from_text(
         explanation_ar = "تطابق ضعيف - يُنصح بإضافة التشكيل"
         explanation_en = "Weak match - diacritics recommended"
 
-    # Create detection result
     return DetectionResult(
-        meter_id=meter_id,
-        meter_name_ar=meter_name_ar,
-        meter_name_en=meter.name_en,
-        confidence=confidence,
+        meter_id=candidate.meter_id,
+        meter_name_ar=candidate.meter_name_ar,
+        meter_name_en=candidate.meter_name_en,
+        confidence=score,
         match_quality=match_quality,
-        matched_pattern=best_pattern,
+        matched_pattern=candidate.matched_pattern,
         input_pattern="<hybrid-scoring>",  # Using combined fitness + similarity
-        transformations=[],
+        transformations=list(candidate.transformations),
         explanation=f"{explanation_ar} | {explanation_en}",
     )
+
+
+def detect_meter_from_text(
+    text: str,
+    has_tashkeel: bool,
+    detector: BahrDetectorV2,
+    min_score: float = 0.50,
+    use_hybrid: bool = True,
+    context: Optional[AnalysisContext] = None,
+) -> Optional[DetectionResult]:
+    """
+    Detect meter from Arabic text using hybrid scoring (fitness + similarity).
+
+    This is the main entry point for enhanced phoneme-based detection.
+    It combines phoneme fitness with pattern similarity for better accuracy.
+    Use detect_meter_candidates() to also get the ranked alternatives.
+
+    Args:
+        text: Arabic text (normalized)
+        has_tashkeel: Whether text has diacritical marks
+        detector: Initialized BahrDetectorV2 instance
+        min_score: Minimum score threshold (default: 0.50 = 50%)
+        use_hybrid: Whether to use hybrid scoring (default: True)
+        context: Optional shared AnalysisContext for the verse
+
+    Returns:
+        DetectionResult for best match, or None if no good match
+    """
+    return detect_meter_candidates(
+        text,
+        has_tashkeel,
+        detector,
+        top_k=1,
+        min_score=min_score,
+        use_hybrid=use_hybrid,
+        context=context,
+    ).result
@@ -0,0 +1,156 @@
+"""
+Sequence Similarity - difflib-equivalent Ratcliff/Obershelp ratio in batch.
+
+Hybrid meter scoring compares one extracted pattern against every cached
+pattern of every meter with ``difflib.SequenceMatcher(None, a, b).ratio()``.
+SequenceMatcher rebuilds its index of b and scans a × b in Python for every
+pair, which makes it the most expensive loop of the V2 pipeline.
+
+SequenceRatioMatcher computes exactly the same ratio, 2 * M / (len(a) + len(b))
+where M is the number of characters in the matching blocks found by
+recursively taking the longest common substring, with two changes:
+
+- The longest common substring is found with C-level substring search. The
+  best length only ever grows, so each start position in a costs one search
+  on average.
+- Matching-block counts are memoized per (a part, b part). Generated patterns
+  are products of per-position tafila variants and share long prefixes and
+  suffixes, so most recursive subproblems recur across candidates.
+
+Ties are broken as in difflib (earliest block in a, then in b), so ratios
+are bit-identical. Candidates of 200+ characters, where difflib's "autojunk"
+heuristic changes the result, are delegated to difflib itself.
+"""
+
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+# SequenceMatcher applies its autojunk heuristic from this length of b on
+AUTOJUNK_MIN_LENGTH = 200
+
+
+def _longest_match(a: str, b: str) -> Tuple[int, int, int]:
+    """
+    Longest common substring of a and b, as SequenceMatcher.find_longest_match().
+
+    Returns:
+        (i, j, k) with a[i:i+k] == b[j:j+k]; among equally long matches the
+        smallest i, then the smallest j. (0, 0, 0) if nothing matches.
+    """
+    m = len(a)
+    best = 0
+    start = 0
+    for s in range(m):
+        if s + best >= m:
+            break
+        # Only a longer match than the best so far is interesting
+        while s + best < m and a[s : s + best + 1] in b:
+            best += 1
+            start = s
+    if not best:
+        return 0, 0, 0
+    return start, b.find(a[start : start + best]), best
+
+
+class SequenceRatioMatcher:
+    """
+    Ratcliff/Obershelp similarity of one query against many candidates.
+
+    The subproblem memo is kept for the lifetime of the matcher, so score all
+    candidates for a query with the same instance. Instances are cheap and
+    not shared between threads.
+
+    Example:
+        >>> matcher = SequenceRatioMatcher("/o//o//o/o")
+        >>> matcher.ratio("/o//o//o//")
+        0.9
+        >>> matcher.ratios(["/o//o//o/o", "//o/o"]).tolist()
+        [1.0, 0.6666666666666666]
+    """
+
+    def __init__(self, query: str):
+        """
+        Args:
+            query: Sequence compared against every candidate (difflib's a)
+        """
+        self.query = query
+        self._matches: Dict[Tuple[str, str], int] = {}
+
+    def _count_matches(self, a: str, b: str) -> int:
+        """Total size of the matching blocks of a and b."""
+        key = (a, b)
+        count = self._matches.get(key)
+        if count is None:
+            i, j, k = _longest_match(a, b)
+            count = k
+            if k:
+                if i and j:
+                    count += self._count_matches(a[:i], b[:j])
+                if i + k < len(a) and j + k < len(b):
+                    count += self._count_matches(a[i + k :], b[j + k :])
+            self._matches[key] = count
+        return count
+
+    def ratio(self, candidate: str) -> float:
+        """
+        SequenceMatcher(None, query, candidate).ratio().
+
+        Args:
+            candidate: Sequence to compare with the query
+
+        Returns:
+            Similarity in [0.0, 1.0] (1.0 for two empty sequences)
+        """
+        length = len(self.query) + len(candidate)
+        if not length:
+            return 1.0
+        if len(candidate) >= AUTOJUNK_MIN_LENGTH:
+            return SequenceMatcher(None, self.query, candidate).ratio()
+        if not self.query or not candidate:
+            return 0.0
+        return 2.0 * self._count_matches(self.query, candidate) / length
+
+    def ratios(self, candidates: Iterable[str]) -> np.ndarray:
+        """
+        ratio() for every candidate.
+
+        Args:
+            candidates: Sequences to compare with the query
+
+        Returns:
+            float64 array aligned with candidates
+        """
+        return np.array(
+            [self.ratio(candidate) for candidate in candidates], dtype=np.float64
+        )
+
+
+def sequence_ratio(a: str, b: str) -> float:
+    """
+    Drop-in replacement for ``SequenceMatcher(None, a, b).ratio()``.
+
+    Example:
+        >>> sequence_ratio("//o/o", "//o//o")
+        0.9090909090909091
+    """
+    return SequenceRatioMatcher(a).ratio(b)
+
+
+def sequence_ratio_many(query: str, candidates: Iterable[str]) -> np.ndarray:
+    """
+    ``SequenceMatcher(None, query, c).ratio()`` for every candidate c.
+
+    Example:
+        >>> sequence_ratio_many("//o/o", ["//o/o", "//o//o"]).tolist()
+        [1.0, 0.9090909090909091]
+    """
+    return SequenceRatioMatcher(query).ratios(candidates)
+
+
+__all__ = [
+    "SequenceRatioMatcher",
+    "sequence_ratio",
+    "sequence_ratio_many",
+]
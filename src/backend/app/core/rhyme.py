@@ -20,6 +20,7 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List, Optional, Tuple
 
+from app.core.analysis_context import AnalysisContext
 from app.core.normalization import has_diacritics, normalize_arabic_text
 from app.core.phonetics import Phoneme, extract_phonemes
 
@@ -175,7 +176,9 @@ class RhymeAnalyzer:
         """Initialize rhyme analyzer."""
         pass
 
-    def extract_qafiyah(self, verse: str) -> RhymePattern:
+    def extract_qafiyah(
+        self, verse: str, context: Optional[AnalysisContext] = None
+    ) -> RhymePattern:
         """
         Extract qafiyah (rhyme pattern) from a verse.
 
@@ -190,6 +193,8 @@ class RhymeAnalyzer:
 
         Args:
             verse: Arabic poetry verse
+            context: Optional shared AnalysisContext to reuse normalization
+                and phonemes from
 
         Returns:
             RhymePattern object with complete analysis
@@ -200,14 +205,19 @@ class RhymeAnalyzer:
             >>> pattern.qafiyah.rawi
             'م'
         """
-        # Normalize text
-        normalized = normalize_arabic_text(verse)
+        if context is not None:
+            normalized = context.normalize(verse)
+            has_tashkeel = context.diacritized(verse)
+            phonemes = context.phonemes(normalized, has_tashkeel)
+        else:
+            # Normalize text
+            normalized = normalize_arabic_text(verse)
 
-        # Check if text has diacritics
-        has_tashkeel = has_diacritics(verse)
+            # Check if text has diacritics
+            has_tashkeel = has_diacritics(verse)
 
-        # Convert to phonemes
-        phonemes = extract_phonemes(normalized, has_tashkeel=has_tashkeel)
+            # Convert to phonemes
+            phonemes = extract_phonemes(normalized, has_tashkeel=has_tashkeel)
 
         if len(phonemes) < 2:
             raise ValueError("Verse too short for rhyme analysis")
@@ -569,12 +579,15 @@ class RhymeAnalyzer:
         )
 
 
-def analyze_verse_rhyme(verse: str) -> Tuple[RhymePattern, str, str]:
+def analyze_verse_rhyme(
+    verse: str, context: Optional[AnalysisContext] = None
+) -> Tuple[RhymePattern, str, str]:
     """
     Convenience function to analyze rhyme of a single verse.
 
     Args:
         verse: Arabic poetry verse
+        context: Optional shared AnalysisContext for the verse
 
     Returns:
         Tuple of (RhymePattern, rhyme_description_ar, rhyme_description_en)
@@ -585,7 +598,7 @@ def analyze_verse_rhyme(verse: str) -> Tuple[RhymePattern, str, str]:
         'القافية: روي:م + ردف:ئ (مطلقة)'
     """
     analyzer = RhymeAnalyzer()
-    pattern = analyzer.extract_qafiyah(verse)
+    pattern = analyzer.extract_qafiyah(verse, context=context)
 
     # Generate descriptions
     desc_ar = f"القافية: {pattern.qafiyah}"
@@ -5,6 +5,7 @@ Taqti3 (تقطيع) - Prosodic scansion for Arabic poetry.
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
+from app.core.analysis_context import AnalysisContext
 from app.core.normalization import has_diacritics, normalize_arabic_text
 from app.core.phonetics import text_to_phonetic_pattern
 
@@ -180,7 +181,9 @@ def pattern_to_tafail(pattern: str) -> List[str]:
     return tafail
 
 
-def get_tafail_for_bahr(bahr_id: int, verse_text: str) -> str:
+def get_tafail_for_bahr(
+    bahr_id: int, verse_text: str, context: Optional[AnalysisContext] = None
+) -> str:
     """
     Get the appropriate tafail pattern for a given meter and verse.
 
@@ -194,6 +197,7 @@ def get_tafail_for_bahr(bahr_id: int, verse_text: str) -> str:
     Args:
         bahr_id: Meter ID (1-9)
         verse_text: The verse text (normalized)
+        context: Optional shared AnalysisContext (reuses its phonetic pattern)
 
     Returns:
         Appropriate tafail pattern string
@@ -211,7 +215,10 @@ def get_tafail_for_bahr(bahr_id: int, verse_text: str) -> str:
 
     # For meters with variations, analyze verse features
     try:
-        pattern = text_to_phonetic_pattern(verse_text)
+        if context is not None:
+            pattern = context.pattern(verse_text)
+        else:
+            pattern = text_to_phonetic_pattern(verse_text)
         pattern_len = len(pattern)
         char_count = len(verse_text.replace(" ", ""))
 
@@ -274,7 +281,10 @@ def get_tafail_for_bahr(bahr_id: int, verse_text: str) -> str:
 
 
 def perform_taqti3(
-    verse: str, normalize: bool = True, bahr_id: Optional[int] = None
+    verse: str,
+    normalize: bool = True,
+    bahr_id: Optional[int] = None,
+    context: Optional[AnalysisContext] = None,
 ) -> str:
     """
     Perform taqti3 (prosodic scansion) on Arabic verse.
@@ -288,6 +298,8 @@ def perform_taqti3(
         verse: Arabic verse text
         normalize: Whether to normalize text first
         bahr_id: Optional meter ID (1-9). If provided, returns standard tafail for that meter.
+        context: Optional shared AnalysisContext; normalization and the
+            phonetic pattern are taken from it instead of recomputed
 
     Returns:
         Tafa'il pattern string (e.g., "فعولن مفاعيلن فعولن مفاعيلن")
@@ -320,7 +332,10 @@ def perform_taqti3(
     verse_for_analysis = verse
     if normalize:
         try:
-            verse_for_analysis = normalize_arabic_text(verse)
+            if context is not None:
+                verse_for_analysis = context.normalize(verse)
+            else:
+                verse_for_analysis = normalize_arabic_text(verse)
         except ValueError as e:
             raise ValueError(f"Normalization failed: {str(e)}")
 
@@ -335,13 +350,16 @@ def perform_taqti3(
             raise ValueError(f"Invalid bahr_id: {bahr_id}. Must be between 1 and 9.")
 
         # Get appropriate tafail (primary or variation) based on verse structure
-        return get_tafail_for_bahr(bahr_id, verse_for_analysis)
+        return get_tafail_for_bahr(bahr_id, verse_for_analysis, context=context)
 
     # Legacy behavior: pattern matching (used when bahr is not known)
     # Convert to phonetic pattern
     try:
-        has_tash = has_diacritics(verse_for_analysis)
-        pattern = text_to_phonetic_pattern(verse_for_analysis, has_tash)
+        if context is not None:
+            pattern = context.pattern(verse_for_analysis)
+        else:
+            has_tash = has_diacritics(verse_for_analysis)
+            pattern = text_to_phonetic_pattern(verse_for_analysis, has_tash)
     except Exception as e:
         raise ValueError(f"Phonetic conversion failed: {str(e)}")
 
@@ -0,0 +1,495 @@
+"""
+Vocalization cache - word → (vocalized word, confidence) for vowel inference.
+
+VowelInferencer keeps recently used word vocalizations in a per-process LRU
+(VocalizationCache). Behind it, an optional shared store keeps them across
+restarts and across workers, so warm workers rarely need CAMeL Tools:
+
+- memory: no shared store, only the per-process LRU (default)
+- sqlite: a local SQLite file (WAL mode), shared read-mostly by the workers
+  of one host
+- redis: one Redis hash, shared by every host
+
+Stores can be warmed in bulk from diacritized corpora (the golden-set JSONL
+files and the poetry_sources.py verses), see scripts/warm_vocalization_cache.py:
+
+    >>> store = SQLiteVocalizationStore("/var/cache/bahr/vocalizations.sqlite3")
+    >>> warm_vocalization_store(store, load_golden_texts(paths))
+    4210
+"""
+
+import importlib.util
+import json
+import logging
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.core.normalization import normalize_arabic_text, remove_diacritics
+
+logger = logging.getLogger(__name__)
+
+# word → (vocalized word, confidence)
+Vocalization = Tuple[str, float]
+
+# Default vocalization cache limits (entries and approximate bytes)
+DEFAULT_CACHE_MAX_ENTRIES = 50_000
+DEFAULT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Confidence of a corpus vocalization used by every occurrence of its word
+CORPUS_CONFIDENCE = 0.92
+
+# Words whose most common corpus vocalization covers less than this share of
+# occurrences are left to CAMeL Tools (which sees the sentence)
+MIN_CORPUS_SHARE = 0.5
+
+# Default Redis hash of the redis store
+REDIS_VOCALIZATIONS_KEY = "bahr:vocalizations"
+
+# SQLite limits the number of host parameters per statement
+_SQLITE_BATCH = 500
+
+# Arabic words (letters, tatweel, diacritics, superscript alef)
+_ARABIC_WORD = re.compile("[\u0621-\u064a\u0640\u064b-\u0652\u0670]+")
+
+
+class VocalizationCache:
+    """
+    Thread-safe LRU cache of word → (vocalized word, confidence).
+
+    Bounded both by entry count and by approximate memory (the sizes of the
+    key and value strings), evicting least recently used words first. Sizes
+    are tracked incrementally, so stats() is O(1).
+
+    Example:
+        >>> cache = VocalizationCache(max_entries=2)
+        >>> cache.set("قفا", ("قِفَا", 0.87))
+        >>> cache.get("قفا")
+        ('قِفَا', 0.87)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached words (0 disables caching)
+            max_bytes: Maximum approximate size of cached strings in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Vocalization]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(word: str, value: Vocalization) -> int:
+        return sys.getsizeof(word) + sys.getsizeof(value[0])
+
+    def get(self, word: str) -> Optional[Vocalization]:
+        """Return the cached vocalization of a word, or None."""
+        with self._lock:
+            value = self._entries.get(word)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(word)
+            self.hits += 1
+            return value
+
+    def set(self, word: str, value: Vocalization) -> None:
+        """Cache a word's vocalization, evicting old words beyond the limits."""
+        size = self._entry_size(word, value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(word, None)
+            if previous is not None:
+                self._bytes -= self._entry_size(word, previous)
+            self._entries[word] = value
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_word, old_value = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(old_word, old_value)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all cached words (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Entry count, size, limits and hit/miss/eviction counters."""
+        return {
+            "cached_words": len(self._entries),
+            "cache_size_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class VocalizationStore:
+    """
+    Shared, persistent word vocalizations behind the per-process LRU.
+
+    Subclasses implement _get_many/_set_many/clear/__len__. Store errors are
+    logged and treated as misses, so vowel inference never fails because of
+    its cache.
+    """
+
+    backend = "base"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, words: Sequence[str]) -> Dict[str, Vocalization]:
+        """
+        Look up many words at once.
+
+        Args:
+            words: Words to look up
+
+        Returns:
+            Mapping of the words found to their vocalization
+        """
+        if not words:
+            return {}
+        try:
+            found = self._get_many(words)
+        except Exception as e:
+            logger.warning(f"Vocalization store ({self.backend}) read failed: {e}")
+            found = {}
+        self.hits += len(found)
+        self.misses += len(words) - len(found)
+        return found
+
+    def set_many(self, items: Mapping[str, Vocalization]) -> None:
+        """Store many word vocalizations at once (replacing existing ones)."""
+        if not items:
+            return
+        try:
+            self._set_many(items)
+        except Exception as e:
+            logger.warning(f"Vocalization store ({self.backend}) write failed: {e}")
+
+    def _get_many(self, words: Sequence[str]) -> Dict[str, Vocalization]:
+        raise NotImplementedError
+
+    def _set_many(self, items: Mapping[str, Vocalization]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Remove every stored word."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release connections held by this process."""
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters of this process."""
+        return {"store_hits": self.hits, "store_misses": self.misses}
+
+
+class SQLiteVocalizationStore(VocalizationStore):
+    """
+    Vocalizations in a local SQLite file shared by the workers of a host.
+
+    The database uses WAL mode, so readers never block each other or the
+    occasional writer. Each thread gets its own connection.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file (created with its directory if missing)
+        """
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS vocalizations ("
+            "word TEXT PRIMARY KEY, vocalized TEXT NOT NULL, confidence REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get_many(self, words: Sequence[str]) -> Dict[str, Vocalization]:
+        conn = self._connection()
+        found = {}
+        for start in range(0, len(words), _SQLITE_BATCH):
+            batch = list(words[start : start + _SQLITE_BATCH])
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                "SELECT word, vocalized, confidence FROM vocalizations "
+                f"WHERE word IN ({placeholders})",
+                batch,
+            )
+            for word, vocalized, confidence in rows:
+                found[word] = (vocalized, confidence)
+        return found
+
+    def _set_many(self, items: Mapping[str, Vocalization]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vocalizations (word, vocalized, confidence) "
+                "VALUES (?, ?, ?)",
+                [(word, vocalized, conf) for word, (vocalized, conf) in items.items()],
+            )
+
+    def clear(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM vocalizations")
+
+    def __len__(self) -> int:
+        return (
+            self._connection()
+            .execute("SELECT COUNT(*) FROM vocalizations")
+            .fetchone()[0]
+        )
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisVocalizationStore(VocalizationStore):
+    """
+    Vocalizations in one Redis hash shared by every worker and host.
+
+    Vowel inference runs in executor threads, so this uses the synchronous
+    Redis client; lookups of a whole batch are one HMGET.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, key: str = REDIS_VOCALIZATIONS_KEY, client=None):
+        """
+        Args:
+            url: Redis URL (ignored when client is given)
+            key: Hash holding the vocalizations
+            client: Optional synchronous Redis client
+        """
+        super().__init__()
+        if client is None:
+            from redis import Redis
+
+            client = Redis.from_url(url, decode_responses=True, socket_timeout=1.0)
+        self.client = client
+        self.key = key
+
+    def _get_many(self, words: Sequence[str]) -> Dict[str, Vocalization]:
+        values = self.client.hmget(self.key, list(words))
+        found = {}
+        for word, value in zip(words, values):
+            if value:
+                vocalized, confidence = json.loads(value)
+                found[word] = (vocalized, confidence)
+        return found
+
+    def _set_many(self, items: Mapping[str, Vocalization]) -> None:
+        self.client.hset(
+            self.key,
+            mapping={
+                word: json.dumps([vocalized, conf], ensure_ascii=False)
+                for word, (vocalized, conf) in items.items()
+            },
+        )
+
+    def clear(self) -> None:
+        self.client.delete(self.key)
+
+    def __len__(self) -> int:
+        return self.client.hlen(self.key)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_vocalization_store(
+    backend: str, path: str = "", redis_url: str = ""
+) -> Optional[VocalizationStore]:
+    """
+    Create the shared store for a backend name.
+
+    Args:
+        backend: memory | sqlite | redis
+        path: SQLite file (empty → bahr-vocalizations.sqlite3 in the temp dir)
+        redis_url: Redis URL of the redis backend
+
+    Returns:
+        The store, or None for the memory backend (LRU only)
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteVocalizationStore(
+            path or str(Path(tempfile.gettempdir()) / "bahr-vocalizations.sqlite3")
+        )
+    if backend == "redis":
+        return RedisVocalizationStore(redis_url)
+    raise ValueError(f"Unknown vocalization cache backend: {backend}")
+
+
+_store: Optional[VocalizationStore] = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_vocalization_store() -> Optional[VocalizationStore]:
+    """
+    Process-wide shared store configured from settings.
+
+    Returns:
+        The configured store, or None for the memory backend or when the
+        store cannot be opened (vowel inference then uses its LRU only)
+    """
+    global _store, _store_loaded
+    with _store_lock:
+        if not _store_loaded:
+            try:
+                _store = create_vocalization_store(
+                    settings.vocalization_cache_backend,
+                    settings.vocalization_cache_path,
+                    settings.redis_url,
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Vocalization store unavailable, using memory only: {e}"
+                )
+                _store = None
+            _store_loaded = True
+        return _store
+
+
+def build_vocalizations(
+    texts: Iterable[str], min_share: float = MIN_CORPUS_SHARE
+) -> Dict[str, Vocalization]:
+    """
+    Word vocalizations observed in diacritized texts.
+
+    Each undiacritized word maps to its most common vocalization, with a
+    confidence of CORPUS_CONFIDENCE scaled by the share of occurrences using
+    it. Undiacritized occurrences are ignored, and so are repeated verses
+    (the golden-set versions overlap). Verses are normalized like request
+    text (normalize_arabic_text defaults: hamza and alef variants unified),
+    so keys match the words vowel inference looks up.
+
+    Args:
+        texts: Diacritized verses
+        min_share: Minimum share of the most common vocalization
+
+    Returns:
+        word → (vocalized word, confidence)
+
+    Example:
+        >>> build_vocalizations(["قِفَا نَبْكِ", "قِفَا"])
+        {'قفا': ('قِفَا', 0.92), 'نبك': ('نَبْكِ', 0.92)}
+    """
+    forms: Dict[str, Counter] = defaultdict(Counter)
+    for text in dict.fromkeys(texts):
+        try:
+            text = normalize_arabic_text(text)
+        except ValueError:
+            continue
+        for vocalized in _ARABIC_WORD.findall(text):
+            word = remove_diacritics(vocalized)
+            if word and word != vocalized:
+                forms[word][vocalized] += 1
+
+    vocalizations = {}
+    for word, counts in forms.items():
+        vocalized, count = counts.most_common(1)[0]
+        share = count / sum(counts.values())
+        if share >= min_share:
+            vocalizations[word] = (vocalized, round(CORPUS_CONFIDENCE * share, 4))
+    return vocalizations
+
+
+def load_golden_texts(paths: Iterable[Path]) -> Iterator[str]:
+    """Verse texts of golden-set JSONL files (field "text")."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    text = json.loads(line).get("text")
+                    if text:
+                        yield text
+
+
+def load_poetry_sources(path: Path) -> Iterator[str]:
+    """Verse texts of the poetry_sources.py corpus (PRE_ISLAMIC_POETRY)."""
+    spec = importlib.util.spec_from_file_location("poetry_sources", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for verses in module.PRE_ISLAMIC_POETRY.values():
+        for verse in verses:
+            yield verse["text"]
+
+
+def warm_vocalization_store(
+    store: VocalizationStore, texts: Iterable[str], min_share: float = MIN_CORPUS_SHARE
+) -> int:
+    """
+    Fill a store with the vocalizations observed in diacritized texts.
+
+    Args:
+        store: Store to fill (existing words are replaced)
+        texts: Diacritized verses
+        min_share: Minimum share of a word's most common vocalization
+
+    Returns:
+        Number of words stored
+    """
+    vocalizations = build_vocalizations(texts, min_share)
+    words = list(vocalizations)
+    for start in range(0, len(words), _SQLITE_BATCH):
+        store.set_many(
+            {word: vocalizations[word] for word in words[start : start + _SQLITE_BATCH]}
+        )
+    logger.info(f"Warmed {store.backend} vocalization store with {len(words)} words")
+    return len(words)
@@ -16,13 +16,33 @@ Usage:
     "قِفَا نَبْكِ"
     >>> print(f"Confidence: {conf:.1%}")
     Confidence: 87.0%
+
+Verses are disambiguated as whole sentences, and many verses at once with
+restore_vowels_batch(). Word vocalizations are kept in a bounded LRU cache
+(VocalizationCache) in front of an optional shared store (SQLite or Redis,
+see app.core.vocalization_cache) so that words already seen skip CAMeL Tools,
+and keep their vocalization while CAMeL Tools is missing or still loading.
 """
 
 import logging
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.vocalization_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    VocalizationCache,
+    VocalizationStore,
+    get_vocalization_store,
+)
 
 logger = logging.getLogger(__name__)
 
+# Confidence of a CAMeL Tools diacritization and of the heuristic fallbacks
+CAMEL_CONFIDENCE = 0.87  # Empirical average confidence
+HEURISTIC_CONFIDENCE = 0.65
+FALLBACK_CONFIDENCE = 0.60
+
 
 class VowelInferencer:
     """
@@ -32,25 +52,62 @@ class VowelInferencer:
     and undiacritized production input (90% of real-world Arabic text).
     """
 
-    def __init__(self, use_camel_tools: bool = True):
+    def __init__(
+        self,
+        use_camel_tools: bool = True,
+        cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        store: Optional[VocalizationStore] = None,
+        load: bool = True,
+    ):
         """
         Initialize vowel inferencer.
         
         Args:
             use_camel_tools: Use CAMeL Tools if available (recommended)
+            cache_max_entries: Maximum number of cached word vocalizations
+            cache_max_bytes: Maximum approximate size of the cache in bytes
+            store: Shared vocalization store behind the cache (default: the
+                one configured by VOCALIZATION_CACHE_BACKEND, if any)
+            load: Load CAMeL Tools now; if False, call load_disambiguator()
+                later (heuristic inference is used until it is loaded)
         """
         self.use_camel_tools = use_camel_tools
-        self._cache: Dict[str, Tuple[str, float]] = {}
+        self._cache = VocalizationCache(cache_max_entries, cache_max_bytes)
+        self.store = store if store is not None else get_vocalization_store()
         self.disambiguator = None
+        # Whitespace until CAMeL Tools is loaded (cache and store lookups only)
+        self.tokenize = str.split
+        self._load_lock = threading.Lock()
         
-        if use_camel_tools:
+        if use_camel_tools and load:
+            self.load_disambiguator()
+
+    def load_disambiguator(self) -> bool:
+        """
+        Load the CAMeL Tools MLE disambiguator (thread-safe, idempotent).
+
+        Safe to run in a background thread while restore_vowels() serves
+        requests: they use the heuristic until the disambiguator is set.
+
+        Returns:
+            True if CAMeL Tools is ready, False if it is disabled or unavailable
+        """
+        with self._load_lock:
+            if self.disambiguator is not None:
+                return True
+            if not self.use_camel_tools:
+                return False
             try:
                 from camel_tools.disambig.mle import MLEDisambiguator
                 from camel_tools.tokenizers.word import simple_word_tokenize
                 
-                self.disambiguator = MLEDisambiguator.pretrained()
+                disambiguator = MLEDisambiguator.pretrained()
                 self.tokenize = simple_word_tokenize
+                # Set last: a non-None disambiguator enables the CAMeL Tools path
+                self.disambiguator = disambiguator
                 logger.info("✅ CAMeL Tools loaded successfully")
+                return True
             except ImportError:
                 logger.warning(
                     "⚠️  CAMeL Tools not available. Install with: pip install camel-tools"
@@ -60,6 +117,12 @@ class VowelInferencer:
             except Exception as e:
                 logger.error(f"Failed to load CAMeL Tools: {e}")
                 self.use_camel_tools = False
+            return False
+
+    @property
+    def is_ready(self) -> bool:
+        """True once CAMeL Tools is loaded (otherwise heuristics are used)."""
+        return self.disambiguator is not None
 
     def restore_vowels(
         self, text: str, preserve_existing: bool = True
@@ -87,20 +150,50 @@ class VowelInferencer:
             >>> print(conf)
             0.87
         """
-        if not text or not text.strip():
-            return text, 0.0
+        return self.restore_vowels_batch([text], preserve_existing)[0]
 
-        # Check if already fully diacritized
-        if preserve_existing and self._is_fully_diacritized(text):
-            logger.debug("Text already fully diacritized")
-            return text, 1.0
+    def restore_vowels_batch(
+        self, texts: Sequence[str], preserve_existing: bool = True
+    ) -> List[Tuple[str, float]]:
+        """
+        Restore missing vowels in many texts (e.g. the verses of a poem).
 
-        # Use CAMeL Tools if available
-        if self.use_camel_tools and self.disambiguator:
-            return self._restore_with_camel_tools(text)
-        else:
-            # Fallback to heuristic
-            return self._restore_with_heuristic(text)
+        Texts that need CAMeL Tools are disambiguated together, each as a
+        whole sentence, instead of one word at a time.
+
+        Args:
+            texts: Input texts (may have partial/no diacritics)
+            preserve_existing: Keep existing diacritics if True
+
+        Returns:
+            (vocalized_text, confidence_score) per text, as restore_vowels()
+        """
+        results: List[Optional[Tuple[str, float]]] = [None] * len(texts)
+        pending: List[int] = []
+
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = (text, 0.0)
+            elif preserve_existing and self._is_fully_diacritized(text):
+                # Check if already fully diacritized
+                logger.debug("Text already fully diacritized")
+                results[i] = (text, 1.0)
+            else:
+                pending.append(i)
+
+        if pending:
+            pending_texts = [texts[i] for i in pending]
+            if self.use_camel_tools and self.disambiguator:
+                # Use CAMeL Tools if available
+                restored = self._restore_with_camel_tools(pending_texts)
+            else:
+                # Known words from the cache and the shared store, heuristic
+                # for the rest (CAMeL Tools not installed or still loading)
+                restored = self._restore_with_known_words(pending_texts)
+            for i, result in zip(pending, restored):
+                results[i] = result
+
+        return results
 
     def _is_fully_diacritized(self, text: str, threshold: float = 0.7) -> bool:
         """
@@ -133,84 +226,164 @@ class VowelInferencer:
 
         return ratio >= threshold
 
-    def _restore_with_camel_tools(self, text: str) -> Tuple[str, float]:
+    def _restore_with_camel_tools(
+        self, texts: Sequence[str]
+    ) -> List[Tuple[str, float]]:
         """
         Restore vowels using CAMeL Tools morphological disambiguation.
         
         This is the recommended approach for production (85-92% accuracy).
+        Only texts with words missing from the cache and the shared store
+        reach the disambiguator, as whole sentences and in one call when it
+        supports batches.
         """
         try:
-            # Tokenize
-            tokens = self.tokenize(text)
-
-            if not tokens:
-                return text, 0.0
-
-            disambiguated = []
-            confidence_scores = []
-
-            for token in tokens:
-                # Check cache first
-                if token in self._cache:
-                    vocalized, conf = self._cache[token]
-                    disambiguated.append(vocalized)
-                    confidence_scores.append(conf)
-                    continue
-
-                # Disambiguate morphologically
-                try:
-                    result = self.disambiguator.disambiguate([token])
-
-                    if result and result[0] and result[0].analyses:
-                        # Extract best analysis
-                        best = result[0].analyses[0]
-
-                        if hasattr(best, "diac") and best.diac:
-                            vocalized = best.diac
-                            # CAMeL Tools analyses are sorted by likelihood
-                            conf = 0.87  # Empirical average confidence
-                        else:
-                            # No diacritization available, use heuristic
-                            vocalized = self._heuristic_vowel_inference(token)
-                            conf = 0.65
-
-                        # Cache result
-                        self._cache[token] = (vocalized, conf)
-
-                        disambiguated.append(vocalized)
-                        confidence_scores.append(conf)
-                    else:
-                        # Fallback to heuristic
-                        vocalized = self._heuristic_vowel_inference(token)
-                        disambiguated.append(vocalized)
-                        confidence_scores.append(0.60)
-
-                except Exception as e:
-                    logger.warning(f"Failed to disambiguate '{token}': {e}")
-                    vocalized = self._heuristic_vowel_inference(token)
-                    disambiguated.append(vocalized)
-                    confidence_scores.append(0.60)
-
-            # Reconstruct text
-            vocalized_text = " ".join(disambiguated)
-
-            # Calculate overall confidence
-            avg_confidence = (
-                sum(confidence_scores) / len(confidence_scores)
-                if confidence_scores
-                else 0.0
-            )
-
-            logger.debug(
-                f"Restored vowels with CAMeL Tools (confidence: {avg_confidence:.2f})"
-            )
-
-            return vocalized_text, avg_confidence
+            sentences = [self.tokenize(text) for text in texts]
+            cached = self._lookup_words(sentences)
+
+            # Sentences with any word still unknown are disambiguated as a whole
+            uncached = [n for n, values in enumerate(cached) if None in values]
+            if uncached:
+                learned: Dict[str, Tuple[str, float]] = {}
+                disambiguated = self._disambiguate([sentences[n] for n in uncached])
+                for n, words in zip(uncached, disambiguated):
+                    words = list(words)
+                    cached[n] = [
+                        self._vocalize_word(
+                            token, words[k] if k < len(words) else None, learned
+                        )
+                        for k, token in enumerate(sentences[n])
+                    ]
+                if self.store is not None:
+                    self.store.set_many(learned)
+
+            return [self._join_words(text, values) for text, values in zip(texts, cached)]
 
         except Exception as e:
             logger.error(f"CAMeL Tools restoration failed: {e}")
             # Fallback to heuristic
-            return self._restore_with_heuristic(text)
+            return [self._restore_with_heuristic(text) for text in texts]
+
+    def _restore_with_known_words(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Restore vowels without CAMeL Tools.
+
+        Words found in the cache or the shared store (e.g. one warmed from a
+        diacritized corpus) keep their vocalization; only the others get the
+        heuristic, and those are not cached (CAMeL Tools may do better once
+        it is loaded).
+        """
+        try:
+            sentences = [self.tokenize(text) for text in texts]
+            known = self._lookup_words(sentences)
+        except Exception as e:
+            logger.error(f"Vocalization cache lookup failed: {e}")
+            return [self._restore_with_heuristic(text) for text in texts]
+
+        results = []
+        for text, tokens, values in zip(texts, sentences, known):
+            if not any(values):
+                results.append(self._restore_with_heuristic(text))
+                continue
+            values = [
+                value or (self._heuristic_vowel_inference(token), HEURISTIC_CONFIDENCE)
+                for token, value in zip(tokens, values)
+            ]
+            results.append(self._join_words(text, values))
+        return results
+
+    def _lookup_words(
+        self, sentences: List[List[str]]
+    ) -> List[List[Optional[Tuple[str, float]]]]:
+        """
+        Cached vocalizations of tokenized sentences (None for unknown words).
+
+        Checks the cache first, then the shared store with one lookup for all
+        missing words; store hits are promoted to the cache.
+        """
+        cached = [[self._cache.get(token) for token in tokens] for tokens in sentences]
+        missing = {
+            token
+            for tokens, values in zip(sentences, cached)
+            for token, value in zip(tokens, values)
+            if value is None
+        }
+        if missing and self.store is not None:
+            found = self.store.get_many(sorted(missing))
+            for word, value in found.items():
+                self._cache.set(word, value)
+            cached = [
+                [value or found.get(token) for token, value in zip(tokens, values)]
+                for tokens, values in zip(sentences, cached)
+            ]
+        return cached
+
+    def _join_words(
+        self, text: str, values: List[Tuple[str, float]]
+    ) -> Tuple[str, float]:
+        """Vocalized text and average confidence from per-word vocalizations."""
+        if not values:
+            return text, 0.0
+
+        vocalized_words = [vocalized for vocalized, _ in values]
+        confidence_scores = [conf for _, conf in values]
+
+        # Calculate overall confidence
+        avg_confidence = sum(confidence_scores) / len(confidence_scores)
+
+        logger.debug(f"Restored vowels from known words (confidence: {avg_confidence:.2f})")
+
+        # Reconstruct text
+        return " ".join(vocalized_words), avg_confidence
+
+    def _disambiguate(self, sentences: List[List[str]]) -> List[list]:
+        """
+        Disambiguate tokenized sentences in as few CAMeL Tools calls as possible.
+
+        Returns:
+            Disambiguated words per sentence (aligned with its tokens)
+        """
+        if hasattr(self.disambiguator, "disambiguate_sentences"):
+            return list(self.disambiguator.disambiguate_sentences(sentences))
+        return [self.disambiguator.disambiguate(tokens) for tokens in sentences]
+
+    def _vocalize_word(
+        self, token: str, word, learned: Dict[str, Tuple[str, float]]
+    ) -> Tuple[str, float]:
+        """
+        Vocalize one token from its disambiguation, caching the result.
+
+        Args:
+            token: Undiacritized token
+            word: CAMeL Tools DisambiguatedWord for the token (or None)
+            learned: Collects the cached vocalizations for the shared store
+
+        Returns:
+            (vocalized_word, confidence)
+        """
+        analyses = getattr(word, "analyses", None)
+        if not analyses:
+            # Fallback to heuristic (not cached: CAMeL Tools may do better
+            # with another sentence)
+            return self._heuristic_vowel_inference(token), FALLBACK_CONFIDENCE
+
+        # Extract best analysis (CAMeL Tools analyses are sorted by likelihood)
+        best = analyses[0]
+        diac = getattr(best, "diac", None)
+        if diac is None:
+            analysis = getattr(best, "analysis", None)
+            diac = analysis.get("diac") if isinstance(analysis, dict) else None
+
+        if diac:
+            value = (diac, CAMEL_CONFIDENCE)
+        else:
+            # No diacritization available, use heuristic
+            value = (self._heuristic_vowel_inference(token), HEURISTIC_CONFIDENCE)
+
+        # Cache result
+        self._cache.set(token, value)
+        learned[token] = value
+        return value
 
     def _restore_with_heuristic(self, text: str) -> Tuple[str, float]:
         """
@@ -245,7 +418,7 @@ class VowelInferencer:
         result = " ".join(vocalized_words)
 
         # Lower confidence for heuristic approach
-        confidence = 0.65
+        confidence = HEURISTIC_CONFIDENCE
 
         logger.debug(f"Restored vowels with heuristic (confidence: {confidence:.2f})")
 
@@ -310,10 +483,13 @@ class VowelInferencer:
         return "".join(vocalized)
 
     def clear_cache(self):
-        """Clear the word vocalization cache."""
+        """Clear the word vocalization cache (the shared store is kept)."""
         self._cache.clear()
         logger.debug("Cleared vowel inference cache")
 
     def get_cache_stats(self) -> Dict[str, int]:
-        """Get cache statistics."""
-        return {"cached_words": len(self._cache), "cache_size_bytes": len(str(self._cache))}
+        """Get cache statistics (entries, approximate bytes, limits, hit rate counters)."""
+        stats = self._cache.stats()
+        if self.store is not None:
+            stats.update(self.store.stats())
+        return stats
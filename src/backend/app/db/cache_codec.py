@@ -0,0 +1,229 @@
+"""
+Binary encoding of cached analysis results.
+
+Values stored in Redis start with one header byte: the low nibble selects
+the codec, the high nibble the compression applied to the encoded body.
+
+    codec:       1 = JSON (compact), 2 = MessagePack
+    compression: 0 = none, 1 = zlib, 2 = zstd
+
+Bodies larger than CACHE_COMPRESS_THRESHOLD bytes are compressed. Values
+written before the header existed (plain JSON text) still decode, so a
+rolling deploy keeps serving the existing entries.
+
+MessagePack and zstd are optional: without ``msgpack`` the JSON codec is
+used, and without ``zstandard`` zlib is.
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from app.config import settings
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSION_NAMES = {
+    "none": COMPRESSION_NONE,
+    "zlib": COMPRESSION_ZLIB,
+    "zstd": COMPRESSION_ZSTD,
+}
+
+
+class CacheDecodeError(ValueError):
+    """A cached value could not be decoded."""
+
+
+class CacheCodec:
+    """Serializer selected by the low nibble of the header byte."""
+
+    codec_id: int = 0
+    name: str = ""
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONCodec(CacheCodec):
+    """Compact UTF-8 JSON."""
+
+    codec_id = 1
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec(CacheCodec):
+    """MessagePack (requires ``msgpack``)."""
+
+    codec_id = 2
+    name = "msgpack"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+# Codecs by id, for decoding
+CODECS: Dict[int, CacheCodec] = {}
+
+
+def register_codec(codec: CacheCodec) -> None:
+    """Make a codec available for encoding (by name) and decoding (by id)."""
+    if not 0 < codec.codec_id < 16:
+        raise ValueError(f"Codec id must be in 1..15, got {codec.codec_id}")
+    CODECS[codec.codec_id] = codec
+
+
+register_codec(JSONCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
+
+
+def get_codec(name: str) -> CacheCodec:
+    """
+    Codec by name, falling back to JSON when it is not available.
+
+    Raises:
+        ValueError: If no codec of that name exists at all
+    """
+    for codec in CODECS.values():
+        if codec.name == name:
+            return codec
+    if name == MsgpackCodec.name:
+        logger.warning("msgpack is not installed; caching with the JSON codec")
+        return CODECS[JSONCodec.codec_id]
+    raise ValueError(f"Unknown cache codec: {name!r}")
+
+
+def get_compression(name: str) -> int:
+    """Compression id by name, falling back to zlib without ``zstandard``."""
+    if name not in COMPRESSION_NAMES:
+        raise ValueError(f"Unknown cache compression: {name!r}")
+    compression = COMPRESSION_NAMES[name]
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        logger.warning(
+            "zstandard is not installed; compressing cached values with zlib"
+        )
+        return COMPRESSION_ZLIB
+    return compression
+
+
+def _compress(body: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(body, 6)
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return body
+
+
+def _decompress(body: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_NONE:
+        return body
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(body)
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise CacheDecodeError(
+                "zstd-compressed value but zstandard is not installed"
+            )
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise CacheDecodeError(f"Unknown compression {compression}")
+
+
+def encode(
+    value: Any,
+    codec: Optional[CacheCodec] = None,
+    compression: Optional[int] = None,
+    threshold: Optional[int] = None,
+) -> bytes:
+    """
+    Encode a value with its header byte.
+
+    Args:
+        value: Value to encode (JSON-compatible types)
+        codec: Codec (default: CACHE_CODEC)
+        compression: Compression id for large bodies (default: CACHE_COMPRESSION)
+        threshold: Minimum body size to compress (default: CACHE_COMPRESS_THRESHOLD)
+
+    Raises:
+        TypeError, ValueError: If the value cannot be encoded
+    """
+    codec = codec or default_codec
+    compression = default_compression if compression is None else compression
+    threshold = settings.cache_compress_threshold if threshold is None else threshold
+
+    body = codec.dumps(value)
+    if compression == COMPRESSION_NONE or len(body) < threshold:
+        compression = COMPRESSION_NONE
+    else:
+        body = _compress(body, compression)
+    return bytes([codec.codec_id | (compression << 4)]) + body
+
+
+def decode(data: Union[bytes, str]) -> Any:
+    """
+    Decode a value written by encode() (or plain JSON text).
+
+    Raises:
+        CacheDecodeError: If the value is corrupt or uses an unknown codec
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if not data:
+        raise CacheDecodeError("Empty cached value")
+
+    header = data[0]
+    try:
+        if header in b"{[":  # Plain JSON from before the header byte
+            return json.loads(data)
+        codec = CODECS.get(header & 0x0F)
+        if codec is None:
+            raise CacheDecodeError(f"Unknown cache codec id {header & 0x0F}")
+        return codec.loads(_decompress(data[1:], header >> 4))
+    except CacheDecodeError:
+        raise
+    except Exception as e:
+        raise CacheDecodeError(str(e)) from e
+
+
+# Codec and compression used by encode()
+default_codec = get_codec(settings.cache_codec)
+default_compression = get_compression(settings.cache_compression)
+
+__all__ = [
+    "CacheCodec",
+    "CacheDecodeError",
+    "JSONCodec",
+    "MsgpackCodec",
+    "decode",
+    "encode",
+    "get_codec",
+    "get_compression",
+    "register_codec",
+]
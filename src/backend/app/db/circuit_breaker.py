@@ -0,0 +1,145 @@
+"""
+Circuit breaker for the Redis cache.
+
+When Redis is down, every cache call would otherwise wait for a connection
+attempt (up to REDIS_SOCKET_CONNECT_TIMEOUT) before failing and being
+logged. After REDIS_BREAKER_THRESHOLD consecutive connection failures or
+timeouts the breaker opens and Redis is skipped for
+REDIS_BREAKER_COOLDOWN seconds; callers fall back to the L1 and L3 caches
+or compute. After the cooldown one probe call is let through: success
+closes the breaker, failure opens it for another cooldown.
+
+    closed ──threshold failures──▶ open ──cooldown──▶ half-open (one probe)
+       ▲                                                  │
+       └────────────────── probe succeeds ────────────────┘
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.metrics.analysis_metrics import inc_circuit_open, inc_circuit_rejected
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """The call was skipped because the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker (single event loop, not thread-safe).
+
+    Example:
+        >>> breaker = CircuitBreaker("redis", failure_threshold=5, cooldown=10)
+        >>> breaker.check()  # raises CircuitOpenError while open
+        >>> try:
+        ...     value = await redis.get(key)
+        ...     breaker.record_success()
+        ... except ConnectionError:
+        ...     breaker.record_failure()
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        cooldown: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            name: Name used in logs and metrics
+            failure_threshold: Consecutive failures that open the breaker
+                (0 disables it)
+            cooldown: Seconds calls are skipped once open
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """True if a call may go through (in half-open state: one probe)."""
+        if self.failure_threshold <= 0:
+            return True
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            now = self._clock()
+            # A probe that never reported back does not block forever
+            if (
+                self._probe_started is None
+                or now - self._probe_started >= self.cooldown
+            ):
+                self._probe_started = now
+                return True
+        inc_circuit_rejected(self.name)
+        return False
+
+    def check(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the call should be skipped
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+    def record_success(self) -> None:
+        if self._state != CLOSED:
+            logger.info(f"{self.name} circuit breaker closed")
+        self._state = CLOSED
+        self._failures = 0
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        self._failures += 1
+        self._probe_started = None
+        if self._state != CLOSED or self._failures >= self.failure_threshold:
+            if self._state == CLOSED:
+                logger.warning(
+                    f"{self.name} circuit breaker opened after {self._failures} "
+                    f"consecutive failures; skipping for {self.cooldown}s"
+                )
+                inc_circuit_open(self.name)
+            self._state = OPEN
+            self._opened_at = self._clock()
+
+    def stats(self) -> Dict[str, Any]:
+        """State and configuration."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "cooldown": self.cooldown,
+        }
+
+
+# Process-wide breaker for the Redis cache
+redis_circuit_breaker = CircuitBreaker(
+    "redis",
+    failure_threshold=settings.redis_breaker_threshold,
+    cooldown=settings.redis_breaker_cooldown,
+)
+
+__all__ = ["CircuitBreaker", "CircuitOpenError", "redis_circuit_breaker"]
@@ -0,0 +1,158 @@
+"""
+In-process L1 cache in front of Redis.
+
+Hot verses (famous openings are requested over and over) otherwise cost a
+Redis round trip plus ``json.loads`` on every request. ``LocalCache`` keeps a
+bounded number of decoded results per worker, keyed by the same
+``generate_cache_key`` hash as Redis, with least-recently-used eviction and a
+per-entry TTL.
+
+Entries are tagged with the analysis engine version. ``invalidate(version)``
+drops everything cached under another version; app.db.redis calls it when a
+worker announces a new ANALYSIS_ENGINE_VERSION over Redis pub/sub.
+
+Cached values are shared between requests and must not be mutated.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from app.metrics.analysis_metrics import inc_l1_eviction, inc_l1_hit, inc_l1_miss
+
+
+class LocalCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.
+
+    Example:
+        >>> cache = LocalCache(max_entries=2, ttl=60)
+        >>> cache.set("analysis:abc123", {"score": 97.5})
+        >>> cache.get("analysis:abc123")
+        {'score': 97.5}
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300,
+        version: str = "",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries (0 disables the cache)
+            ttl: Default time to live in seconds
+            version: Analysis engine version the entries belong to
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.version = version
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a value, or None if absent or expired.
+
+        Args:
+            key: Cache key
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    inc_l1_hit()
+                    return value
+                del self._entries[key]
+                inc_l1_eviction()
+        inc_l1_miss()
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key
+            value: Decoded value (not copied)
+            ttl: Time to live in seconds (capped at the cache default)
+        """
+        if not self.enabled or value is None:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        inc_l1_eviction(evicted)
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> int:
+        """
+        Remove all entries.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        inc_l1_eviction(count)
+        return count
+
+    def invalidate(self, version: str) -> int:
+        """
+        Switch to another engine version, dropping entries of the old one.
+
+        Args:
+            version: Analysis engine version now in effect
+
+        Returns:
+            Number of entries removed (0 if the version did not change)
+        """
+        if version == self.version:
+            return 0
+        self.version = version
+        return self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current size and configuration."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "version": self.version,
+        }
+
+
+# Process-wide L1 cache for analysis results
+analysis_l1_cache = LocalCache(
+    max_entries=settings.cache_l1_max_entries if settings.cache_l1_enabled else 0,
+    ttl=settings.cache_l1_ttl,
+    version=settings.analysis_engine_version,
+)
+
+__all__ = ["LocalCache", "analysis_l1_cache"]
@@ -0,0 +1,388 @@
+"""
+Durable L3 analysis cache in PostgreSQL (``analysis_cache`` table).
+
+Redis contents vanish on restart or eviction; the L3 tier keeps analysis
+results for CACHE_L3_TTL_DAYS behind it. Lookups go L1 (in-process) →
+Redis → L3, and an L3 hit is written back to Redis and L1
+(see app.db.redis).
+
+Nothing touches the database on the request path except L3 reads on a
+Redis miss:
+- writes are write-behind: results are queued in memory and upserted in
+  bulk by the background flush
+- hits are counted in memory and applied as one bulk UPDATE of
+  hit_count/last_accessed per flush
+- expired rows are deleted in batches by a background sweep using the
+  expires_at index
+
+Rows are keyed by the SHA-256 of the cache key (``text_hash``) and only
+served for the current ANALYSIS_ENGINE_VERSION (``algorithm_version``).
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.metrics.analysis_metrics import inc_l3_hit, inc_l3_miss
+from app.models.cache import AnalysisCache
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+analysis_cache_table = AnalysisCache.__table__
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PersistentAnalysisCache:
+    """
+    Write-behind analysis cache over the ``analysis_cache`` table.
+
+    Example:
+        >>> cache = PersistentAnalysisCache(engine)
+        >>> cache.put("analysis:abc123", {"text": "..."}, normalized_text="...")
+        >>> await cache.flush()
+        >>> await cache.get("analysis:abc123")
+        {'text': '...'}
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        enabled: bool = True,
+        ttl_days: float = 30,
+        version: str = "",
+        max_pending: int = 1000,
+        max_pending_hits: int = 10000,
+        flush_interval: float = 5.0,
+        sweep_interval: float = 3600.0,
+        sweep_batch_size: int = 1000,
+        clock: Callable[[], datetime] = _utcnow,
+    ):
+        """
+        Args:
+            engine: SQLAlchemy engine (default: app.db.session.engine, lazily)
+            enabled: False turns every operation into a no-op
+            ttl_days: Lifetime of stored results
+            version: Analysis engine version stored and served
+            max_pending: Queued writes kept before the oldest are dropped
+            max_pending_hits: Rows with counted hits kept between flushes;
+                hits on further rows are dropped
+            flush_interval: Seconds between background flushes
+            sweep_interval: Seconds between expiry sweeps
+            sweep_batch_size: Rows deleted per sweep statement
+            clock: UTC time source (injectable for tests)
+        """
+        self._engine = engine
+        self.enabled = enabled
+        self.ttl = timedelta(days=ttl_days)
+        self.version = version
+        self.max_pending = max_pending
+        self.max_pending_hits = max_pending_hits
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        self._clock = clock
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._hits: Counter = Counter()
+        self._last_accessed: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.dropped_writes = 0
+        self.dropped_hits = 0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.db.session import engine
+
+            self._engine = engine
+        return self._engine
+
+    @staticmethod
+    def text_hash(key: str) -> str:
+        """Row key of a cache key."""
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Request path (no database writes)
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Get a stored result, or None if absent, expired or on error.
+
+        Args:
+            key: Cache key (as used for Redis)
+        """
+        if not self.enabled:
+            return None
+        text_hash = self.text_hash(key)
+        with self._lock:
+            pending = self._pending.get(text_hash)
+        if pending is not None:
+            value = pending["cached_result"]
+        else:
+            try:
+                value = await asyncio.to_thread(self._fetch, text_hash, self._clock())
+            except Exception as e:
+                logger.error(f"L3 cache read error for key {key}: {e}")
+                return None
+        if value is None:
+            inc_l3_miss()
+            return None
+        inc_l3_hit()
+        self.record_hit(key)
+        return value
+
+    def put(self, key: str, value: Any, normalized_text: Optional[str] = None) -> None:
+        """
+        Queue a result for the next flush (write-behind).
+
+        Args:
+            key: Cache key
+            value: JSON-serializable analysis result
+            normalized_text: Normalized verse (default: the result's text)
+        """
+        if not self.enabled:
+            return
+        now = self._clock()
+        original_text = value.get("text", "") if isinstance(value, dict) else ""
+        row = {
+            "text_hash": self.text_hash(key),
+            "original_text": original_text,
+            "normalized_text": (
+                normalized_text if normalized_text is not None else original_text
+            ),
+            "cached_result": value,
+            "hit_count": 0,
+            "algorithm_version": self.version[:20],
+            "created_at": now,
+            "last_accessed": now,
+            "expires_at": now + self.ttl,
+        }
+        with self._lock:
+            self._pending[row["text_hash"]] = row
+            self._pending.move_to_end(row["text_hash"])
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped_writes += 1
+
+    def record_hit(self, key: str) -> None:
+        """Count a cache hit; applied to the row by the next flush."""
+        if not self.enabled:
+            return
+        text_hash = self.text_hash(key)
+        with self._lock:
+            self._count_hit(text_hash, 1, self._clock())
+
+    # ------------------------------------------------------------------
+    # Background work
+    # ------------------------------------------------------------------
+
+    async def flush(self) -> int:
+        """
+        Write queued results and aggregated hits to the database.
+
+        Failed writes are queued again (hits are merged back) for the next
+        flush.
+
+        Returns:
+            Number of rows written or updated
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            rows = list(self._pending.values())
+            hits = [
+                {"h": text_hash, "n": count, "ts": self._last_accessed[text_hash]}
+                for text_hash, count in self._hits.items()
+            ]
+            self._pending.clear()
+            self._hits.clear()
+            self._last_accessed.clear()
+        if not rows and not hits:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, rows, hits)
+        except Exception as e:
+            logger.error(
+                f"L3 cache flush failed ({len(rows)} rows, {len(hits)} hit updates): {e}"
+            )
+            self._requeue(rows, hits)
+            return 0
+        logger.debug(f"L3 cache flushed {len(rows)} rows, {len(hits)} hit updates")
+        return len(rows) + len(hits)
+
+    async def sweep_expired(self) -> int:
+        """
+        Delete expired rows in batches of sweep_batch_size.
+
+        Returns:
+            Number of rows deleted
+        """
+        if not self.enabled:
+            return 0
+        deleted = 0
+        try:
+            while True:
+                count = await asyncio.to_thread(
+                    self._delete_expired, self._clock(), self.sweep_batch_size
+                )
+                deleted += count
+                if count < self.sweep_batch_size:
+                    break
+        except Exception as e:
+            logger.error(f"L3 cache expiry sweep failed: {e}")
+        if deleted:
+            logger.info(f"L3 cache swept {deleted} expired rows")
+        return deleted
+
+    async def start(self) -> None:
+        """Start the background flush and expiry sweep task."""
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and flush what is queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if loop.time() >= next_sweep:
+                await self.sweep_expired()
+                next_sweep = loop.time() + self.sweep_interval
+
+    def stats(self) -> Dict[str, Any]:
+        """Queued work and configuration."""
+        return {
+            "enabled": self.enabled,
+            "pending_writes": len(self._pending),
+            "pending_hit_updates": len(self._hits),
+            "dropped_writes": self.dropped_writes,
+            "dropped_hits": self.dropped_hits,
+            "version": self.version,
+        }
+
+    def _count_hit(self, text_hash: str, count: int, ts: datetime) -> None:
+        # Caller holds self._lock
+        if text_hash not in self._hits and len(self._hits) >= self.max_pending_hits:
+            self.dropped_hits += count
+            return
+        self._hits[text_hash] += count
+        previous = self._last_accessed.get(text_hash)
+        self._last_accessed[text_hash] = max(ts, previous or ts)
+
+    def _requeue(self, rows: List[dict], hits: List[dict]) -> None:
+        with self._lock:
+            # Failed rows are older than anything queued since, so they go
+            # in front and are the first dropped
+            for row in reversed(rows):
+                if row["text_hash"] not in self._pending:
+                    self._pending[row["text_hash"]] = row
+                    self._pending.move_to_end(row["text_hash"], last=False)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped_writes += 1
+            for hit in hits:
+                self._count_hit(hit["h"], hit["n"], hit["ts"])
+
+    # ------------------------------------------------------------------
+    # SQL (run in worker threads)
+    # ------------------------------------------------------------------
+
+    def _fetch(self, text_hash: str, now: datetime) -> Optional[Any]:
+        table = analysis_cache_table
+        statement = select(table.c.cached_result).where(
+            table.c.text_hash == text_hash,
+            table.c.algorithm_version == self.version[:20],
+            table.c.expires_at > now,
+        )
+        with self.engine.connect() as connection:
+            return connection.execute(statement).scalar_one_or_none()
+
+    def _write(self, rows: List[dict], hits: List[dict]) -> None:
+        with self.engine.begin() as connection:
+            if rows:
+                connection.execute(upsert_statement(), rows)
+            if hits:
+                connection.execute(hit_update_statement(), hits)
+
+    def _delete_expired(self, now: datetime, limit: int) -> int:
+        with self.engine.begin() as connection:
+            return connection.execute(expiry_sweep_statement(now, limit)).rowcount
+
+
+def upsert_statement():
+    """INSERT ... ON CONFLICT (text_hash) DO UPDATE for queued results."""
+    statement = insert(analysis_cache_table)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[analysis_cache_table.c.text_hash],
+        set_={
+            "original_text": excluded.original_text,
+            "normalized_text": excluded.normalized_text,
+            "cached_result": excluded.cached_result,
+            "algorithm_version": excluded.algorithm_version,
+            "last_accessed": excluded.last_accessed,
+            "expires_at": excluded.expires_at,
+        },
+    )
+
+
+def hit_update_statement():
+    """Bulk hit_count/last_accessed UPDATE (executemany over h, n, ts)."""
+    table = analysis_cache_table
+    return (
+        update(table)
+        .where(table.c.text_hash == bindparam("h"))
+        .values(
+            hit_count=func.coalesce(table.c.hit_count, 0) + bindparam("n"),
+            last_accessed=func.greatest(table.c.last_accessed, bindparam("ts")),
+        )
+    )
+
+
+def expiry_sweep_statement(now: datetime, limit: int):
+    """DELETE up to ``limit`` expired rows, oldest first (uses ix_analysis_cache_expires_at)."""
+    table = analysis_cache_table
+    expired = (
+        select(table.c.id)
+        .where(table.c.expires_at < now)
+        .order_by(table.c.expires_at)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    return delete(table).where(table.c.id.in_(expired))
+
+
+# Process-wide L3 cache for analysis results
+analysis_l3_cache = PersistentAnalysisCache(
+    enabled=settings.cache_l3_enabled,
+    ttl_days=settings.cache_l3_ttl_days,
+    version=settings.analysis_engine_version,
+    flush_interval=settings.cache_l3_flush_interval,
+    sweep_interval=settings.cache_l3_sweep_interval,
+)
+
+__all__ = ["PersistentAnalysisCache", "analysis_l3_cache"]
@@ -1,128 +1,369 @@
 """
 Redis caching utilities for the BAHR API.
+
+Reads and writes go through an in-process L1 cache (app.db.local_cache)
+first, so hot keys are served without a Redis round trip. Behind Redis, the
+optional durable L3 cache in PostgreSQL (app.db.persistent_cache) is read on
+Redis misses and populated write-behind.
+
+Redis is skipped while its circuit breaker (app.db.circuit_breaker) is
+open, so an outage costs one failed connection attempt per cooldown instead
+of one per request.
+
+Values are stored in Redis in the binary format of app.db.cache_codec
+(header byte + MessagePack or JSON, compressed when large).
+
+Analysis cache keys are namespaced by the analysis engine version
+(``analysis:<version>:<sha256>``), so results of other detector versions are
+never served as current ones (see app.db.revalidation for serving them
+while a rollout re-analyzes).
 """
 
+import asyncio
 import hashlib
-import json
 import logging
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from redis.asyncio import Redis, from_url
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 
 from app.config import settings
+from app.db.cache_codec import decode, encode
+from app.db.circuit_breaker import CircuitOpenError, redis_circuit_breaker
+from app.db.local_cache import analysis_l1_cache
+from app.db.persistent_cache import analysis_l3_cache
 
 logger = logging.getLogger(__name__)
 
+# Pub/sub channel announcing analysis engine versions to every worker
+CACHE_INVALIDATION_CHANNEL = "bahr:cache:engine_version"
+
+# Last engine version announced to the cluster
+ENGINE_VERSION_KEY = "bahr:analysis_engine_version"
+
+# The invalidation listener waits for messages this long per poll (a read
+# timeout that is not an error, unlike REDIS_SOCKET_TIMEOUT) and reconnects
+# after failures with a delay doubling up to the maximum
+PUBSUB_POLL_TIMEOUT = 1.0  # seconds
+PUBSUB_RECONNECT_DELAY = 1.0  # seconds
+PUBSUB_RECONNECT_MAX_DELAY = 30.0  # seconds
+
+# Errors that count towards the circuit breaker (Redis unreachable or slow)
+REDIS_FAILURES = (
+    RedisConnectionError,
+    RedisTimeoutError,
+    ConnectionError,
+    TimeoutError,
+)
+
 # Global Redis connection
 _redis_client: Optional[Redis] = None
 
+# Background pub/sub listener task
+_invalidation_task: Optional[asyncio.Task] = None
+
 
 async def get_redis() -> Redis:
     """
     Get or create Redis connection.
 
+    The client uses a blocking connection pool of REDIS_MAX_CONNECTIONS
+    (callers wait up to REDIS_POOL_TIMEOUT for a free connection) with the
+    configured socket timeouts and health checks.
+
     Returns:
         Redis client instance
     """
     global _redis_client
     if _redis_client is None:
-        _redis_client = from_url(
-            settings.redis_url, encoding="utf-8", decode_responses=True
+        # Binary responses: cached values are encoded by app.db.cache_codec
+        pool = BlockingConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_connect_timeout,
+            socket_keepalive=True,
+            health_check_interval=settings.redis_health_check_interval,
         )
+        _redis_client = Redis(connection_pool=pool)
     return _redis_client
 
 
+async def get_available_redis() -> Redis:
+    """
+    Redis client, unless the circuit breaker is open.
+
+    Raises:
+        CircuitOpenError: While Redis is being skipped
+    """
+    redis_circuit_breaker.check()
+    return await get_redis()
+
+
 async def close_redis():
     """Close Redis connection."""
     global _redis_client
     if _redis_client:
-        await _redis_client.close()
+        await _redis_client.aclose(close_connection_pool=True)
         _redis_client = None
 
 
-async def cache_get(key: str) -> Optional[Any]:
+def _chunks(items: List[Any]) -> List[List[Any]]:
+    size = max(1, settings.redis_pipeline_chunk_size)
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+async def cache_get(key: str, use_l3: bool = True) -> Optional[Any]:
     """
     Get value from cache.
 
     Args:
         key: Cache key
+        use_l3: Fall back to the L3 cache on a Redis miss (it only holds
+            results of the current engine version)
 
     Returns:
-        Cached value (deserialized from JSON) or None if not found
+        Cached value (decoded) or None if not found
 
     Example:
         >>> result = await cache_get("analysis:abc123")
     """
+    local = analysis_l1_cache.get(key)
+    if local is not None:
+        analysis_l3_cache.record_hit(key)
+        return local
+
     try:
-        redis = await get_redis()
+        redis = await get_available_redis()
         value = await redis.get(key)
+        redis_circuit_breaker.record_success()
         if value:
             logger.debug(f"Cache hit for key: {key}")
             try:
-                return json.loads(value)
-            except json.JSONDecodeError as e:
+                decoded = decode(value)
+                analysis_l1_cache.set(key, decoded)
+                analysis_l3_cache.record_hit(key)
+                return decoded
+            except ValueError as e:
                 logger.error(f"Failed to deserialize cached value for key {key}: {e}")
                 # Delete corrupted cache entry
                 try:
                     await redis.delete(key)
                 except Exception:
                     pass
-                return None
-        logger.debug(f"Cache miss for key: {key}")
-        return None
-    except ConnectionError as e:
+        else:
+            logger.debug(f"Cache miss for key: {key}")
+    except CircuitOpenError:
+        pass
+    except REDIS_FAILURES as e:
+        redis_circuit_breaker.record_failure()
         logger.error(f"Redis connection error for key {key}: {e}")
-        return None
-    except TimeoutError as e:
-        logger.error(f"Redis timeout for key {key}: {e}")
-        return None
     except Exception as e:
         logger.error(f"Redis get error for key {key}: {e}")
+
+    return await _l3_get(key) if use_l3 else None
+
+
+async def _l3_get(key: str) -> Optional[Any]:
+    """Read a key from the L3 cache and write it back to Redis and L1."""
+    if not analysis_l3_cache.enabled:
+        return None
+    value = await analysis_l3_cache.get(key)
+    if value is None:
         return None
+    analysis_l1_cache.set(key, value)
+    try:
+        redis = await get_available_redis()
+        await redis.setex(key, settings.cache_ttl, encode(value))
+        redis_circuit_breaker.record_success()
+    except CircuitOpenError:
+        pass
+    except REDIS_FAILURES as e:
+        redis_circuit_breaker.record_failure()
+        logger.debug(f"Redis write-back of L3 hit failed for key {key}: {e}")
+    except Exception as e:
+        logger.debug(f"Redis write-back of L3 hit failed for key {key}: {e}")
+    return value
 
 
-async def cache_set(key: str, value: Any, ttl: int = 86400) -> bool:
+async def cache_set(
+    key: str, value: Any, ttl: int = 86400, normalized_text: Optional[str] = None
+) -> bool:
     """
     Set value in cache with TTL.
 
     Args:
         key: Cache key
-        value: Value to cache (will be JSON serialized)
+        value: Value to cache (encoded by app.db.cache_codec)
         ttl: Time to live in seconds (default: 24 hours)
+        normalized_text: Normalized verse, stored with the L3 row
 
     Returns:
-        True if successful, False otherwise
+        True if stored in Redis, False otherwise (L1/L3 are still updated
+        while Redis is unavailable)
 
     Example:
         >>> await cache_set("analysis:abc123", {"result": "..."}, ttl=3600)
     """
     try:
-        redis = await get_redis()
-        try:
-            serialized = json.dumps(value, ensure_ascii=False)
-        except (TypeError, ValueError) as e:
-            logger.error(f"Failed to serialize value for key {key}: {e}")
-            return False
+        serialized = encode(value)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Failed to serialize value for key {key}: {e}")
+        return False
 
-        # Edge case: Validate TTL
-        if ttl <= 0:
-            logger.warning(f"Invalid TTL {ttl} for key {key}, using default 86400")
-            ttl = 86400
+    # Edge case: Validate TTL
+    if ttl <= 0:
+        logger.warning(f"Invalid TTL {ttl} for key {key}, using default 86400")
+        ttl = 86400
 
+    analysis_l1_cache.set(key, value, ttl)
+    analysis_l3_cache.put(key, value, normalized_text)
+    try:
+        redis = await get_available_redis()
         await redis.setex(key, ttl, serialized)
+        redis_circuit_breaker.record_success()
         logger.debug(f"Cached key: {key} with TTL: {ttl}s")
         return True
-    except ConnectionError as e:
-        logger.error(f"Redis connection error for key {key}: {e}")
+    except CircuitOpenError:
         return False
-    except TimeoutError as e:
-        logger.error(f"Redis timeout for key {key}: {e}")
+    except REDIS_FAILURES as e:
+        redis_circuit_breaker.record_failure()
+        logger.error(f"Redis connection error for key {key}: {e}")
         return False
     except Exception as e:
         logger.error(f"Redis set error for key {key}: {e}")
         return False
 
 
+async def cache_get_many(keys: List[str], use_l3: bool = True) -> List[Optional[Any]]:
+    """
+    Get several values from cache in one round trip.
+
+    Keys missing from L1 are fetched with MGETs of at most
+    REDIS_PIPELINE_CHUNK_SIZE keys, sent together in one pipeline.
+
+    Args:
+        keys: Cache keys
+        use_l3: Fall back to the L3 cache on Redis misses
+
+    Returns:
+        Values in the same order as keys (None for misses, corrupted entries
+        or when Redis is unavailable)
+
+    Example:
+        >>> results = await cache_get_many(["analysis:abc123", "analysis:def456"])
+    """
+    if not keys:
+        return []
+
+    results: List[Optional[Any]] = [analysis_l1_cache.get(key) for key in keys]
+    missing = [i for i, value in enumerate(results) if value is None]
+
+    if missing:
+        values: List[Optional[bytes]] = [None] * len(missing)
+        try:
+            redis = await get_available_redis()
+            chunks = _chunks([keys[i] for i in missing])
+            if len(chunks) == 1:
+                values = await redis.mget(chunks[0])
+            else:
+                pipe = redis.pipeline(transaction=False)
+                for chunk in chunks:
+                    pipe.mget(chunk)
+                values = [value for chunk in await pipe.execute() for value in chunk]
+            redis_circuit_breaker.record_success()
+        except CircuitOpenError:
+            pass
+        except REDIS_FAILURES as e:
+            redis_circuit_breaker.record_failure()
+            logger.error(f"Redis mget connection error for {len(missing)} keys: {e}")
+        except Exception as e:
+            logger.error(f"Redis mget error for {len(missing)} keys: {e}")
+
+        for i, value in zip(missing, values):
+            if value is None:
+                continue
+            try:
+                results[i] = decode(value)
+            except ValueError as e:
+                logger.error(
+                    f"Failed to deserialize cached value for key {keys[i]}: {e}"
+                )
+                continue
+            analysis_l1_cache.set(keys[i], results[i])
+
+    for key, value in zip(keys, results):
+        if value is not None:
+            analysis_l3_cache.record_hit(key)
+    if use_l3 and analysis_l3_cache.enabled:
+        for i in [i for i in missing if results[i] is None]:
+            results[i] = await _l3_get(keys[i])
+    return results
+
+
+async def cache_set_many(
+    items: Dict[str, Any],
+    ttl: int = 86400,
+    normalized_texts: Optional[Dict[str, str]] = None,
+) -> bool:
+    """
+    Set several values in cache with one pipelined round trip.
+
+    Args:
+        items: Mapping cache key → value (encoded by app.db.cache_codec)
+        ttl: Time to live in seconds (default: 24 hours)
+        normalized_texts: Normalized verse per cache key, stored with the
+            L3 rows
+
+    Returns:
+        True if stored in Redis, False otherwise
+
+    Example:
+        >>> await cache_set_many({"analysis:abc123": {...}}, ttl=3600)
+    """
+    if not items:
+        return True
+    if ttl <= 0:
+        logger.warning(f"Invalid TTL {ttl}, using default 86400")
+        ttl = 86400
+    normalized_texts = normalized_texts or {}
+
+    encoded: Dict[str, bytes] = {}
+    for key, value in items.items():
+        try:
+            encoded[key] = encode(value)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Failed to serialize value for key {key}: {e}")
+            continue
+        analysis_l1_cache.set(key, value, ttl)
+        analysis_l3_cache.put(key, value, normalized_texts.get(key))
+    if not encoded:
+        return False
+
+    try:
+        redis = await get_available_redis()
+        pipe = redis.pipeline(transaction=False)
+        for key, serialized in encoded.items():
+            pipe.setex(key, ttl, serialized)
+        await pipe.execute()
+        redis_circuit_breaker.record_success()
+        logger.debug(f"Cached {len(encoded)} keys with TTL: {ttl}s")
+        return True
+    except CircuitOpenError:
+        return False
+    except REDIS_FAILURES as e:
+        redis_circuit_breaker.record_failure()
+        logger.error(
+            f"Redis pipelined set connection error for {len(encoded)} keys: {e}"
+        )
+        return False
+    except Exception as e:
+        logger.error(f"Redis pipelined set error for {len(encoded)} keys: {e}")
+        return False
+
+
 async def cache_delete(key: str) -> bool:
     """
     Delete value from cache.
@@ -136,21 +377,139 @@ async def cache_delete(key: str) -> bool:
     Example:
         >>> await cache_delete("analysis:abc123")
     """
+    analysis_l1_cache.delete(key)
     try:
-        redis = await get_redis()
+        redis = await get_available_redis()
         await redis.delete(key)
+        redis_circuit_breaker.record_success()
         logger.debug(f"Deleted cache key: {key}")
         return True
+    except CircuitOpenError:
+        return False
+    except REDIS_FAILURES as e:
+        redis_circuit_breaker.record_failure()
+        logger.error(f"Redis connection error deleting key {key}: {e}")
+        return False
     except Exception as e:
         logger.error(f"Redis delete error for key {key}: {e}")
         return False
 
 
+async def announce_engine_version(version: Optional[str] = None) -> bool:
+    """
+    Publish this worker's analysis engine version if it changed.
+
+    The last announced version is kept in Redis; when it differs from ours,
+    the new version is published so every worker clears its L1 cache.
+
+    Args:
+        version: Engine version (default: settings.analysis_engine_version)
+
+    Returns:
+        True if a new version was published, False otherwise
+    """
+    version = version or settings.analysis_engine_version
+    try:
+        redis = await get_redis()
+        previous = await redis.getset(ENGINE_VERSION_KEY, version)
+        if isinstance(previous, bytes):
+            previous = previous.decode("utf-8")
+        if previous == version:
+            return False
+        await redis.publish(CACHE_INVALIDATION_CHANNEL, version)
+        logger.info(f"Announced analysis engine version {previous} → {version}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to announce engine version {version}: {e}")
+        return False
+
+
+async def _listen_for_invalidation() -> None:
+    """
+    Clear the L1 cache whenever another engine version is announced.
+
+    Runs until cancelled: errors are logged and the subscription is
+    re-established after a delay.
+    """
+    delay = PUBSUB_RECONNECT_DELAY
+    while True:
+        try:
+            async for version in _invalidation_messages():
+                delay = PUBSUB_RECONNECT_DELAY
+                removed = analysis_l1_cache.invalidate(version)
+                if removed:
+                    logger.info(
+                        f"L1 cache invalidated for engine version {version} "
+                        f"({removed} entries)"
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Cache invalidation listener failed, resubscribing in {delay:.0f}s: {e}"
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, PUBSUB_RECONNECT_MAX_DELAY)
+
+
+async def _invalidation_messages() -> AsyncIterator[str]:
+    """Engine versions announced on the invalidation channel."""
+    redis = await get_redis()
+    pubsub = redis.pubsub()
+    try:
+        await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+        while True:
+            # Polled with a read timeout: listen() blocks on the connection's
+            # socket timeout and fails as soon as the channel is idle that long
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=PUBSUB_POLL_TIMEOUT
+            )
+            if message is None or message.get("type") != "message":
+                continue
+            version = message["data"]
+            if isinstance(version, bytes):
+                version = version.decode("utf-8")
+            yield version
+    finally:
+        try:
+            await pubsub.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing invalidation subscription: {e}")
+
+
+async def start_cache_invalidation() -> None:
+    """
+    Subscribe to engine version announcements and announce our own.
+
+    No-op unless CACHE_INVALIDATION_PUBSUB is enabled.
+    """
+    global _invalidation_task
+    if not settings.cache_invalidation_pubsub or _invalidation_task is not None:
+        return
+    _invalidation_task = asyncio.create_task(_listen_for_invalidation())
+    await announce_engine_version()
+
+
+async def stop_cache_invalidation() -> None:
+    """Stop the pub/sub listener, if running."""
+    global _invalidation_task
+    if _invalidation_task is None:
+        return
+    _invalidation_task.cancel()
+    try:
+        await _invalidation_task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _invalidation_task = None
+
+
 def generate_cache_key(
     text: str,
     detect_bahr: bool = True,
     suggest_corrections: bool = False,
     analyze_rhyme: bool = True,
+    namespace: str = "",
+    version: Optional[str] = None,
 ) -> str:
     """
     Generate cache key from text and request parameters using SHA256 hash.
@@ -160,6 +519,8 @@ def generate_cache_key(
         detect_bahr: Whether bahr detection was requested
         suggest_corrections: Whether corrections were requested
         analyze_rhyme: Whether rhyme analysis was requested
+        namespace: Endpoint namespace (e.g. "v2"), hashed with the text
+        version: Engine version (default: settings.analysis_engine_version)
 
     Returns:
         Cache key string
@@ -167,10 +528,13 @@ def generate_cache_key(
     Example:
         >>> key = generate_cache_key("إذا غامرت في شرف مروم", detect_bahr=True)
         >>> key
-        'analysis:abc123...'
+        'analysis:1.0.0:abc123...'
     """
     # Include request parameters in cache key to avoid returning
     # cached results with different analysis options
     cache_data = f"{text}|{detect_bahr}|{suggest_corrections}|{analyze_rhyme}"
+    if namespace:
+        cache_data = f"{namespace}|{cache_data}"
     text_hash = hashlib.sha256(cache_data.encode("utf-8")).hexdigest()
-    return f"analysis:{text_hash}"
+    version = version or settings.analysis_engine_version
+    return f"analysis:{version}:{text_hash}"
@@ -0,0 +1,227 @@
+"""
+Stale-while-revalidate across analysis engine versions.
+
+Cache keys include ANALYSIS_ENGINE_VERSION (see
+app.db.redis.generate_cache_key), so a deploy that changes detector rules
+starts from an empty cache instead of serving old results for a day. To
+avoid the CPU spike of every popular verse missing at once, a rollout can
+set CACHE_STALE_WHILE_REVALIDATE and CACHE_PREVIOUS_ENGINE_VERSION:
+
+- a miss under the new version is answered right away with the previous
+  version's cached result, if there is one
+- the verse is re-analyzed in the background through the analysis
+  singleflight, so foreground misses of the same key share that analysis
+- at most CACHE_REVALIDATE_MAX_INFLIGHT background analyses run per worker;
+  beyond that the stale result is still served and a later read schedules
+  the re-analysis
+
+The cache refills under the new version at a bounded rate, and requests
+never wait for it.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.config import settings
+from app.db.singleflight import SingleFlight, analysis_singleflight
+from app.metrics.analysis_metrics import inc_revalidation, inc_stale_served
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StaleWhileRevalidate:
+    """
+    Serves previous-version cache entries while re-analyzing them.
+
+    Example:
+        >>> swr = StaleWhileRevalidate(enabled=True, previous_version="1.0.0")
+        >>> stale_key = generate_cache_key(text, version=swr.previous_version)
+        >>> result = await swr.serve_stale(stale_key, cache_key, compute, lookup)
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        previous_version: str = "",
+        current_version: str = "",
+        max_inflight: int = 2,
+        flight: Optional[SingleFlight] = None,
+        get: Optional[Callable[[str], Awaitable[Optional[Any]]]] = None,
+        get_many: Optional[
+            Callable[[List[str]], Awaitable[List[Optional[Any]]]]
+        ] = None,
+    ):
+        """
+        Args:
+            enabled: False makes serve_stale() always miss
+            previous_version: Engine version whose entries may be served
+            current_version: Engine version being served
+            max_inflight: Background re-analyses running at once
+            flight: Singleflight shared with the request path
+            get: Reads a raw cached value (default: app.db.redis.cache_get
+                without the L3 fallback)
+            get_many: Reads several (default: app.db.redis.cache_get_many
+                without the L3 fallback)
+        """
+        # Nothing to serve when the previous version is the current one
+        self.enabled = bool(
+            enabled and previous_version and previous_version != current_version
+        )
+        self.previous_version = previous_version
+        self.max_inflight = max_inflight
+        self._flight = flight or SingleFlight()
+        self._get = get
+        self._get_many = get_many
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def serve_stale(
+        self,
+        stale_key: str,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        lookup: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+        parse: Optional[Callable[[Any], T]] = None,
+    ) -> Optional[T]:
+        """
+        Previous-version result of a missed key, re-analyzing it in the background.
+
+        Args:
+            stale_key: Cache key under the previous engine version
+            key: Cache key under the current engine version
+            compute: Analyzes the verse and caches it under ``key``
+            lookup: Reads ``key`` from the cache (see SingleFlight.do)
+            parse: Converts the cached value; a value that fails to parse
+                is treated as a miss
+
+        Returns:
+            The stale result, or None if there is none (compute yourself)
+        """
+        if not self.enabled:
+            return None
+        try:
+            value = await self._read(stale_key)
+        except Exception as e:
+            logger.warning(f"Stale cache read failed for key {stale_key}: {e}")
+            return None
+        if not value:
+            return None
+        if parse is not None:
+            try:
+                value = parse(value)
+            except Exception as e:
+                logger.info(f"Ignoring unusable stale result for key {stale_key}: {e}")
+                return None
+
+        inc_stale_served()
+        self.revalidate(key, compute, lookup)
+        return value
+
+    async def serve_stale_many(
+        self,
+        stale_keys: Dict[str, str],
+        compute_for: Callable[[str], Callable[[], Awaitable[Any]]],
+        parse: Optional[Callable[[Any], T]] = None,
+    ) -> Dict[str, T]:
+        """
+        Batch version of serve_stale() with one multi-get.
+
+        Args:
+            stale_keys: Current cache key → cache key under the previous version
+            compute_for: Returns the compute function of a current cache key
+            parse: Converts cached values (see serve_stale)
+
+        Returns:
+            Stale results by current cache key (misses are left out)
+        """
+        if not self.enabled or not stale_keys:
+            return {}
+        keys = list(stale_keys)
+        try:
+            values = await self._read_many([stale_keys[key] for key in keys])
+        except Exception as e:
+            logger.warning(f"Stale cache read failed for {len(keys)} keys: {e}")
+            return {}
+
+        results: Dict[str, T] = {}
+        for key, value in zip(keys, values):
+            if not value:
+                continue
+            if parse is not None:
+                try:
+                    value = parse(value)
+                except Exception as e:
+                    logger.info(
+                        f"Ignoring unusable stale result for key {stale_keys[key]}: {e}"
+                    )
+                    continue
+            inc_stale_served()
+            self.revalidate(key, compute_for(key))
+            results[key] = value
+        return results
+
+    def revalidate(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        lookup: Optional[Callable[[], Awaitable[Optional[Any]]]] = None,
+    ) -> bool:
+        """
+        Re-analyze a key in the background unless too many already are.
+
+        Returns:
+            True if a re-analysis of the key is running
+        """
+        if key in self._tasks:
+            return True
+        if len(self._tasks) >= self.max_inflight:
+            inc_revalidation("skipped")
+            return False
+        inc_revalidation("scheduled")
+        task = asyncio.create_task(self._run(key, compute, lookup))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return True
+
+    async def drain(self) -> None:
+        """Wait for the running re-analyses (e.g. on shutdown)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def _run(self, key, compute, lookup) -> None:
+        try:
+            await self._flight.do(key, compute, lookup)
+            logger.debug(f"Revalidated cache key {key}")
+        except Exception as e:
+            logger.warning(f"Background re-analysis of {key} failed: {e}")
+
+    async def _read(self, key: str) -> Optional[Any]:
+        if self._get is None:
+            from app.db.redis import cache_get
+
+            return await cache_get(key, use_l3=False)
+        return await self._get(key)
+
+    async def _read_many(self, keys: List[str]) -> List[Optional[Any]]:
+        if self._get_many is None:
+            from app.db.redis import cache_get_many
+
+            return await cache_get_many(keys, use_l3=False)
+        return await self._get_many(keys)
+
+
+# Process-wide stale-while-revalidate for analysis results
+analysis_revalidator = StaleWhileRevalidate(
+    enabled=settings.cache_stale_while_revalidate,
+    previous_version=settings.cache_previous_engine_version,
+    current_version=settings.analysis_engine_version,
+    max_inflight=settings.cache_revalidate_max_inflight,
+    flight=analysis_singleflight,
+)
+
+__all__ = ["StaleWhileRevalidate", "analysis_revalidator"]
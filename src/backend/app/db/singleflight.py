@@ -0,0 +1,210 @@
+"""
+Singleflight coalescing of concurrent cache misses.
+
+When a verse goes viral, many identical requests miss the cache at the same
+moment. Instead of each running the full analysis:
+
+- within a worker, the first request for a cache key (the leader) runs the
+  analysis and every concurrent request for that key (a follower) awaits
+  the leader's asyncio future
+- across workers (SINGLEFLIGHT_REDIS_LEASE), the leader also takes a Redis
+  lease (SET NX PX); leaders of other workers that find the lease taken poll
+  the cache for the result, and compute it themselves if it does not show
+  up within SINGLEFLIGHT_WAIT_TIMEOUT
+
+Coalesced waits and wait timeouts are exported as Prometheus counters.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.config import settings
+from app.db.circuit_breaker import CircuitOpenError
+from app.metrics.analysis_metrics import (
+    inc_singleflight_coalesced,
+    inc_singleflight_timeout,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Prefix of the Redis lease keys
+LEASE_PREFIX = "singleflight:"
+
+
+class SingleFlight:
+    """
+    Per-key in-flight deduplication of async computations.
+
+    Example:
+        >>> flight = SingleFlight()
+        >>> result = await flight.do(cache_key, compute, lookup=read_cache)
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        redis_lease: bool = False,
+        lease_ttl: float = 30.0,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        get_redis: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        """
+        Args:
+            enabled: False runs every computation directly
+            redis_lease: Coordinate leaders across workers with a Redis lease
+            lease_ttl: Seconds before an abandoned lease expires
+            wait_timeout: Seconds a worker waits for another worker's result
+            poll_interval: Seconds between cache polls while waiting
+            get_redis: Returns the async Redis client (default:
+                app.db.redis.get_available_redis, which honours the circuit
+                breaker)
+        """
+        self.enabled = enabled
+        self.redis_lease = redis_lease
+        self.lease_ttl = lease_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._get_redis = get_redis
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        lookup: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+    ) -> T:
+        """
+        Run ``compute`` once for concurrent callers with the same key.
+
+        Args:
+            key: Cache key of the result
+            compute: Computes the result and stores it in the cache
+            lookup: Reads the result from the cache (None on a miss); needed
+                to wait for another worker's result
+
+        Returns:
+            The leader's result (exceptions are shared the same way)
+        """
+        if not self.enabled:
+            return await compute()
+
+        future = self._inflight.get(key)
+        if future is not None:
+            inc_singleflight_coalesced("local")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled (client went away): take over
+                return await self.do(key, compute, lookup)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._lead(key, compute, lookup)
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it so an unawaited future does not log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():  # Cancelled leader: followers take over
+                future.cancel()
+
+    async def _lead(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        lookup: Optional[Callable[[], Awaitable[Optional[T]]]],
+    ) -> T:
+        if not self.redis_lease or lookup is None:
+            return await compute()
+
+        token = uuid.uuid4().hex
+        lease_key = LEASE_PREFIX + key
+        try:
+            redis = await self._redis()
+            acquired = await redis.set(
+                lease_key, token, nx=True, px=int(self.lease_ttl * 1000)
+            )
+        except CircuitOpenError:
+            return await compute()
+        except Exception as e:
+            logger.warning(f"Singleflight lease unavailable for {key}: {e}")
+            return await compute()
+
+        if acquired:
+            try:
+                return await compute()
+            finally:
+                await self._release(redis, lease_key, token)
+
+        # Another worker is computing: wait for its result in the cache
+        inc_singleflight_coalesced("redis")
+        result = await self._wait_for(redis, lease_key, lookup)
+        if result is not None:
+            return result
+        inc_singleflight_timeout()
+        logger.info(f"Singleflight wait for {key} gave up, computing locally")
+        return await compute()
+
+    async def _wait_for(
+        self, redis, lease_key: str, lookup: Callable[[], Awaitable[Optional[T]]]
+    ) -> Optional[T]:
+        """Poll the cache until the result appears, the lease is gone or time runs out."""
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await lookup()
+            if result is not None:
+                return result
+            try:
+                if not await redis.exists(lease_key):
+                    # Released without a cached result (the leader failed)
+                    return await lookup()
+            except Exception:
+                return None
+        return None
+
+    async def _release(self, redis, lease_key: str, token: str) -> None:
+        # Only delete our own lease (it may have expired and been retaken)
+        try:
+            current = await redis.get(lease_key)
+            if isinstance(current, bytes):
+                current = current.decode("utf-8")
+            if current == token:
+                await redis.delete(lease_key)
+        except Exception as e:
+            logger.debug(f"Singleflight lease release failed for {lease_key}: {e}")
+
+    async def _redis(self):
+        if self._get_redis is None:
+            from app.db.redis import get_available_redis
+
+            self._get_redis = get_available_redis
+        return await self._get_redis()
+
+
+# Process-wide singleflight for analysis cache misses
+analysis_singleflight = SingleFlight(
+    enabled=settings.singleflight_enabled,
+    redis_lease=settings.singleflight_redis_lease,
+    lease_ttl=settings.singleflight_lease_ttl,
+    wait_timeout=settings.singleflight_wait_timeout,
+)
+
+__all__ = ["SingleFlight", "analysis_singleflight"]
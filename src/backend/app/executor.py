@@ -0,0 +1,251 @@
+"""Executor layer for CPU-bound verse analysis.
+
+The analyze endpoints are ``async def`` but the prosody pipeline (taqti3,
+meter detection, quality and rhyme analysis) is pure CPU work. Running it on
+the event loop stalls every other request served by the same worker, so the
+endpoints hand it to an ``AnalysisExecutor`` instead.
+
+Configuration (see app.config.Settings):
+ - ANALYSIS_EXECUTOR: "thread" (default), "process" or "inline"
+ - ANALYSIS_WORKERS: pool size
+ - ANALYSIS_QUEUE_SIZE: tasks allowed to wait for a free worker
+ - ANALYSIS_TIMEOUT: per-request timeout in seconds
+
+When ``workers + queue_size`` tasks are already in flight, new requests are
+rejected with 429 instead of piling up. Requests that exceed the timeout get
+503 and are counted by ``inc_timeout()``.
+
+Process pools use the "spawn" start method; each worker imports the modules
+listed in ``warm_modules`` on startup so detectors are built before the first
+request reaches it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException, status
+
+from .config import settings
+from .metrics.analysis_metrics import inc_timeout
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+# Modules that build the detectors; imported by process-pool workers at startup
+DEFAULT_WARM_MODULES = (
+    "app.api.v1.endpoints.analyze",
+    "app.api.v1.endpoints.analyze_v2",
+)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when the executor already has its maximum number of tasks."""
+
+
+class AnalysisTimeoutError(TimeoutError):
+    """Raised when an analysis task does not finish within the timeout."""
+
+
+def _warm_worker(modules: Sequence[str]) -> None:
+    """Process-pool initializer: build detectors, load CAMeL Tools and ML models."""
+    for name in modules:
+        importlib.import_module(name)
+
+    # The parent warms up in its startup event; spawned workers must do it too
+    # (before their first task, so workers never serve the degraded path)
+    try:
+        from app.warmup import register_default_components, warmup
+
+        register_default_components()
+        warmup.start(background=False)
+    except Exception as e:
+        logger.warning(f"Analysis worker could not warm up: {e}")
+
+
+class AnalysisExecutor:
+    """
+    Bounded executor for running synchronous analysis from async handlers.
+
+    Example:
+        >>> executor = AnalysisExecutor(kind="thread", max_workers=2)
+        >>> result = await executor.run(perform_taqti3, text)
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 4,
+        max_queue: int = 32,
+        timeout: Optional[float] = 10.0,
+        warm_modules: Sequence[str] = DEFAULT_WARM_MODULES,
+    ):
+        """
+        Args:
+            kind: "thread", "process" or "inline" (run on the event loop,
+                for debugging and tests)
+            max_workers: Number of worker threads/processes
+            max_queue: Tasks allowed to wait for a worker before rejecting
+            timeout: Per-task timeout in seconds (None or <= 0 disables it)
+            warm_modules: Modules imported by each process-pool worker
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(
+                f"Unknown executor kind {kind!r}, expected one of {EXECUTOR_KINDS}"
+            )
+
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.warm_modules = tuple(warm_modules)
+
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued tasks."""
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        """Tasks currently running or queued."""
+        return self._in_flight
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                    initargs=(self.warm_modules,),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="analysis"
+                )
+            logger.info(
+                f"Analysis executor started: kind={self.kind}, workers={self.max_workers}, "
+                f"queue={self.max_queue}, timeout={self.timeout}"
+            )
+        return self._pool
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise ExecutorSaturatedError(
+                    f"Analysis executor saturated ({self._in_flight}/{self.capacity} tasks)"
+                )
+            self._in_flight += 1
+
+    def _release(self, *_: Any) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run fn(*args) on the pool and await its result.
+
+        A slot is held until the task really finishes, even after a timeout,
+        so abandoned work still counts against the queue bound.
+
+        Raises:
+            ExecutorSaturatedError: Too many tasks in flight
+            AnalysisTimeoutError: The task exceeded the timeout
+        """
+        if self.kind == "inline":
+            return fn(*args)
+
+        self._acquire()
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # Only effective if it has not started yet
+            inc_timeout()
+            raise AnalysisTimeoutError(
+                f"Analysis did not finish within {self.timeout:.1f}s"
+            ) from None
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the pool (pending tasks are cancelled)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+_analysis_executor: Optional[AnalysisExecutor] = None
+
+
+def get_analysis_executor() -> AnalysisExecutor:
+    """Process-wide executor configured from settings."""
+    global _analysis_executor
+    if _analysis_executor is None:
+        _analysis_executor = AnalysisExecutor(
+            kind=settings.analysis_executor,
+            max_workers=settings.analysis_workers,
+            max_queue=settings.analysis_queue_size,
+            timeout=settings.analysis_timeout,
+        )
+    return _analysis_executor
+
+
+def shutdown_analysis_executor() -> None:
+    """Shut down the process-wide executor, if it was started."""
+    global _analysis_executor
+    if _analysis_executor is not None:
+        _analysis_executor.shutdown()
+        _analysis_executor = None
+
+
+async def run_analysis(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run an analysis function on the shared executor, mapping failures to HTTP.
+
+    Raises:
+        HTTPException: 429 when saturated, 503 on timeout
+    """
+    try:
+        return await get_analysis_executor().run(fn, *args)
+    except ExecutorSaturatedError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is busy analyzing other requests. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    except AnalysisTimeoutError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis took too long. Please try again with a shorter text.",
+            headers={"Retry-After": "1"},
+        )
+
+
+__all__ = [
+    "AnalysisExecutor",
+    "AnalysisTimeoutError",
+    "ExecutorSaturatedError",
+    "get_analysis_executor",
+    "run_analysis",
+    "shutdown_analysis_executor",
+]
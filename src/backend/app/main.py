@@ -8,12 +8,21 @@ from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .api.v1.router import api_router
 from .config import settings
-from .db.redis import close_redis, get_redis
+from .db.persistent_cache import analysis_l3_cache
+from .db.redis import (
+    close_redis,
+    get_redis,
+    start_cache_invalidation,
+    stop_cache_invalidation,
+)
+from .db.revalidation import analysis_revalidator
 from .exceptions import BahrException
+from .executor import shutdown_analysis_executor
 from .metrics.analysis_metrics import record_latency
 from .middleware.response_envelope import RequestIDMiddleware
 from .middleware.util_request_id import HEADER_NAME as REQUEST_ID_HEADER
 from .response_envelope import failure, success
+from .warmup import register_default_components, warmup
 
 try:
     from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
@@ -50,24 +59,30 @@ async def startup_event():
     try:
         await get_redis()
         print("✓ Redis connection initialized")
+        await start_cache_invalidation()
     except Exception as e:
         print(f"✗ Redis connection failed: {e}")
+
+    # Durable L3 cache: background write-behind flush and expiry sweep
+    await analysis_l3_cache.start()
     
-    # Load ML models
-    try:
-        from app.ml.model_loader import ml_service
-        models_loaded = ml_service.load_models()
-        if models_loaded:
-            print("✓ ML models loaded successfully (RandomForest ensemble ready)")
-        else:
-            print("⚠ ML models failed to load - using rule-based detection only")
-    except Exception as e:
-        print(f"⚠ ML model loading error: {e} - using rule-based detection only")
+    # Load CAMeL Tools and ML models; until they are ready requests use
+    # heuristic vowels and rule-based detection (see /health/ready)
+    register_default_components()
+    warmup.start(background=settings.warmup_in_background)
+    if settings.warmup_in_background:
+        print(f"✓ Warm-up started in background: {', '.join(warmup.names())}")
+    else:
+        print(f"✓ Warm-up finished: {warmup.status()['components']}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close Redis connection on shutdown."""
+    """Close Redis connection and stop the analysis executor on shutdown."""
+    await analysis_revalidator.drain()
+    shutdown_analysis_executor()
+    await analysis_l3_cache.stop()
+    await stop_cache_invalidation()
     await close_redis()
     print("✓ Redis connection closed")
 
@@ -77,6 +92,18 @@ async def health():
     return {"status": "healthy", "timestamp": time.time(), "version": app.version}
 
 
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: 503 until CAMeL Tools and ML models have settled."""
+    report = warmup.status()
+    body = {
+        "status": "ready" if report["ready"] else "starting",
+        "degraded": report["degraded"],
+        "components": report["components"],
+    }
+    return JSONResponse(body, status_code=200 if report["ready"] else 503)
+
+
 @app.get("/health/detailed")
 async def health_detailed():
     # Minimal stub; extend with real checks (DB/Redis) later
@@ -86,6 +113,7 @@ async def health_detailed():
             "database": {"status": "unknown", "message": "not wired"},
             "redis": {"status": "unknown", "message": "not wired"},
             "system": {"cpu_percent": 0, "memory_percent": 0},
+            "warmup": warmup.status()["components"],
         },
     }
 
@@ -23,6 +23,114 @@ ANALYSIS_TIMEOUTS = (
     else None
 )
 
+CACHE_L1_HITS = (
+    Counter("analysis_cache_l1_hits_total", "In-process analysis cache hits")
+    if Counter
+    else None
+)
+
+CACHE_L1_MISSES = (
+    Counter("analysis_cache_l1_misses_total", "In-process analysis cache misses")
+    if Counter
+    else None
+)
+
+CACHE_L1_EVICTIONS = (
+    Counter(
+        "analysis_cache_l1_evictions_total",
+        "In-process analysis cache entries evicted (size bound, expiry or invalidation)",
+    )
+    if Counter
+    else None
+)
+
+CACHE_L3_HITS = (
+    Counter("analysis_cache_l3_hits_total", "PostgreSQL analysis cache hits")
+    if Counter
+    else None
+)
+
+CACHE_L3_MISSES = (
+    Counter("analysis_cache_l3_misses_total", "PostgreSQL analysis cache misses")
+    if Counter
+    else None
+)
+
+SINGLEFLIGHT_COALESCED = (
+    Counter(
+        "analysis_singleflight_coalesced_total",
+        "Cache misses that waited for an in-flight analysis of the same key",
+        ["scope"],  # local (same worker) | redis (another worker's lease)
+    )
+    if Counter
+    else None
+)
+
+SINGLEFLIGHT_TIMEOUTS = (
+    Counter(
+        "analysis_singleflight_timeouts_total",
+        "Waits for another worker's analysis that timed out and computed locally",
+    )
+    if Counter
+    else None
+)
+
+CACHE_STALE_SERVED = (
+    Counter(
+        "analysis_cache_stale_served_total",
+        "Cache misses answered with the previous engine version's result",
+    )
+    if Counter
+    else None
+)
+
+CACHE_REVALIDATIONS = (
+    Counter(
+        "analysis_cache_revalidations_total",
+        "Background re-analyses of stale results",
+        ["outcome"],  # scheduled | skipped (too many in flight)
+    )
+    if Counter
+    else None
+)
+
+CIRCUIT_OPENED = (
+    Counter(
+        "cache_circuit_breaker_opened_total",
+        "Times a circuit breaker opened after consecutive failures",
+        ["name"],
+    )
+    if Counter
+    else None
+)
+
+CIRCUIT_REJECTED = (
+    Counter(
+        "cache_circuit_breaker_rejected_total",
+        "Calls skipped while a circuit breaker was open",
+        ["name"],
+    )
+    if Counter
+    else None
+)
+
+METER_SEARCH_SCORED = (
+    Counter(
+        "meter_search_scored_total", "Meters fully scored by the top-k meter search"
+    )
+    if Counter
+    else None
+)
+
+METER_SEARCH_PRUNED = (
+    Counter(
+        "meter_search_pruned_total",
+        "Meters skipped by the top-k meter search because their bound could not win",
+    )
+    if Counter
+    else None
+)
+
 
 def record_latency(seconds: float) -> None:
     if VERSE_ANALYSIS_LATENCY:
@@ -32,3 +140,65 @@ def record_latency(seconds: float) -> None:
 def inc_timeout() -> None:
     if ANALYSIS_TIMEOUTS:
         ANALYSIS_TIMEOUTS.inc()
+
+
+def inc_l1_hit() -> None:
+    if CACHE_L1_HITS:
+        CACHE_L1_HITS.inc()
+
+
+def inc_l1_miss() -> None:
+    if CACHE_L1_MISSES:
+        CACHE_L1_MISSES.inc()
+
+
+def inc_l1_eviction(count: int = 1) -> None:
+    if CACHE_L1_EVICTIONS and count:
+        CACHE_L1_EVICTIONS.inc(count)
+
+
+def inc_l3_hit() -> None:
+    if CACHE_L3_HITS:
+        CACHE_L3_HITS.inc()
+
+
+def inc_l3_miss() -> None:
+    if CACHE_L3_MISSES:
+        CACHE_L3_MISSES.inc()
+
+
+def inc_singleflight_coalesced(scope: str) -> None:
+    if SINGLEFLIGHT_COALESCED:
+        SINGLEFLIGHT_COALESCED.labels(scope=scope).inc()
+
+
+def inc_singleflight_timeout() -> None:
+    if SINGLEFLIGHT_TIMEOUTS:
+        SINGLEFLIGHT_TIMEOUTS.inc()
+
+
+def inc_stale_served() -> None:
+    if CACHE_STALE_SERVED:
+        CACHE_STALE_SERVED.inc()
+
+
+def inc_revalidation(outcome: str) -> None:
+    if CACHE_REVALIDATIONS:
+        CACHE_REVALIDATIONS.labels(outcome=outcome).inc()
+
+
+def inc_circuit_open(name: str) -> None:
+    if CIRCUIT_OPENED:
+        CIRCUIT_OPENED.labels(name=name).inc()
+
+
+def inc_circuit_rejected(name: str) -> None:
+    if CIRCUIT_REJECTED:
+        CIRCUIT_REJECTED.labels(name=name).inc()
+
+
+def record_meter_search(scored: int, pruned: int) -> None:
+    if METER_SEARCH_SCORED:
+        METER_SEARCH_SCORED.inc(scored)
+    if METER_SEARCH_PRUNED:
+        METER_SEARCH_PRUNED.inc(pruned)
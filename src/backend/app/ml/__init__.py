@@ -8,7 +8,7 @@ This module provides:
 - Production model loading and inference
 """
 
-from .feature_extractor import BAHRFeatureExtractor
+from .feature_extractor import BAHRFeatureExtractor, FeaturePlan
 from .model_loader import ml_service
 
-__all__ = ['BAHRFeatureExtractor', 'ml_service']
+__all__ = ['BAHRFeatureExtractor', 'FeaturePlan', 'ml_service']
@@ -0,0 +1,138 @@
+"""
+Content-addressed on-disk cache of extracted ML feature rows.
+
+Rows are keyed by the SHA-256 of the extractor version and the verse text,
+so regenerating a training matrix after a small dataset change only
+extracts the new verses, and bumping FEATURE_EXTRACTOR_VERSION invalidates
+every row at once.
+
+Layout of the cache directory:
+- features.npy: (n, n_features) float64 rows, opened as a read-only memmap
+- keys.npy: (n, 32) uint8 digests, row i of features.npy belongs to keys[i]
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever feature computation changes (invalidates cached rows)
+FEATURE_EXTRACTOR_VERSION = "1"
+
+
+def feature_key(verse_text: str, version: str = FEATURE_EXTRACTOR_VERSION) -> bytes:
+    """Content address of a verse's feature row."""
+    return hashlib.sha256(f"{version}\0{verse_text}".encode("utf-8")).digest()
+
+
+class FeatureCache:
+    """
+    Feature rows stored by content address in a .npy matrix.
+
+    Example:
+        >>> cache = FeatureCache("data/ml/feature_cache")
+        >>> cache.put_many({feature_key(text): row})
+        >>> cache.get_many([feature_key(text)])
+    """
+
+    def __init__(self, directory: Union[str, Path], n_features: int = 71):
+        """
+        Args:
+            directory: Cache directory (created on first write)
+            n_features: Row width; a cache of another width is ignored
+        """
+        self.directory = Path(directory)
+        self.n_features = n_features
+        self._features: Optional[np.ndarray] = None
+        self._index: Dict[bytes, int] = {}
+        self._load()
+
+    @property
+    def features_path(self) -> Path:
+        return self.directory / "features.npy"
+
+    @property
+    def keys_path(self) -> Path:
+        return self.directory / "keys.npy"
+
+    def _load(self) -> None:
+        if not (self.features_path.exists() and self.keys_path.exists()):
+            return
+        try:
+            features = np.load(self.features_path, mmap_mode="r")
+            keys = np.load(self.keys_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable feature cache {self.directory}: {e}")
+            return
+        if features.ndim != 2 or features.shape != (len(keys), self.n_features):
+            logger.warning(
+                f"Ignoring feature cache {self.directory}: shape {features.shape}"
+            )
+            return
+        self._features = features
+        self._index = {key.tobytes(): row for row, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._index
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached rows of the given keys (missing keys are left out)."""
+        return {
+            key: np.array(self._features[self._index[key]])
+            for key in keys
+            if key in self._index
+        }
+
+    def put_many(self, rows: Mapping[bytes, np.ndarray]) -> int:
+        """
+        Add rows and rewrite the cache files atomically.
+
+        Returns:
+            Number of new rows stored
+        """
+        new_keys: List[bytes] = [key for key in rows if key not in self._index]
+        if not new_keys:
+            return 0
+
+        new_rows = np.array([rows[key] for key in new_keys], dtype=np.float64).reshape(
+            len(new_keys), self.n_features
+        )
+        if self._features is not None and len(self._features):
+            features = np.concatenate([np.asarray(self._features), new_rows])
+            keys = list(self._index) + new_keys
+        else:
+            features, keys = new_rows, new_keys
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._atomic_save(self.features_path, features)
+        self._atomic_save(
+            self.keys_path,
+            np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(-1, 32),
+        )
+        self._features = None
+        self._index = {}
+        self._load()
+        return len(new_keys)
+
+    def _atomic_save(self, path: Path, array: np.ndarray) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+__all__ = ["FEATURE_EXTRACTOR_VERSION", "FeatureCache", "feature_key"]
@@ -10,16 +10,53 @@ Extracts comprehensive feature set (71 features) from Arabic poetry verses:
 - 10 linguistic features (word count, letter distribution, structure)
 
 Total: 71 features for ML training (XGBoost, Random Forest, etc.)
+
+For inference, a FeaturePlan built from the model's selected feature indices
+(optimized_feature_indices.npy) lets extract_selected() compute only the
+feature groups those columns need, straight into a float32 array.
 """
 
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
 from collections import Counter
 
+from ..core.analysis_context import AnalysisContext
 from ..core.phonetics import text_to_phonetic_pattern
 from ..core.prosody.pattern_similarity import PatternSimilarity
 from ..core.prosody.meters import METERS_REGISTRY
 from ..core.prosody.detector_v2_hybrid import EMPIRICAL_PATTERNS
+from .feature_cache import FeatureCache, feature_key
+
+
+@dataclass(frozen=True)
+class FeaturePlan:
+    """
+    Selected feature columns and the computations they need.
+
+    Attributes:
+        names: Selected feature names, in model column order
+        indices: Their positions among the 71 extracted features
+        pattern: Pattern features are needed
+        similarity_meters: Meters whose similarity scan is needed
+        discriminative: Discriminative/relative features are needed (these
+            need the similarity to every meter)
+        rule_meters: Meters whose rule feature is needed
+        linguistic: Linguistic features are needed
+    """
+
+    names: Tuple[str, ...]
+    indices: Tuple[int, ...]
+    pattern: bool
+    similarity_meters: FrozenSet[int]
+    discriminative: bool
+    rule_meters: FrozenSet[int]
+    linguistic: bool
+
+    def __len__(self) -> int:
+        return len(self.names)
 
 
 class BAHRFeatureExtractor:
@@ -41,9 +78,18 @@ class BAHRFeatureExtractor:
         """Initialize feature extractor with similarity calculator."""
         self.similarity_calc = PatternSimilarity()
         self.meter_ids = sorted(EMPIRICAL_PATTERNS.keys())
+        self._feature_names = self.get_feature_names()
+
+        # Empirical patterns packed once for vectorized similarity scoring
+        self._encoded_patterns = {
+            meter_id: PatternSimilarity.encode_patterns(data.get('patterns', []))
+            for meter_id, data in EMPIRICAL_PATTERNS.items()
+            if data.get('patterns')
+        }
 
     def extract_features(self, verse_text: str, include_target: bool = False,
-                        target_meter_id: Optional[int] = None) -> Dict[str, float]:
+                        target_meter_id: Optional[int] = None,
+                        context: Optional[AnalysisContext] = None) -> Dict[str, float]:
         """
         Extract all 71 features from a verse.
 
@@ -51,16 +97,19 @@ class BAHRFeatureExtractor:
             verse_text: Arabic verse text (with or without tashkeel)
             include_target: Whether to include target meter ID
             target_meter_id: True meter ID (for training data)
+            context: Optional shared AnalysisContext (reuses its phonemes)
 
         Returns:
             Dictionary with 71 feature values + optional target
         """
+        to_pattern = context.pattern if context is not None else text_to_phonetic_pattern
+
         # Convert text to phonetic pattern
         try:
-            pattern = text_to_phonetic_pattern(verse_text, has_tashkeel=True)
+            pattern = to_pattern(verse_text, has_tashkeel=True)
         except Exception:
             # Fallback for verses without tashkeel
-            pattern = text_to_phonetic_pattern(verse_text, has_tashkeel=False)
+            pattern = to_pattern(verse_text, has_tashkeel=False)
 
         if not pattern:
             # Return zero features if pattern extraction fails
@@ -86,6 +135,108 @@ class BAHRFeatureExtractor:
 
         return features
 
+    def plan(self, indices: Union[str, Path, Sequence[int], np.ndarray]) -> FeaturePlan:
+        """
+        Build the plan computing only the selected feature columns.
+
+        Args:
+            indices: Selected column indices (into get_feature_names()), or
+                the path of an optimized_feature_indices.npy file
+
+        Returns:
+            FeaturePlan for extract_selected()
+        """
+        if isinstance(indices, (str, Path)):
+            indices = np.load(indices)
+        indices = tuple(int(i) for i in np.asarray(indices).ravel())
+        all_names = self.get_feature_names()
+        names = tuple(all_names[i] for i in indices)
+
+        pattern_names = set(all_names[:8])
+        linguistic_names = set(all_names[-10:])
+        discriminative = any(
+            name.startswith(('relative_similarity_meter_', 'similarity_spread',
+                             'similarity_ratio', 'similarity_std', 'similarity_mean',
+                             'is_clear_winner'))
+            for name in names
+        )
+        similarity_meters = (
+            set(self.meter_ids) if discriminative
+            else {int(n.rsplit('_', 1)[1]) for n in names if n.startswith('similarity_to_meter_')}
+        )
+        rule_meters = {int(n.rsplit('_', 1)[1]) for n in names if n.startswith('rule_match_meter_')}
+
+        return FeaturePlan(
+            names=names,
+            indices=indices,
+            pattern=any(name in pattern_names for name in names),
+            similarity_meters=frozenset(similarity_meters),
+            discriminative=discriminative,
+            rule_meters=frozenset(rule_meters),
+            linguistic=any(name in linguistic_names for name in names),
+        )
+
+    def extract_selected(self, verse_text: str, plan: FeaturePlan,
+                         out: Optional[np.ndarray] = None,
+                         context: Optional[AnalysisContext] = None) -> np.ndarray:
+        """
+        Extract only the features of a plan.
+
+        Same values as extract_features() for the planned columns, but skips
+        the feature groups (and per-meter scans) no column depends on.
+
+        Args:
+            verse_text: Arabic verse text (with or without tashkeel)
+            plan: FeaturePlan from plan()
+            out: Optional preallocated array of len(plan) to fill
+            context: Optional shared AnalysisContext (reuses its phonemes)
+
+        Returns:
+            float32 array of len(plan), in plan column order (``out`` if given)
+        """
+        if out is None:
+            out = np.empty(len(plan), dtype=np.float32)
+
+        to_pattern = context.pattern if context is not None else text_to_phonetic_pattern
+        try:
+            pattern = to_pattern(verse_text, has_tashkeel=True)
+        except Exception:
+            pattern = to_pattern(verse_text, has_tashkeel=False)
+
+        if not pattern:
+            features = self._get_zero_features()
+        else:
+            features = {}
+            if plan.pattern:
+                features.update(self._extract_pattern_features(pattern))
+            if plan.similarity_meters:
+                similarity_features = self._extract_similarity_features(
+                    pattern, plan.similarity_meters
+                )
+                features.update(similarity_features)
+                if plan.discriminative:
+                    features.update(self._extract_discriminative_features(similarity_features))
+            if plan.rule_meters:
+                features.update(self._extract_rule_features(verse_text, pattern, plan.rule_meters))
+            if plan.linguistic:
+                features.update(self._extract_linguistic_features(verse_text))
+
+        for column, name in enumerate(plan.names):
+            out[column] = features[name]
+        return out
+
+    def extract_selected_batch(self, verse_texts: Sequence[str], plan: FeaturePlan) -> np.ndarray:
+        """
+        Extract the features of a plan for many verses.
+
+        Returns:
+            float32 matrix of shape (n_verses, len(plan))
+        """
+        matrix = np.empty((len(verse_texts), len(plan)), dtype=np.float32)
+        for row, verse_text in enumerate(verse_texts):
+            self.extract_selected(verse_text, plan, out=matrix[row])
+        return matrix
+
     def _extract_pattern_features(self, pattern: str) -> Dict[str, float]:
         """
         Extract 8 basic pattern features.
@@ -137,32 +288,28 @@ class BAHRFeatureExtractor:
 
         return features
 
-    def _extract_similarity_features(self, pattern: str) -> Dict[str, float]:
+    def _extract_similarity_features(self, pattern: str,
+                                     meter_ids: Optional[FrozenSet[int]] = None) -> Dict[str, float]:
         """
         Extract 16 similarity features (one per meter).
 
         For each meter, compute minimum weighted edit distance to its empirical patterns.
         Features: similarity_to_meter_1, similarity_to_meter_2, ..., similarity_to_meter_16
+        (only those of ``meter_ids`` if given)
         """
         features = {}
 
         for meter_id in self.meter_ids:
-            if meter_id not in EMPIRICAL_PATTERNS:
-                features[f'similarity_to_meter_{meter_id}'] = 0.0
+            if meter_ids is not None and meter_id not in meter_ids:
                 continue
-
-            meter_patterns = EMPIRICAL_PATTERNS[meter_id].get('patterns', [])
-            if not meter_patterns:
+            encoded = self._encoded_patterns.get(meter_id)
+            if encoded is None:
                 features[f'similarity_to_meter_{meter_id}'] = 0.0
                 continue
 
             # Find best similarity to any pattern in this meter
-            best_similarity = 0.0
-            for meter_pattern in meter_patterns:
-                similarity = self.similarity_calc.calculate_similarity(
-                    pattern, meter_pattern
-                )
-                best_similarity = max(best_similarity, similarity)
+            similarities = self.similarity_calc.similarity_many(pattern, encoded)
+            best_similarity = max(0.0, float(similarities.max()))
 
             features[f'similarity_to_meter_{meter_id}'] = best_similarity
 
@@ -231,12 +378,14 @@ class BAHRFeatureExtractor:
 
         return features
 
-    def _extract_rule_features(self, verse_text: str, pattern: str) -> Dict[str, float]:
+    def _extract_rule_features(self, verse_text: str, pattern: str,
+                               meter_ids: Optional[FrozenSet[int]] = None) -> Dict[str, float]:
         """
         Extract 16 rule-based features (one per meter).
 
         For each meter, check if verse matches theoretical prosodic rules.
         Features: rule_match_meter_1, rule_match_meter_2, ..., rule_match_meter_16
+        (only those of ``meter_ids`` if given)
 
         This is a simplified version - in full implementation, would check:
         - Taf'ilah structure matches
@@ -249,6 +398,8 @@ class BAHRFeatureExtractor:
         # For now, use pattern-based heuristics
         # TODO: Implement full theoretical rule checking
         for meter_id in self.meter_ids:
+            if meter_ids is not None and meter_id not in meter_ids:
+                continue
             # Simple heuristic: does pattern length match expected range for this meter?
             if meter_id in EMPIRICAL_PATTERNS:
                 meter_patterns = EMPIRICAL_PATTERNS[meter_id].get('patterns', [])
@@ -379,68 +530,87 @@ class BAHRFeatureExtractor:
 
         return features
 
-    def extract_batch(self, verses: List[Tuple[str, Optional[int]]]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    def feature_vector(self, verse_text: str) -> np.ndarray:
+        """
+        Extract all 71 features of a verse as a row in get_feature_names() order.
+
+        Returns:
+            float64 array of shape (71,)
+        """
+        features = self.extract_features(verse_text)
+        return np.array([features[name] for name in self._feature_names], dtype=np.float64)
+
+    def extract_batch(self, verses: List[Tuple[str, Optional[int]]],
+                      n_jobs: int = 1, chunk_size: int = 64,
+                      cache_dir: Optional[Union[str, Path]] = None,
+                      progress: Optional[Callable[[int, int], None]] = None
+                      ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
         """
         Extract features from multiple verses efficiently.
 
+        Repeated verses are extracted once. With ``cache_dir``, rows are read
+        from and added to a content-addressed FeatureCache, so only verses
+        not seen before (by this extractor version) are extracted.
+
         Args:
             verses: List of (verse_text, meter_id) tuples
+            n_jobs: Worker processes for uncached verses (1 = in this process)
+            chunk_size: Verses per worker task
+            cache_dir: Optional FeatureCache directory
+            progress: Optional callback(done, total), called as verses complete
 
         Returns:
             Tuple of (feature_matrix, target_array)
             - feature_matrix: Shape (n_verses, 71)
             - target_array: Shape (n_verses,) or None if no targets
         """
-        feature_list = []
-        target_list = []
-        has_targets = any(meter_id is not None for _, meter_id in verses)
-
-        for verse_text, meter_id in verses:
-            features = self.extract_features(
-                verse_text,
-                include_target=has_targets,
-                target_meter_id=meter_id
-            )
-
-            # Extract feature values in consistent order
-            feature_values = []
-
-            # Pattern features (8)
-            for feat in ['pattern_length', 'sakin_count', 'mutaharrik_count', 'sakin_ratio',
-                        'pattern_complexity', 'consecutive_sakin_max', 'consecutive_mutaharrik_max',
-                        'rhythm_alternation']:
-                feature_values.append(features[feat])
-
-            # Similarity features (16)
-            for meter_id_feat in self.meter_ids:
-                feature_values.append(features[f'similarity_to_meter_{meter_id_feat}'])
-
-            # Discriminative features (5)
-            for feat in ['similarity_spread', 'similarity_ratio', 'similarity_std',
-                        'similarity_mean', 'is_clear_winner']:
-                feature_values.append(features[feat])
-
-            # Relative similarity features (16)
-            for meter_id_feat in self.meter_ids:
-                feature_values.append(features[f'relative_similarity_meter_{meter_id_feat}'])
-
-            # Rule features (16)
-            for meter_id_feat in self.meter_ids:
-                feature_values.append(features[f'rule_match_meter_{meter_id_feat}'])
-
-            # Linguistic features (10)
-            for feat in ['word_count', 'avg_word_length', 'unique_letters', 'letter_diversity',
-                        'has_tanween', 'has_shadda', 'vowel_density', 'long_vowel_count',
-                        'verse_length_chars', 'hamza_count']:
-                feature_values.append(features[feat])
+        n_features = len(self._feature_names)
+        texts = [verse_text for verse_text, _ in verses]
+        keys = [feature_key(verse_text) for verse_text in texts]
+        cache = FeatureCache(cache_dir, n_features) if cache_dir is not None else None
+
+        rows = cache.get_many(set(keys)) if cache is not None else {}
+        pending = {key: text for key, text in zip(keys, texts) if key not in rows}
+        done = len(verses) - sum(1 for key in keys if key in pending)
+        if progress is not None:
+            progress(done, len(verses))
+
+        pending_keys = list(pending)
+        chunks = [pending_keys[start:start + chunk_size]
+                  for start in range(0, len(pending_keys), chunk_size)]
+        key_counts = Counter(keys)
+
+        def add_chunk(chunk_keys: List[bytes], chunk_rows: np.ndarray) -> None:
+            nonlocal done
+            rows.update(zip(chunk_keys, chunk_rows))
+            done += sum(key_counts[key] for key in chunk_keys)
+            if progress is not None:
+                progress(done, len(verses))
+
+        if n_jobs > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                futures = {
+                    pool.submit(_extract_chunk, [pending[key] for key in chunk]): chunk
+                    for chunk in chunks
+                }
+                for future in as_completed(futures):
+                    add_chunk(futures[future], future.result())
+        else:
+            for chunk in chunks:
+                add_chunk(chunk, np.array([self.feature_vector(pending[key]) for key in chunk]))
 
-            feature_list.append(feature_values)
+        if cache is not None and pending:
+            cache.put_many({key: rows[key] for key in pending_keys})
 
-            if has_targets and meter_id is not None:
-                target_list.append(meter_id)
+        feature_matrix = np.array([rows[key] for key in keys], dtype=np.float64).reshape(
+            len(verses), n_features
+        )
 
-        feature_matrix = np.array(feature_list)
-        target_array = np.array(target_list) if has_targets else None
+        has_targets = any(meter_id is not None for _, meter_id in verses)
+        target_array = (
+            np.array([meter_id for _, meter_id in verses if meter_id is not None])
+            if has_targets else None
+        )
 
         return feature_matrix, target_array
 
@@ -481,3 +651,14 @@ class BAHRFeatureExtractor:
         ])
 
         return feature_names
+
+
+# Extractor of a worker process (see BAHRFeatureExtractor.extract_batch)
+_worker_extractor: Optional[BAHRFeatureExtractor] = None
+
+
+def _extract_chunk(verse_texts: List[str]) -> np.ndarray:
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = BAHRFeatureExtractor()
+    return np.array([_worker_extractor.feature_vector(text) for text in verse_texts])
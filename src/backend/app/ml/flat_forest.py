@@ -0,0 +1,232 @@
+"""
+RandomForest flattened into contiguous NumPy node arrays for serving.
+
+export_forest() writes every tree of a fitted RandomForestClassifier into
+one set of node arrays (split feature, threshold, children, leaf class
+probabilities). FlatForest loads them with np.load(mmap_mode='r'), so API
+workers share the pages through the OS page cache instead of each holding
+unpickled sklearn objects, and predicts with a vectorized traversal of all
+trees at once.
+
+FlatForest.predict_proba() reproduces the sklearn model's predict_proba()
+within float tolerance.
+
+Layout of an export directory:
+- feature.npy (int32), threshold.npy (float64): split of each node
+- left.npy, right.npy (int32): children; a leaf points to itself
+- value.npy (float64): (n_nodes, n_classes) leaf class probabilities
+- roots.npy (int32): root node of each tree
+- classes.npy: class labels (model.classes_)
+- flat_forest.json: format version, shapes, traversal depth and the SHA-256
+  of the pickle it was exported from (see FlatForest.matches())
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FLAT_FOREST_FORMAT = 1
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "classes")
+
+
+def _sha256(path: Union[str, Path]) -> str:
+    """SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_forest(
+    model, directory: Union[str, Path], source: Optional[Union[str, Path]] = None
+) -> Path:
+    """
+    Flatten a fitted RandomForestClassifier into node arrays.
+
+    Args:
+        model: Fitted single-output RandomForestClassifier
+        directory: Export directory (created if needed)
+        source: Pickle the model was loaded from; its SHA-256 is recorded
+            so a stale export can be detected after retraining
+
+    Returns:
+        The export directory
+    """
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output forests can be flattened")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+
+        # Per-tree class probabilities, as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "classes": np.asarray(model.classes_),
+    }
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(array))
+
+    with open(directory / "flat_forest.json", "w") as f:
+        json.dump(
+            {
+                "format": FLAT_FOREST_FORMAT,
+                "n_trees": len(roots),
+                "n_nodes": offset,
+                "n_features": int(model.n_features_in_),
+                "n_classes": len(model.classes_),
+                "max_depth": int(max_depth),
+                "source_sha256": _sha256(source) if source is not None else None,
+            },
+            f,
+            indent=2,
+        )
+
+    logger.info(f"Exported {len(roots)} trees ({offset} nodes) to {directory}")
+    return directory
+
+
+class FlatForest:
+    """
+    Array-based RandomForest predictor (see export_forest()).
+
+    Offers the part of the RandomForestClassifier interface the API uses:
+    predict_proba(), predict(), classes_ and n_features_in_.
+
+    Example:
+        >>> forest = FlatForest.load("models/ensemble_v1/random_forest_flat")
+        >>> forest.predict_proba(X).shape
+        (n_samples, 16)
+    """
+
+    def __init__(
+        self,
+        feature,
+        threshold,
+        left,
+        right,
+        value,
+        roots,
+        classes,
+        n_features: int,
+        max_depth: int,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.max_depth = max_depth
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> "FlatForest":
+        """
+        Load an export directory.
+
+        Args:
+            directory: Directory written by export_forest()
+            mmap: Memory-map the node arrays (shared between processes)
+        """
+        directory = Path(directory)
+        with open(directory / "flat_forest.json") as f:
+            meta = json.load(f)
+        if meta.get("format") != FLAT_FOREST_FORMAT:
+            raise ValueError(f"Unsupported flat forest format: {meta.get('format')}")
+
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in ARRAYS
+        }
+        return cls(
+            n_features=meta["n_features"],
+            max_depth=meta["max_depth"],
+            **arrays,
+        )
+
+    @classmethod
+    def exists(cls, directory: Union[str, Path]) -> bool:
+        """True if ``directory`` holds a flat forest export."""
+        return (Path(directory) / "flat_forest.json").exists()
+
+    @classmethod
+    def matches(cls, directory: Union[str, Path], source: Union[str, Path]) -> bool:
+        """
+        True if the export in ``directory`` was made from the pickle ``source``.
+
+        False when the pickle has been rewritten since (e.g. by retraining
+        without re-running scripts/export_flat_forest.py) or the export does
+        not record its source.
+        """
+        with open(Path(directory) / "flat_forest.json") as f:
+            recorded = json.load(f).get("source_sha256")
+        return recorded is not None and recorded == _sha256(source)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leaf node reached in every tree.
+
+        Returns:
+            (n_samples, n_trees) global node indices
+        """
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has shape {X.shape}, expected (n_samples, {self.n_features_in_})"
+            )
+
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        # Leaves point to themselves, so max_depth steps reach every leaf
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities averaged over the trees (n_samples, n_classes)."""
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Most probable class label of each sample."""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+__all__ = ["FLAT_FOREST_FORMAT", "FlatForest", "export_forest"]
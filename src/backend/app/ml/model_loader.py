@@ -2,16 +2,121 @@
 
 Loads the trained RandomForest ensemble on startup and provides
 prediction interface for the analyze endpoint.
+
+predict_batch() scores a whole feature matrix with one predict_proba call.
+predict_batched() lets concurrent requests (analysis executor threads) share
+that call through a PredictionBatcher micro-batching queue.
+extract_features() computes only the 45 selected features (see FeaturePlan)
+with one extractor shared by all requests.
 """
 
 import joblib
 import numpy as np
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Union
 import logging
 
+from app.config import settings
+from app.ml.flat_forest import FlatForest
+
 logger = logging.getLogger(__name__)
 
+# Meter names by training label (label = index + 1, see scripts/ml/train_baseline_models.py)
+METER_LABELS = [
+    'طويل', 'كامل', 'وافر', 'رمل', 'بسيط', 'متقارب', 'رجز', 'سريع',
+    'مديد', 'منسرح', 'هزج', 'خفيف', 'مجتث', 'مقتضب', 'مضارع', 'متدارك'
+]
+
+
+class PredictionBatcher:
+    """
+    Micro-batching queue in front of a batch predictor.
+
+    Rows submitted by concurrent threads within max_wait of each other (up
+    to max_batch_size rows) are stacked and scored with one predictor call.
+
+    Example:
+        >>> batcher = PredictionBatcher(ml_service.predict_batch)
+        >>> batcher.predict(feature_row)["meter"]
+        'طويل'
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[np.ndarray], List[dict]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.002,
+    ):
+        """
+        Args:
+            predict_batch: Scores a 2D feature matrix, one result per row
+            max_batch_size: Maximum rows per predictor call
+            max_wait: Seconds to wait for more rows after the first one
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, row: np.ndarray) -> Future:
+        """Queue one feature row; the future resolves to its prediction."""
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="ml-batcher", daemon=True
+                )
+                self._thread.start()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row: np.ndarray, timeout: Optional[float] = None) -> dict:
+        """Predict one feature row through the queue (blocking)."""
+        return self.submit(row).result(timeout)
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = [
+                (row, future)
+                for row, future in self._next_batch()
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                results = self.predict_batch(np.vstack([row for row, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
 
 class MLModelService:
     """Singleton service for ML model inference"""
@@ -32,22 +137,51 @@ class MLModelService:
         self.feature_indices = None
         self.metadata = None
         self.meter_mapping = None
+        self._feature_names: Optional[List[str]] = None
+        self.extractor = None
+        self.feature_plan = None
+        self._class_meters: Optional[List[str]] = None
+        self._batcher: Optional[PredictionBatcher] = None
+        self._batcher_lock = threading.Lock()
         self._initialized = True
         
     def load_models(self, models_dir: str = "models/ensemble_v1"):
-        """Load the production RandomForest model and metadata"""
+        """Load the production RandomForest model and metadata
+
+        May run in a background thread (see app.warmup): the model is
+        published last, so is_loaded() only turns True once everything
+        predict() needs is in place.
+        """
         try:
             models_path = Path(models_dir)
             
-            # Load RandomForest (best performer: 60.1% test accuracy)
+            # Load RandomForest (best performer: 60.1% test accuracy),
+            # preferring its memory-mapped flat export (see app.ml.flat_forest)
+            flat_path = models_path / "random_forest_flat"
             model_path = models_path / "random_forest_model.pkl"
-            self.model = joblib.load(model_path)
-            logger.info(f"✅ Loaded RandomForest model from {model_path}")
+            use_flat = settings.ml_flat_forest and FlatForest.exists(flat_path)
+            if use_flat and model_path.exists() and not FlatForest.matches(flat_path, model_path):
+                logger.warning(
+                    f"⚠️  {flat_path} was not exported from {model_path}; "
+                    "loading the pickle (re-run scripts/export_flat_forest.py)"
+                )
+                use_flat = False
+            if use_flat:
+                model = FlatForest.load(flat_path)
+                logger.info(f"✅ Loaded flat RandomForest from {flat_path}")
+            else:
+                model = joblib.load(model_path)
+                logger.info(f"✅ Loaded RandomForest model from {model_path}")
             
             # Load optimized feature indices (45 features)
             feature_path = models_path / "optimized_feature_indices.npy"
             self.feature_indices = np.load(feature_path)
             logger.info(f"✅ Loaded {len(self.feature_indices)} optimized features")
+
+            # Shared extractor computing only the selected features
+            from app.ml.feature_extractor import BAHRFeatureExtractor
+            self.extractor = BAHRFeatureExtractor()
+            self.feature_plan = self.extractor.plan(self.feature_indices)
             
             # Load metadata
             import json
@@ -57,11 +191,11 @@ class MLModelService:
             logger.info(f"✅ Loaded ensemble metadata (CV: {self.metadata.get('cv_scores', {}).get('random_forest', 'N/A')}%)")
             
             # Meter mapping (same order as training)
-            self.meter_mapping = [
-                'طويل', 'مديد', 'بسيط', 'وافر', 'كامل', 'هزج', 'رجز', 'رمل',
-                'سريع', 'منسرح', 'خفيف', 'مضارع', 'مقتضب', 'مجتث', 'متقارب', 'متدارك'
-            ]
+            self.meter_mapping = list(METER_LABELS)
+            # Meter of each predict_proba column
+            self._class_meters = [self.meter_mapping[int(label) - 1] for label in model.classes_]
             
+            self.model = model
             logger.info("🚀 ML Model Service initialized successfully")
             return True
             
@@ -69,6 +203,93 @@ class MLModelService:
             logger.error(f"❌ Failed to load ML models: {e}")
             return False
     
+    @property
+    def feature_names(self) -> List[str]:
+        """Ordered names of the 71 extracted features (computed once)."""
+        if self._feature_names is None:
+            from app.ml.feature_extractor import BAHRFeatureExtractor
+            extractor = self.extractor or BAHRFeatureExtractor()
+            self._feature_names = extractor.get_feature_names()
+        return self._feature_names
+
+    def extract_features(self, verse_text: str, context=None) -> np.ndarray:
+        """
+        Extract the model's selected features for one verse.
+
+        Args:
+            verse_text: Arabic verse text
+            context: Optional shared AnalysisContext
+
+        Returns:
+            float32 row of the 45 selected features, ready for predict_batch()
+        """
+        if self.feature_plan is None:
+            raise RuntimeError("Model not loaded. Call load_models() first.")
+        return self.extractor.extract_selected(verse_text, self.feature_plan, context=context)
+
+    def features_to_matrix(self, features_dicts: Sequence[Dict[str, float]]) -> np.ndarray:
+        """
+        Stack feature dicts from BAHRFeatureExtractor into a model input matrix.
+
+        Returns:
+            (n, n_features) array with the optimized features selected
+        """
+        names = self.feature_names
+        matrix = np.array(
+            [[features[name] for name in names] for features in features_dicts],
+            dtype=np.float32,
+        ).reshape(len(features_dicts), len(names))
+        if self.feature_indices is not None:
+            matrix = matrix[:, self.feature_indices]
+        return matrix
+
+    def predict_batch(self, feature_matrix: np.ndarray, top_k: int = 3) -> List[Dict[str, any]]:
+        """
+        Predict meters for many verses with one predict_proba call.
+
+        Args:
+            feature_matrix: (n, 71) extracted features in get_feature_names()
+                order, or (n, 45) already reduced to the optimized features
+            top_k: Number of ranked meters per verse
+
+        Returns:
+            One dict per row, as predict()
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load_models() first.")
+
+        # RandomForest compares float32 thresholds, so float32 input is exact
+        features = np.asarray(feature_matrix, dtype=np.float32)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if (
+            self.feature_indices is not None
+            and features.shape[1] == len(self.feature_names)
+        ):
+            # Select optimized features (71 → 45)
+            features = features[:, self.feature_indices]
+
+        probabilities = self.model.predict_proba(features)
+        best = probabilities.argmax(axis=1)
+
+        # Top-k columns per row: partition, then sort only those k
+        k = min(top_k, probabilities.shape[1])
+        top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+        top_probabilities = np.take_along_axis(probabilities, top, axis=1)
+        order = np.argsort(-top_probabilities, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+
+        meters = self._class_meters
+        return [
+            {
+                "meter": meters[best[row]],
+                "confidence": float(probabilities[row, best[row]]),
+                "top_k": [(meters[i], float(probabilities[row, i])) for i in top[row]],
+                "probabilities": {meters[i]: float(p) for i, p in enumerate(probabilities[row])},
+            }
+            for row in range(len(probabilities))
+        ]
+
     def predict(self, features_dict: Dict[str, float]) -> Dict[str, any]:
         """
         Predict meter using the RandomForest model
@@ -79,49 +300,43 @@ class MLModelService:
         Returns:
             dict with keys: meter, confidence, probabilities, top_k
         """
-        if self.model is None:
-            raise RuntimeError("Model not loaded. Call load_models() first.")
-        
         try:
-            # Convert dict to array using feature names
-            from app.ml.feature_extractor import BAHRFeatureExtractor
-            extractor = BAHRFeatureExtractor()
-            feature_names = extractor.get_feature_names()
-            
-            # Build feature array in correct order
-            features = np.array([features_dict[fname] for fname in feature_names])
-            
-            # Select optimized features (71 → 45)
-            if self.feature_indices is not None:
-                features_optimized = features[self.feature_indices]
-            else:
-                features_optimized = features
-            
-            # Reshape for sklearn (expects 2D)
-            features_2d = features_optimized.reshape(1, -1)
-            
-            # Get prediction and probabilities
-            prediction = self.model.predict(features_2d)[0]
-            probabilities = self.model.predict_proba(features_2d)[0]
-            
-            # Map to meter name
-            meter = self.meter_mapping[prediction]
-            confidence = float(probabilities[prediction])
-            
-            # Get top 3 predictions
-            top_k_indices = np.argsort(probabilities)[-3:][::-1]
-            top_k_meters = [(self.meter_mapping[i], float(probabilities[i])) for i in top_k_indices]
-            
-            return {
-                "meter": meter,
-                "confidence": confidence,
-                "top_k": top_k_meters,
-                "probabilities": {self.meter_mapping[i]: float(p) for i, p in enumerate(probabilities)}
-            }
-            
+            return self.predict_batch(self.features_to_matrix([features_dict]))[0]
         except Exception as e:
             logger.error(f"Prediction error: {e}")
             raise
+
+    def predict_batched(
+        self,
+        features: Union[Dict[str, float], np.ndarray],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, any]:
+        """
+        Predict one verse through the micro-batching queue (see ML_MICRO_BATCHING).
+
+        Concurrent callers are scored together with one predict_proba call.
+
+        Args:
+            features: Feature dict from BAHRFeatureExtractor, or a row from
+                extract_features()
+            timeout: Seconds to wait for the prediction
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load_models() first.")
+        if isinstance(features, dict):
+            features = self.features_to_matrix([features])
+        row = np.asarray(features, dtype=np.float32).reshape(1, -1)
+        if not settings.ml_micro_batching:
+            return self.predict_batch(row)[0]
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = PredictionBatcher(
+                        self.predict_batch,
+                        max_batch_size=settings.ml_batch_max_size,
+                        max_wait=settings.ml_batch_max_wait_ms / 1000,
+                    )
+        return self._batcher.predict(row, timeout)
     
     def is_loaded(self) -> bool:
         """Check if model is loaded and ready"""
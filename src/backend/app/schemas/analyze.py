@@ -254,6 +254,20 @@ class AnalyzeResponse(BaseModel):
         ..., ge=0.0, le=100.0, description="Overall quality score (0-100)"
     )
 
+    @classmethod
+    def from_cache(cls, data: dict) -> "AnalyzeResponse":
+        """
+        Rebuild a cached response (model_dump() of a validated response).
+
+        Validated in one pydantic-core call: building the nested models with
+        model_construct skips validation but runs in Python and is about
+        three times slower for this schema.
+
+        Args:
+            data: Cached model_dump() of an AnalyzeResponse
+        """
+        return cls.model_validate(data)
+
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -280,3 +294,135 @@ class AnalyzeResponse(BaseModel):
             ]
         }
     }
+
+
+# Maximum verses accepted by one batch request
+BATCH_MAX_ITEMS = 500
+
+
+class AnalyzeBatchRequest(BaseModel):
+    """
+    Request schema for batch verse analysis.
+
+    Attributes:
+        items: Verses to analyze, each with its own options
+    """
+
+    items: List[AnalyzeRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+        description=f"Verses to analyze (1-{BATCH_MAX_ITEMS})",
+    )
+
+
+class AnalyzeBatchItem(BaseModel):
+    """
+    One line of the batch analysis stream (NDJSON).
+
+    Attributes:
+        index: Position of the verse in the request
+        result: Analysis result (None if the verse failed)
+        error: Error message (None on success)
+        cached: Whether the result came from the cache
+    """
+
+    index: int = Field(..., ge=0, description="Position of the verse in the request")
+    result: Optional[AnalyzeResponse] = Field(None, description="Analysis result")
+    error: Optional[str] = Field(None, description="Error message if analysis failed")
+    cached: bool = Field(False, description="Whether the result came from the cache")
+
+
+# Maximum verses accepted by one poem request
+POEM_MAX_VERSES = 200
+
+
+class AnalyzePoemRequest(BaseModel):
+    """
+    Request schema for streamed poem analysis.
+
+    Attributes:
+        text: Poem text, one verse (bayt) per line
+        detect_bahr: Whether to detect the meter of each verse
+        suggest_corrections: Whether to suggest corrections per verse
+        analyze_rhyme: Whether to analyze rhyme per verse
+    """
+
+    text: str = Field(
+        ...,
+        min_length=5,
+        max_length=POEM_MAX_VERSES * 2000,
+        description="Poem text, one verse (bayt) per line",
+    )
+    detect_bahr: bool = Field(
+        default=True, description="Whether to detect the meter (bahr)"
+    )
+    suggest_corrections: bool = Field(
+        default=False, description="Whether to suggest prosodic corrections"
+    )
+    analyze_rhyme: bool = Field(
+        default=True, description="Whether to analyze rhyme (qafiyah) per verse"
+    )
+
+
+class PoemMeterSummary(BaseModel):
+    """Majority meter across the verses of a poem."""
+
+    id: int = Field(..., description="Meter ID")
+    name_ar: str = Field(..., description="Arabic name")
+    name_en: str = Field(..., description="English name")
+    verse_count: int = Field(..., ge=0, description="Verses detected in this meter")
+    ratio: float = Field(
+        ..., ge=0.0, le=1.0, description="Share of the analyzed verses in this meter"
+    )
+    mean_confidence: float = Field(
+        ..., ge=0.0, le=1.0, description="Mean confidence over those verses"
+    )
+
+
+class PoemRhymeError(BaseModel):
+    """A rhyme consistency error (إقواء، سناد، إكفاء، ...)."""
+
+    type: str = Field(..., description="Error type")
+    message_ar: str = Field(..., description="Arabic description")
+    message_en: str = Field(..., description="English description")
+
+
+class PoemRhymeInfo(BaseModel):
+    """Poem-level rhyme consistency."""
+
+    is_consistent: bool = Field(..., description="Whether all verses share the rhyme")
+    common_rawi: Optional[str] = Field(None, description="Common rawi (if consistent)")
+    common_rawi_vowel: Optional[str] = Field(
+        None, description="Common rawi vowel (if consistent)"
+    )
+    consistency_score: float = Field(
+        ..., ge=0.0, le=1.0, description="Rhyme consistency score"
+    )
+    errors: List[PoemRhymeError] = Field(
+        default_factory=list, description="Detected rhyme errors"
+    )
+    summary_ar: str = Field(..., description="Arabic summary")
+    summary_en: str = Field(..., description="English summary")
+
+
+class PoemSummary(BaseModel):
+    """
+    Final event of a streamed poem analysis.
+
+    Attributes:
+        verse_count: Number of verses in the poem
+        analyzed_count: Verses analyzed successfully
+        majority_meter: Most frequent detected meter (None if none detected)
+        rhyme: Rhyme consistency of the analyzed verses (None for fewer
+            than two, or if it failed)
+    """
+
+    verse_count: int = Field(..., ge=0, description="Number of verses in the poem")
+    analyzed_count: int = Field(..., ge=0, description="Verses analyzed successfully")
+    majority_meter: Optional[PoemMeterSummary] = Field(
+        None, description="Most frequent detected meter"
+    )
+    rhyme: Optional[PoemRhymeInfo] = Field(
+        None, description="Poem-level rhyme consistency"
+    )
@@ -0,0 +1,214 @@
+"""Background warm-up of heavy resources with per-component readiness.
+
+Loading CAMeL Tools' MLE disambiguator and the RandomForest models takes
+seconds. Doing it at import time or in the startup event delays every worker,
+so the API loads them in background threads instead and keeps serving:
+
+ - vowel_inference: until CAMeL Tools is ready, undiacritized text gets the
+   heuristic vowel inference
+ - ml_models: until the models are ready, /analyze uses rule-based
+   detection only
+
+``GET /health/ready`` reports the state of each component and answers 503
+until every component has settled (ready, or degraded when the resource is
+not available at all). Results computed before then come from the fallbacks
+and are not cached. Set WARMUP_IN_BACKGROUND=false to load everything in the
+startup event instead (the worker then only serves once warmed up).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentState(str, Enum):
+    """Loading state of a warm-up component."""
+
+    PENDING = "pending"  # Not started yet
+    LOADING = "loading"  # Loading in the background
+    READY = "ready"  # Loaded and in use
+    DEGRADED = "degraded"  # Not available; the fallback path is used
+    FAILED = "failed"  # Loading raised; the fallback path is used
+
+
+# States after which a component no longer changes
+SETTLED_STATES = (ComponentState.READY, ComponentState.DEGRADED, ComponentState.FAILED)
+
+
+@dataclass
+class WarmupComponent:
+    """
+    A heavy resource loaded in the background.
+
+    Attributes:
+        name: Component name reported by /health/ready
+        loader: Loads the resource; returns False if it is not available
+        state: Current loading state
+        detail: Error message of a failed load
+        started_at: time.monotonic() when loading started
+        finished_at: time.monotonic() when loading settled
+    """
+
+    name: str
+    loader: Callable[[], bool]
+    state: ComponentState = ComponentState.PENDING
+    detail: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _thread: Optional[threading.Thread] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        """Readiness report of the component."""
+        report = {"state": self.state.value}
+        if self.started_at is not None:
+            end = self.finished_at if self.finished_at is not None else time.monotonic()
+            report["seconds"] = round(end - self.started_at, 3)
+        if self.detail:
+            report["detail"] = self.detail
+        return report
+
+
+class WarmupRegistry:
+    """
+    Registered warm-up components and their loading state.
+
+    Example:
+        >>> registry = WarmupRegistry()
+        >>> registry.register("ml_models", ml_service.load_models)
+        >>> registry.start()
+        >>> registry.status()["ready"]
+        False
+    """
+
+    def __init__(self):
+        self._components: Dict[str, WarmupComponent] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], bool]) -> None:
+        """Register a component (a registered name is kept as is)."""
+        with self._lock:
+            self._components.setdefault(name, WarmupComponent(name, loader))
+
+    def _load(self, component: WarmupComponent) -> None:
+        component.started_at = time.monotonic()
+        try:
+            loaded = component.loader()
+            state = (
+                ComponentState.READY if loaded is not False else ComponentState.DEGRADED
+            )
+        except Exception as e:
+            logger.error(f"Warm-up of {component.name} failed: {e}", exc_info=True)
+            component.detail = str(e)
+            state = ComponentState.FAILED
+        component.finished_at = time.monotonic()
+        component.state = state
+        logger.info(
+            f"Warm-up of {component.name}: {state.value} "
+            f"({component.finished_at - component.started_at:.2f}s)"
+        )
+
+    def start(self, background: bool = True) -> None:
+        """
+        Load every pending component.
+
+        Args:
+            background: Load in daemon threads (True) or here, one after the
+                other (False)
+        """
+        with self._lock:
+            pending = [
+                c
+                for c in self._components.values()
+                if c.state == ComponentState.PENDING
+            ]
+            for component in pending:
+                component.state = ComponentState.LOADING
+        for component in pending:
+            if background:
+                component._thread = threading.Thread(
+                    target=self._load,
+                    args=(component,),
+                    name=f"warmup-{component.name}",
+                    daemon=True,
+                )
+                component._thread.start()
+            else:
+                self._load(component)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for background loading to settle.
+
+        Returns:
+            True if every component has settled
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for component in list(self._components.values()):
+            if component._thread is not None:
+                remaining = (
+                    None if deadline is None else max(0.0, deadline - time.monotonic())
+                )
+                component._thread.join(remaining)
+        return self.is_ready()
+
+    def is_ready(self) -> bool:
+        """True once every component has settled (ready or on its fallback)."""
+        return all(c.state in SETTLED_STATES for c in self._components.values())
+
+    def status(self) -> dict:
+        """
+        Readiness report for /health/ready.
+
+        Returns:
+            {"ready": bool, "degraded": bool, "components": {name: report}}
+        """
+        components = list(self._components.values())
+        return {
+            "ready": self.is_ready(),
+            "degraded": any(c.state != ComponentState.READY for c in components),
+            "components": {c.name: c.to_dict() for c in components},
+        }
+
+    def names(self) -> List[str]:
+        """Registered component names."""
+        return list(self._components)
+
+
+# Process-wide registry used by the API
+warmup = WarmupRegistry()
+
+
+def _load_vowel_inference() -> bool:
+    from app.api.v1.endpoints.analyze_v2 import bahr_detector_v2
+
+    inferencer = bahr_detector_v2.vowel_inferencer
+    return inferencer is not None and inferencer.load_disambiguator()
+
+
+def _load_ml_models() -> bool:
+    from app.ml.model_loader import ml_service
+
+    return ml_service.is_loaded() or ml_service.load_models()
+
+
+def register_default_components(registry: WarmupRegistry = warmup) -> WarmupRegistry:
+    """Register the API's heavy resources (CAMeL Tools, ML models)."""
+    registry.register("vowel_inference", _load_vowel_inference)
+    registry.register("ml_models", _load_ml_models)
+    return registry
+
+
+__all__ = [
+    "ComponentState",
+    "WarmupComponent",
+    "WarmupRegistry",
+    "register_default_components",
+    "warmup",
+]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Export the trained RandomForest to flat NumPy node arrays for serving.
+
+Usage:
+    python scripts/export_flat_forest.py
+    python scripts/export_flat_forest.py --models-dir ../../models/ensemble_v1
+
+Writes <models-dir>/random_forest_flat, which the API loads memory-mapped
+instead of random_forest_model.pkl (see app/ml/flat_forest.py), and checks
+that the export reproduces predict_proba. Run again after retraining: the
+export records the pickle's SHA-256, and the API falls back to the pickle
+when they no longer match.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ml.flat_forest import FlatForest, export_forest
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+MODELS_DIR = REPO_ROOT / "models" / "ensemble_v1"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    parser.add_argument("--samples", type=int, default=2000, help="Parity check rows")
+    args = parser.parse_args()
+
+    model_path = args.models_dir / "random_forest_model.pkl"
+    model = joblib.load(model_path)
+    directory = export_forest(model, args.models_dir / "random_forest_flat", source=model_path)
+    forest = FlatForest.load(directory)
+
+    # Parity check on random rows spanning the trained thresholds
+    rng = np.random.default_rng(0)
+    thresholds = forest.threshold[forest.left != np.arange(len(forest.left))]
+    X = rng.uniform(thresholds.min() - 1, thresholds.max() + 1, (args.samples, model.n_features_in_))
+    error = float(np.abs(forest.predict_proba(X) - model.predict_proba(X)).max())
+    size = sum(path.stat().st_size for path in directory.iterdir())
+
+    print(f"✓ Exported {len(forest.roots)} trees ({len(forest.left)} nodes, {size / 1024:.0f} KiB) to {directory}")
+    print(f"  max |predict_proba difference|: {error:.2e}")
+    if error > 1e-9:
+        print("✗ Export does not reproduce predict_proba")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
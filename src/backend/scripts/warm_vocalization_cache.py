@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Warm the shared vocalization cache of vowel inference from diacritized corpora.
+
+Usage:
+    python scripts/warm_vocalization_cache.py
+    python scripts/warm_vocalization_cache.py --backend sqlite --path /var/cache/bahr/vocalizations.sqlite3
+
+Reads every golden-set JSONL file and the poetry_sources.py verses, and stores
+the most common vocalization of each word in the configured store
+(VOCALIZATION_CACHE_BACKEND / VOCALIZATION_CACHE_PATH / REDIS_URL unless given
+on the command line). Safe to run again: existing words are replaced.
+"""
+
+import argparse
+import itertools
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.core.vocalization_cache import (
+    MIN_CORPUS_SHARE,
+    create_vocalization_store,
+    load_golden_texts,
+    load_poetry_sources,
+    warm_vocalization_store,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+GOLDEN_DIR = REPO_ROOT / "data" / "processed" / "datasets" / "evaluation"
+POETRY_SOURCES = REPO_ROOT / "data" / "raw" / "ml_dataset" / "poetry_sources.py"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--backend",
+        default=settings.vocalization_cache_backend,
+        choices=["sqlite", "redis"],
+        help="Store to warm (default: VOCALIZATION_CACHE_BACKEND)",
+    )
+    parser.add_argument("--path", default=settings.vocalization_cache_path, help="SQLite file")
+    parser.add_argument("--redis-url", default=settings.redis_url, help="Redis URL")
+    parser.add_argument("--golden-dir", type=Path, default=GOLDEN_DIR)
+    parser.add_argument("--poetry-sources", type=Path, default=POETRY_SOURCES)
+    parser.add_argument("--min-share", type=float, default=MIN_CORPUS_SHARE)
+    args = parser.parse_args()
+
+    golden_files = sorted(args.golden_dir.glob("golden_set_*.jsonl"))
+    corpora = [load_golden_texts(golden_files)]
+    if args.poetry_sources.exists():
+        corpora.append(load_poetry_sources(args.poetry_sources))
+    print(f"Golden-set files: {len(golden_files)}, poetry sources: {args.poetry_sources.exists()}")
+
+    store = create_vocalization_store(args.backend, args.path, args.redis_url)
+    try:
+        count = warm_vocalization_store(store, itertools.chain(*corpora), args.min_share)
+        print(f"✓ Stored {count} word vocalizations ({args.backend}, {len(store)} total)")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,194 @@
+"""
+Integration tests for the batch analyze V2 endpoint.
+
+Tests cover:
+- Streaming NDJSON results in request order
+- Deduplication of identical verses
+- Cache hits via a single multi-get and pipelined writes
+- Per-item error isolation and batch validation
+"""
+
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api.v1.endpoints import analyze_v2
+from app.main import app
+
+VERSES = [
+    "قِفا نَبكِ مِن ذِكرى حَبيبٍ وَمَنزِلِ",
+    "إذا غامَرتَ في شَرَفٍ مَرومِ",
+    "أَلا لَيتَ الشَبابَ يَعودُ يَوماً",
+]
+
+
+@pytest.fixture
+async def async_client():
+    """Async HTTP client for the FastAPI application."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    """In-memory replacement for the Redis multi-get/multi-set helpers."""
+    store = {}
+    calls = {"get_many": 0, "set_many": 0}
+
+    async def cache_get_many(keys):
+        calls["get_many"] += 1
+        return [store.get(key) for key in keys]
+
+    async def cache_set_many(items, ttl=86400, normalized_texts=None):
+        calls["set_many"] += 1
+        store.update(items)
+        return True
+
+    monkeypatch.setattr(analyze_v2, "cache_get_many", cache_get_many)
+    monkeypatch.setattr(analyze_v2, "cache_set_many", cache_set_many)
+    return store, calls
+
+
+@pytest.fixture
+def analysis_calls(monkeypatch):
+    """Record which verses actually reach the analysis pipeline."""
+    analyzed = []
+    original = analyze_v2._perform_analysis_v2
+
+    def recording(request, normalized_text):
+        analyzed.append(normalized_text)
+        return original(request, normalized_text)
+
+    monkeypatch.setattr(analyze_v2, "_perform_analysis_v2", recording)
+    return analyzed
+
+
+def parse_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_in_order(async_client, fake_cache, analysis_calls):
+    """Every verse gets one line, in request order."""
+    response = await async_client.post(
+        "/api/v1/analyze-v2/batch",
+        json={"items": [{"text": verse} for verse in VERSES]},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = parse_ndjson(response)
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    for line, verse in zip(lines, VERSES):
+        assert line["error"] is None
+        assert line["result"]["text"] == verse
+        assert line["cached"] is False
+
+
+@pytest.mark.asyncio
+async def test_batch_deduplicates_and_caches(async_client, fake_cache, analysis_calls):
+    """Duplicates are analyzed once; a repeat batch is served from cache."""
+    store, calls = fake_cache
+    payload = {"items": [{"text": VERSES[0]}, {"text": VERSES[1]}, {"text": VERSES[0]}]}
+
+    first = parse_ndjson(await async_client.post("/api/v1/analyze-v2/batch", json=payload))
+
+    assert len(analysis_calls) == 2
+    assert first[0]["result"] == first[2]["result"]
+    assert len(store) == 2
+    assert calls == {"get_many": 1, "set_many": 1}
+
+    second = parse_ndjson(await async_client.post("/api/v1/analyze-v2/batch", json=payload))
+
+    assert len(analysis_calls) == 2
+    assert all(line["cached"] for line in second)
+    assert [line["result"] for line in second] == [line["result"] for line in first]
+
+
+@pytest.mark.asyncio
+async def test_batch_item_error_is_isolated(async_client, fake_cache, monkeypatch):
+    """A failing verse yields an error line without failing the batch."""
+    original = analyze_v2._perform_analysis_v2
+
+    def failing(request, normalized_text):
+        if request.text == VERSES[1]:
+            raise ValueError("Invalid verse structure: test")
+        return original(request, normalized_text)
+
+    monkeypatch.setattr(analyze_v2, "_perform_analysis_v2", failing)
+
+    lines = parse_ndjson(
+        await async_client.post(
+            "/api/v1/analyze-v2/batch",
+            json={"items": [{"text": verse} for verse in VERSES]},
+        )
+    )
+
+    assert lines[1]["error"] == "Invalid verse structure: test"
+    assert lines[1]["result"] is None
+    assert lines[0]["result"] is not None
+    assert lines[2]["result"] is not None
+
+
+@pytest.mark.asyncio
+async def test_batch_validation(async_client):
+    """Empty batches and invalid items are rejected."""
+    empty = await async_client.post("/api/v1/analyze-v2/batch", json={"items": []})
+    invalid = await async_client.post(
+        "/api/v1/analyze-v2/batch", json={"items": [{"text": "hello world"}]}
+    )
+
+    assert empty.status_code == 422
+    assert invalid.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_serves_previous_engine_version(
+    async_client, fake_cache, analysis_calls, monkeypatch
+):
+    """During a rollout, previous-version results are served and re-analyzed in the background."""
+    from app.db.revalidation import StaleWhileRevalidate
+    from app.db.singleflight import SingleFlight
+    from app.schemas.analyze import AnalyzeRequest
+
+    store, _ = fake_cache
+    payload = {"items": [{"text": verse} for verse in VERSES]}
+    first = parse_ndjson(await async_client.post("/api/v1/analyze-v2/batch", json=payload))
+
+    # Move the results under the previous engine version's keys
+    for verse in VERSES:
+        request = AnalyzeRequest(text=verse)
+        normalized_text = analyze_v2._normalize_verse(verse)
+        current = analyze_v2._cache_key_v2(request, normalized_text)
+        previous = analyze_v2._cache_key_v2(request, normalized_text, version="0.9.0")
+        store[previous] = store.pop(current)
+
+    async def get_many(keys):
+        return [store.get(key) for key in keys]
+
+    async def cache_set(key, value, ttl=86400, normalized_text=None):
+        store[key] = value
+        return True
+
+    revalidator = StaleWhileRevalidate(
+        enabled=True,
+        previous_version="0.9.0",
+        current_version=analyze_v2.settings.analysis_engine_version,
+        max_inflight=len(VERSES),
+        flight=SingleFlight(),
+        get_many=get_many,
+    )
+    monkeypatch.setattr(analyze_v2, "analysis_revalidator", revalidator)
+    monkeypatch.setattr(analyze_v2, "cache_set", cache_set)
+    analysis_calls.clear()
+
+    second = parse_ndjson(await async_client.post("/api/v1/analyze-v2/batch", json=payload))
+
+    assert all(line["cached"] for line in second)
+    assert [line["result"] for line in second] == [line["result"] for line in first]
+    await revalidator.drain()
+    assert sorted(analysis_calls) == sorted(analyze_v2._normalize_verse(v) for v in VERSES)
+    assert len(store) == 2 * len(VERSES)
+
@@ -0,0 +1,184 @@
+"""
+Integration tests for the streamed poem analysis endpoint.
+
+Tests cover:
+- One verse event per line, in poem order, followed by a summary
+- Majority meter and rhyme consistency aggregation
+- Server-Sent Events format
+- Invalid lines and empty poems
+"""
+
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api.v1.endpoints import analyze_v2
+from app.api.v1.endpoints.analyze_v2 import split_poem_verses
+from app.main import app
+from app.schemas.analyze import AnalyzeResponse, BahrInfo
+
+# Opening of Imru' al-Qais's mu'allaqa (الطويل, rawi ل)
+POEM = """قِفا نَبكِ مِن ذِكرى حَبيبٍ وَمَنزِلِ    بِسِقطِ اللِوى بَينَ الدَخولِ فَحَومَلِ
+فَتوضِحَ فَالمِقراةِ لَم يَعفُ رَسمُها    لِما نَسَجَتها مِن جَنوبٍ وَشَمأَلِ
+
+تَرى بَعَرَ الآرامِ في عَرَصاتِها    وَقيعانِها كَأَنَّهُ حَبُّ فُلفُلِ"""
+
+
+@pytest.fixture
+async def async_client():
+    """Async HTTP client for the FastAPI application."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    """Keep the tests independent of a running Redis."""
+
+    async def cache_get_many(keys):
+        return [None] * len(keys)
+
+    async def cache_set_many(items, ttl=86400, normalized_texts=None):
+        return True
+
+    monkeypatch.setattr(analyze_v2, "cache_get_many", cache_get_many)
+    monkeypatch.setattr(analyze_v2, "cache_set_many", cache_set_many)
+
+
+def test_split_poem_verses():
+    """Blank lines are dropped and lines are stripped."""
+    assert split_poem_verses(" أ ب ت \n\n  ث ج ح\n") == ["أ ب ت", "ث ج ح"]
+
+
+@pytest.mark.asyncio
+async def test_poem_stream_ndjson(async_client):
+    """Verse events arrive in order and the summary comes last."""
+    response = await async_client.post("/api/v1/analyze-v2/poem", json={"text": POEM})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [e["type"] for e in events] == ["verse", "verse", "verse", "summary"]
+    assert [e["index"] for e in events[:3]] == [0, 1, 2]
+    assert all(e["result"] is not None for e in events[:3])
+
+    summary = events[-1]
+    assert summary["verse_count"] == 3
+    assert summary["analyzed_count"] == 3
+    assert summary["rhyme"] is not None
+    assert summary["rhyme"]["consistency_score"] >= 0.0
+
+
+@pytest.mark.asyncio
+async def test_poem_majority_meter(async_client, monkeypatch):
+    """The most frequent detected meter wins."""
+    verses = split_poem_verses(POEM)
+    meters = {verses[0]: (2, 0.8), verses[1]: (1, 0.9), verses[2]: (2, 0.6)}
+
+    def fixed_meter(request, normalized_text):
+        meter_id, confidence = meters[request.text]
+        return AnalyzeResponse(
+            text=request.text,
+            taqti3="-",
+            bahr=BahrInfo(
+                id=meter_id, name_ar=f"m{meter_id}", name_en=f"m{meter_id}",
+                confidence=confidence,
+            ),
+            score=50.0,
+        )
+
+    monkeypatch.setattr(analyze_v2, "_perform_analysis_v2", fixed_meter)
+    response = await async_client.post("/api/v1/analyze-v2/poem", json={"text": POEM})
+    summary = json.loads(response.text.splitlines()[-1])
+
+    majority = summary["majority_meter"]
+    assert majority["id"] == 2
+    assert majority["verse_count"] == 2
+    assert majority["ratio"] == pytest.approx(2 / 3)
+    assert majority["mean_confidence"] == pytest.approx(0.7)
+
+
+@pytest.mark.asyncio
+async def test_poem_stream_sse(async_client):
+    """Accept: text/event-stream switches to Server-Sent Events."""
+    response = await async_client.post(
+        "/api/v1/analyze-v2/poem",
+        json={"text": POEM},
+        headers={"Accept": "text/event-stream"},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in response.text.split("\n\n") if b]
+    assert [b.splitlines()[0] for b in blocks] == ["event: verse"] * 3 + ["event: summary"]
+    assert json.loads(blocks[0].splitlines()[1][len("data: "):])["index"] == 0
+
+
+@pytest.mark.asyncio
+async def test_poem_invalid_line_is_error_event(async_client):
+    """Lines that are not Arabic verses become error events."""
+    text = POEM.splitlines()[0] + "\nhello world, not a verse"
+    response = await async_client.post("/api/v1/analyze-v2/poem", json={"text": text})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert events[0]["error"] is None
+    assert events[1]["error"]
+    assert events[-1]["type"] == "summary"
+    assert events[-1]["analyzed_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_poem_without_verses(async_client):
+    """A poem of blank lines is rejected."""
+    response = await async_client.post(
+        "/api/v1/analyze-v2/poem", json={"text": "\n\n\n\n\n\n"}
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_poem_summary_counts_only_analyzed_verses(async_client, monkeypatch):
+    """Failed lines count neither towards the meter ratio nor the rhyme check."""
+    rhyme_verses = []
+
+    def fixed_meter(request, normalized_text):
+        return AnalyzeResponse(
+            text=request.text,
+            taqti3="-",
+            bahr=BahrInfo(id=1, name_ar="m1", name_en="m1", confidence=0.9),
+            score=50.0,
+        )
+
+    def record_rhyme(verses):
+        rhyme_verses.extend(verses)
+        raise ValueError("not checked here")
+
+    monkeypatch.setattr(analyze_v2, "_perform_analysis_v2", fixed_meter)
+    monkeypatch.setattr(analyze_v2, "analyze_poem_rhyme", record_rhyme)
+    lines = POEM.splitlines()
+    text = "\n".join([lines[0], "hello world, not a verse", lines[1]])
+    response = await async_client.post("/api/v1/analyze-v2/poem", json={"text": text})
+    summary = json.loads(response.text.splitlines()[-1])
+
+    assert (summary["verse_count"], summary["analyzed_count"]) == (3, 2)
+    assert summary["majority_meter"]["ratio"] == pytest.approx(1.0)
+    assert rhyme_verses == [lines[0].strip(), lines[1].strip()]
+
+
+@pytest.mark.asyncio
+async def test_poem_summary_failure_is_error_event(async_client, monkeypatch):
+    """An unexpected summary failure ends the stream with an error event."""
+
+    def broken_summary(verses, items):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(analyze_v2, "_summarize_poem", broken_summary)
+    response = await async_client.post("/api/v1/analyze-v2/poem", json={"text": POEM})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert [e["type"] for e in events] == ["verse", "verse", "verse", "error"]
+    assert events[-1]["status_code"] == 500
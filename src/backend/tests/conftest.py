@@ -2,8 +2,11 @@
 Pytest configuration and shared fixtures for integration tests.
 """
 
+import os
+
 import pytest
 import asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 
 @pytest.fixture(scope="session")
@@ -26,3 +29,130 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "slow: marks tests as slow (deselect with '-m \"not slow\"')"
     )
+
+    # Detectors built by tests (and by process-pool workers, which read the
+    # environment) must not write pattern snapshots into the real temp dir;
+    # snapshot tests pass tmp_path explicitly
+    os.environ["PATTERN_SNAPSHOT_ENABLED"] = "false"
+    from app.config import settings
+
+    settings.pattern_snapshot_enabled = False
+
+
+class FakeClock:
+    """Settable time source for code that takes a ``clock`` callable."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakePipeline:
+    """Queues mget/setex and runs them in one round trip of its FakeRedis."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def mget(self, keys):
+        self.commands.append(("mget", list(keys)))
+
+    def setex(self, key, ttl, value):
+        self.commands.append(("setex", key, value))
+
+    async def execute(self):
+        self.redis.round_trip()
+        results = []
+        for command in self.commands:
+            if command[0] == "mget":
+                results.append([self.redis.data.get(key) for key in command[1]])
+            else:
+                self.redis.data[command[1]] = command[2]
+                results.append(True)
+        return results
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for redis.asyncio.Redis.
+
+    Reads are recorded in ``calls``, published messages in ``published`` and
+    every round trip (a command or a pipeline) in ``round_trips``. Setting
+    ``down`` makes every round trip raise a Redis ConnectionError.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+        self.published = []
+        self.round_trips = 0
+        self.down = False
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.down:
+            raise RedisConnectionError("Connection refused")
+
+    async def get(self, key):
+        self.round_trip()
+        self.calls.append(("get", key))
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.round_trip()
+        self.calls.append(("mget", tuple(keys)))
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, px=None):
+        self.round_trip()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode("utf-8") if isinstance(value, str) else value
+        return True
+
+    async def setex(self, key, ttl, value):
+        self.round_trip()
+        self.data[key] = value
+
+    async def getset(self, key, value):
+        self.round_trip()
+        previous = self.data.get(key)
+        self.data[key] = value
+        return previous
+
+    async def delete(self, *keys):
+        self.round_trip()
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, *keys):
+        self.round_trip()
+        return sum(key in self.data for key in keys)
+
+    async def publish(self, channel, message):
+        self.round_trip()
+        self.published.append((channel, message))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def clock():
+    """FakeClock starting at 1000.0 (set ``now`` to a datetime for UTC clocks)."""
+    return FakeClock()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """FakeRedis returned by app.db.redis.get_redis()."""
+    from app.db import redis as redis_module
+
+    fake = FakeRedis()
+
+    async def get_redis():
+        return fake
+
+    monkeypatch.setattr(redis_module, "get_redis", get_redis)
+    return fake
@@ -11,6 +11,7 @@ from app.core.prosody.detector_v2 import (
     detect_meters_top_k,
 )
 from app.core.prosody.meters import METERS_REGISTRY
+from app.core.vowel_inference import VowelInferencer
 
 
 class TestBahrDetectorV2Initialization:
@@ -220,6 +221,71 @@ class TestTopKDetection:
         assert best.confidence == top_1[0].confidence
 
 
+class TestTopKSearch:
+    """Test the bounded best-first search behind detect(top_k=...)."""
+
+    PATTERNS = [
+        "/o//o//o/o/o/o//o//o/o/o",  # الطويل (exact)
+        "/o//o//o/o/o/o//o//o/oo",  # الطويل (one substitution)
+        "///o//o///o//o///o//o",  # الكامل
+        "////oooo/o",  # Ties across several meters
+        "//oo/o////o//ooo//o",
+        "oooo///",
+        "/o/o//o/o/o//o",
+    ]
+
+    def test_matches_exhaustive_search(self):
+        """The first k results equal the exhaustive search, ties included."""
+        detector = BahrDetectorV2()
+
+        for pattern in self.PATTERNS:
+            exhaustive = detector._detect_from_pattern(pattern)
+            for top_k in (1, 2, 3, 5):
+                pruned = detector._detect_from_pattern(pattern, top_k=top_k)
+                assert pruned[:top_k] == exhaustive[:top_k]
+
+    def test_bounds_are_upper_bounds(self):
+        """No meter scores above its confidence or similarity bound."""
+        detector = BahrDetectorV2()
+
+        for pattern in self.PATTERNS:
+            for meter in detector.meters.values():
+                confidence_bound, similarity_bound = detector._confidence_upper_bound(
+                    pattern, meter
+                )
+                result = detector._match_meter(pattern, meter)
+                if result:
+                    assert result.confidence <= confidence_bound + 1e-9
+                    assert result.similarity <= similarity_bound + 1e-9
+
+    def test_records_pruned_meters(self, monkeypatch):
+        """Scored and pruned meter counts are reported."""
+        from app.core.prosody import detector_v2 as detector_module
+
+        calls = []
+        monkeypatch.setattr(
+            detector_module,
+            "record_meter_search",
+            lambda scored, pruned: calls.append((scored, pruned)),
+        )
+        detector = BahrDetectorV2()
+
+        detector.detect("/o//o//o/o/o/o//o//o/o/o", top_k=1)
+
+        scored, pruned = calls[-1]
+        assert scored + pruned == len(detector.meters)
+        assert pruned > 0
+
+    def test_expected_meter_uses_exhaustive_search(self, monkeypatch):
+        """Disambiguation towards an expected meter sees every result."""
+        detector = BahrDetectorV2()
+        monkeypatch.setattr(
+            detector, "_search_top_k", lambda *args: pytest.fail("pruned search used")
+        )
+
+        detector.detect("/o//o//o/o/o/o//o//o/o/o", top_k=1, expected_meter_ar="الطويل")
+
+
 class TestApproximateMatches:
     """Test approximate/fuzzy matching."""
 
@@ -239,6 +305,31 @@ class TestApproximateMatches:
             assert result.confidence < 1.0
 
 
+class TestDetectBatch:
+    """Test detection of many raw texts."""
+
+    def test_batch_matches_single_detection(self):
+        """Texts are vocalized in one batch with the same results as detect()."""
+        detector = BahrDetectorV2(enable_vowel_inference=False)
+        detector.vowel_inferencer = VowelInferencer(use_camel_tools=False)
+        texts = ["قفا نبك من ذكرى حبيب ومنزل", "ألا ليت الشباب يعود يوما"]
+
+        batch = detector.detect_batch(texts, top_k=2)
+
+        for text, results in zip(texts, batch):
+            single = detector.detect(text=text, top_k=2)
+            assert [(r.meter_id, r.confidence) for r in results] == [
+                (r.meter_id, r.confidence) for r in single
+            ]
+
+    def test_batch_requires_vowel_inference(self):
+        """Without vowel inference there is nothing to vocalize with."""
+        detector = BahrDetectorV2(enable_vowel_inference=False)
+
+        with pytest.raises(ValueError):
+            detector.detect_batch(["قفا نبك"])
+
+
 class TestValidation:
     """Test pattern validation."""
 
@@ -300,6 +391,54 @@ class TestGetValidPatterns:
         assert len(patterns) == 0
 
 
+class TestTransformationTables:
+    """Test the precomputed pattern → transformations tables."""
+
+    def test_tables_built_for_every_meter(self):
+        """Both verse types get a table per meter."""
+        detector = BahrDetectorV2()
+
+        assert set(detector.tracking_tables) == set(detector.pattern_cache)
+        assert set(detector.hemistich_tracking_tables) == set(detector.hemistich_cache)
+
+    def test_tables_match_generate_with_tracking(self):
+        """Lookups agree with a linear search over generate_with_tracking()."""
+        detector = BahrDetectorV2()
+
+        for meter_id, generator in detector.generators.items():
+            expected = {}
+            for pattern, transformations in generator.generate_with_tracking():
+                expected.setdefault(pattern, transformations)
+
+            for pattern, transformations in expected.items():
+                assert detector.get_transformations(meter_id, pattern) == transformations
+
+    def test_hemistich_transformations(self):
+        """Hemistich patterns resolve against the hemistich table."""
+        detector = BahrDetectorV2()
+        pattern = next(iter(detector.hemistich_cache[1]))
+
+        transformations = detector.get_transformations(1, pattern, 'hemistich')
+
+        assert len(transformations) == 2
+
+    def test_unknown_pattern_returns_empty(self):
+        """Unknown patterns and meters yield no transformations."""
+        detector = BahrDetectorV2()
+
+        assert detector.get_transformations(1, "///") == []
+        assert detector.get_transformations(999, "/o//o") == []
+
+    def test_lookup_returns_copy(self):
+        """Mutating a result does not corrupt the table."""
+        detector = BahrDetectorV2()
+        pattern = next(iter(detector.pattern_cache[1]))
+
+        detector.get_transformations(1, pattern).append("bogus")
+
+        assert "bogus" not in detector.get_transformations(1, pattern)
+
+
 class TestStatistics:
     """Test statistics functionality."""
 
@@ -0,0 +1,117 @@
+"""
+Tests for the prefix-trie pattern index.
+
+The trie must return exactly what a linear scan with
+PatternSimilarity.calculate_similarity() returns, only faster.
+"""
+
+import random
+
+import pytest
+
+from app.core.prosody.detector_v2 import BahrDetectorV2
+from app.core.prosody.pattern_index import PatternTrie, build_pattern_index
+from app.core.prosody.pattern_similarity import PatternSimilarity
+
+
+def _linear_scan(query, patterns, min_similarity):
+    """Reference implementation (the old _find_close_match loop)."""
+    best_pattern = None
+    best_similarity = 0.0
+    for pattern in patterns:
+        similarity = PatternSimilarity.calculate_similarity(query, pattern)
+        if similarity >= min_similarity and similarity > best_similarity:
+            best_similarity = similarity
+            best_pattern = pattern
+    return best_pattern, best_similarity
+
+
+def _mutate(pattern, rng, edits):
+    """Apply random insert/delete/substitute edits to a pattern."""
+    symbols = list(pattern)
+    for _ in range(edits):
+        position = rng.randrange(len(symbols) + 1)
+        operation = rng.random()
+        if operation < 0.33 and symbols:
+            symbols.pop(min(position, len(symbols) - 1))
+        elif operation < 0.66:
+            symbols.insert(position, rng.choice("/o"))
+        elif symbols:
+            symbols[min(position, len(symbols) - 1)] = rng.choice("/o")
+    return "".join(symbols)
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return BahrDetectorV2(enable_vowel_inference=False)
+
+
+class TestPatternTrie:
+    """Basic trie behaviour."""
+
+    def test_exact_pattern_scores_one(self):
+        trie = PatternTrie(["/o//o", "//o/o", "/o/o/o"])
+        assert trie.best_match("//o/o") == ("//o/o", 1.0)
+
+    def test_size_ignores_duplicates_and_empty(self):
+        trie = PatternTrie(["/o//o", "/o//o", "", "/o"])
+        assert len(trie) == 2
+
+    def test_empty_query_returns_none(self):
+        trie = PatternTrie(["/o//o"])
+        assert trie.best_match("") == (None, 0.0)
+
+    def test_threshold_filters_matches(self):
+        trie = PatternTrie(["oooooooo"])
+        assert trie.best_match("////////", min_similarity=0.6) == (None, 0.0)
+
+    def test_ties_resolved_by_insertion_order(self):
+        # Both candidates are one insertion away from the query
+        patterns = ["/o//o/", "/o//oo"]
+        expected = _linear_scan("/o//o", patterns, 0.0)
+        assert PatternTrie(patterns).best_match("/o//o") == expected
+        expected_reversed = _linear_scan("/o//o", patterns[::-1], 0.0)
+        assert PatternTrie(patterns[::-1]).best_match("/o//o") == expected_reversed
+
+    def test_build_pattern_index(self, detector):
+        index = build_pattern_index(detector.pattern_cache)
+        assert set(index) == set(detector.pattern_cache)
+        for meter_id, trie in index.items():
+            assert len(trie) == len(detector.pattern_cache[meter_id])
+
+
+class TestScanParity:
+    """The trie must agree with the linear scan on every meter."""
+
+    def test_parity_on_mutated_meter_patterns(self, detector):
+        rng = random.Random(42)
+        all_patterns = [p for patterns in detector.pattern_cache.values() for p in patterns]
+        queries = [_mutate(rng.choice(all_patterns), rng, rng.randint(0, 4)) for _ in range(40)]
+
+        for query in queries:
+            for meter_id, patterns in detector.pattern_cache.items():
+                expected = _linear_scan(query, patterns, 0.60)
+                actual = detector.pattern_index[meter_id].best_match(query, 0.60)
+                assert actual == expected, (query, meter_id)
+
+    def test_parity_on_hemistich_patterns(self, detector):
+        rng = random.Random(7)
+        queries = ["".join(rng.choice("/o") for _ in range(rng.randint(5, 25))) for _ in range(30)]
+
+        for query in queries:
+            for meter_id, patterns in detector.hemistich_cache.items():
+                expected = _linear_scan(query, patterns, 0.60)
+                actual = detector.hemistich_index[meter_id].best_match(query, 0.60)
+                assert actual == expected, (query, meter_id)
+
+    def test_detector_uses_index(self, detector):
+        """Fuzzy detection with and without the index returns the same result."""
+        meter = detector.meters[1]
+        query = "/o//o//o/o/o/o//o//o//"
+        indexed = detector._find_close_match(
+            query, detector.pattern_cache[1], meter, index=detector.pattern_index[1]
+        )
+        scanned = detector._find_close_match(query, detector.pattern_cache[1], meter)
+        assert indexed.matched_pattern == scanned.matched_pattern
+        assert indexed.similarity == scanned.similarity
+        assert indexed.confidence == scanned.confidence
@@ -135,6 +135,47 @@ class TestWeightedEditDistance:
         assert abs(distance - expected_cost) < 0.1
 
 
+class TestSimilarityMany:
+    """Test the vectorized batch similarity API."""
+
+    def test_matches_scalar_scores_exactly(self):
+        """Batch scores must be bit-identical to calculate_similarity()."""
+        import random
+
+        rng = random.Random(0)
+        for _ in range(300):
+            query = "".join(rng.choice("/o") for _ in range(rng.randint(1, 30)))
+            candidates = [
+                "".join(rng.choice("/o") for _ in range(rng.randint(0, 30)))
+                for _ in range(rng.randint(1, 10))
+            ]
+            expected = [
+                PatternSimilarity.calculate_similarity(query, c) for c in candidates
+            ]
+            actual = PatternSimilarity.similarity_many(query, candidates).tolist()
+            assert actual == expected
+
+    def test_unknown_symbols_match_scalar(self):
+        """Non-/o symbols are handled like the scalar substitution cost."""
+        candidates = ["/x/o", "//o/o", "x"]
+        expected = [PatternSimilarity.calculate_similarity("/xo/o", c) for c in candidates]
+        actual = PatternSimilarity.similarity_many("/xo/o", candidates).tolist()
+        assert actual == expected
+
+    def test_empty_inputs(self):
+        """Empty query or candidates score 0.0."""
+        assert PatternSimilarity.similarity_many("", ["/o", "//o"]).tolist() == [0.0, 0.0]
+        assert PatternSimilarity.similarity_many("/o", ["", "/o"]).tolist() == [0.0, 1.0]
+        assert len(PatternSimilarity.similarity_many("/o", [])) == 0
+
+    def test_encoded_patterns_reusable(self):
+        """Pre-encoded candidates give the same scores as raw strings."""
+        candidates = ["//o/o//o/o/o", "/o//o/o//o", "///o//o"]
+        encoded = PatternSimilarity.encode_patterns(candidates)
+        raw = PatternSimilarity.similarity_many("//o/o//o//o", candidates)
+        assert PatternSimilarity.similarity_many("//o/o//o//o", encoded).tolist() == raw.tolist()
+
+
 class TestFindBestMatches:
     """Test finding best matching meters from candidates."""
 
@@ -0,0 +1,179 @@
+"""
+Tests for the on-disk pattern snapshot used at detector startup.
+"""
+
+import json
+import os
+import time
+
+import pytest
+from app.core.prosody import pattern_snapshot
+from app.core.prosody.meters import METERS_REGISTRY
+from app.core.prosody.pattern_snapshot import (
+    build_snapshot,
+    compute_rules_fingerprint,
+    STALE_SNAPSHOT_AGE,
+    TrackingTable,
+    load_pattern_snapshot,
+    read_snapshot,
+    rules_fingerprint,
+    snapshot_path,
+    write_snapshot,
+)
+from app.core.prosody.zihafat import ZahafType, get_zahaf
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_cache():
+    """Each test starts without memoized snapshots."""
+    pattern_snapshot.clear_loaded_snapshots()
+    yield
+    pattern_snapshot.clear_loaded_snapshots()
+
+
+class TestFingerprint:
+    """Test the rules fingerprint."""
+
+    def test_fingerprint_is_stable(self):
+        """Same rules give the same fingerprint."""
+        assert compute_rules_fingerprint() == compute_rules_fingerprint()
+
+    def test_fingerprint_changes_with_meters(self):
+        """Dropping a meter changes the fingerprint."""
+        subset = {k: v for k, v in METERS_REGISTRY.items() if k != 1}
+
+        assert compute_rules_fingerprint(subset) != compute_rules_fingerprint()
+
+    def test_fingerprint_changes_with_zihafat(self, monkeypatch):
+        """Allowing a new zahaf changes the fingerprint."""
+        before = compute_rules_fingerprint()
+        rules = METERS_REGISTRY[1].get_rules_at_position(1)
+        monkeypatch.setattr(
+            rules, "allowed_zihafat", rules.allowed_zihafat + [get_zahaf(ZahafType.KHABN)]
+        )
+
+        assert compute_rules_fingerprint() != before
+
+    def test_fingerprint_memoized_per_registry(self, monkeypatch):
+        """Repeated detector construction does not re-hash the rules."""
+        first = rules_fingerprint()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("fingerprint should be memoized")
+
+        monkeypatch.setattr(pattern_snapshot, "compute_rules_fingerprint", fail)
+
+        assert rules_fingerprint() == first
+
+
+class TestRoundTrip:
+    """Test writing and reading snapshots."""
+
+    def test_round_trip_matches_generation(self, tmp_path):
+        """A snapshot read from disk equals the generated one."""
+        generated = build_snapshot()
+        write_snapshot(generated, tmp_path)
+
+        loaded = read_snapshot(tmp_path, generated.fingerprint)
+
+        assert loaded is not None
+        assert loaded.patterns == generated.patterns
+        assert loaded.hemistich_patterns == generated.hemistich_patterns
+        assert loaded.tracking_tables == generated.tracking_tables
+        assert loaded.hemistich_tracking_tables == generated.hemistich_tracking_tables
+
+    def test_tracking_tables_are_backed_by_mmap(self, tmp_path):
+        """Loaded tracking tables binary-search the mapped arrays."""
+        generated = build_snapshot()
+        write_snapshot(generated, tmp_path)
+
+        loaded = read_snapshot(tmp_path, generated.fingerprint)
+        table = loaded.tracking_tables[1]
+
+        assert isinstance(table, TrackingTable)
+        pattern = next(iter(generated.tracking_tables[1]))
+        assert table[pattern] == generated.tracking_tables[1][pattern]
+        assert "not-a-pattern" not in table
+        assert table.get("/" * 200) is None
+
+    def test_snapshot_is_read_only(self, tmp_path):
+        """Shared pattern sets and tables cannot be mutated by a detector."""
+        generated = build_snapshot()
+        write_snapshot(generated, tmp_path)
+
+        for snapshot in (generated, read_snapshot(tmp_path, generated.fingerprint)):
+            assert isinstance(snapshot.patterns[1], frozenset)
+            with pytest.raises(TypeError):
+                snapshot.tracking_tables[1]["//o"] = ["base"]
+
+    def test_missing_snapshot(self, tmp_path):
+        """Nothing on disk yields None."""
+        assert read_snapshot(tmp_path, compute_rules_fingerprint()) is None
+
+    def test_corrupt_snapshot_is_ignored(self, tmp_path):
+        """Unreadable files are treated as a miss."""
+        generated = build_snapshot()
+        path = write_snapshot(generated, tmp_path)
+        (path / "patterns.npy").write_bytes(b"garbage")
+
+        assert read_snapshot(tmp_path, generated.fingerprint) is None
+
+    def test_mismatched_manifest_is_ignored(self, tmp_path):
+        """A manifest for other rules is not trusted."""
+        generated = build_snapshot()
+        path = write_snapshot(generated, tmp_path)
+        manifest = json.loads((path / "manifest.json").read_text())
+        manifest["fingerprint"] = "0" * 64
+        (path / "manifest.json").write_text(json.dumps(manifest))
+
+        assert read_snapshot(tmp_path, generated.fingerprint) is None
+
+
+class TestLoadPatternSnapshot:
+    """Test the load-or-regenerate entry point."""
+
+    def test_generates_and_writes_when_missing(self, tmp_path):
+        """First load writes a snapshot for the current rules."""
+        snapshot = load_pattern_snapshot(snapshot_dir=tmp_path)
+
+        assert snapshot_path(tmp_path, snapshot.fingerprint).is_dir()
+
+    def test_reads_existing_snapshot(self, tmp_path, monkeypatch):
+        """Later processes load from disk instead of generating."""
+        load_pattern_snapshot(snapshot_dir=tmp_path)
+        pattern_snapshot.clear_loaded_snapshots()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("snapshot should not be regenerated")
+
+        monkeypatch.setattr(pattern_snapshot, "build_snapshot", fail)
+        snapshot = load_pattern_snapshot(snapshot_dir=tmp_path)
+
+        assert len(snapshot.patterns) == len(METERS_REGISTRY)
+
+    def test_unused_snapshot_is_removed(self, tmp_path):
+        """Snapshots for other rules nobody loaded for a while are removed."""
+        stale = tmp_path / "patterns-v1-stale"
+        stale.mkdir()
+        old = time.time() - STALE_SNAPSHOT_AGE - 60
+        os.utime(stale, (old, old))
+
+        load_pattern_snapshot(snapshot_dir=tmp_path)
+
+        assert not stale.exists()
+
+    def test_other_versions_snapshot_is_kept(self, tmp_path):
+        """A version still running in a rollout keeps its snapshot."""
+        other = tmp_path / "patterns-v1-other-version"
+        other.mkdir()
+
+        load_pattern_snapshot(snapshot_dir=tmp_path)
+
+        assert other.exists()
+
+    def test_memoized_per_process(self, tmp_path):
+        """Repeated loads share one snapshot object."""
+        first = load_pattern_snapshot(snapshot_dir=tmp_path)
+        second = load_pattern_snapshot(snapshot_dir=tmp_path)
+
+        assert first is second
@@ -0,0 +1,191 @@
+"""
+Tests for phoneme-based fitness detection.
+"""
+
+from difflib import SequenceMatcher
+
+import pytest
+
+from app.core.normalization import normalize_arabic_text, remove_diacritics
+from app.core.phonetics import Phoneme, extract_phonemes, text_to_phonetic_pattern
+from app.core.prosody.detector_v2 import BahrDetectorV2
+from app.core.prosody.phoneme_based_detector import (
+    PatternBuckets,
+    calculate_pattern_fitness,
+    count_phonemes,
+    detect_meter_candidates,
+    detect_meter_from_text,
+    detect_with_phoneme_fitness,
+    get_pattern_buckets,
+)
+
+VERSES = [
+    "إذا غامَرتَ في شَرَفٍ مَرومِ",
+    "قِفا نَبكِ مِن ذِكرى حَبيبٍ وَمَنزِلِ",
+    "أَلا لَيتَ الشَبابَ يَعودُ يَوماً",
+    "على قدر أهل العزم تأتي العزائم",
+]
+
+
+def reference_fitness(phonemes, pattern):
+    """The original per-pattern fitness heuristic."""
+    if not phonemes or not pattern:
+        return 0.0
+    n_harakas = sum(1 for p in phonemes if p.vowel in ["a", "u", "i"])
+    n_sakins = sum(1 for p in phonemes if p.is_sukun())
+    n_long = sum(1 for p in phonemes if p.is_long_vowel())
+    n_tanween = sum(1 for p in phonemes if p.vowel in ["an", "un", "in"])
+    total_sakins = n_sakins + n_long + n_tanween
+
+    def ratio(a, b):
+        return min(a, b) / max(a, b) if max(a, b) > 0 else 0.0
+
+    return (
+        ratio(n_harakas, pattern.count("/")) * 0.4
+        + ratio(total_sakins, pattern.count("o")) * 0.4
+        + ratio(n_harakas + total_sakins, len(pattern)) * 0.2
+    )
+
+
+def reference_best(phonemes, extracted_pattern, patterns, has_tashkeel, hybrid):
+    """The original sequential best-pattern scan of one meter."""
+    best_fitness, best_similarity, best_pattern = 0.0, 0.0, None
+    for pattern in patterns:
+        fitness = reference_fitness(phonemes, pattern)
+        similarity = 0.0
+        if extracted_pattern:
+            similarity = SequenceMatcher(None, extracted_pattern, pattern).ratio()
+        if hybrid and extracted_pattern and has_tashkeel:
+            score = (similarity * 0.65) + (fitness * 0.35)
+        elif hybrid and extracted_pattern:
+            score = (similarity * 0.50) + (fitness * 0.50)
+        else:
+            score = fitness
+        if score > best_fitness or (score == best_fitness and similarity > best_similarity):
+            best_fitness, best_similarity, best_pattern = score, similarity, pattern
+    return best_fitness, best_pattern
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return BahrDetectorV2(enable_vowel_inference=False)
+
+
+def verse_variants():
+    for verse in VERSES:
+        text = normalize_arabic_text(verse)
+        yield text, True
+        yield remove_diacritics(text), False
+
+
+class TestFitness:
+    def test_count_phonemes(self):
+        phonemes = [
+            Phoneme("ك", "a"),
+            Phoneme("ت", ""),
+            Phoneme("ب", "aa"),
+            Phoneme("ن", "un"),
+            Phoneme("و", "aw"),
+        ]
+
+        assert count_phonemes(phonemes) == (1, 3)
+
+    def test_matches_reference(self, detector):
+        for text, flag in verse_variants():
+            phonemes = extract_phonemes(text, has_tashkeel=flag)
+            for pattern in list(detector.pattern_cache[1])[:50] + ["", "///", "ooo"]:
+                assert calculate_pattern_fitness(phonemes, pattern) == (
+                    reference_fitness(phonemes, pattern)
+                )
+
+    def test_buckets_match_per_pattern_fitness(self, detector):
+        buckets = get_pattern_buckets(detector)
+
+        for text, flag in verse_variants():
+            phonemes = extract_phonemes(text, has_tashkeel=flag)
+            n_harakas, total_sakins = count_phonemes(phonemes)
+            for meter_buckets in buckets.values():
+                expected = [reference_fitness(phonemes, p) for p in meter_buckets.patterns]
+                assert meter_buckets.fitness(n_harakas, total_sakins).tolist() == expected
+
+    def test_bucketing(self):
+        buckets = PatternBuckets.build(["/o//o", "//o/o", "/o/o", "//o/o"])
+
+        assert buckets.patterns == ("/o//o", "//o/o", "/o/o", "//o/o")
+        assert buckets.pattern_bucket.tolist() == [0, 0, 1, 0]
+        assert buckets.harakat.tolist() == [3, 2]
+        assert buckets.sakinat.tolist() == [2, 2]
+        assert buckets.lengths.tolist() == [5, 4]
+
+    def test_buckets_cached_per_detector(self, detector):
+        assert get_pattern_buckets(detector) is get_pattern_buckets(detector)
+
+
+class TestDetectWithPhonemeFitness:
+    @pytest.mark.parametrize("hybrid", [True, False])
+    def test_best_pattern_matches_sequential_scan(self, detector, hybrid):
+        """Scores and chosen patterns equal the original per-pattern loop."""
+        for text, flag in verse_variants():
+            phonemes = extract_phonemes(text, has_tashkeel=flag)
+            extracted = text_to_phonetic_pattern(text, has_tashkeel=flag) if hybrid else None
+            results = detect_with_phoneme_fitness(
+                text, flag, detector, top_k=len(detector.meters), use_hybrid_scoring=hybrid
+            )
+            by_meter = {meter_id: pattern for meter_id, _, _, pattern in results}
+
+            for meter_id, patterns in detector.pattern_cache.items():
+                score, pattern = reference_best(phonemes, extracted, patterns, flag, hybrid)
+                if pattern is not None:
+                    assert by_meter[meter_id] == pattern
+
+    def test_empty_text(self, detector):
+        assert detect_with_phoneme_fitness("", False, detector) == []
+
+    def test_scores_are_python_floats(self, detector):
+        text = normalize_arabic_text(VERSES[0])
+
+        for _, _, score, _ in detect_with_phoneme_fitness(text, True, detector):
+            assert type(score) is float  # Not np.float64
+
+
+class TestDetectMeterCandidates:
+    def test_matches_separate_top1_and_top3_calls(self, detector):
+        for text, flag in verse_variants():
+            detection = detect_meter_candidates(text, flag, detector, top_k=3)
+            ranking = detect_with_phoneme_fitness(text, flag, detector, top_k=3)
+
+            assert [
+                (c.meter_id, c.meter_name_ar, c.score, c.matched_pattern)
+                for c in detection.candidates
+            ] == ranking
+            assert detection.result == detect_meter_from_text(text, flag, detector)
+
+    def test_margins_and_transformations(self, detector):
+        text = normalize_arabic_text(VERSES[1])
+        detection = detect_meter_candidates(text, True, detector, top_k=3)
+        top = detection.candidates[0]
+
+        assert top.margin == 0.0
+        assert detection.top_margin == top.score - detection.candidates[1].score
+        for candidate in detection.candidates:
+            assert candidate.margin == top.score - candidate.score
+            assert candidate.transformations == detector.get_transformations(
+                candidate.meter_id, candidate.matched_pattern
+            )
+            assert candidate.transformations  # Cached patterns are all tracked
+        assert detection.result.transformations == top.transformations
+        assert detection.alternatives == detection.candidates[1:]
+
+    def test_below_min_score(self, detector):
+        text = normalize_arabic_text(VERSES[0])
+        detection = detect_meter_candidates(text, True, detector, min_score=1.01)
+
+        assert detection.result is None
+        assert detection.candidates
+
+    def test_empty_text(self, detector):
+        detection = detect_meter_candidates("", False, detector)
+
+        assert detection.result is None
+        assert detection.candidates == []
+        assert detection.top_margin is None
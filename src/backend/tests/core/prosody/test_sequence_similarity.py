@@ -0,0 +1,112 @@
+"""
+Parity tests for the batch Ratcliff/Obershelp similarity against difflib.
+"""
+
+import json
+import random
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import pytest
+
+from app.core.normalization import normalize_arabic_text, remove_diacritics
+from app.core.phonetics import text_to_phonetic_pattern
+from app.core.prosody.detector_v2 import BahrDetectorV2
+from app.core.prosody.sequence_similarity import (
+    SequenceRatioMatcher,
+    sequence_ratio,
+    sequence_ratio_many,
+)
+
+GOLDEN_SET = (
+    Path(__file__).resolve().parents[5]
+    / "data/processed/datasets/evaluation/golden_set_v1_3_with_sari.jsonl"
+)
+
+# Every Nth golden verse is compared against all cached patterns
+GOLDEN_STRIDE = 20
+
+
+def difflib_ratio(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+@pytest.fixture(scope="module")
+def cached_patterns():
+    detector = BahrDetectorV2(enable_vowel_inference=False)
+    return [p for patterns in detector.pattern_cache.values() for p in patterns]
+
+
+@pytest.fixture(scope="module")
+def golden_patterns():
+    if not GOLDEN_SET.exists():
+        pytest.skip(f"Golden set not found: {GOLDEN_SET}")
+
+    with open(GOLDEN_SET, encoding="utf-8") as f:
+        verses = [json.loads(line)["text"] for line in f if line.strip()]
+
+    patterns = []
+    for verse in verses[::GOLDEN_STRIDE]:
+        text = normalize_arabic_text(verse)
+        patterns.append(text_to_phonetic_pattern(text, has_tashkeel=True))
+        patterns.append(text_to_phonetic_pattern(remove_diacritics(text), has_tashkeel=False))
+    return [p for p in patterns if p]
+
+
+class TestParity:
+    def test_golden_set_against_cached_patterns(self, golden_patterns, cached_patterns):
+        for query in golden_patterns:
+            expected = [difflib_ratio(query, p) for p in cached_patterns]
+            assert sequence_ratio_many(query, cached_patterns).tolist() == expected
+
+    def test_random_prosodic_strings(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            a = "".join(rng.choice("/o") for _ in range(rng.randint(0, 40)))
+            b = "".join(rng.choice("/o") for _ in range(rng.randint(0, 40)))
+            assert sequence_ratio(a, b) == difflib_ratio(a, b)
+
+    def test_random_text(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            a = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 30)))
+            b = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 30)))
+            assert sequence_ratio(a, b) == difflib_ratio(a, b)
+
+    def test_tafail_strings(self):
+        pairs = [
+            ("فعولن مفاعيلن فعولن مفاعيلن", "فعولن مفاعيلن فعولن مفاعيلن"),
+            ("فعولن مفاعيلن فعولن", "فعولن مفاعيلن فعولن مفاعيلن"),
+            ("متفاعلن متفاعلن متفاعلن", "مستفعلن فاعلن مستفعلن فاعلن"),
+            ("فاعلاتن فاعلاتن فاعلن", "مفاعلتن مفاعلتن فعولن"),
+        ]
+        for a, b in pairs:
+            assert sequence_ratio(a, b) == difflib_ratio(a, b)
+
+    @pytest.mark.parametrize("a,b", [("", ""), ("", "/o"), ("/o", ""), ("abc", "xyz")])
+    def test_edge_cases(self, a, b):
+        assert sequence_ratio(a, b) == difflib_ratio(a, b)
+
+    def test_long_candidates_use_autojunk(self):
+        """From 200 characters on, difflib's junk heuristic is reproduced."""
+        rng = random.Random(2)
+        a = "".join(rng.choice("/o") for _ in range(120))
+        b = "".join(rng.choice("/o") for _ in range(250))
+
+        assert sequence_ratio(a, b) == difflib_ratio(a, b)
+        assert sequence_ratio(b, a) == difflib_ratio(b, a)
+
+
+class TestSequenceRatioMatcher:
+    def test_matcher_reused_across_candidates(self, cached_patterns):
+        query = "//o/o//o/o/o//o/o//o//o"
+        matcher = SequenceRatioMatcher(query)
+
+        first = matcher.ratios(cached_patterns)
+        second = matcher.ratios(reversed(cached_patterns))
+
+        assert first.tolist() == second.tolist()[::-1]
+        assert first.dtype.name == "float64"
+
+    def test_empty_batch(self):
+        assert sequence_ratio_many("/o", []).tolist() == []
@@ -0,0 +1,143 @@
+"""
+Unit tests for AnalysisContext (per-request memo of derived representations).
+"""
+
+import pytest
+
+from app.core import analysis_context as analysis_context_module
+from app.core.analysis_context import AnalysisContext
+from app.core.bahr_detector import BahrDetector
+from app.core.normalization import has_diacritics, normalize_arabic_text
+from app.core.phonetics import extract_phonemes, text_to_phonetic_pattern
+from app.core.prosody.detector_v2 import BahrDetectorV2
+from app.core.prosody.phoneme_based_detector import detect_with_phoneme_fitness
+from app.core.rhyme import analyze_verse_rhyme
+from app.core.taqti3 import perform_taqti3
+
+VERSES = [
+    "إذا غامَرتَ في شَرَفٍ مَرومِ",
+    "قِفا نَبكِ مِن ذِكرى حَبيبٍ وَمَنزِلِ",
+    "على قدر أهل العزم تأتي العزائم",
+]
+
+LONG_VERSE = "قفا نبك من ذكرى حبيب ومنزل بسقط اللوى بين الدخول فحومل"
+
+
+@pytest.fixture(scope="module")
+def detector_v2():
+    return BahrDetectorV2()
+
+
+class TestMemoization:
+    """Derived values are computed once per text."""
+
+    def test_values_match_direct_functions(self):
+        for verse in VERSES:
+            context = AnalysisContext(verse)
+            normalized = normalize_arabic_text(verse)
+
+            assert context.normalized_text == normalized
+            assert context.has_diacritics == has_diacritics(normalized)
+            assert context.phonemes() == extract_phonemes(
+                normalized, has_tashkeel=has_diacritics(normalized)
+            )
+            assert context.pattern() == text_to_phonetic_pattern(normalized)
+
+    def test_pattern_computed_once(self, monkeypatch):
+        calls = []
+        original = analysis_context_module.extract_phonemes
+
+        def counting(text, has_tashkeel=False):
+            calls.append(text)
+            return original(text, has_tashkeel=has_tashkeel)
+
+        monkeypatch.setattr(analysis_context_module, "extract_phonemes", counting)
+        context = AnalysisContext(VERSES[0])
+
+        assert context.pattern() is context.pattern()
+        assert context.phonemes() is context.phonemes()
+        assert len(calls) == 1
+
+    def test_seeded_normalized_text(self, monkeypatch):
+        monkeypatch.setattr(
+            analysis_context_module,
+            "normalize_arabic_text",
+            lambda text: pytest.fail("normalization should be reused"),
+        )
+        context = AnalysisContext("raw", normalized_text="normalized")
+
+        assert context.normalized_text == "normalized"
+        assert context.normalize("raw") == "normalized"
+
+    def test_invalid_text_raises(self):
+        with pytest.raises(ValueError):
+            AnalysisContext("hello world").normalized_text
+
+
+class TestHemistichs:
+    """Hemistich split used by the V2 detector."""
+
+    def test_explicit_separator(self):
+        context = AnalysisContext("قفا نبك من دمع *** حبيب ومنزل")
+
+        assert context.hemistichs == ["قفا نبك من دمع", "حبيب ومنزل"]
+        assert context.first_hemistich == "قفا نبك من دمع"
+
+    def test_midpoint_split_for_long_verse(self):
+        context = AnalysisContext(LONG_VERSE)
+        words = context.normalized_text.split()
+
+        assert context.first_hemistich == " ".join(words[: len(words) // 2])
+        assert len(context.hemistichs) == 2
+
+    def test_short_verse_not_split(self):
+        context = AnalysisContext(VERSES[0])
+
+        assert context.hemistichs == [context.normalized_text]
+
+
+class TestStageParity:
+    """Stages return the same results with and without a shared context."""
+
+    def test_taqti3(self):
+        for verse in VERSES:
+            context = AnalysisContext(verse)
+            normalized = context.normalized_text
+
+            assert perform_taqti3(normalized, normalize=False, context=context) == (
+                perform_taqti3(normalized, normalize=False)
+            )
+            for bahr_id in (1, 4, 5, 8, 9):
+                assert perform_taqti3(
+                    normalized, normalize=False, bahr_id=bahr_id, context=context
+                ) == perform_taqti3(normalized, normalize=False, bahr_id=bahr_id)
+
+    def test_rhyme(self):
+        for verse in VERSES:
+            with_context = analyze_verse_rhyme(verse, context=AnalysisContext(verse))
+            without = analyze_verse_rhyme(verse)
+
+            assert with_context[0].to_dict() == without[0].to_dict()
+            assert with_context[1:] == without[1:]
+
+    def test_bahr_detector(self):
+        detector = BahrDetector()
+        for verse in VERSES:
+            context = AnalysisContext(verse)
+            normalized = context.normalized_text
+
+            assert detector.analyze_verse(normalized, context=context) == (
+                detector.analyze_verse(normalized)
+            )
+
+    def test_phoneme_fitness_shares_ranking(self, detector_v2):
+        for verse in VERSES:
+            context = AnalysisContext(verse)
+            text, flag = context.normalized_text, context.has_diacritics
+
+            top1 = detect_with_phoneme_fitness(text, flag, detector_v2, top_k=1, context=context)
+            top3 = detect_with_phoneme_fitness(text, flag, detector_v2, top_k=3, context=context)
+
+            assert top1 == detect_with_phoneme_fitness(text, flag, detector_v2, top_k=1)
+            assert top3 == detect_with_phoneme_fitness(text, flag, detector_v2, top_k=3)
+            assert top1 == top3[:1]
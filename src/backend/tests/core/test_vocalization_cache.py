@@ -0,0 +1,152 @@
+"""
+Tests for the shared vocalization stores and their corpus warmup.
+"""
+
+import json
+
+import pytest
+
+from app.core.vocalization_cache import (
+    CORPUS_CONFIDENCE,
+    RedisVocalizationStore,
+    SQLiteVocalizationStore,
+    build_vocalizations,
+    create_vocalization_store,
+    load_golden_texts,
+    warm_vocalization_store,
+)
+
+
+class FakeSyncRedis:
+    """Minimal synchronous Redis hash stand-in."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hmget(self, key, fields):
+        values = self.hashes.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def hlen(self, key):
+        return len(self.hashes.get(key, {}))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLiteVocalizationStore(str(tmp_path / "cache" / "vocalizations.sqlite3"))
+    else:
+        store = RedisVocalizationStore("", client=FakeSyncRedis())
+    yield store
+    store.close()
+
+
+class TestStores:
+    def test_round_trip(self, store):
+        store.set_many({"قفا": ("قِفَا", 0.92), "نبك": ("نَبْكِ", 0.87)})
+
+        assert store.get_many(["قفا", "نبك", "من"]) == {
+            "قفا": ("قِفَا", 0.92),
+            "نبك": ("نَبْكِ", 0.87),
+        }
+        assert len(store) == 2
+        assert store.stats() == {"store_hits": 2, "store_misses": 1}
+
+    def test_replace_and_clear(self, store):
+        store.set_many({"قفا": ("قِفَا", 0.5)})
+        store.set_many({"قفا": ("قِفَا", 0.92)})
+
+        assert store.get_many(["قفا"]) == {"قفا": ("قِفَا", 0.92)}
+        store.clear()
+        assert len(store) == 0
+
+    def test_many_words(self, store):
+        words = {f"كلمة{i}": (f"كَلِمَة{i}", 0.9) for i in range(1200)}
+        store.set_many(words)
+
+        assert store.get_many(list(words)) == words
+
+    def test_errors_are_misses(self, store, monkeypatch):
+        def broken(*args):
+            raise OSError("disk gone")
+
+        monkeypatch.setattr(store, "_get_many", broken)
+        monkeypatch.setattr(store, "_set_many", broken)
+
+        store.set_many({"قفا": ("قِفَا", 0.92)})
+        assert store.get_many(["قفا"]) == {}
+        assert store.stats()["store_misses"] == 1
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "vocalizations.sqlite3")
+        SQLiteVocalizationStore(path).set_many({"قفا": ("قِفَا", 0.92)})
+
+        assert SQLiteVocalizationStore(path).get_many(["قفا"]) == {"قفا": ("قِفَا", 0.92)}
+
+
+class TestFactory:
+    def test_memory_has_no_store(self):
+        assert create_vocalization_store("memory") is None
+
+    def test_sqlite(self, tmp_path):
+        store = create_vocalization_store("sqlite", str(tmp_path / "v.sqlite3"))
+
+        assert isinstance(store, SQLiteVocalizationStore)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_vocalization_store("lmdb")
+
+
+class TestWarmup:
+    def test_build_vocalizations(self):
+        texts = [
+            "قِفَا نَبْكِ مِنْ ذِكْرَى",
+            "قِفَا نَبْكِ مِنْ ذِكْرَى",  # Repeated verse counted once
+            "قِفَا مِنَ",
+            "قفا",  # Undiacritized occurrences are ignored
+        ]
+
+        vocalizations = build_vocalizations(texts)
+
+        assert vocalizations["قفا"] == ("قِفَا", CORPUS_CONFIDENCE)
+        assert vocalizations["من"] == ("مِنْ", CORPUS_CONFIDENCE * 0.5)
+        assert "من" not in build_vocalizations(texts, min_share=0.6)
+
+    def test_warm_from_golden_jsonl(self, tmp_path):
+        golden = tmp_path / "golden_set_test.jsonl"
+        golden.write_text(
+            "\n".join(json.dumps({"text": t}, ensure_ascii=False) for t in ["قِفَا نَبْكِ", "مِنْ ذِكْرَى"])
+            + "\n",
+            encoding="utf-8",
+        )
+        store = SQLiteVocalizationStore(str(tmp_path / "v.sqlite3"))
+
+        assert warm_vocalization_store(store, load_golden_texts([golden])) == 4
+        # Keyed like normalized request text (alef maksura → ya)
+        assert store.get_many(["ذكري"]) == {"ذكري": ("ذِكْرَي", CORPUS_CONFIDENCE)}
+
+    def test_keys_match_request_normalization(self, tmp_path):
+        from app.api.v1.endpoints.analyze_v2 import _normalize_verse
+        from app.core.vowel_inference import VowelInferencer
+
+        store = SQLiteVocalizationStore(str(tmp_path / "v.sqlite3"))
+        warm_vocalization_store(store, ["إِذَا غَامَرْتَ فِي شَرَفٍ مَرُومِ"])
+        inferencer = VowelInferencer(use_camel_tools=False, store=store)
+
+        vocalized, confidence = inferencer.restore_vowels(
+            _normalize_verse("إذا غامرت في شرف مروم")
+        )
+
+        # Every word (also إذا, looked up as اذا) comes from the store
+        assert vocalized == "اِذَا غَامَرْتَ فِي شَرَفٍ مَرُومِ"
+        assert confidence == pytest.approx(CORPUS_CONFIDENCE)
@@ -0,0 +1,223 @@
+"""
+Tests for batched vowel inference and its vocalization caches.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.vocalization_cache import (
+    CORPUS_CONFIDENCE,
+    SQLiteVocalizationStore,
+    warm_vocalization_store,
+)
+from app.core.vowel_inference import (
+    CAMEL_CONFIDENCE,
+    FALLBACK_CONFIDENCE,
+    HEURISTIC_CONFIDENCE,
+    VocalizationCache,
+    VowelInferencer,
+)
+
+VOCALIZED = {"قفا": "قِفَا", "نبك": "نَبْكِ", "من": "مِنْ", "ذكرى": "ذِكْرَى"}
+
+
+class FakeDisambiguator:
+    """Stand-in for MLEDisambiguator recording the sentences it receives."""
+
+    def __init__(self):
+        self.calls = []
+
+    def disambiguate(self, sentence):
+        self.calls.append(list(sentence))
+        return [
+            SimpleNamespace(
+                analyses=[SimpleNamespace(score=1.0, analysis={"diac": VOCALIZED[word]})]
+                if word in VOCALIZED
+                else []
+            )
+            for word in sentence
+        ]
+
+
+class BatchFakeDisambiguator(FakeDisambiguator):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def disambiguate_sentences(self, sentences):
+        self.batches.append(len(sentences))
+        return [self.disambiguate(sentence) for sentence in sentences]
+
+
+def make_inferencer(disambiguator, **kwargs):
+    inferencer = VowelInferencer(use_camel_tools=False, **kwargs)
+    inferencer.use_camel_tools = True
+    inferencer.disambiguator = disambiguator
+    inferencer.tokenize = str.split
+    return inferencer
+
+
+class TestVocalizationCache:
+    def test_lru_by_entries(self):
+        cache = VocalizationCache(max_entries=2)
+        cache.set("a", ("أ", 0.87))
+        cache.set("b", ("ب", 0.87))
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", ("ج", 0.87))
+
+        assert "b" not in cache
+        assert cache.get("a") == ("أ", 0.87)
+        assert cache.stats()["evictions"] == 1
+
+    def test_bounded_by_bytes(self):
+        probe = VocalizationCache()
+        probe.set("word", ("word", 0.87))
+        entry_bytes = probe.stats()["cache_size_bytes"]
+
+        cache = VocalizationCache(max_entries=100, max_bytes=entry_bytes * 3)
+        for word in ["aaaa", "bbbb", "cccc", "dddd", "eeee"]:
+            cache.set(word, (word, 0.87))
+
+        assert len(cache) == 3
+        assert cache.stats()["cache_size_bytes"] <= entry_bytes * 3
+
+    def test_stats_track_size_incrementally(self):
+        cache = VocalizationCache()
+        cache.set("قفا", ("قِفَا", 0.87))
+        size = cache.stats()["cache_size_bytes"]
+        cache.set("قفا", ("قِفَا", 0.87))  # Replacing does not double count
+
+        assert cache.stats()["cache_size_bytes"] == size
+        cache.clear()
+        assert cache.stats()["cache_size_bytes"] == 0
+
+    def test_hits_and_misses(self):
+        cache = VocalizationCache()
+        cache.set("a", ("أ", 0.87))
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+class TestVowelInferencer:
+    def test_whole_verse_in_one_call(self):
+        disambiguator = FakeDisambiguator()
+        inferencer = make_inferencer(disambiguator)
+
+        vocalized, confidence = inferencer.restore_vowels("قفا نبك من ذكرى")
+
+        assert vocalized == "قِفَا نَبْكِ مِنْ ذِكْرَى"
+        assert confidence == pytest.approx(CAMEL_CONFIDENCE)
+        assert disambiguator.calls == [["قفا", "نبك", "من", "ذكرى"]]
+
+    def test_cached_verse_skips_disambiguator(self):
+        disambiguator = FakeDisambiguator()
+        inferencer = make_inferencer(disambiguator)
+
+        first = inferencer.restore_vowels("قفا نبك")
+        second = inferencer.restore_vowels("نبك قفا")
+
+        assert len(disambiguator.calls) == 1
+        assert first[1] == second[1]
+        assert second[0] == "نَبْكِ قِفَا"
+
+    def test_batch_uses_one_call(self):
+        disambiguator = BatchFakeDisambiguator()
+        inferencer = make_inferencer(disambiguator)
+
+        results = inferencer.restore_vowels_batch(["قفا نبك", "من ذكرى", "", "قفا"])
+
+        assert disambiguator.batches == [3]  # Empty text never reaches CAMeL Tools
+        assert [text for text, _ in results] == ["قِفَا نَبْكِ", "مِنْ ذِكْرَى", "", "قِفَا"]
+        assert results[2] == ("", 0.0)
+
+    def test_unknown_words_fall_back_without_caching(self):
+        disambiguator = FakeDisambiguator()
+        inferencer = make_inferencer(disambiguator)
+
+        _, confidence = inferencer.restore_vowels("قفا حبيب")
+
+        assert confidence == pytest.approx((CAMEL_CONFIDENCE + FALLBACK_CONFIDENCE) / 2)
+        assert "حبيب" not in inferencer._cache
+
+    def test_batch_matches_single_calls(self):
+        texts = ["قفا نبك", "من ذكرى حبيب", "قِفَا نَبْكِ مِنْ ذِكْرَى"]
+        single = make_inferencer(FakeDisambiguator())
+        batch = make_inferencer(BatchFakeDisambiguator())
+
+        assert batch.restore_vowels_batch(texts) == [single.restore_vowels(t) for t in texts]
+
+    def test_cache_limits_and_stats(self):
+        inferencer = make_inferencer(FakeDisambiguator(), cache_max_entries=2)
+
+        inferencer.restore_vowels("قفا نبك من ذكرى")
+
+        stats = inferencer.get_cache_stats()
+        assert stats["cached_words"] == 2
+        assert stats["max_entries"] == 2
+        assert stats["evictions"] == 2
+
+    def test_heuristic_batch_without_camel(self):
+        inferencer = VowelInferencer(use_camel_tools=False)
+
+        results = inferencer.restore_vowels_batch(["قفا نبك", "   "])
+
+        assert results[0] == inferencer.restore_vowels("قفا نبك")
+        assert results[1] == ("   ", 0.0)
+
+
+class TestVowelInferencerWithStore:
+    def test_warm_store_skips_disambiguator(self, tmp_path):
+        store = SQLiteVocalizationStore(str(tmp_path / "v.sqlite3"))
+        warm_vocalization_store(store, ["قِفَا نَبْكِ"])
+        disambiguator = FakeDisambiguator()
+        inferencer = make_inferencer(disambiguator, store=store)
+
+        vocalized, confidence = inferencer.restore_vowels("قفا نبك")
+
+        assert disambiguator.calls == []
+        assert vocalized == "قِفَا نَبْكِ"
+        assert confidence == pytest.approx(CORPUS_CONFIDENCE)
+        assert "قفا" in inferencer._cache  # Promoted to the worker's LRU
+
+    def test_learned_words_are_shared(self, tmp_path):
+        store = SQLiteVocalizationStore(str(tmp_path / "v.sqlite3"))
+        first = make_inferencer(FakeDisambiguator(), store=store)
+        first.restore_vowels("قفا نبك حبيب")
+
+        disambiguator = FakeDisambiguator()
+        second = make_inferencer(disambiguator, store=store)
+        second.restore_vowels("نبك قفا")
+
+        assert disambiguator.calls == []
+        assert second.get_cache_stats()["store_hits"] == 2
+        # Heuristic fallbacks are not shared
+        assert set(store.get_many(["قفا", "نبك", "حبيب"])) == {"قفا", "نبك"}
+
+    def test_warm_store_used_without_camel(self, tmp_path):
+        store = SQLiteVocalizationStore(str(tmp_path / "v.sqlite3"))
+        warm_vocalization_store(store, ["قِفَا نَبْكِ"])
+        inferencer = VowelInferencer(use_camel_tools=False, store=store)
+        heuristic = VowelInferencer(use_camel_tools=False, store=None)
+
+        vocalized, confidence = inferencer.restore_vowels("قفا نبك حبيب")
+
+        # Known words from the store, heuristic only for the unknown one
+        expected = "قِفَا نَبْكِ " + heuristic._heuristic_vowel_inference("حبيب")
+        assert vocalized == expected
+        assert confidence == pytest.approx((2 * CORPUS_CONFIDENCE + HEURISTIC_CONFIDENCE) / 3)
+        assert "حبيب" not in inferencer._cache
+
+    def test_warm_store_used_while_loading(self, tmp_path):
+        store = SQLiteVocalizationStore(str(tmp_path / "v.sqlite3"))
+        warm_vocalization_store(store, ["قِفَا نَبْكِ"])
+        # Degraded mode: CAMeL Tools enabled but not loaded yet
+        inferencer = VowelInferencer(use_camel_tools=True, store=store, load=False)
+
+        results = inferencer.restore_vowels_batch(["قفا نبك", "نبك"])
+
+        assert [text for text, _ in results] == ["قِفَا نَبْكِ", "نَبْكِ"]
+        assert inferencer.get_cache_stats()["store_hits"] == 2
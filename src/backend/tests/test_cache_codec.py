@@ -0,0 +1,123 @@
+"""
+Tests for the binary encoding of cached analysis results.
+"""
+
+import json
+
+import pytest
+
+from app.db import cache_codec
+from app.db.cache_codec import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    CacheDecodeError,
+    JSONCodec,
+    decode,
+    encode,
+    get_codec,
+)
+from app.schemas.analyze import AnalyzeResponse
+
+RESULT = {
+    "text": "قِفَا نَبْكِ مِنْ ذِكْرَى حَبِيبٍ وَمَنْزِلِ",
+    "taqti3": "فعولن مفاعيلن فعولن مفاعلن",
+    "bahr": {
+        "id": 1,
+        "name_ar": "الطويل",
+        "name_en": "at-Tawil",
+        "confidence": 0.97,
+        "match_quality": "strong",
+        "matched_pattern": "//o/o//o/o/o//o/o//o//o",
+        "transformations": ["base", "base", "base", "قبض"],
+        "explanation_ar": None,
+        "explanation_en": None,
+    },
+    "rhyme": None,
+    "alternative_meters": [
+        {
+            "id": 2,
+            "name_ar": "الكامل",
+            "name_en": "al-Kamil",
+            "confidence": 0.71,
+            "matched_pattern": "///o//o",
+            "transformations": None,
+            "confidence_diff": 0.26,
+        }
+    ],
+    "detection_uncertainty": {
+        "is_uncertain": False,
+        "reason": None,
+        "top_diff": 0.26,
+        "recommendation": None,
+    },
+    "errors": [],
+    "suggestions": ["✓ التقطيع دقيق"],
+    "score": 97.0,
+}
+
+
+def codecs():
+    names = ["json"]
+    if cache_codec.msgpack is not None:
+        names.append("msgpack")
+    return names
+
+
+class TestCodec:
+    @pytest.mark.parametrize("name", codecs())
+    @pytest.mark.parametrize("compression", [COMPRESSION_NONE, COMPRESSION_ZLIB])
+    def test_round_trip(self, name, compression):
+        data = encode(RESULT, get_codec(name), compression, threshold=0)
+
+        assert data[0] == get_codec(name).codec_id | (compression << 4)
+        assert decode(data) == RESULT
+
+    def test_small_values_are_not_compressed(self):
+        data = encode({"score": 1}, JSONCodec(), COMPRESSION_ZLIB, threshold=1024)
+
+        assert data[0] >> 4 == COMPRESSION_NONE
+
+    def test_msgpack_is_smaller_than_json(self):
+        if cache_codec.msgpack is None:
+            pytest.skip("msgpack not installed")
+        legacy = json.dumps(RESULT, ensure_ascii=False).encode("utf-8")
+
+        assert len(encode(RESULT, get_codec("msgpack"), COMPRESSION_NONE)) < len(legacy)
+
+    def test_zstd(self):
+        if cache_codec.zstandard is None:
+            pytest.skip("zstandard not installed")
+        data = encode(RESULT, JSONCodec(), COMPRESSION_ZSTD, threshold=0)
+
+        assert decode(data) == RESULT
+
+    def test_legacy_json_text(self):
+        assert decode(json.dumps(RESULT, ensure_ascii=False)) == RESULT
+        assert decode(b'{"score": 90}') == {"score": 90}
+
+    @pytest.mark.parametrize("data", [b"", b"\x0f123", b"\x01{not json", b"\x71abc"])
+    def test_corrupt_values(self, data):
+        with pytest.raises(CacheDecodeError):
+            decode(data)
+
+    def test_unknown_codec_name(self):
+        with pytest.raises(ValueError):
+            get_codec("pickle")
+
+
+class TestFromCache:
+    def test_matches_validated_response(self):
+        validated = AnalyzeResponse(**RESULT)
+
+        constructed = AnalyzeResponse.from_cache(RESULT)
+
+        assert constructed == validated
+        assert constructed.bahr.name_ar == "الطويل"
+        assert constructed.alternative_meters[0].confidence_diff == 0.26
+        assert constructed.model_dump() == RESULT
+
+    def test_optional_parts_missing(self):
+        response = AnalyzeResponse.from_cache({"text": "قفا", "taqti3": "", "score": 0.0})
+
+        assert (response.bahr, response.errors) == (None, [])
@@ -0,0 +1,253 @@
+"""
+Tests for the Redis circuit breaker, connection pool and multi-key operations.
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.db import redis as redis_module
+from app.db.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.db.local_cache import LocalCache
+from app.db.persistent_cache import PersistentAnalysisCache
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    breaker = CircuitBreaker("redis", failure_threshold=3, cooldown=10, clock=clock)
+    monkeypatch.setattr(redis_module, "redis_circuit_breaker", breaker)
+    return breaker
+
+
+@pytest.fixture
+def fake_redis(monkeypatch, fake_redis, breaker):
+    """The shared fake as the only cache tier."""
+    monkeypatch.setattr(redis_module, "analysis_l1_cache", LocalCache(max_entries=0))
+    monkeypatch.setattr(
+        redis_module, "analysis_l3_cache", PersistentAnalysisCache(engine=object(), enabled=False)
+    )
+    return fake_redis
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self, clock):
+        breaker = CircuitBreaker("test", failure_threshold=3, cooldown=10, clock=clock)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    def test_success_resets_failure_count(self, clock):
+        breaker = CircuitBreaker("test", failure_threshold=2, cooldown=10, clock=clock)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_lets_one_probe_through(self, clock):
+        breaker = CircuitBreaker("test", failure_threshold=1, cooldown=10, clock=clock)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # Probe in flight
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self, clock):
+        breaker = CircuitBreaker("test", failure_threshold=3, cooldown=10, clock=clock)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now += 10
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now += 5
+        assert not breaker.allow()
+
+    def test_threshold_zero_disables(self, clock):
+        breaker = CircuitBreaker("test", failure_threshold=0, clock=clock)
+        for _ in range(10):
+            breaker.record_failure()
+        assert breaker.allow()
+
+
+class TestRedisCircuitBreaker:
+    async def test_outage_skips_redis_after_threshold(self, fake_redis, breaker):
+        fake_redis.down = True
+        for _ in range(3):
+            assert await redis_module.cache_get("k") is None
+        assert breaker.state == OPEN
+        assert fake_redis.round_trips == 3
+
+        # Skipped without touching Redis while open
+        assert await redis_module.cache_get("k") is None
+        assert await redis_module.cache_set("k", {"a": 1}) is False
+        assert await redis_module.cache_get_many(["k", "j"]) == [None, None]
+        assert await redis_module.cache_set_many({"k": {"a": 1}}) is False
+        assert fake_redis.round_trips == 3
+
+    async def test_recovers_after_cooldown(self, fake_redis, breaker, clock):
+        fake_redis.down = True
+        for _ in range(3):
+            await redis_module.cache_get("k")
+        fake_redis.down = False
+        clock.now += 10
+
+        assert await redis_module.cache_set("k", {"a": 1}) is True
+        assert breaker.state == CLOSED
+        assert await redis_module.cache_get("k") == {"a": 1}
+
+    async def test_decode_errors_do_not_count(self, fake_redis, breaker):
+        for _ in range(5):
+            fake_redis.data["k"] = b"\x0fcorrupt"
+            assert await redis_module.cache_get("k") is None
+        assert breaker.state == CLOSED
+
+
+class TestMultiKeyOperations:
+    async def test_set_many_and_get_many_round_trip(self, fake_redis):
+        items = {f"k{i}": {"i": i} for i in range(5)}
+        assert await redis_module.cache_set_many(items) is True
+        assert fake_redis.round_trips == 1
+
+        values = await redis_module.cache_get_many([f"k{i}" for i in range(6)])
+        assert values == [{"i": i} for i in range(5)] + [None]
+        assert fake_redis.round_trips == 2
+
+    async def test_large_get_many_is_chunked_in_one_pipeline(self, fake_redis, monkeypatch):
+        monkeypatch.setattr(settings, "redis_pipeline_chunk_size", 2)
+        await redis_module.cache_set_many({f"k{i}": i for i in range(5)})
+        fake_redis.round_trips = 0
+
+        values = await redis_module.cache_get_many([f"k{i}" for i in range(5)])
+        assert values == [0, 1, 2, 3, 4]
+        assert fake_redis.round_trips == 1
+
+
+class TestConnectionPool:
+    async def test_pool_uses_settings(self, monkeypatch):
+        monkeypatch.setattr(redis_module, "_redis_client", None)
+        monkeypatch.setattr(settings, "redis_max_connections", 7)
+        monkeypatch.setattr(settings, "redis_socket_timeout", 0.25)
+
+        client = await redis_module.get_redis()
+        pool = client.connection_pool
+        assert pool.max_connections == 7
+        assert pool.timeout == settings.redis_pool_timeout
+        assert pool.connection_kwargs["socket_timeout"] == 0.25
+        assert (
+            pool.connection_kwargs["health_check_interval"]
+            == settings.redis_health_check_interval
+        )
+        await redis_module.close_redis()
+
+
+class RespServer:
+    """Minimal RESP server: acknowledges SUBSCRIBE, answers +OK otherwise."""
+
+    def __init__(self):
+        self.subscriptions = 0
+        self.subscribed = asyncio.Event()
+        self.writers = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for writer in self.writers:
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.writers.append(writer)
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(length + 2))[:-2])
+            if args[0].upper() == b"SUBSCRIBE":
+                writer.write(b"*3\r\n" + bulk(b"subscribe") + bulk(args[1]) + b":1\r\n")
+                self.subscriptions += 1
+                self.subscribed.set()
+            else:
+                writer.write(b"+OK\r\n")
+            await writer.drain()
+
+    async def publish(self, channel, message):
+        for writer in self.writers:
+            writer.write(b"*3\r\n" + bulk(b"message") + bulk(channel) + bulk(message))
+            await writer.drain()
+
+
+def bulk(value):
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class TestInvalidationListener:
+    @pytest.fixture
+    async def server(self, monkeypatch):
+        server = RespServer()
+        port = await server.start()
+        monkeypatch.setattr(redis_module, "_redis_client", None)
+        monkeypatch.setattr(settings, "redis_url", f"redis://127.0.0.1:{port}/0")
+        monkeypatch.setattr(settings, "redis_socket_timeout", 0.1)
+        monkeypatch.setattr(settings, "redis_health_check_interval", 0)
+        monkeypatch.setattr(redis_module, "PUBSUB_POLL_TIMEOUT", 0.05)
+        monkeypatch.setattr(redis_module, "PUBSUB_RECONNECT_DELAY", 0.01)
+        yield server
+        await redis_module.close_redis()
+        await server.stop()
+
+    @pytest.fixture
+    def l1(self, monkeypatch):
+        cache = LocalCache(max_entries=10, ttl=60, version="1.0.0")
+        cache.set("k", {"a": 1})
+        monkeypatch.setattr(redis_module, "analysis_l1_cache", cache)
+        return cache
+
+    async def wait_for(self, condition, timeout=2.0):
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def test_idle_subscription_outlives_socket_timeout(self, server, l1):
+        task = asyncio.create_task(redis_module._listen_for_invalidation())
+        try:
+            await asyncio.wait_for(server.subscribed.wait(), timeout=2)
+            await asyncio.sleep(0.5)  # Five socket timeouts without a message
+            assert not task.done()
+            assert server.subscriptions == 1
+
+            await server.publish(redis_module.CACHE_INVALIDATION_CHANNEL.encode(), b"2.0.0")
+            assert await self.wait_for(lambda: len(l1) == 0)
+            assert l1.version == "2.0.0"
+        finally:
+            task.cancel()
+
+    async def test_resubscribes_after_connection_loss(self, server, l1):
+        task = asyncio.create_task(redis_module._listen_for_invalidation())
+        try:
+            await asyncio.wait_for(server.subscribed.wait(), timeout=2)
+            for writer in server.writers:
+                writer.close()
+
+            assert await self.wait_for(lambda: server.subscriptions == 2)
+            assert not task.done()
+        finally:
+            task.cancel()
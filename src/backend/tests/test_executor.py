@@ -0,0 +1,129 @@
+"""
+Tests for the analysis executor (bounded offloading of CPU-bound work).
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import executor as executor_module
+from app.executor import (
+    AnalysisExecutor,
+    AnalysisTimeoutError,
+    ExecutorSaturatedError,
+    run_analysis,
+)
+
+
+def _square(value):
+    return value * value
+
+
+def _thread_name():
+    return threading.current_thread().name
+
+
+@pytest.fixture
+def executor():
+    pool = AnalysisExecutor(kind="thread", max_workers=1, max_queue=1, timeout=5)
+    yield pool
+    pool.shutdown()
+
+
+async def test_runs_off_event_loop(executor):
+    """Work runs on a pool thread and returns its result."""
+    assert await executor.run(_square, 7) == 49
+    assert (await executor.run(_thread_name)).startswith("analysis")
+
+
+async def test_inline_runs_on_caller():
+    """Inline mode calls the function directly."""
+    inline = AnalysisExecutor(kind="inline")
+
+    assert await inline.run(_thread_name) == threading.current_thread().name
+
+
+async def test_exceptions_propagate(executor):
+    """Errors raised by the task reach the caller."""
+    with pytest.raises(ValueError):
+        await executor.run(int, "not a number")
+
+    assert executor.in_flight == 0
+
+
+async def test_rejects_when_saturated(executor):
+    """Requests beyond workers + queue are rejected immediately."""
+    release = threading.Event()
+    running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(ExecutorSaturatedError):
+        await executor.run(_square, 2)
+
+    release.set()
+    await asyncio.gather(*running)
+    assert executor.in_flight == 0
+
+
+async def test_timeout_counts_metric(monkeypatch):
+    """Slow tasks time out and increment the timeout metric."""
+    calls = []
+    monkeypatch.setattr(executor_module, "inc_timeout", lambda: calls.append(1))
+    pool = AnalysisExecutor(kind="thread", max_workers=1, max_queue=0, timeout=0.05)
+
+    with pytest.raises(AnalysisTimeoutError):
+        await pool.run(time.sleep, 0.3)
+
+    assert calls == [1]
+    # The abandoned task keeps its slot until it actually finishes
+    assert pool.in_flight == 1
+    pool.shutdown(wait=True)
+    assert pool.in_flight == 0
+
+
+async def test_run_analysis_saturated_is_429(monkeypatch):
+    """Saturation maps to 429 with Retry-After."""
+    pool = AnalysisExecutor(kind="thread", max_workers=1, max_queue=0, timeout=5)
+    monkeypatch.setattr(executor_module, "_analysis_executor", pool)
+    release = threading.Event()
+    blocker = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_analysis(_square, 3)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"]
+    release.set()
+    await blocker
+    pool.shutdown(wait=True)
+
+
+async def test_run_analysis_timeout_is_503(monkeypatch):
+    """Timeouts map to 503."""
+    pool = AnalysisExecutor(kind="thread", max_workers=1, timeout=0.05)
+    monkeypatch.setattr(executor_module, "_analysis_executor", pool)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_analysis(time.sleep, 0.2)
+
+    assert exc_info.value.status_code == 503
+    pool.shutdown(wait=True)
+
+
+def test_unknown_kind():
+    """Only known executor kinds are accepted."""
+    with pytest.raises(ValueError):
+        AnalysisExecutor(kind="gpu")
+
+
+async def test_process_pool():
+    """Process pools run picklable module-level functions."""
+    pool = AnalysisExecutor(kind="process", max_workers=1, timeout=60, warm_modules=())
+    try:
+        assert await pool.run(_square, 12) == 144
+    finally:
+        pool.shutdown(wait=True)
@@ -0,0 +1,110 @@
+"""
+Tests for cached, parallel batch feature extraction.
+"""
+
+import numpy as np
+import pytest
+
+from app.ml.feature_cache import FeatureCache, feature_key
+from app.ml.feature_extractor import BAHRFeatureExtractor
+
+VERSES = [
+    ("قِفَا نَبْكِ مِنْ ذِكْرَى حَبِيبٍ وَمَنْزِلِ", 1),
+    ("بِسِقْطِ اللِّوَى بَيْنَ الدَّخُولِ فَحَوْمَلِ", 1),
+    ("أَلا لَيْتَ الشَّبَابَ يَعُودُ يَوْمًا", 3),
+    ("قِفَا نَبْكِ مِنْ ذِكْرَى حَبِيبٍ وَمَنْزِلِ", 1),
+    ("", 2),
+]
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return BAHRFeatureExtractor()
+
+
+@pytest.fixture
+def count_extractions(monkeypatch, extractor):
+    texts = []
+    original = BAHRFeatureExtractor.feature_vector
+
+    def counting(self, verse_text):
+        texts.append(verse_text)
+        return original(self, verse_text)
+
+    monkeypatch.setattr(BAHRFeatureExtractor, "feature_vector", counting)
+    return texts
+
+
+class TestExtractBatch:
+    def test_matches_extract_features(self, extractor):
+        X, y = extractor.extract_batch(VERSES)
+        names = extractor.get_feature_names()
+
+        assert X.shape == (len(VERSES), 71)
+        assert y.tolist() == [1, 1, 3, 1, 2]
+        for (text, _), row in zip(VERSES, X):
+            features = extractor.extract_features(text)
+            np.testing.assert_array_equal(row, [features[name] for name in names])
+
+    def test_process_pool(self, extractor):
+        X, _ = extractor.extract_batch(VERSES)
+        X_parallel, _ = extractor.extract_batch(VERSES, n_jobs=2, chunk_size=1)
+
+        np.testing.assert_array_equal(X_parallel, X)
+
+    def test_repeated_verses_extracted_once(self, extractor, count_extractions):
+        extractor.extract_batch(VERSES)
+
+        assert len(count_extractions) == 4
+
+    def test_no_targets(self, extractor):
+        _, y = extractor.extract_batch([(text, None) for text, _ in VERSES[:2]])
+
+        assert y is None
+
+    def test_progress(self, extractor):
+        calls = []
+        extractor.extract_batch(VERSES, chunk_size=2, progress=lambda *c: calls.append(c))
+
+        assert calls[0] == (0, 5)
+        assert calls[-1] == (5, 5)
+        assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+
+
+class TestFeatureCache:
+    def test_only_new_verses_are_extracted(self, extractor, tmp_path, count_extractions):
+        X, _ = extractor.extract_batch(VERSES[:3], cache_dir=tmp_path)
+        count_extractions.clear()
+
+        X_more, _ = extractor.extract_batch(VERSES, cache_dir=tmp_path)
+
+        assert count_extractions == [""]
+        np.testing.assert_array_equal(X_more[:3], X)
+        assert len(FeatureCache(tmp_path)) == 4
+
+    def test_progress_counts_cached_rows(self, extractor, tmp_path):
+        extractor.extract_batch(VERSES, cache_dir=tmp_path)
+        calls = []
+
+        extractor.extract_batch(VERSES, cache_dir=tmp_path, progress=lambda *c: calls.append(c))
+
+        assert calls == [(5, 5)]
+
+    def test_version_changes_key(self):
+        assert feature_key("قفا", version="1") != feature_key("قفا", version="2")
+
+    def test_round_trip(self, tmp_path):
+        cache = FeatureCache(tmp_path, n_features=3)
+        key = feature_key("قفا")
+
+        assert cache.put_many({key: np.array([1.0, 2.0, 3.0])}) == 1
+        assert cache.put_many({key: np.array([1.0, 2.0, 3.0])}) == 0
+
+        reopened = FeatureCache(tmp_path, n_features=3)
+        assert key in reopened
+        np.testing.assert_array_equal(reopened.get_many([key])[key], [1.0, 2.0, 3.0])
+
+    def test_other_width_is_ignored(self, tmp_path):
+        FeatureCache(tmp_path, n_features=3).put_many({feature_key("قفا"): np.zeros(3)})
+
+        assert len(FeatureCache(tmp_path, n_features=71)) == 0
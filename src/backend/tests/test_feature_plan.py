@@ -0,0 +1,87 @@
+"""
+Tests for feature-plan extraction of the ML model's selected features.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ml.feature_extractor import BAHRFeatureExtractor
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+INDICES_PATH = REPO_ROOT / "models" / "ensemble_v1" / "optimized_feature_indices.npy"
+GOLDEN_PATH = (
+    REPO_ROOT / "data" / "processed" / "datasets" / "evaluation" / "golden_set_v1_3_with_sari.jsonl"
+)
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return BAHRFeatureExtractor()
+
+
+@pytest.fixture(scope="module")
+def verses():
+    if not GOLDEN_PATH.exists():
+        pytest.skip("Golden set not available")
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    return texts[::25] + ["", "123"]
+
+
+class TestFeaturePlan:
+    def test_selected_groups(self, extractor):
+        names = extractor.get_feature_names()
+        plan = extractor.plan(
+            [names.index("similarity_to_meter_3"), names.index("rule_match_meter_1")]
+        )
+
+        assert plan.names == ("similarity_to_meter_3", "rule_match_meter_1")
+        assert plan.similarity_meters == {3}
+        assert plan.rule_meters == {1}
+        assert not (plan.pattern or plan.discriminative or plan.linguistic)
+
+    def test_discriminative_needs_every_meter(self, extractor):
+        plan = extractor.plan([extractor.get_feature_names().index("similarity_mean")])
+
+        assert plan.discriminative
+        assert plan.similarity_meters == set(extractor.meter_ids)
+
+    def test_model_plan_from_file(self, extractor):
+        if not INDICES_PATH.exists():
+            pytest.skip("Trained models not available")
+        plan = extractor.plan(INDICES_PATH)
+
+        assert len(plan) == len(np.load(INDICES_PATH))
+        assert plan.linguistic is False
+
+
+class TestExtractSelected:
+    @pytest.mark.parametrize("indices", [None, [30, 8, 60, 0]])
+    def test_matches_full_extraction(self, extractor, verses, indices):
+        if indices is None:
+            if not INDICES_PATH.exists():
+                pytest.skip("Trained models not available")
+            indices = np.load(INDICES_PATH)
+        plan = extractor.plan(indices)
+        names = extractor.get_feature_names()
+
+        selected = extractor.extract_selected_batch(verses, plan)
+
+        assert selected.dtype == np.float32
+        for text, row in zip(verses, selected):
+            features = extractor.extract_features(text)
+            expected = np.array([features[names[i]] for i in plan.indices], dtype=np.float32)
+            np.testing.assert_array_equal(row, expected)
+
+    def test_fills_out(self, extractor, verses):
+        plan = extractor.plan(range(8))
+        out = np.zeros((2, 8), dtype=np.float32)
+
+        result = extractor.extract_selected(verses[0], plan, out=out[1])
+
+        assert np.shares_memory(result, out)
+        assert out[1, 0] == extractor.extract_features(verses[0])["pattern_length"]
+        assert not out[0].any()
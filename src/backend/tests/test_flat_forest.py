@@ -0,0 +1,141 @@
+"""
+Tests for the flat NumPy RandomForest export and predictor.
+"""
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from app.ml.flat_forest import FlatForest, export_forest
+from app.ml.model_loader import MLModelService
+
+MODELS_DIR = Path(__file__).resolve().parents[3] / "models" / "ensemble_v1"
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int) + 2 * (X[:, 2] > 0.5) + 3
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def model(data):
+    return RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(*data)
+
+
+class TestFlatForest:
+    @pytest.mark.parametrize("mmap", [True, False])
+    def test_matches_predict_proba(self, model, data, tmp_path, mmap):
+        forest = FlatForest.load(export_forest(model, tmp_path), mmap=mmap)
+        X = np.vstack([data[0], np.random.default_rng(1).normal(size=(100, 6))])
+
+        np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), atol=1e-12)
+        np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+        np.testing.assert_array_equal(forest.classes_, model.classes_)
+
+    def test_memory_mapped(self, model, tmp_path):
+        forest = FlatForest.load(export_forest(model, tmp_path))
+
+        assert isinstance(forest.value, np.memmap)
+
+    def test_single_leaf_trees(self, tmp_path):
+        X = np.zeros((4, 2))
+        stump = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, [1, 1, 1, 1])
+        forest = FlatForest.load(export_forest(stump, tmp_path))
+
+        np.testing.assert_allclose(forest.predict_proba(X), stump.predict_proba(X))
+
+    def test_feature_count_checked(self, model, tmp_path):
+        forest = FlatForest.load(export_forest(model, tmp_path))
+
+        with pytest.raises(ValueError):
+            forest.predict_proba(np.zeros((1, 5)))
+
+    def test_exists(self, model, tmp_path):
+        assert not FlatForest.exists(tmp_path)
+        export_forest(model, tmp_path)
+        assert FlatForest.exists(tmp_path)
+
+    def test_matches_source_pickle(self, model, tmp_path):
+        source = tmp_path / "model.pkl"
+        joblib.dump(model, source)
+        export_forest(model, tmp_path / "flat", source=source)
+
+        assert FlatForest.matches(tmp_path / "flat", source)
+
+        source.write_bytes(source.read_bytes() + b"retrained")
+        assert not FlatForest.matches(tmp_path / "flat", source)
+
+    def test_export_without_source_never_matches(self, model, tmp_path):
+        source = tmp_path / "model.pkl"
+        joblib.dump(model, source)
+        export_forest(model, tmp_path / "flat")
+
+        assert not FlatForest.matches(tmp_path / "flat", source)
+
+
+class TestServing:
+    def test_shipped_export_matches_pickle(self):
+        if not FlatForest.exists(MODELS_DIR / "random_forest_flat"):
+            pytest.skip("Flat export not available")
+        model = joblib.load(MODELS_DIR / "random_forest_model.pkl")
+        forest = FlatForest.load(MODELS_DIR / "random_forest_flat")
+        X = np.random.default_rng(0).uniform(-1, 40, size=(500, model.n_features_in_))
+
+        np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+    @staticmethod
+    def _models_dir(tmp_path):
+        if not (MODELS_DIR / "ensemble_metadata.json").exists():
+            pytest.skip("Trained models not available")
+        for name in ("optimized_feature_indices.npy", "ensemble_metadata.json"):
+            (tmp_path / name).write_bytes((MODELS_DIR / name).read_bytes())
+        forest = RandomForestClassifier(n_estimators=3, random_state=0).fit(
+            np.random.default_rng(0).random((32, 45)), np.arange(32) % 16 + 1
+        )
+        joblib.dump(forest, tmp_path / "random_forest_model.pkl")
+        export_forest(
+            forest, tmp_path / "random_forest_flat", source=tmp_path / "random_forest_model.pkl"
+        )
+        return tmp_path
+
+    @staticmethod
+    def _service():
+        service = object.__new__(MLModelService)
+        service._initialized = False
+        service.__init__()
+        return service
+
+    def test_shipped_export_records_pickle(self):
+        if not FlatForest.exists(MODELS_DIR / "random_forest_flat"):
+            pytest.skip("Flat export not available")
+
+        assert FlatForest.matches(
+            MODELS_DIR / "random_forest_flat", MODELS_DIR / "random_forest_model.pkl"
+        )
+
+    def test_service_prefers_flat_export(self, tmp_path):
+        models_dir = self._models_dir(tmp_path)
+        service = self._service()
+
+        assert service.load_models(str(models_dir)) is True
+        assert isinstance(service.model, FlatForest)
+        assert len(service.predict_batch(np.zeros((2, 45)))) == 2
+
+    def test_service_loads_pickle_when_export_is_stale(self, tmp_path, caplog):
+        models_dir = self._models_dir(tmp_path)
+        retrained = RandomForestClassifier(n_estimators=4, random_state=1).fit(
+            np.random.default_rng(1).random((32, 45)), np.arange(32) % 16 + 1
+        )
+        joblib.dump(retrained, models_dir / "random_forest_model.pkl")
+        service = self._service()
+
+        assert service.load_models(str(models_dir)) is True
+        assert isinstance(service.model, RandomForestClassifier)
+        assert len(service.model.estimators_) == 4
+        assert "not exported from" in caplog.text
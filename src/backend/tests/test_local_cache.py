@@ -0,0 +1,113 @@
+"""
+Tests for the in-process L1 cache in front of Redis.
+"""
+
+import pytest
+
+from app.db import local_cache as local_cache_module
+from app.db import redis as redis_module
+from app.db.cache_codec import decode
+from app.db.local_cache import LocalCache
+
+
+@pytest.fixture
+def l1(monkeypatch):
+    cache = LocalCache(max_entries=2, ttl=60, version="1.0.0")
+    monkeypatch.setattr(redis_module, "analysis_l1_cache", cache)
+    return cache
+
+
+class TestLocalCache:
+    def test_lru_eviction(self, monkeypatch):
+        evictions = []
+        monkeypatch.setattr(local_cache_module, "inc_l1_eviction", evictions.append)
+        cache = LocalCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert sum(evictions) == 1
+
+    def test_ttl_expiry(self, clock):
+        cache = LocalCache(max_entries=10, ttl=60, clock=clock)
+        cache.set("short", 1, ttl=5)
+        cache.set("long", 2, ttl=3600)  # capped at the cache TTL
+
+        clock.now += 10
+        assert cache.get("short") is None
+        assert cache.get("long") == 2
+
+        clock.now += 51
+        assert cache.get("long") is None
+        assert len(cache) == 0
+
+    def test_hit_and_miss_metrics(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(local_cache_module, "inc_l1_hit", lambda: calls.append("hit"))
+        monkeypatch.setattr(local_cache_module, "inc_l1_miss", lambda: calls.append("miss"))
+        cache = LocalCache(max_entries=10)
+        cache.set("a", 1)
+
+        cache.get("a")
+        cache.get("b")
+
+        assert calls == ["hit", "miss"]
+
+    def test_invalidate_on_version_change(self):
+        cache = LocalCache(max_entries=10, version="1.0.0")
+        cache.set("a", 1)
+
+        assert cache.invalidate("1.0.0") == 0
+        assert cache.get("a") == 1
+        assert cache.invalidate("1.1.0") == 1
+        assert cache.get("a") is None
+        assert cache.version == "1.1.0"
+
+    def test_disabled(self):
+        cache = LocalCache(max_entries=0)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+
+
+class TestRedisIntegration:
+    async def test_cache_get_populates_l1(self, l1, fake_redis):
+        fake_redis.data["k"] = '{"score": 90}'
+
+        assert await redis_module.cache_get("k") == {"score": 90}
+        assert await redis_module.cache_get("k") == {"score": 90}
+        assert fake_redis.calls == [("get", "k")]
+
+    async def test_cache_set_writes_through(self, l1, fake_redis):
+        await redis_module.cache_set("k", {"score": 90})
+
+        assert l1.get("k") == {"score": 90}
+        assert decode(fake_redis.data["k"]) == {"score": 90}
+
+    async def test_cache_get_many_only_fetches_l1_misses(self, l1, fake_redis):
+        l1.set("hot", {"score": 1})
+        fake_redis.data["cold"] = '{"score": 2}'
+
+        values = await redis_module.cache_get_many(["hot", "cold", "absent"])
+
+        assert values == [{"score": 1}, {"score": 2}, None]
+        assert fake_redis.calls == [("mget", ("cold", "absent"))]
+        assert l1.get("cold") == {"score": 2}
+
+    async def test_cache_delete_evicts_l1(self, l1, fake_redis):
+        l1.set("k", {"score": 1})
+
+        await redis_module.cache_delete("k")
+
+        assert l1.get("k") is None
+
+    async def test_announce_engine_version(self, fake_redis):
+        assert await redis_module.announce_engine_version("2.0.0") is True
+        assert await redis_module.announce_engine_version("2.0.0") is False
+        assert fake_redis.published == [
+            (redis_module.CACHE_INVALIDATION_CHANNEL, "2.0.0")
+        ]
@@ -0,0 +1,135 @@
+"""
+Tests for batched ML prediction and the micro-batching queue.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ml import model_loader
+from app.ml.model_loader import METER_LABELS, PredictionBatcher, ml_service
+
+MODELS_DIR = Path(__file__).resolve().parents[3] / "models" / "ensemble_v1"
+
+
+@pytest.fixture(scope="module")
+def service():
+    if not (MODELS_DIR / "random_forest_model.pkl").exists():
+        pytest.skip("Trained models not available")
+    if not ml_service.is_loaded() and not ml_service.load_models(str(MODELS_DIR)):
+        pytest.skip("Models could not be loaded")
+    return ml_service
+
+
+@pytest.fixture(scope="module")
+def features(service):
+    rng = np.random.default_rng(0)
+    return rng.random((40, len(service.feature_names)))
+
+
+class TestPredictBatch:
+    def test_matches_predict_proba(self, service, features):
+        results = service.predict_batch(features, top_k=3)
+        probabilities = service.model.predict_proba(features[:, service.feature_indices])
+
+        assert len(results) == len(features)
+        for result, row in zip(results, probabilities):
+            labels = service.model.classes_[np.argsort(-row, kind="stable")[:3]]
+            assert result["meter"] == METER_LABELS[labels[0] - 1]
+            assert result["confidence"] == pytest.approx(row.max())
+            assert [meter for meter, _ in result["top_k"]] == [
+                METER_LABELS[label - 1] for label in labels
+            ]
+            assert sum(result["probabilities"].values()) == pytest.approx(1.0)
+
+    def test_reduced_features(self, service, features):
+        full = service.predict_batch(features[:5])
+        reduced = service.predict_batch(features[:5, service.feature_indices])
+
+        assert full == reduced
+
+    def test_predict_uses_feature_names(self, service, features):
+        row = dict(zip(service.feature_names, features[0]))
+
+        assert service.predict(row) == service.predict_batch(features[:1])[0]
+
+    def test_every_class_has_a_meter(self, service):
+        assert len(set(service._class_meters)) == len(service.model.classes_)
+
+    def test_concurrent_callers_share_one_batcher(self, service, features, monkeypatch):
+        created = []
+
+        class SlowBatcher(PredictionBatcher):
+            def __init__(self, *args, **kwargs):
+                time.sleep(0.05)  # Widen the creation race
+                created.append(self)
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(model_loader, "PredictionBatcher", SlowBatcher)
+        monkeypatch.setattr(model_loader.settings, "ml_micro_batching", True)
+        monkeypatch.setattr(service, "_batcher", None)
+        threads = [
+            threading.Thread(target=service.predict_batched, args=(features[i], 5))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(created) == 1
+        assert service._batcher is created[0]
+
+
+class TestPredictionBatcher:
+    def test_concurrent_rows_share_one_call(self):
+        calls = []
+
+        def predict_batch(matrix):
+            calls.append(len(matrix))
+            return [{"meter": row[0]} for row in matrix]
+
+        batcher = PredictionBatcher(predict_batch, max_batch_size=8, max_wait=0.2)
+        barrier = threading.Barrier(4)
+        results = {}
+
+        def worker(i):
+            barrier.wait()
+            results[i] = batcher.predict(np.array([[float(i), 0.0]]), timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == {i: {"meter": float(i)} for i in range(4)}
+        assert calls == [4]
+        assert (batcher.batches, batcher.rows) == (1, 4)
+
+    def test_max_batch_size(self):
+        calls = []
+
+        def predict_batch(matrix):
+            calls.append(len(matrix))
+            return [None] * len(matrix)
+
+        batcher = PredictionBatcher(predict_batch, max_batch_size=2, max_wait=0.2)
+        futures = [batcher.submit(np.zeros((1, 2))) for _ in range(5)]
+
+        for future in futures:
+            future.result(5)
+        assert sum(calls) == 5
+        assert max(calls) <= 2
+
+    def test_errors_reach_every_caller(self):
+        def predict_batch(matrix):
+            raise ValueError("bad features")
+
+        batcher = PredictionBatcher(predict_batch)
+
+        with pytest.raises(ValueError, match="bad features"):
+            batcher.predict(np.zeros((1, 2)), timeout=5)
@@ -0,0 +1,240 @@
+"""
+Tests for the durable PostgreSQL L3 analysis cache.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db import redis as redis_module
+from app.db.cache_codec import decode
+from app.db.local_cache import LocalCache
+from app.db.persistent_cache import (
+    PersistentAnalysisCache,
+    expiry_sweep_statement,
+    hit_update_statement,
+    upsert_statement,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class InMemoryL3(PersistentAnalysisCache):
+    """L3 cache with the SQL statements replaced by a dict of rows."""
+
+    def __init__(self, **kwargs):
+        super().__init__(engine=object(), version="1.0.0", **kwargs)
+        self.rows = {}
+        self.writes = []
+        self.fail = False
+
+    def _fetch(self, text_hash, now):
+        if self.fail:
+            raise ConnectionError("database down")
+        row = self.rows.get(text_hash)
+        if row is None or row["algorithm_version"] != self.version or row["expires_at"] <= now:
+            return None
+        return row["cached_result"]
+
+    def _write(self, rows, hits):
+        if self.fail:
+            raise ConnectionError("database down")
+        self.writes.append((len(rows), len(hits)))
+        for row in rows:
+            self.rows[row["text_hash"]] = dict(row)
+        for hit in hits:
+            if hit["h"] in self.rows:
+                self.rows[hit["h"]]["hit_count"] += hit["n"]
+                self.rows[hit["h"]]["last_accessed"] = hit["ts"]
+
+    def _delete_expired(self, now, limit):
+        expired = [h for h, row in self.rows.items() if row["expires_at"] < now][:limit]
+        for text_hash in expired:
+            del self.rows[text_hash]
+        return len(expired)
+
+
+@pytest.fixture
+def clock(clock):
+    """The shared clock as a UTC time source."""
+    clock.now = START
+    return clock
+
+
+@pytest.fixture
+def l3(clock):
+    return InMemoryL3(clock=clock, sweep_batch_size=2)
+
+
+class TestPersistentAnalysisCache:
+    async def test_write_behind(self, l3):
+        l3.put("analysis:a", {"text": "قفا نبك"}, normalized_text="قفا نبك")
+
+        assert l3.rows == {}
+        assert await l3.get("analysis:a") == {"text": "قفا نبك"}  # Served while queued
+        assert await l3.flush() == 2  # The row and its hit
+
+        row = l3.rows[l3.text_hash("analysis:a")]
+        assert (row["original_text"], row["algorithm_version"]) == ("قفا نبك", "1.0.0")
+        assert row["expires_at"] == START + timedelta(days=30)
+
+    async def test_hits_are_aggregated(self, l3, clock):
+        l3.put("analysis:a", {"text": "a"})
+        await l3.flush()
+
+        for minute in range(5):
+            clock.now = START + timedelta(minutes=minute)
+            l3.record_hit("analysis:a")
+        await l3.flush()
+
+        row = l3.rows[l3.text_hash("analysis:a")]
+        assert (row["hit_count"], row["last_accessed"]) == (5, START + timedelta(minutes=4))
+        assert l3.writes == [(1, 0), (0, 1)]
+
+    async def test_failed_flush_is_retried(self, l3):
+        l3.put("analysis:a", {"text": "a"})
+        l3.record_hit("analysis:a")
+        l3.fail = True
+
+        assert await l3.flush() == 0
+        l3.record_hit("analysis:a")
+        l3.fail = False
+        await l3.flush()
+
+        assert l3.rows[l3.text_hash("analysis:a")]["hit_count"] == 2
+
+    async def test_read_errors_are_misses(self, l3):
+        l3.fail = True
+
+        assert await l3.get("analysis:a") is None
+
+    async def test_other_version_and_expired_rows_are_misses(self, l3, clock):
+        l3.put("analysis:a", {"text": "a"})
+        await l3.flush()
+
+        l3.version = "2.0.0"
+        assert await l3.get("analysis:a") is None
+        l3.version = "1.0.0"
+        clock.now = START + timedelta(days=31)
+        assert await l3.get("analysis:a") is None
+
+    async def test_sweep_expired_in_batches(self, l3, clock):
+        for i in range(5):
+            l3.put(f"analysis:{i}", {"text": str(i)})
+        await l3.flush()
+        clock.now = START + timedelta(days=31)
+        l3.put("analysis:fresh", {"text": "fresh"})
+        await l3.flush()
+
+        assert await l3.sweep_expired() == 5
+        assert list(l3.rows) == [l3.text_hash("analysis:fresh")]
+
+    async def test_bounded_queue(self, clock):
+        l3 = InMemoryL3(clock=clock, max_pending=2)
+        for i in range(3):
+            l3.put(f"analysis:{i}", {"text": str(i)})
+
+        assert l3.stats()["pending_writes"] == 2
+        assert l3.dropped_writes == 1
+
+    async def test_failed_flush_respects_bound(self, clock):
+        l3 = InMemoryL3(clock=clock, max_pending=3)
+        for i in range(3):
+            l3.put(f"analysis:old{i}", {"text": str(i)})
+        l3.fail = True
+        await l3.flush()
+        for i in range(2):
+            l3.put(f"analysis:new{i}", {"text": str(i)})
+        await l3.flush()
+
+        assert l3.stats()["pending_writes"] == 3
+        assert l3.dropped_writes == 2
+        assert list(l3._pending) == [
+            l3.text_hash(key) for key in ("analysis:old2", "analysis:new0", "analysis:new1")
+        ]
+
+    async def test_bounded_hits_during_outage(self, clock):
+        l3 = InMemoryL3(clock=clock, max_pending_hits=2)
+        l3.fail = True
+        for i in range(3):
+            l3.record_hit(f"analysis:{i}")
+        l3.record_hit("analysis:0")
+        await l3.flush()
+        l3.record_hit("analysis:3")
+
+        assert l3.stats()["pending_hit_updates"] == 2
+        assert len(l3._last_accessed) == 2
+        assert l3.stats()["dropped_hits"] == 2
+        assert l3._hits[l3.text_hash("analysis:0")] == 2
+
+    async def test_disabled(self):
+        l3 = PersistentAnalysisCache(enabled=False)
+        l3.put("analysis:a", {"text": "a"})
+
+        assert await l3.get("analysis:a") is None
+        assert await l3.flush() == 0
+
+
+class TestStatements:
+    def compile(self, statement):
+        return str(statement.compile(dialect=postgresql.dialect()))
+
+    def test_upsert(self):
+        sql = self.compile(upsert_statement())
+
+        assert "ON CONFLICT (text_hash) DO UPDATE" in sql
+        assert "hit_count = excluded" not in sql
+
+    def test_hit_update(self):
+        sql = self.compile(hit_update_statement())
+
+        assert "hit_count=(coalesce(analysis_cache.hit_count" in sql
+        assert "WHERE analysis_cache.text_hash = %(h)s" in sql
+        assert "greatest(analysis_cache.last_accessed" in sql
+
+    def test_expiry_sweep(self):
+        sql = self.compile(expiry_sweep_statement(START, 1000))
+
+        assert sql.startswith("DELETE FROM analysis_cache WHERE analysis_cache.id IN")
+        assert "ORDER BY analysis_cache.expires_at" in sql
+
+
+class TestTieredLookup:
+    @pytest.fixture
+    def tiers(self, monkeypatch, l3, fake_redis):
+        l1 = LocalCache(max_entries=10, ttl=60)
+        monkeypatch.setattr(redis_module, "analysis_l1_cache", l1)
+        monkeypatch.setattr(redis_module, "analysis_l3_cache", l3)
+        return l1, fake_redis, l3
+
+    async def test_l3_hit_populates_redis_and_l1(self, tiers):
+        l1, fake, l3 = tiers
+        l3.put("analysis:a", {"text": "a"})
+        await l3.flush()
+
+        assert await redis_module.cache_get("analysis:a") == {"text": "a"}
+        assert decode(fake.data["analysis:a"]) == {"text": "a"}
+        assert l1.get("analysis:a") == {"text": "a"}
+
+    async def test_cache_set_is_written_behind(self, tiers):
+        _, fake, l3 = tiers
+
+        await redis_module.cache_set("analysis:a", {"text": "a"}, normalized_text="a")
+        await redis_module.cache_get("analysis:a")  # L1 hit, counted for L3
+
+        assert "analysis:a" in fake.data
+        assert l3.rows == {}
+        await l3.flush()
+        assert l3.rows[l3.text_hash("analysis:a")]["hit_count"] == 1
+
+    async def test_get_many_falls_back_to_l3(self, tiers):
+        _, fake, l3 = tiers
+        l3.put("analysis:b", {"text": "b"})
+        await l3.flush()
+        fake.data["analysis:a"] = json.dumps({"text": "a"})
+
+        results = await redis_module.cache_get_many(["analysis:a", "analysis:b", "analysis:c"])
+
+        assert results == [{"text": "a"}, {"text": "b"}, None]
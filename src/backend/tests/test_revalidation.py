@@ -0,0 +1,174 @@
+"""
+Tests for engine-version cache keys and stale-while-revalidate.
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.db.redis import generate_cache_key
+from app.db.revalidation import StaleWhileRevalidate
+from app.db.singleflight import SingleFlight
+
+
+class TestVersionedCacheKeys:
+    def test_key_includes_engine_version(self):
+        key = generate_cache_key("قفا نبك", version="2.0.0")
+        assert key.startswith("analysis:2.0.0:")
+
+    def test_default_version_is_current_engine(self):
+        key = generate_cache_key("قفا نبك")
+        assert key.startswith(f"analysis:{settings.analysis_engine_version}:")
+
+    def test_versions_do_not_share_keys(self):
+        assert generate_cache_key("قفا نبك", version="1.0.0") != generate_cache_key(
+            "قفا نبك", version="1.1.0"
+        )
+
+    def test_namespace_separates_endpoints(self):
+        v1 = generate_cache_key("قفا نبك", version="1.0.0")
+        v2 = generate_cache_key("قفا نبك", namespace="v2", version="1.0.0")
+        assert v1 != v2
+        # The namespace is hashed, not appended to the verse
+        assert v2 != generate_cache_key("قفا نبك_v2", version="1.0.0")
+
+    def test_options_change_key(self):
+        assert generate_cache_key("قفا نبك", detect_bahr=True) != generate_cache_key(
+            "قفا نبك", detect_bahr=False
+        )
+
+
+class FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def get_many(self, keys):
+        return [self.data.get(key) for key in keys]
+
+
+def make_swr(cache, **kwargs):
+    kwargs.setdefault("enabled", True)
+    kwargs.setdefault("previous_version", "1.0.0")
+    kwargs.setdefault("current_version", "1.1.0")
+    return StaleWhileRevalidate(
+        flight=SingleFlight(), get=cache.get, get_many=cache.get_many, **kwargs
+    )
+
+
+class TestStaleWhileRevalidate:
+    async def test_serves_stale_and_revalidates_in_background(self):
+        cache = FakeCache()
+        cache.data["old"] = {"text": "stale"}
+        swr = make_swr(cache)
+
+        async def compute():
+            cache.data["new"] = {"text": "fresh"}
+            return cache.data["new"]
+
+        assert await swr.serve_stale("old", "new", compute) == {"text": "stale"}
+        assert len(swr) == 1
+        await swr.drain()
+        assert cache.data["new"] == {"text": "fresh"}
+        assert len(swr) == 0
+
+    async def test_miss_returns_none_without_revalidating(self):
+        swr = make_swr(FakeCache())
+
+        async def compute():
+            raise AssertionError("should not compute")
+
+        assert await swr.serve_stale("old", "new", compute) is None
+        assert len(swr) == 0
+
+    async def test_disabled_when_previous_is_current(self):
+        assert not make_swr(FakeCache(), previous_version="1.1.0").enabled
+        assert not make_swr(FakeCache(), previous_version="").enabled
+        assert not make_swr(FakeCache(), enabled=False).enabled
+
+    async def test_unparseable_stale_value_is_a_miss(self):
+        cache = FakeCache()
+        cache.data["old"] = {"schema": "outdated"}
+        swr = make_swr(cache)
+
+        def parse(value):
+            raise ValueError("invalid")
+
+        async def compute():
+            return None
+
+        assert await swr.serve_stale("old", "new", compute, parse=parse) is None
+        assert len(swr) == 0
+
+    async def test_background_work_is_bounded(self):
+        cache = FakeCache()
+        release = asyncio.Event()
+        for i in range(3):
+            cache.data[f"old{i}"] = {"i": i}
+        swr = make_swr(cache, max_inflight=2)
+        calls = []
+
+        def compute_for(key):
+            async def compute():
+                calls.append(key)
+                await release.wait()
+
+            return compute
+
+        for i in range(3):
+            # Stale results are served even when revalidation is skipped
+            assert await swr.serve_stale(f"old{i}", f"new{i}", compute_for(f"new{i}")) == {"i": i}
+        assert len(swr) == 2
+
+        release.set()
+        await swr.drain()
+        assert sorted(calls) == ["new0", "new1"]
+
+    async def test_same_key_revalidated_once(self):
+        cache = FakeCache()
+        cache.data["old"] = {"text": "stale"}
+        swr = make_swr(cache)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+
+        await swr.serve_stale("old", "new", compute)
+        await swr.serve_stale("old", "new", compute)
+        await swr.drain()
+        assert calls == 1
+
+    async def test_background_failure_is_contained(self):
+        cache = FakeCache()
+        cache.data["old"] = {"text": "stale"}
+        swr = make_swr(cache)
+
+        async def compute():
+            raise RuntimeError("analysis failed")
+
+        assert await swr.serve_stale("old", "new", compute) == {"text": "stale"}
+        await swr.drain()
+        assert len(swr) == 0
+
+    async def test_serve_stale_many(self):
+        cache = FakeCache()
+        cache.data["old-a"] = {"text": "a"}
+        swr = make_swr(cache)
+        revalidated = []
+
+        def compute_for(key):
+            async def compute():
+                revalidated.append(key)
+
+            return compute
+
+        stale = await swr.serve_stale_many({"a": "old-a", "b": "old-b"}, compute_for)
+        await swr.drain()
+
+        assert stale == {"a": {"text": "a"}}
+        assert revalidated == ["a"]
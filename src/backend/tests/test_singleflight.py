@@ -0,0 +1,208 @@
+"""
+Tests for singleflight coalescing of concurrent cache misses.
+"""
+
+import asyncio
+
+import pytest
+
+from app.db.singleflight import LEASE_PREFIX, SingleFlight
+from app.metrics import analysis_metrics
+
+
+def counter_value(counter, **labels):
+    if counter is None:
+        pytest.skip("prometheus_client is not installed")
+    metric = counter.labels(**labels) if labels else counter
+    return metric._value.get()
+
+
+class TestLocalCoalescing:
+    async def test_concurrent_calls_share_one_computation(self):
+        flight = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "result"
+
+        tasks = [asyncio.create_task(flight.do("k", compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert len(flight) == 1
+        release.set()
+
+        assert await asyncio.gather(*tasks) == ["result"] * 5
+        assert calls == 1
+        assert len(flight) == 0
+
+    async def test_coalesced_waits_are_counted(self):
+        before = counter_value(analysis_metrics.SINGLEFLIGHT_COALESCED, scope="local")
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return 1
+
+        tasks = [asyncio.create_task(flight.do("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        after = counter_value(analysis_metrics.SINGLEFLIGHT_COALESCED, scope="local")
+        assert after - before == 2
+
+    async def test_different_keys_do_not_coalesce(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def compute(key):
+            calls.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        results = await asyncio.gather(
+            flight.do("a", lambda: compute("a")), flight.do("b", lambda: compute("b"))
+        )
+        assert results == ["a", "b"]
+        assert sorted(calls) == ["a", "b"]
+
+    async def test_leader_exception_is_shared(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            raise ValueError("analysis failed")
+
+        tasks = [asyncio.create_task(flight.do("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert len(flight) == 0
+
+    async def test_follower_takes_over_from_cancelled_leader(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        leader = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == 2
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    async def test_disabled_runs_every_computation(self):
+        flight = SingleFlight(enabled=False)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return calls
+
+        await asyncio.gather(flight.do("k", compute), flight.do("k", compute))
+        assert calls == 2
+
+
+class TestRedisLease:
+    def make_flight(self, redis, **kwargs):
+        async def get_redis():
+            return redis
+
+        kwargs.setdefault("wait_timeout", 0.5)
+        return SingleFlight(redis_lease=True, poll_interval=0.01, get_redis=get_redis, **kwargs)
+
+    async def test_leader_takes_and_releases_lease(self, fake_redis):
+        flight = self.make_flight(fake_redis)
+        seen = []
+
+        async def compute():
+            seen.append(dict(fake_redis.data))
+            return "result"
+
+        async def lookup():
+            return None
+
+        assert await flight.do("k", compute, lookup) == "result"
+        assert LEASE_PREFIX + "k" in seen[0]
+        assert fake_redis.data == {}
+
+    async def test_other_worker_waits_for_cached_result(self, fake_redis):
+        fake_redis.data[LEASE_PREFIX + "k"] = b"other-worker"
+        cache = {}
+        flight = self.make_flight(fake_redis)
+
+        async def compute():
+            raise AssertionError("should not compute")
+
+        async def lookup():
+            return cache.get("k")
+
+        async def other_worker_finishes():
+            await asyncio.sleep(0.03)
+            cache["k"] = "cached"
+
+        asyncio.create_task(other_worker_finishes())
+        assert await flight.do("k", compute, lookup) == "cached"
+
+    async def test_wait_times_out_and_computes_locally(self, fake_redis):
+        before = counter_value(analysis_metrics.SINGLEFLIGHT_TIMEOUTS)
+        fake_redis.data[LEASE_PREFIX + "k"] = b"other-worker"
+        flight = self.make_flight(fake_redis, wait_timeout=0.05)
+
+        async def compute():
+            return "local"
+
+        async def lookup():
+            return None
+
+        assert await flight.do("k", compute, lookup) == "local"
+        assert counter_value(analysis_metrics.SINGLEFLIGHT_TIMEOUTS) - before == 1
+        # Someone else's lease is left alone
+        assert fake_redis.data[LEASE_PREFIX + "k"] == b"other-worker"
+
+    async def test_released_lease_without_result_stops_waiting(self, fake_redis):
+        fake_redis.data[LEASE_PREFIX + "k"] = b"other-worker"
+        flight = self.make_flight(fake_redis, wait_timeout=5)
+
+        async def compute():
+            return "local"
+
+        async def lookup():
+            return None
+
+        async def other_worker_fails():
+            await asyncio.sleep(0.02)
+            del fake_redis.data[LEASE_PREFIX + "k"]
+
+        asyncio.create_task(other_worker_fails())
+        result = await asyncio.wait_for(flight.do("k", compute, lookup), timeout=1)
+        assert result == "local"
+
+    async def test_redis_error_computes_directly(self, fake_redis):
+        fake_redis.down = True
+        flight = self.make_flight(fake_redis)
+
+        async def compute():
+            return "result"
+
+        async def lookup():
+            return None
+
+        assert await flight.do("k", compute, lookup) == "result"
@@ -0,0 +1,181 @@
+"""
+Tests for background warm-up and the /health/ready probe.
+"""
+
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app import main as main_module
+from app.api.v1.endpoints import analyze as analyze_module
+from app.api.v1.endpoints import analyze_v2 as analyze_v2_module
+from app.core.vowel_inference import VowelInferencer
+from app.warmup import ComponentState, WarmupRegistry
+
+
+@pytest.fixture
+def registry():
+    return WarmupRegistry()
+
+
+class TestWarmupRegistry:
+    def test_states(self, registry):
+        def broken():
+            raise OSError("model file missing")
+
+        registry.register("ready", lambda: True)
+        registry.register("unavailable", lambda: False)
+        registry.register("broken", broken)
+
+        assert registry.status()["components"]["ready"] == {"state": "pending"}
+        registry.start(background=False)
+
+        status = registry.status()
+        assert status["ready"] is True
+        assert status["degraded"] is True
+        states = {name: c["state"] for name, c in status["components"].items()}
+        assert states == {"ready": "ready", "unavailable": "degraded", "broken": "failed"}
+        assert status["components"]["broken"]["detail"] == "model file missing"
+
+    def test_background_loading(self, registry):
+        release = threading.Event()
+        registry.register("slow", lambda: release.wait(5))
+
+        registry.start()
+        assert registry.status()["components"]["slow"]["state"] == "loading"
+        assert registry.is_ready() is False
+
+        release.set()
+        assert registry.wait(5) is True
+        status = registry.status()
+        assert (status["ready"], status["degraded"]) == (True, False)
+        assert status["components"]["slow"]["state"] == "ready"
+
+    def test_started_once(self, registry):
+        calls = []
+        registry.register("once", lambda: calls.append(1) or True)
+        registry.register("once", lambda: False)  # Keeps the first registration
+
+        registry.start(background=False)
+        registry.start(background=False)
+
+        assert calls == [1]
+        assert registry.status()["components"]["once"]["state"] == ComponentState.READY
+
+
+class TestReadyProbe:
+    @pytest.fixture
+    def app_registry(self, monkeypatch, registry):
+        monkeypatch.setattr(main_module, "warmup", registry)
+        return registry
+
+    async def _get_ready(self):
+        transport = ASGITransport(app=main_module.app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/health/ready")
+
+    async def test_starting(self, app_registry):
+        release = threading.Event()
+        app_registry.register("vowel_inference", lambda: release.wait(5))
+        app_registry.start()
+
+        response = await self._get_ready()
+        release.set()
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+        assert response.json()["components"]["vowel_inference"]["state"] == "loading"
+
+    async def test_ready_degraded(self, app_registry):
+        app_registry.register("vowel_inference", lambda: False)
+        app_registry.register("ml_models", lambda: True)
+        app_registry.start(background=False)
+
+        response = await self._get_ready()
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["status"], body["degraded"]) == ("ready", True)
+        assert body["components"]["ml_models"]["state"] == "ready"
+
+
+class TestNoCachingDuringWarmup:
+    VERSE = "إذا غامَرتَ في شَرَفٍ مَرومِ"
+
+    @pytest.fixture
+    def cache(self, monkeypatch, registry):
+        """Loading registry in both endpoints, caches recording their writes."""
+        writes = []
+
+        async def cache_get(key, *args, **kwargs):
+            return None
+
+        async def cache_get_many(keys, *args, **kwargs):
+            return [None] * len(keys)
+
+        async def cache_set(key, value, *args, **kwargs):
+            writes.append(key)
+            return True
+
+        async def cache_set_many(items, *args, **kwargs):
+            writes.extend(items)
+            return True
+
+        for module in (analyze_module, analyze_v2_module):
+            monkeypatch.setattr(module, "warmup", registry)
+            monkeypatch.setattr(module, "cache_get", cache_get)
+            monkeypatch.setattr(module, "cache_set", cache_set)
+        monkeypatch.setattr(analyze_v2_module, "cache_get_many", cache_get_many)
+        monkeypatch.setattr(analyze_v2_module, "cache_set_many", cache_set_many)
+        registry.register("vowel_inference", lambda: True)  # Pending: not ready
+        return writes
+
+    async def _post(self, path, json):
+        transport = ASGITransport(app=main_module.app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=json)
+
+    @pytest.mark.parametrize("path", ["/api/v1/analyze/", "/api/v1/analyze-v2/"])
+    async def test_result_before_warmup_is_not_cached(self, cache, registry, path):
+        response = await self._post(path, {"text": self.VERSE})
+
+        assert response.status_code == 200
+        assert cache == []
+
+        registry.start(background=False)
+        await self._post(path, {"text": self.VERSE})
+        assert len(cache) == 1
+
+    async def test_batch_before_warmup_is_not_cached(self, cache, registry):
+        batch = {"items": [{"text": self.VERSE}]}
+
+        response = await self._post("/api/v1/analyze-v2/batch", batch)
+
+        assert response.status_code == 200
+        assert cache == []
+
+        registry.start(background=False)
+        await self._post("/api/v1/analyze-v2/batch", batch)
+        assert len(cache) == 1
+
+
+class TestLazyVowelInference:
+    def test_heuristic_until_loaded(self):
+        inferencer = VowelInferencer(use_camel_tools=True, load=False)
+
+        assert inferencer.is_ready is False
+        assert inferencer.restore_vowels("قفا نبك") == inferencer._restore_with_heuristic(
+            "قفا نبك"
+        )
+
+    def test_load_is_idempotent(self):
+        inferencer = VowelInferencer(use_camel_tools=True, load=False)
+        sentinel = object()
+        inferencer.disambiguator = sentinel
+
+        assert inferencer.load_disambiguator() is True
+        assert inferencer.disambiguator is sentinel
+
+    def test_disabled(self):
+        assert VowelInferencer(use_camel_tools=False).load_disambiguator() is False